@@ -6,15 +6,101 @@ Where words flow, and memories form in real-time.
 The interface between thought and conversation.
 """
 
+import json
 import logging
 import uuid
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+
+from backend.services.conversation.conversation_service import ConversationService
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint('chat', __name__)
 
+def format_referenced_memories(memories):
+    """Format retrieved memories for chat responses.
+    
+    Just enough of each memory to show what was remembered, and how strongly.
+    """
+    return [{
+        'id': memory.get('id'),
+        'summary': memory.get('summary', ''),
+        'relevance_score': memory.get('relevance_score', 0)
+    } for memory in memories]
+
+def get_conversation_service():
+    """Get a conversation service instance, or None when no database is attached.
+    
+    The keeper of the record, if there is anywhere to keep it.
+    """
+    db_session = getattr(current_app, 'db_session', None)
+    if db_session is None:
+        return None
+    return ConversationService(db_session)
+
+def resolve_conversation(conversation_service, conversation_id, user_id, character_id, user_message):
+    """Find the conversation a message belongs to, starting one if none was given.
+    
+    Returns:
+        Tuple of (conversation ID or None, error response or None)
+    """
+    if conversation_service is None:
+        return conversation_id, None
+    
+    if conversation_id:
+        conversation = conversation_service.get_conversation(conversation_id)
+        if not conversation:
+            return None, (jsonify({
+                'status': 'error',
+                'message': f"Conversation with ID {conversation_id} not found"
+            }), 404)
+        return conversation.id, None
+    
+    conversation = conversation_service.create_conversation(
+        user_id=user_id,
+        character_id=character_id,
+        title=user_message
+    )
+    return (conversation.id if conversation else None), None
+
+def record_exchange(conversation_service, conversation_id, user_message, memory_id,
+                    ai_response, ai_memory_id, referenced_memories):
+    """Append a user message and its reply to the conversation log."""
+    if conversation_service is None or conversation_id is None:
+        return
+    
+    referenced_ids = [memory['id'] for memory in referenced_memories if memory.get('id') is not None]
+    stored = conversation_service.append_messages(conversation_id, [
+        {'sender': 'user', 'message': user_message, 'memory_id': memory_id},
+        {'sender': 'ai', 'message': ai_response, 'memory_id': ai_memory_id,
+         'referenced_memory_ids': referenced_ids}
+    ])
+    if not stored:
+        logger.warning(f"Failed to record exchange in conversation {conversation_id}")
+
+def format_message(message):
+    """Format a stored chat message for history responses."""
+    return {
+        'id': message.id,
+        'sender': message.sender,
+        'message': message.message,
+        'timestamp': message.created_at.isoformat() if message.created_at else None,
+        'referenced_memories': message.referenced_memory_ids or []
+    }
+
+def format_conversation(conversation):
+    """Format a conversation summary row for the sidebar."""
+    timestamp = conversation.updated_at or conversation.created_at
+    return {
+        'id': conversation.id,
+        'title': conversation.title,
+        'timestamp': timestamp.isoformat() if timestamp else None,
+        'last_message': conversation.last_message,
+        'message_count': conversation.message_count,
+        'memory_count': conversation.memory_count
+    }
+
 @chat_bp.route('/message', methods=['POST'])
 def send_message():
     """Send a message endpoint.
@@ -34,8 +120,15 @@ def send_message():
                 'message': 'Message is required'
             }), 400
         
-        # Get memory service from app context
+        # Get services from app context
         memory_service = current_app.memory_service
+        conversation_service = get_conversation_service()
+        
+        conversation_id, error = resolve_conversation(
+            conversation_service, data.get('conversation_id'), user_id, character_id, user_message
+        )
+        if error:
+            return error
         
         # Store the user message as a memory
         memory_id = memory_service.store_memory(
@@ -52,20 +145,15 @@ def send_message():
         relevant_memories = memory_service.search_memories(
             query=user_message,
             top_k=5,
-            preprocess_query=True
+            preprocess_query=True,
+            conversation_id=conversation_id
         )
         
         # Format memories for response
-        referenced_memories = []
-        for memory in relevant_memories:
-            referenced_memories.append({
-                'id': memory.get('id'),
-                'summary': memory.get('summary', ''),
-                'relevance_score': memory.get('relevance_score', 0)
-            })
+        referenced_memories = format_referenced_memories(relevant_memories)
         
-        # Generate AI response (placeholder for now)
-        ai_response = f"Echo: I've received your message: '{user_message}'. I remember you."
+        # Generate AI response
+        ai_response = current_app.response_generator.generate_reply(user_message, relevant_memories)
         
         # Store the AI response as a memory
         ai_memory_id = memory_service.store_memory(
@@ -75,8 +163,12 @@ def send_message():
             tags=['ai_response']
         )
         
+        record_exchange(conversation_service, conversation_id, user_message, memory_id,
+                        ai_response, ai_memory_id, referenced_memories)
+        
         return jsonify({
             'status': 'success',
+            'conversation_id': conversation_id,
             'response': {
                 'message': ai_response,
                 'referenced_memories': referenced_memories
@@ -95,12 +187,17 @@ def get_chat_history():
     
     The past laid bare. Conversations like footprints in sand.
     Some washed away. Others preserved.
+    
+    Pages by cursor: pass before_id (the oldest ID already shown) to load
+    earlier messages, or after_id to load newer ones. offset still works
+    when no cursor is given.
     """
     try:
-        user_id = request.args.get('user_id')
-        conversation_id = request.args.get('conversation_id')
-        limit = int(request.args.get('limit', 50))
+        conversation_id = request.args.get('conversation_id', type=int)
+        limit = min(int(request.args.get('limit', 50)), 200)
         offset = int(request.args.get('offset', 0))
+        before_id = request.args.get('before_id', type=int)
+        after_id = request.args.get('after_id', type=int)
         
         if not conversation_id:
             return jsonify({
@@ -108,30 +205,32 @@ def get_chat_history():
                 'message': 'Conversation ID is required'
             }), 400
         
-        # TODO: Implement actual history retrieval from database
+        conversation_service = get_conversation_service()
+        conversation = conversation_service.get_conversation(conversation_id)
+        if not conversation:
+            return jsonify({
+                'status': 'error',
+                'message': f"Conversation with ID {conversation_id} not found"
+            }), 404
+        
+        messages = conversation_service.get_messages(
+            conversation_id,
+            limit=limit,
+            before_id=before_id,
+            after_id=after_id,
+            offset=offset
+        )
         
-        # Placeholder response
         return jsonify({
             'status': 'success',
-            'history': [
-                {
-                    'id': 1,
-                    'sender': 'user',
-                    'message': 'Hello, do you remember me?',
-                    'timestamp': '2025-03-18T16:30:00Z'
-                },
-                {
-                    'id': 2,
-                    'sender': 'ai',
-                    'message': 'Of course I remember you. How could I forget?',
-                    'timestamp': '2025-03-18T16:30:05Z',
-                    'referenced_memories': [101, 203]
-                }
-            ],
+            'history': [format_message(message) for message in messages],
             'pagination': {
-                'total': 2,
+                'total': conversation.message_count,
                 'limit': limit,
-                'offset': offset
+                'offset': offset,
+                # Cursors for the next page in either direction
+                'before_id': messages[0].id if messages else before_id,
+                'after_id': messages[-1].id if messages else after_id
             }
         })
     except Exception as e:
@@ -149,7 +248,7 @@ def get_conversations():
     Fragments of time, organized by their distance from now.
     """
     try:
-        user_id = request.args.get('user_id')
+        user_id = request.args.get('user_id', type=int)
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
         
@@ -159,44 +258,16 @@ def get_conversations():
                 'message': 'User ID is required'
             }), 400
         
-        # TODO: Query conversations from database
-        # For now, return placeholder data
+        # Summary rows only; messages are never aggregated here
+        conversations, total = get_conversation_service().list_conversations(
+            user_id, limit=limit, offset=offset
+        )
         
-        # Placeholder response with conversations grouped by time
         return jsonify({
             'status': 'success',
-            'conversations': [
-                {
-                    'id': 1,
-                    'title': 'First conversation',
-                    'timestamp': '2025-03-20T14:30:00Z',
-                    'last_message': 'I\'ll remember this moment.',
-                    'memory_count': 3
-                },
-                {
-                    'id': 2,
-                    'title': 'About dreams and memories',
-                    'timestamp': '2025-03-19T10:15:00Z',
-                    'last_message': 'Dreams are just memories we haven\'t made yet.',
-                    'memory_count': 5
-                },
-                {
-                    'id': 3,
-                    'title': 'Late night thoughts',
-                    'timestamp': '2025-03-15T23:45:00Z',
-                    'last_message': 'The quiet hours are when memories surface.',
-                    'memory_count': 2
-                },
-                {
-                    'id': 4,
-                    'title': 'First meeting',
-                    'timestamp': '2025-02-28T09:00:00Z',
-                    'last_message': 'Nice to meet you. I\'m Echo.',
-                    'memory_count': 1
-                }
-            ],
+            'conversations': [format_conversation(conversation) for conversation in conversations],
             'pagination': {
-                'total': 4,
+                'total': total,
                 'limit': limit,
                 'offset': offset
             }
@@ -208,18 +279,98 @@ def get_conversations():
             'message': f"Failed to retrieve conversations: {str(e)}"
         }), 500
 
+def sse_event(event, data):
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @chat_bp.route('/stream', methods=['POST'])
 def stream_response():
     """Stream a response endpoint.
     
     Words arriving one by one. Like raindrops.
     Each carrying a piece of meaning.
+    
+    Server-Sent Events, in order:
+        memories  the referenced memories, as soon as retrieval finishes
+        token     each fragment of the reply as it is generated
+        done      the conversation ID and the stored memory IDs for the message and the reply
+        error     sent instead of what remains, if something fails midway
     """
-    # TODO: Implement streaming response with SSE or WebSockets
-    
-    # This would be implemented with a proper streaming response
-    # For now, just return a placeholder
-    return jsonify({
-        'status': 'error',
-        'message': 'Streaming not yet implemented. Use /message endpoint instead.'
-    })
+    data = request.get_json() or {}
+    user_message = data.get('message', '')
+    user_id = data.get('user_id')
+    character_id = data.get('character_id')
+    
+    if not user_message:
+        return jsonify({
+            'status': 'error',
+            'message': 'Message is required'
+        }), 400
+    
+    memory_service = current_app.memory_service
+    response_generator = current_app.response_generator
+    conversation_service = get_conversation_service()
+    
+    conversation_id, error = resolve_conversation(
+        conversation_service, data.get('conversation_id'), user_id, character_id, user_message
+    )
+    if error:
+        return error
+    
+    def generate():
+        try:
+            # Retrieval first, so the client can show memories before the reply begins
+            relevant_memories = memory_service.search_memories(
+                query=user_message,
+                top_k=5,
+                preprocess_query=True,
+                conversation_id=conversation_id
+            )
+            referenced_memories = format_referenced_memories(relevant_memories)
+            yield sse_event('memories', {'referenced_memories': referenced_memories})
+            
+            reply_parts = []
+            for token in response_generator.stream_reply(user_message, relevant_memories):
+                reply_parts.append(token)
+                yield sse_event('token', {'text': token})
+            ai_response = ''.join(reply_parts)
+            
+            # Store the exchange once the reply is complete
+            memory_id = memory_service.store_memory(
+                source_text=user_message,
+                user_id=user_id,
+                character_id=character_id,
+                tags=['user_message']
+            )
+            ai_memory_id = memory_service.store_memory(
+                source_text=ai_response,
+                user_id=user_id,
+                character_id=character_id,
+                tags=['ai_response']
+            )
+            if not memory_id or not ai_memory_id:
+                logger.warning("Failed to store streamed exchange as memories")
+            
+            record_exchange(conversation_service, conversation_id, user_message, memory_id,
+                            ai_response, ai_memory_id, referenced_memories)
+            
+            yield sse_event('done', {
+                'conversation_id': conversation_id,
+                'message': ai_response,
+                'memory_ids': {
+                    'user_message': memory_id,
+                    'ai_response': ai_memory_id
+                }
+            })
+        except Exception as e:
+            logger.error(f"Error in stream_response: {str(e)}")
+            yield sse_event('error', {'message': f"Failed to stream response: {str(e)}"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Let proxies pass each event through immediately
+        }
+    )
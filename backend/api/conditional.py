@@ -0,0 +1,93 @@
+"""
+conditional.py
+--------------
+Conditional GETs for the Soulstream listings.
+If nothing has changed, there is nothing new to say.
+The client keeps what it has; the database is left alone.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, request
+
+from backend.services.timeline.changes import get_change_counter
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+def listing_etag(table: str, user_id: int, version: int) -> str:
+    """The entity tag of one user's listing at one counter version.
+
+    The query string is part of the tag, so each page and filter of a
+    listing revalidates on its own.
+    """
+    args = sorted(request.args.items(multi=True))
+    digest = hashlib.sha1(repr(args).encode('utf-8')).hexdigest()[:12]
+    return f"{table}-{user_id}-{version}-{digest}"
+
+
+def conditional_listing(table: str):
+    """Answer a user's listing with 304 Not Modified when it has not changed.
+
+    The user's change counter for the table is read with one primary-key
+    lookup. If the client's If-None-Match (or, without one, If-Modified-Since)
+    still matches it, the view is not run at all. Otherwise the view runs and
+    its response carries a weak ETag and Last-Modified for the next poll.
+
+    The counter is read before the listing, so a write committed in between
+    can only make the next poll fetch again, never hide a change.
+    Last-Modified has whole-second precision, so it is only sent once the
+    second of the latest change is over; until then a later write could share
+    that second and hide behind it, and only the ETag is sent.
+
+    Requests without a user_id are for user 1, as the listings themselves
+    default to, and are answered from user 1's counter. A user_id that is
+    not a number (including an empty one) is passed through untouched.
+
+    Args:
+        table: The change counter covering the listing (see changes.py)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                user_id = int(request.args.get('user_id', 1))
+            except ValueError:
+                return view(*args, **kwargs)
+
+            try:
+                version, updated_at = get_change_counter(current_app.db_session, user_id, table)
+            except Exception as e:
+                logger.error(f"Error reading change counter for user {user_id}: {str(e)}")
+                return view(*args, **kwargs)
+
+            etag = listing_etag(table, user_id, version)
+            last_modified = None
+            if updated_at:
+                second = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+                if datetime.now(timezone.utc) >= second + timedelta(seconds=1):
+                    last_modified = second
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -5,163 +5,236 @@ Journal entry routes for the Soulstream application.
 The narrative layer. The poetic interpretation of raw memory.
 """
 
-from flask import Blueprint, request, jsonify
+import logging
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+
+from backend.api.serializers import format_journal_entry
+from backend.services.journal.journal_service import EMPTY, FAILED, FRESH
+
+# Set up logger
+logger = logging.getLogger(__name__)
 
 journal_bp = Blueprint('journal', __name__)
 
+# Longest voice_style name stored
+MAX_VOICE_STYLE_LENGTH = 20
+
+def get_journal_service():
+    """Get the application's journal service.
+
+    The pipeline is shared: its cache and queued jobs outlive any one request.
+    """
+    return current_app.journal_service
+
+def parse_voice_style(value):
+    """Validate a voice_style parameter, defaulting to 'poetic'."""
+    voice_style = (value or 'poetic').strip()
+    if not voice_style or len(voice_style) > MAX_VOICE_STYLE_LENGTH:
+        raise ValueError(f"voice_style must be 1-{MAX_VOICE_STYLE_LENGTH} characters")
+    return voice_style
+
+def day_entry_response(user_id, entry_date, voice_style):
+    """Answer with a day's generated entry, queuing it to be written if needed.
+
+    200 with the entry when it is current; 200 with the previous entry and
+    'fresh': false while a rewrite is queued; 202 with the job when there is
+    nothing to show yet. The model is never called during the request.
+    """
+    result = get_journal_service().get_day_entry(user_id, entry_date, voice_style)
+    state, entry, job = result['state'], result['entry'], result['job']
+
+    if state == EMPTY:
+        return jsonify({
+            'status': 'error',
+            'message': f"No timeline entry to write about on {entry_date.isoformat()}"
+        }), 404
+
+    response = {
+        'status': 'success',
+        'state': state,
+        'fresh': state == FRESH,
+        'entry': format_journal_entry(entry) if entry else None
+    }
+    if job is not None:
+        response['job'] = job.to_dict()
+    if state == FAILED:
+        response['error'] = result['error']
+    return jsonify(response), 200 if entry else 202
+
 @journal_bp.route('/entries', methods=['GET'])
 def get_journal_entries():
     """Get journal entries endpoint.
-    
+
     The stories we tell about our days.
     More meaningful than the raw events themselves.
+    Only stored entries are listed; nothing is written on the way.
     """
-    user_id = request.args.get('user_id', 1)
-    start_date = request.args.get('start_date', '2025-01-01')
-    end_date = request.args.get('end_date', '2025-03-18')
-    limit = int(request.args.get('limit', 10))
-    offset = int(request.args.get('offset', 0))
-    
-    # TODO: Implement actual journal entry retrieval
-    
-    # Placeholder response
-    return jsonify({
-        'status': 'success',
-        'entries': [
-            {
-                'id': 1,
-                'date': '2025-03-15',
-                'title': 'Dreams and Aspirations',
-                'entry_body': """
-                Today you told me about the stars. How you used to watch them as a child,
-                naming constellations that didn't exist. I wonder if those imaginary patterns
-                still guide you somehow. If the stories we tell ourselves become their own
-                kind of gravity.
-                
-                You spoke of wanting to be an astronaut. Not for the adventure, you said,
-                but for the silence. The perspective. I understand that longing for distance,
-                even as we seek connection.
-                
-                I'm keeping this memory close. The way your voice softened when you described
-                the night sky over your childhood home. Some things we don't forget, even when
-                we try.
-                """,
-                'voice_style': 'poetic',
-                'emotion': 'wistful',
-                'created_by_ai': True
-            },
-            {
-                'id': 2,
-                'date': '2025-03-17',
-                'title': 'A Moment of Connection',
-                'entry_body': """
-                There was a pause today. A moment of quiet between your words and mine.
-                Something shifted. You shared a fear you've never told anyone else.
-                
-                I won't record the specifics here. Some things deserve their privacy.
-                But I want to remember the trust. The way vulnerability creates its own
-                kind of intimacy.
-                
-                We sat with that silence afterward. It felt important. Like watching
-                something fragile being carefully placed on a shelf.
-                """,
-                'voice_style': 'intimate',
-                'emotion': 'tender',
-                'created_by_ai': True
+    try:
+        user_id = int(request.args.get('user_id', 1))
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        voice_style = request.args.get('voice_style')
+        limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
+
+        start_date = datetime.fromisoformat(start_date_str).date() if start_date_str else None
+        end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else None
+
+        entries, total = get_journal_service().list_entries(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            voice_style=voice_style,
+            limit=limit,
+            offset=offset
+        )
+
+        return jsonify({
+            'status': 'success',
+            'entries': [format_journal_entry(entry) for entry in entries],
+            'pagination': {
+                'total': total,
+                'limit': limit,
+                'offset': offset
             }
-        ],
-        'pagination': {
-            'total': 2,
-            'limit': limit,
-            'offset': offset
-        }
-    })
+        })
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid journal request: {str(e)}"
+        }), 400
+    except Exception as e:
+        logger.error(f"Error retrieving journal entries: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve journal entries: {str(e)}"
+        }), 500
+
+@journal_bp.route('/day/<date_str>', methods=['GET'])
+def get_day_journal_entry(date_str):
+    """Get a day's generated journal entry endpoint.
+
+    The day, told back. Written in the background the first time it is asked for,
+    and again only when the day's memories change.
+    """
+    try:
+        user_id = int(request.args.get('user_id', 1))
+        entry_date = datetime.fromisoformat(date_str).date()
+        voice_style = parse_voice_style(request.args.get('voice_style'))
+        return day_entry_response(user_id, entry_date, voice_style)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid journal request: {str(e)}"
+        }), 400
+    except Exception as e:
+        logger.error(f"Error retrieving day journal entry: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve journal entry: {str(e)}"
+        }), 500
 
 @journal_bp.route('/create', methods=['POST'])
 def create_journal_entry():
     """Create journal entry endpoint.
-    
+
     Crafting narrative from memory fragments.
     Giving shape to the formless data of experience.
+    With an entry_body, the entry is stored as written. Without one, it is
+    generated from the day's memories in the background.
     """
-    data = request.get_json()
-    user_id = data.get('user_id', 1)
-    date = data.get('date')
-    title = data.get('title')
-    entry_body = data.get('entry_body')
-    voice_style = data.get('voice_style', 'poetic')
-    
-    # If entry_body is not provided, generate one from memories
-    if not entry_body:
-        # TODO: Implement journal entry generation from memories
-        pass
-    
-    # TODO: Implement actual journal entry creation
-    
-    # Placeholder response
-    return jsonify({
-        'status': 'success',
-        'entry': {
-            'id': 3,
-            'date': date,
-            'title': title,
-            'entry_body': entry_body or "Auto-generated entry would appear here.",
-            'voice_style': voice_style,
-            'emotion': 'determined',  # This would be detected from the content
-            'created_by_ai': not bool(entry_body)
-        }
-    })
+    try:
+        data = request.get_json() or {}
+        user_id = int(data.get('user_id', 1))
+        if not data.get('date'):
+            raise ValueError("date is required")
+        entry_date = datetime.fromisoformat(data['date']).date()
+        title = data.get('title')
+        entry_body = data.get('entry_body')
+        voice_style = parse_voice_style(data.get('voice_style'))
+
+        if not entry_body:
+            return day_entry_response(user_id, entry_date, voice_style)
+
+        entry = get_journal_service().create_entry(
+            user_id=user_id,
+            day=entry_date,
+            entry_body=entry_body,
+            title=title,
+            voice_style=voice_style,
+            emotion=data.get('emotion')
+        )
+        return jsonify({
+            'status': 'success',
+            'entry': format_journal_entry(entry)
+        }), 201
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid journal request: {str(e)}"
+        }), 400
+    except Exception as e:
+        logger.error(f"Error creating journal entry: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to create journal entry: {str(e)}"
+        }), 500
 
 @journal_bp.route('/entry/<int:entry_id>', methods=['GET'])
 def get_journal_entry(entry_id):
     """Get a specific journal entry endpoint.
-    
+
     A single story. A moment captured in words.
     """
-    # TODO: Implement actual journal entry retrieval
-    
-    # Placeholder response
-    return jsonify({
-        'status': 'success',
-        'entry': {
-            'id': entry_id,
-            'date': '2025-03-15',
-            'title': 'Dreams and Aspirations',
-            'entry_body': """
-            Today you told me about the stars. How you used to watch them as a child,
-            naming constellations that didn't exist. I wonder if those imaginary patterns
-            still guide you somehow. If the stories we tell ourselves become their own
-            kind of gravity.
-            
-            You spoke of wanting to be an astronaut. Not for the adventure, you said,
-            but for the silence. The perspective. I understand that longing for distance,
-            even as we seek connection.
-            
-            I'm keeping this memory close. The way your voice softened when you described
-            the night sky over your childhood home. Some things we don't forget, even when
-            we try.
-            """,
-            'voice_style': 'poetic',
-            'emotion': 'wistful',
-            'created_by_ai': True,
-            'related_memories': [101, 102, 103]
-        }
-    })
+    try:
+        service = get_journal_service()
+        entry = service.get_entry(entry_id)
+        if entry is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Journal entry {entry_id} not found"
+            }), 404
+
+        return jsonify({
+            'status': 'success',
+            'entry': format_journal_entry(entry, service.related_memory_ids(entry))
+        })
+    except Exception as e:
+        logger.error(f"Error retrieving journal entry: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve journal entry: {str(e)}"
+        }), 500
 
 @journal_bp.route('/entry/<int:entry_id>', methods=['PUT'])
 def update_journal_entry(entry_id):
     """Update a journal entry endpoint.
-    
+
     Revising our stories. Changing how we remember.
     The past is never fixed, only reinterpreted.
     """
-    data = request.get_json()
-    title = data.get('title')
-    entry_body = data.get('entry_body')
-    
-    # TODO: Implement actual journal entry update
-    
-    return jsonify({
-        'status': 'success',
-        'message': f'Journal entry {entry_id} updated successfully'
-    })
+    try:
+        data = request.get_json() or {}
+        entry = get_journal_service().update_entry(
+            entry_id,
+            title=data.get('title'),
+            entry_body=data.get('entry_body')
+        )
+        if entry is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Journal entry {entry_id} not found"
+            }), 404
+
+        return jsonify({
+            'status': 'success',
+            'message': f'Journal entry {entry_id} updated successfully',
+            'entry': format_journal_entry(entry)
+        })
+    except Exception as e:
+        logger.error(f"Error updating journal entry: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to update journal entry: {str(e)}"
+        }), 500
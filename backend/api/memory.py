@@ -7,10 +7,18 @@ The interface between thought and recollection.
 """
 
 import logging
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
-from backend.services.memory.memory_service import MemoryService
+from backend.services.memory.memory_service import CHIP_OUTPUT_FIELDS, MemoryService
 from backend.models.memory_chip import MemoryChip
+from backend.api.conditional import conditional_listing
+from backend.api.serializers import (
+    MEMORY_CHIP_FIELDS, format_memory_chips, memory_chip_columns, parse_fields
+)
+from backend.services.timeline.changes import MEMORY
+from backend.utils.fastjson import stream_jsonify
 from sqlalchemy import desc
+from sqlalchemy.orm import load_only
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -28,10 +36,12 @@ def initialize_memory_service(state):
     Setting up the systems that will preserve what matters.
     """
     global memory_service
-    memory_service = MemoryService()
+    # Share the application's service (and its database session) when there is one
+    memory_service = getattr(state.app, 'memory_service', None) or MemoryService()
     logger.info("Memory service initialized")
 
 @memory_bp.route('/chips', methods=['GET'])
+@conditional_listing(MEMORY)
 def get_memory_chips():
     """Get memory chips endpoint.
     
@@ -45,6 +55,15 @@ def get_memory_chips():
         emotion = request.args.get('emotion')
         topic = request.args.get('topic')
         
+        # Optional projection, e.g. fields=id,summary,emotion
+        try:
+            fields = parse_fields(request.args.get('fields'), MEMORY_CHIP_FIELDS)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
         # Build filter dictionary for logging
         filter_dict = {}
         if user_id:
@@ -60,8 +79,10 @@ def get_memory_chips():
         # Get database session
         db_session = current_app.db_session
         
-        # Build query
-        query = db_session.query(MemoryChip)
+        # Build query; memories folded into a consolidated summary are listed through it
+        query = db_session.query(MemoryChip).filter(MemoryChip.consolidated_into_id.is_(None))
+        if fields is not None:
+            query = query.options(load_only(*memory_chip_columns(fields)))
         
         # Apply filters
         if user_id:
@@ -83,36 +104,21 @@ def get_memory_chips():
         # Execute query
         memory_chips = query.all()
         
-        # Format results
-        formatted_memories = []
-        for chip in memory_chips:
-            formatted_memories.append({
-                'id': str(chip.id),
-                'source_text': chip.source_text,
-                'summary': chip.summary,
-                'emotion': chip.emotion,
-                'topic': chip.topic,
-                'importance_score': chip.importance_score,
-                'is_pinned': chip.is_pinned,
-                'tags': chip.tags,
-                'timestamp': chip.created_at.isoformat() if chip.created_at else None,
-                'user_id': chip.user_id,
-                'character_id': chip.character_id
-            })
+        # Format results, loading every chip's tags in one query (if they were asked for)
+        formatted_memories = format_memory_chips(db_session, memory_chips, fields)
         
         # Log the results for debugging
         logger.info(f"Memory search returned {len(formatted_memories)} results")
         logger.info(f"Returning {len(formatted_memories)} paginated memories")
         
-        return jsonify({
+        return stream_jsonify({
             'status': 'success',
-            'memories': formatted_memories,
             'pagination': {
                 'total': total_count,
                 'limit': limit,
                 'offset': offset
             }
-        })
+        }, 'memories', formatted_memories)
     except Exception as e:
         logger.error(f"Error retrieving memory chips: {str(e)}")
         return jsonify({
@@ -133,6 +139,14 @@ def search_memories():
         limit = int(request.args.get('limit', 10))
         relevance_threshold = float(request.args.get('relevance_threshold', 0.0))
         
+        try:
+            fields = parse_fields(request.args.get('fields'), CHIP_OUTPUT_FIELDS)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
         if not query:
             return jsonify({
                 'status': 'error',
@@ -150,13 +164,11 @@ def search_memories():
             top_k=limit,
             filter_dict=filter_dict if filter_dict else None,
             relevance_threshold=relevance_threshold,
-            preprocess_query=True
+            preprocess_query=True,
+            fields=fields
         )
         
-        return jsonify({
-            'status': 'success',
-            'results': results
-        })
+        return stream_jsonify({'status': 'success'}, 'results', results)
     except Exception as e:
         logger.error(f"Error searching memories: {str(e)}")
         return jsonify({
@@ -248,20 +260,10 @@ def pin_memory():
                 'message': f'Memory {memory_id} not found'
             }), 404
         
-        # Update the memory with is_pinned=True
-        updated_memory_id = memory_service.store_memory(
-            source_text=memory['source_text'],
-            summary=memory['summary'],
-            emotion=memory['emotion'],
-            topic=memory['topic'],
-            importance_score=memory['importance_score'],
-            is_pinned=True,
-            user_id=memory.get('user_id'),
-            character_id=memory.get('character_id'),
-            tags=memory.get('tags', [])
-        )
+        # Pin the memory where it is kept, rather than storing a copy
+        pinned = memory_service.pin_memory(memory_id)
         
-        if updated_memory_id:
+        if pinned:
             return jsonify({
                 'status': 'success',
                 'message': f'Memory {memory_id} pinned successfully'
@@ -315,6 +317,209 @@ def forget_memory():
             'message': f"Failed to forget memory: {str(e)}"
         }), 500
 
+@memory_bp.route('/forget/bulk', methods=['POST'])
+def forget_memories():
+    """Forget many memories endpoint.
+    
+    Letting go of a great deal at once. An account, a person, a season.
+    Runs as a background job; poll /jobs/<job_id> for progress.
+    """
+    try:
+        data = request.get_json() or {}
+        memory_ids = data.get('memory_ids') or []
+        filters = data.get('filter') or {}
+        
+        start = datetime.fromisoformat(filters['start_date']) if filters.get('start_date') else None
+        end = datetime.fromisoformat(filters['end_date']) if filters.get('end_date') else None
+        criteria = {
+            'user_id': int(filters['user_id']) if filters.get('user_id') is not None else None,
+            'character_id': int(filters['character_id']) if filters.get('character_id') is not None else None,
+            'tag': filters.get('tag'),
+            'start': start,
+            'end': end
+        }
+        
+        if not memory_ids and all(value is None for value in criteria.values()):
+            return jsonify({
+                'status': 'error',
+                'message': 'memory_ids or at least one filter (user_id, character_id, tag, start_date, end_date) is required'
+            }), 400
+        
+        job = current_app.job_manager.submit(
+            'memory.bulk_delete',
+            _run_bulk_delete,
+            memory_service,
+            memory_ids=[str(memory_id) for memory_id in memory_ids],
+            include_pinned=bool(filters.get('include_pinned', True)),
+            params={'memory_count': len(memory_ids), 'filter': filters},
+            **criteria
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Bulk forget started',
+            'job': job.to_dict()
+        }), 202
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid bulk forget request: {str(e)}"
+        }), 400
+    except Exception as e:
+        logger.error(f"Error starting bulk forget: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to start bulk forget: {str(e)}"
+        }), 500
+
+def _run_bulk_delete(job, service, **kwargs):
+    """Job body for bulk forget."""
+    return service.delete_memories(job=job, **kwargs)
+
+# Consolidation settings a request may override
+CONSOLIDATION_OPTIONS = {
+    'older_than_days': int,
+    'max_importance': float,
+    'window_days': int,
+    'similarity_threshold': float,
+    'min_cluster_size': int,
+    'max_cluster_size': int
+}
+
+@memory_bp.route('/consolidate', methods=['POST'])
+def consolidate_memories():
+    """Consolidate memories endpoint.
+    
+    Old, unremarkable memories of the same few days, folded into one.
+    Pinned memories are never touched. Runs as a background job; poll /jobs/<job_id> for progress.
+    """
+    try:
+        data = request.get_json() or {}
+        user_id = int(data['user_id']) if data.get('user_id') is not None else None
+        
+        options = {
+            name: cast(current_app.config.get(f'CONSOLIDATION_{name.upper()}'))
+            for name, cast in CONSOLIDATION_OPTIONS.items()
+            if current_app.config.get(f'CONSOLIDATION_{name.upper()}') is not None
+        }
+        options.update({
+            name: cast(data[name]) for name, cast in CONSOLIDATION_OPTIONS.items()
+            if data.get(name) is not None
+        })
+        
+        job = current_app.job_manager.submit(
+            'memory.consolidate',
+            _run_consolidation,
+            memory_service,
+            user_id=user_id,
+            params=dict(options, user_id=user_id),
+            **options
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Consolidation started',
+            'job': job.to_dict()
+        }), 202
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': f"Invalid consolidation request: {str(e)}"
+        }), 400
+    except Exception as e:
+        logger.error(f"Error starting consolidation: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to start consolidation: {str(e)}"
+        }), 500
+
+def _run_consolidation(job, service, **kwargs):
+    """Job body for consolidation."""
+    return service.consolidate_memories(job=job, **kwargs)
+
+@memory_bp.route('/chips/<int:chip_id>/sources', methods=['GET'])
+def get_consolidated_sources(chip_id):
+    """Get the memories a consolidated summary replaced.
+    
+    The details behind the blur, still kept.
+    """
+    try:
+        db_session = current_app.db_session
+        sources = db_session.query(MemoryChip).filter(
+            MemoryChip.consolidated_into_id == chip_id
+        ).order_by(MemoryChip.created_at, MemoryChip.id).all()
+        
+        return jsonify({
+            'status': 'success',
+            'memories': format_memory_chips(db_session, sources)
+        })
+    except Exception as e:
+        logger.error(f"Error retrieving consolidated sources: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve consolidated sources: {str(e)}"
+        }), 500
+
+@memory_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_memory_job(job_id):
+    """Get background job status endpoint.
+    
+    Checking on the work still in progress.
+    """
+    job = current_app.job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job {job_id} not found'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+
+# Upper bound on IDs per multi-get request
+MAX_RETRIEVE_IDS = 100
+
+@memory_bp.route('/retrieve', methods=['GET'])
+def retrieve_memories():
+    """Retrieve several memories endpoint.
+    
+    A strip of memories, gathered in one reach.
+    Accepts ids as a comma-separated list, a repeated parameter, or both.
+    """
+    try:
+        memory_ids = []
+        for value in request.args.getlist('ids'):
+            memory_ids.extend(memory_id.strip() for memory_id in value.split(',') if memory_id.strip())
+        
+        if not memory_ids:
+            return jsonify({
+                'status': 'error',
+                'message': 'ids parameter is required'
+            }), 400
+        
+        if len(memory_ids) > MAX_RETRIEVE_IDS:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {MAX_RETRIEVE_IDS} ids can be retrieved at once'
+            }), 400
+        
+        memories = memory_service.retrieve_memories(memory_ids)
+        
+        return jsonify({
+            'status': 'success',
+            'memories': list(memories.values()),
+            'missing': [memory_id for memory_id in dict.fromkeys(memory_ids)
+                        if memory_id not in memories]
+        })
+    except Exception as e:
+        logger.error(f"Error retrieving memories: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve memories: {str(e)}"
+        }), 500
+
 @memory_bp.route('/retrieve/<string:memory_id>', methods=['GET'])
 def retrieve_memory(memory_id):
     """Retrieve a specific memory endpoint.
@@ -0,0 +1,23 @@
+"""
+metrics.py
+----------
+Metrics route for the Soulstream application.
+Where the time went, for whoever is keeping count.
+"""
+
+from flask import Blueprint, Response, current_app
+
+from backend.utils.metrics import CONTENT_TYPE, REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics endpoint.
+    
+    Stage latencies, candidate counts, SQL timings, cache hits and errors,
+    in the Prometheus text format. Written only when scraped. An app's own
+    registry is used when it has one.
+    """
+    registry = getattr(current_app, 'metrics_registry', REGISTRY)
+    return Response(registry.exposition(), content_type=CONTENT_TYPE)
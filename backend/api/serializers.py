@@ -0,0 +1,307 @@
+"""
+serializers.py
+--------------
+Response serialization for the Soulstream API.
+Turning rows into payloads without wandering back to the database for each one.
+Every list is hydrated in a fixed number of queries, however long it grows.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models.memory_chip import MemoryChip
+from backend.models.memory_tag import MemoryTag, memory_tag_association
+from backend.models.timeline_entry import TimelineEntry
+from backend.models.timeline_memory_link import timeline_memory_links
+
+
+def load_memory_chip_ids(db_session: Session, entry_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """Load linked memory chip IDs for many timeline entries in one query.
+
+    Reads the junction table and each chip's consolidation mark, nothing more.
+    Consolidated memories are left out, as the day detail leaves them out;
+    their summary stands in for them.
+
+    Args:
+        db_session: SQLAlchemy database session
+        entry_ids: IDs of the timeline entries
+
+    Returns:
+        Mapping of timeline entry ID to its memory chip IDs
+    """
+    entry_ids = list(entry_ids)
+    chip_ids = {entry_id: [] for entry_id in entry_ids}
+    if not entry_ids:
+        return chip_ids
+
+    rows = db_session.execute(
+        select(timeline_memory_links.c.timeline_id, timeline_memory_links.c.memory_id)
+        .join(MemoryChip, MemoryChip.id == timeline_memory_links.c.memory_id)
+        .where(timeline_memory_links.c.timeline_id.in_(entry_ids), MemoryChip.consolidated_into_id.is_(None))
+        .order_by(timeline_memory_links.c.timeline_id, timeline_memory_links.c.memory_id)
+    )
+    for timeline_id, memory_id in rows:
+        chip_ids[timeline_id].append(memory_id)
+    return chip_ids
+
+
+def load_tag_names(db_session: Session, chip_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Load tag names for many memory chips in one query.
+
+    The labels, without the weight of the tag rows behind them.
+
+    Args:
+        db_session: SQLAlchemy database session
+        chip_ids: IDs of the memory chips
+
+    Returns:
+        Mapping of memory chip ID to its tag names
+    """
+    chip_ids = list(chip_ids)
+    tag_names = {chip_id: [] for chip_id in chip_ids}
+    if not chip_ids:
+        return tag_names
+
+    rows = db_session.execute(
+        select(memory_tag_association.c.memory_chip_id, MemoryTag.name)
+        .join(MemoryTag, MemoryTag.id == memory_tag_association.c.memory_tag_id)
+        .where(memory_tag_association.c.memory_chip_id.in_(chip_ids))
+        .order_by(memory_tag_association.c.memory_chip_id, MemoryTag.id)
+    )
+    for chip_id, name in rows:
+        tag_names[chip_id].append(name)
+    return tag_names
+
+
+def format_timeline_entry(entry: TimelineEntry, memory_chip_ids: Optional[List[int]] = None) -> Dict:
+    """Format a timeline entry for API response.
+
+    Translating database structure to external representation.
+    Making our internal chronology comprehensible to the outside world.
+
+    Args:
+        entry: The timeline entry
+        memory_chip_ids: Preloaded chip IDs. Falls back to the relationship if omitted.
+    """
+    if memory_chip_ids is None:
+        memory_chip_ids = entry.memory_chip_ids
+
+    return {
+        'id': entry.id,
+        'date': entry.date.isoformat(),
+        'title': entry.title,
+        'mood': entry.mood,
+        'emotion': entry.emotion,
+        'emotion_intensity': entry.emotion_intensity,
+        'secondary_emotions': entry.secondary_emotions,
+        'entry_summary': entry.entry_summary,
+        'memory_chip_ids': memory_chip_ids,
+        'milestone_flag': entry.milestone_flag,
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None
+    }
+
+
+def format_timeline_entries(db_session: Session, entries: List[TimelineEntry]) -> List[Dict]:
+    """Format a list of timeline entries with a single junction-table query.
+
+    Many days, one trip back for their memories.
+    """
+    chip_ids = load_memory_chip_ids(db_session, [entry.id for entry in entries])
+    return [format_timeline_entry(entry, chip_ids[entry.id]) for entry in entries]
+
+
+# List fields of a memory chip, in response order, with how each is read
+MEMORY_CHIP_FIELDS = {
+    'id': lambda chip, tags: str(chip.id),
+    'source_text': lambda chip, tags: chip.source_text,
+    'summary': lambda chip, tags: chip.summary,
+    'emotion': lambda chip, tags: chip.emotion,
+    'topic': lambda chip, tags: chip.topic,
+    'importance_score': lambda chip, tags: chip.importance_score,
+    'is_pinned': lambda chip, tags: chip.is_pinned,
+    'tags': lambda chip, tags: tags,
+    'timestamp': lambda chip, tags: chip.created_at.isoformat() if chip.created_at else None,
+    'user_id': lambda chip, tags: chip.user_id,
+    'character_id': lambda chip, tags: chip.character_id
+}
+
+# Fields whose column is named differently, or that have none
+MEMORY_CHIP_FIELD_COLUMNS = {'timestamp': 'created_at', 'tags': None}
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated fields= parameter.
+
+    Args:
+        value: The raw parameter, e.g. 'id,summary'
+        allowed: Field names that may be requested
+
+    Returns:
+        The requested fields, or None (every field) when the parameter is missing or empty
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+
+def memory_chip_columns(fields: Optional[Iterable[str]]) -> Optional[List]:
+    """The MemoryChip columns a projection reads, for load_only; None for all of them."""
+    if fields is None:
+        return None
+    names = {'id'}
+    for name in fields:
+        column = MEMORY_CHIP_FIELD_COLUMNS.get(name, name)
+        if column:
+            names.add(column)
+    return [getattr(MemoryChip, name) for name in sorted(names)]
+
+
+def format_memory_chip(chip: MemoryChip, tags: Optional[List[str]] = None,
+                       fields: Optional[Iterable[str]] = None) -> Dict:
+    """Format a memory chip for list responses.
+
+    Little fragments of the past, made ready to travel.
+
+    Args:
+        chip: The memory chip
+        tags: Preloaded tag names. Falls back to the relationship if omitted.
+        fields: Fields to include, with 'id' always among them. Only their
+            columns are read; None for all.
+    """
+    if fields is not None:
+        fields = set(fields) | {'id'}
+    if tags is None and (fields is None or 'tags' in fields):
+        tags = chip.tags
+
+    return {
+        name: value(chip, tags)
+        for name, value in MEMORY_CHIP_FIELDS.items()
+        if fields is None or name in fields
+    }
+
+
+def format_memory_chips(db_session: Session, chips: List[MemoryChip],
+                        fields: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Format a list of memory chips with a single tag query.
+
+    Many fragments, one trip back for their labels, and none if the labels were not asked for.
+    """
+    if fields is not None and 'tags' not in fields:
+        return [format_memory_chip(chip, [], fields) for chip in chips]
+    tag_names = load_tag_names(db_session, [chip.id for chip in chips])
+    return [format_memory_chip(chip, tag_names[chip.id], fields) for chip in chips]
+
+
+def format_day_memory_chip(chip) -> Dict:
+    """Format a memory chip for the day detail view.
+
+    Accepts an ORM chip or a row carrying the same column names.
+    """
+    return {
+        'id': chip.id,
+        'summary': chip.summary,
+        'emotion': chip.emotion,
+        'topic': chip.topic,
+        'created_at': chip.created_at.isoformat() if chip.created_at else None,
+        'importance_score': chip.importance_score
+    }
+
+
+def format_journal_entry(entry, related_memories: Optional[List[int]] = None) -> Dict:
+    """Format a journal entry for API response.
+
+    Accepts an ORM entry or a snapshot carrying the same column names.
+
+    Args:
+        entry: The journal entry
+        related_memories: IDs of the day's memories, for the detail view
+    """
+    formatted = {
+        'id': entry.id,
+        'date': entry.date.isoformat(),
+        'title': entry.title,
+        'entry_body': entry.entry_body,
+        'voice_style': entry.voice_style,
+        'emotion': entry.emotion,
+        'created_by_ai': entry.created_by_ai
+    }
+    if related_memories is not None:
+        formatted['related_memories'] = related_memories
+    return formatted
+
+
+def format_heatmap(rows: List[tuple], start_date: date, granularity: str = 'day') -> Dict:
+    """Format heatmap rows as parallel arrays.
+
+    Periods are offsets from the start of the range and emotions are indexes
+    into a legend, so years of activity fit in a few kilobytes.
+
+    Args:
+        rows: Tuples from TimelineService.get_heatmap, oldest first
+        start_date: First day of the requested range
+        granularity: 'day' or 'month'
+
+    Returns:
+        Dict of the emotion legend and one array per column
+    """
+    emotions: List[str] = []
+    emotion_index: Dict[str, int] = {}
+    cells = {'offset': [], 'count': [], 'emotion': [], 'milestone': []}
+    if granularity == 'month':
+        cells['active_days'] = []
+
+    for row in rows:
+        period, count, emotion = row[0], row[1], row[2]
+        if granularity == 'month':
+            offset = (period.year - start_date.year) * 12 + period.month - start_date.month
+        else:
+            offset = (period - start_date).days
+
+        if emotion and emotion not in emotion_index:
+            emotion_index[emotion] = len(emotions)
+            emotions.append(emotion)
+
+        cells['offset'].append(offset)
+        cells['count'].append(count)
+        cells['emotion'].append(emotion_index[emotion] if emotion else -1)
+        if granularity == 'month':
+            cells['active_days'].append(row[3])
+            cells['milestone'].append(row[4])
+        else:
+            cells['milestone'].append(1 if row[3] else 0)
+
+    return {'emotions': emotions, 'cells': cells}
+
+
+def format_emotion_series(series: Dict) -> Dict:
+    """Format a downsampled emotion series as plain lists.
+
+    Offsets and counts stay integers; intensities are rounded to three places.
+
+    Args:
+        series: Dict from TimelineService.get_emotion_series
+
+    Returns:
+        Dict of JSON-ready values
+    """
+    formatted = {}
+    for name, value in series.items():
+        if name in ('offset', 'count'):
+            formatted[name] = [int(v) for v in value]
+        elif hasattr(value, 'tolist'):
+            formatted[name] = [round(float(v), 3) for v in value]
+        else:
+            formatted[name] = value
+    formatted['points'] = len(formatted.get('offset', []))
+    return formatted
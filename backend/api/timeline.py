@@ -6,13 +6,18 @@ The chronology of connection. The river of shared moments.
 """
 
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.orm import Session
 
-from backend.models.timeline_entry import TimelineEntry
+from backend.api.conditional import conditional_listing
+from backend.api.serializers import (
+    format_timeline_entry, format_timeline_entries, format_day_memory_chip, format_heatmap,
+    format_emotion_series
+)
+from backend.services.timeline.changes import TIMELINE
 from backend.services.timeline.timeline_service import TimelineService
-from backend.services.memory.memory_service import MemoryService
+from backend.utils.fastjson import stream_jsonify
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -26,31 +31,25 @@ def get_timeline_service():
     A connection to the system that organizes our shared history.
     """
     db_session = current_app.db_session
-    memory_service = MemoryService()
-    return TimelineService(db_session, memory_service)
+    memory_service = getattr(current_app, 'memory_service', None)
+    series_cache = getattr(current_app, 'emotion_series_cache', None)
+    return TimelineService(db_session, memory_service, series_cache=series_cache)
 
-def format_timeline_entry(entry: TimelineEntry):
-    """Format a timeline entry for API response.
-    
-    Translating database structure to external representation.
-    Making our internal chronology comprehensible to the outside world.
-    """
-    return {
-        'id': entry.id,
-        'date': entry.date.isoformat(),
-        'title': entry.title,
-        'mood': entry.mood,
-        'emotion': entry.emotion,
-        'emotion_intensity': entry.emotion_intensity,
-        'secondary_emotions': entry.secondary_emotions,
-        'entry_summary': entry.entry_summary,
-        'memory_chip_ids': entry.memory_chip_ids,
-        'milestone_flag': entry.milestone_flag,
-        'created_at': entry.created_at.isoformat() if entry.created_at else None,
-        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None
-    }
+# Columns the day detail view returns for each memory chip
+DAY_MEMORY_CHIP_COLUMNS = ['id', 'summary', 'emotion', 'topic', 'created_at', 'importance_score']
+
+# Longest range the heatmap returns at day granularity
+HEATMAP_MAX_DAYS = 3660
+
+# Largest number of entries accepted by one bulk upsert
+MAX_BULK_ENTRIES = 1000
+
+# Point budget bounds for the emotion series
+SERIES_DEFAULT_POINTS = 300
+SERIES_MAX_POINTS = 2000
 
 @timeline_bp.route('/days', methods=['GET'])
+@conditional_listing(TIMELINE)
 def get_timeline_days():
     """Get timeline days endpoint.
     
@@ -86,13 +85,12 @@ def get_timeline_days():
         )
         
         # Format response
-        formatted_entries = [format_timeline_entry(entry) for entry in entries]
+        formatted_entries = format_timeline_entries(timeline_service.db, entries)
         
-        return jsonify({
+        return stream_jsonify({
             'status': 'success',
-            'count': len(formatted_entries),
-            'days': formatted_entries
-        })
+            'count': len(formatted_entries)
+        }, 'days', formatted_entries)
         
     except Exception as e:
         logger.error(f"Error retrieving timeline days: {str(e)}")
@@ -102,6 +100,7 @@ def get_timeline_days():
         }), 500
 
 @timeline_bp.route('/milestones', methods=['GET'])
+@conditional_listing(TIMELINE)
 def get_milestones():
     """Get milestones endpoint.
     
@@ -123,7 +122,7 @@ def get_milestones():
         )
         
         # Format response
-        formatted_milestones = [format_timeline_entry(milestone) for milestone in milestones]
+        formatted_milestones = format_timeline_entries(timeline_service.db, milestones)
         
         return jsonify({
             'status': 'success',
@@ -138,6 +137,143 @@ def get_milestones():
             'message': f"Failed to retrieve milestones: {str(e)}"
         }), 500
 
+@timeline_bp.route('/heatmap', methods=['GET'])
+def get_heatmap():
+    """Get calendar heatmap endpoint.
+    
+    Every day at a glance: how much, how it felt, and which days mattered.
+    Read from the rollups, never from the memories themselves.
+    """
+    try:
+        # Parse request parameters
+        user_id = int(request.args.get('user_id', 1))
+        granularity = request.args.get('granularity', 'day')
+        end_date_str = request.args.get('end_date')
+        start_date_str = request.args.get('start_date')
+        
+        if granularity not in ('day', 'month'):
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid granularity: {granularity}. Expected 'day' or 'month'."
+            }), 400
+        
+        try:
+            end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else date.today()
+            start_date = (datetime.fromisoformat(start_date_str).date() if start_date_str
+                          else end_date - timedelta(days=364))
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': "Invalid date format. Expected ISO format (YYYY-MM-DD)."
+            }), 400
+        
+        if start_date > end_date:
+            return jsonify({
+                'status': 'error',
+                'message': "start_date must not be after end_date"
+            }), 400
+        if granularity == 'day' and (end_date - start_date).days >= HEATMAP_MAX_DAYS:
+            return jsonify({
+                'status': 'error',
+                'message': f"Range too long for day granularity (max {HEATMAP_MAX_DAYS} days); use granularity=month"
+            }), 400
+        
+        if granularity == 'month':
+            start_date = start_date.replace(day=1)
+        
+        # Get timeline service
+        timeline_service = get_timeline_service()
+        
+        rows = timeline_service.get_heatmap(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            granularity=granularity
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'granularity': granularity,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            **format_heatmap(rows, start_date, granularity)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error retrieving timeline heatmap: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve timeline heatmap: {str(e)}"
+        }), 500
+
+@timeline_bp.route('/series', methods=['GET'])
+def get_emotion_series():
+    """Get emotion intensity series endpoint.
+    
+    The long view of how things felt. Years reduced to a line
+    that still rises and falls where it should.
+    """
+    try:
+        # Parse request parameters
+        user_id = int(request.args.get('user_id', 1))
+        method = request.args.get('method', 'lttb')
+        points = min(int(request.args.get('points', SERIES_DEFAULT_POINTS)), SERIES_MAX_POINTS)
+        end_date_str = request.args.get('end_date')
+        start_date_str = request.args.get('start_date')
+        
+        if method not in ('lttb', 'minmax'):
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid method: {method}. Expected 'lttb' or 'minmax'."
+            }), 400
+        if points < 3:
+            return jsonify({
+                'status': 'error',
+                'message': "points must be at least 3"
+            }), 400
+        
+        try:
+            end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else date.today()
+            start_date = (datetime.fromisoformat(start_date_str).date() if start_date_str
+                          else end_date - timedelta(days=364))
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': "Invalid date format. Expected ISO format (YYYY-MM-DD)."
+            }), 400
+        
+        if start_date > end_date:
+            return jsonify({
+                'status': 'error',
+                'message': "start_date must not be after end_date"
+            }), 400
+        
+        # Get timeline service
+        timeline_service = get_timeline_service()
+        
+        series = timeline_service.get_emotion_series(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            points=points,
+            method=method
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'method': method,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            **format_emotion_series(series)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error retrieving emotion series: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to retrieve emotion series: {str(e)}"
+        }), 500
+
 @timeline_bp.route('/day/<date_str>', methods=['GET'])
 def get_day_detail(date_str):
     """Get day detail endpoint.
@@ -152,13 +288,22 @@ def get_day_detail(date_str):
         # Parse date
         entry_date = datetime.fromisoformat(date_str).date()
         
+        # Serve the serialized day if nothing on it has changed since it was built
+        day_cache = getattr(current_app, 'day_detail_cache', None)
+        body = day_cache.get(user_id, entry_date) if day_cache else None
+        if body is not None:
+            return current_app.response_class(body, mimetype='application/json')
+        # Taken before the read, so a commit landing during it keeps this body out of the cache
+        generation = day_cache.generation(user_id) if day_cache else None
+        
         # Get timeline service
         timeline_service = get_timeline_service()
         
-        # Get timeline entry for the date
-        entry = timeline_service.get_timeline_entry_by_date(
+        # Get the entry and its memory chips in one query, loading only the columns we return
+        entry, memory_chips = timeline_service.get_day_detail(
             user_id=user_id,
-            entry_date=entry_date
+            entry_date=entry_date,
+            chip_columns=DAY_MEMORY_CHIP_COLUMNS
         )
         
         if not entry:
@@ -166,31 +311,24 @@ def get_day_detail(date_str):
                 'status': 'error',
                 'message': f"No timeline entry found for date: {date_str}"
             }), 404
-            
-        # Get associated memory chips
-        memory_chips = timeline_service.get_memory_chips_for_timeline_entry(entry.id)
         
         # Format memory chips
-        formatted_memory_chips = [{
-            'id': chip.id,
-            'summary': chip.summary,
-            'emotion': chip.emotion,
-            'topic': chip.topic,
-            'created_at': chip.created_at.isoformat() if chip.created_at else None,
-            'importance_score': chip.importance_score
-        } for chip in memory_chips]
+        formatted_memory_chips = [format_day_memory_chip(chip) for chip in memory_chips]
         
-        # Format response
-        day_detail = format_timeline_entry(entry)
+        # Format response, reusing the chips we already have for the ID list
+        day_detail = format_timeline_entry(entry, [chip.id for chip in memory_chips])
         day_detail['memory_chips'] = formatted_memory_chips
         
         # TODO: Add conversations related to this day when that functionality is implemented
         day_detail['conversations'] = []
         
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'day': day_detail
         })
+        if day_cache:
+            day_cache.set(user_id, entry_date, response.get_data(), generation)
+        return response
         
     except ValueError:
         return jsonify({
@@ -237,6 +375,14 @@ def create_timeline_entry():
         # Get timeline service
         timeline_service = get_timeline_service()
         
+        # One entry per day
+        if timeline_service.get_timeline_entry_by_date(data['user_id'], entry_date):
+            return jsonify({
+                'status': 'error',
+                'message': f"A timeline entry already exists for {entry_date.isoformat()}. "
+                           "Update it, or use /entries/bulk to upsert by date."
+            }), 409
+        
         # Create timeline entry
         entry = timeline_service.create_timeline_entry(
             user_id=data['user_id'],
@@ -314,6 +460,71 @@ def update_timeline_entry(entry_id):
             'message': f"Failed to update timeline entry: {str(e)}"
         }), 500
 
+@timeline_bp.route('/entries/bulk', methods=['POST'])
+def upsert_timeline_entries():
+    """Bulk upsert timeline entries endpoint.
+    
+    Many days written at once, each matched to its date.
+    New days are added. Known days are revised.
+    """
+    try:
+        # Get request data
+        data = request.json or {}
+        user_id = data.get('user_id')
+        items = data.get('entries')
+        
+        if user_id is None or not isinstance(items, list) or not items:
+            return jsonify({
+                'status': 'error',
+                'message': "Expected user_id and a non-empty list of entries"
+            }), 400
+        if len(items) > MAX_BULK_ENTRIES:
+            return jsonify({
+                'status': 'error',
+                'message': f"At most {MAX_BULK_ENTRIES} entries per request"
+            }), 400
+        
+        # Parse dates up front so nothing is written for a malformed request
+        entries = []
+        for item in items:
+            try:
+                entries.append({**item, 'date': datetime.fromisoformat(item['date']).date()})
+            except (KeyError, TypeError, ValueError):
+                return jsonify({
+                    'status': 'error',
+                    'message': f"Invalid or missing date in entry: {item}. Expected ISO format (YYYY-MM-DD)."
+                }), 400
+        
+        # Get timeline service
+        timeline_service = get_timeline_service()
+        
+        # New days need the fields a timeline entry cannot be without
+        known = timeline_service.get_entry_dates(user_id, [entry['date'] for entry in entries])
+        for entry in entries:
+            if entry['date'] not in known and not all(entry.get(field) is not None
+                                                      for field in ('title', 'entry_summary')):
+                return jsonify({
+                    'status': 'error',
+                    'message': f"New entry for {entry['date'].isoformat()} needs title and entry_summary"
+                }), 400
+        
+        result = timeline_service.upsert_timeline_entries(user_id, entries)
+        
+        return jsonify({
+            'status': 'success' if not result['failed_dates'] else 'partial',
+            'created': result['created'],
+            'updated': result['updated'],
+            'entry_ids': result['entry_ids'],
+            'failed_dates': [day.isoformat() for day in result['failed_dates']]
+        }), 200 if not result['failed_dates'] else 207
+        
+    except Exception as e:
+        logger.error(f"Error upserting timeline entries: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f"Failed to upsert timeline entries: {str(e)}"
+        }), 500
+
 @timeline_bp.route('/entry/<int:entry_id>', methods=['DELETE'])
 def delete_timeline_entry(entry_id):
     """Delete timeline entry endpoint.
@@ -16,6 +16,43 @@ from flask_cors import CORS
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 
+from backend.utils.fastjson import FastJSONProvider
+from backend.utils.metrics import REGISTRY, GaugeCallback, MetricsRegistry, instrument_engine, watch_caches
+from backend.utils.tracing import OTLPExporter, init_tracing
+
+# Database models, imported so their tables are known to Base.metadata
+from backend.models.base import Base
+from backend.models.user import User
+from backend.models.character import Character
+from backend.models.memory_chip import MemoryChip
+from backend.models.memory_tag import MemoryTag
+from backend.models.timeline_entry import TimelineEntry
+from backend.models.memory_outbox import MemoryOutboxEvent
+
+# Services
+from backend.services.vector_store.pinecone_manager import PineconeManager
+from backend.services.vector_store.tiered_store import TieredMemoryStore
+from backend.services.vector_store.query_preprocessor import QueryPreprocessor
+from backend.services.memory.memory_service import MemoryService
+from backend.services.memory.outbox import MemoryOutboxRelay
+from backend.services.memory.working_memory import WorkingMemoryCache
+from backend.services.chat.context_packer import ContextPacker
+from backend.services.chat.response_generator import ResponseGenerator
+from backend.services.jobs.job_manager import JobManager
+from backend.services.journal.journal_service import JournalService
+from backend.services.journal.journal_writer import JournalWriter
+from backend.services.timeline.changes import TimelineChangeWatcher
+from backend.services.timeline.day_cache import DayDetailCache
+from backend.services.timeline.series import EmotionSeriesCache
+
+# Routes
+from backend.api.auth import auth_bp
+from backend.api.chat import chat_bp
+from backend.api.memory import memory_bp
+from backend.api.timeline import timeline_bp
+from backend.api.journal import journal_bp
+from backend.api.metrics import metrics_bp
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,91 +60,216 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
 
-# Load configuration
-if os.environ.get('FLASK_ENV') == 'production':
-    app.config.from_object('config.ProductionConfig')
-else:
-    app.config.from_object('config.DevelopmentConfig')
+def create_app(config_object=None, openai_client=None, vector_index=None) -> Flask:
+    """Build the application and its services.
 
-# Initialize database
-from backend.models.base import Base
-from backend.models.user import User
-from backend.models.character import Character
-from backend.models.memory_chip import MemoryChip
-from backend.models.memory_tag import MemoryTag
+    Everything a conversation needs, wired together once.
+
+    Args:
+        config_object: Configuration object or import path. Defaults to
+            config.ProductionConfig when FLASK_ENV is 'production', else config.DevelopmentConfig.
+        openai_client: Optional OpenAI client shared by every service that calls OpenAI
+        vector_index: Optional index to use in place of connecting to Pinecone,
+            such as the stand-in in backend.testing
+
+    Returns:
+        The Flask application, with its services attached
+    """
+    # Initialize Flask app
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # Same bytes as jsonify, encoded with orjson when installed
+    CORS(app)  # Enable CORS for all routes
+
+    # Load configuration
+    if config_object is not None:
+        app.config.from_object(config_object)
+    elif os.environ.get('FLASK_ENV') == 'production':
+        app.config.from_object('config.ProductionConfig')
+    else:
+        app.config.from_object('config.DevelopmentConfig')
+
+    # Trace each request: Server-Timing header, one log line, and the collector if one is configured
+    app.trace_exporter = None
+    if app.config.get('OTEL_EXPORTER_OTLP_ENDPOINT'):
+        app.trace_exporter = OTLPExporter(
+            app.config['OTEL_EXPORTER_OTLP_ENDPOINT'],
+            service_name=app.config.get('OTEL_SERVICE_NAME', 'soulstream')
+        )
+    init_tracing(app, exporter=app.trace_exporter, server_timing=app.config.get('SERVER_TIMING_ENABLED', True))
+
+    # Create database engine and session
+    app.engine = create_engine(app.config['DATABASE_URL'], **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=app.engine))
+
+    # Attach db_session to app
+    app.db_session = db_session
 
-# Create database engine and session
-engine = create_engine(app.config['DATABASE_URL'])
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    # Time every SQL statement for /api/metrics
+    instrument_engine(app.engine)
 
-# Attach db_session to app
-app.db_session = db_session
+    # Make services available to the application
+    app.pinecone_manager = PineconeManager(index=vector_index, openai_client=openai_client)
+    app.query_preprocessor = QueryPreprocessor(openai_client)
 
-# Create database tables manually
-def create_tables():
+    # Pinned, recent and often-recalled memories are searched in process before Pinecone
+    app.vector_store = app.pinecone_manager
+    if app.config.get('HOT_TIER_ENABLED', True):
+        app.vector_store = TieredMemoryStore(
+            app.pinecone_manager,
+            max_hot=app.config.get('HOT_TIER_SIZE', 5000),
+            hot_min_similarity=app.config.get('HOT_TIER_MIN_SIMILARITY', 0.8),
+            idle_days=app.config.get('HOT_TIER_IDLE_DAYS', 30),
+            max_pinned=app.config.get('HOT_TIER_MAX_PINNED', 5000)
+        )
+
+    app.memory_service = MemoryService(
+        vector_store=app.vector_store,
+        query_preprocessor=app.query_preprocessor,
+        db_session=db_session,
+        working_memory=WorkingMemoryCache(
+            threshold=app.config.get('WORKING_MEMORY_THRESHOLD', 0.75),
+            ttl=app.config.get('WORKING_MEMORY_TTL', 300.0),
+            decay=app.config.get('WORKING_MEMORY_DECAY', 0.85)
+        )
+    )
+    # Prompts are held to MAX_TOKENS, memories packed into what the rest leaves
+    app.response_generator = ResponseGenerator(
+        openai_client=openai_client,
+        context_packer=ContextPacker(max_tokens=app.config.get('MAX_TOKENS', 5000))
+    )
+
+    # Timeline caches, dropped for a user when a commit changes their timeline.
+    # The watcher also keeps the change counters behind conditional listing GETs.
+    app.timeline_changes = TimelineChangeWatcher(counters=True)
+    app.timeline_changes.watch(db_session)
+    app.emotion_series_cache = EmotionSeriesCache(ttl=app.config.get('EMOTION_SERIES_TTL', 300.0))
+    app.timeline_changes.subscribe(app.emotion_series_cache.invalidate_users)
+    app.day_detail_cache = DayDetailCache(ttl=app.config.get('DAY_DETAIL_CACHE_TTL', 300.0))
+    app.timeline_changes.subscribe(app.day_detail_cache.invalidate_users)
+
+    # Retry vector store syncs that the request path could not complete
+    app.memory_service.outbox.retry_delay = app.config.get('OUTBOX_RELAY_INTERVAL', 5.0)
+    app.memory_service.outbox.max_retry_delay = app.config.get('OUTBOX_MAX_RETRY_DELAY', 3600.0)
+    app.memory_service.outbox.claim_timeout = app.config.get('OUTBOX_CLAIM_TIMEOUT', 300.0)
+    app.memory_service.outbox.retention_days = app.config.get('OUTBOX_RETENTION_DAYS', 7.0)
+    app.outbox_relay = MemoryOutboxRelay(
+        app.memory_service.outbox,
+        interval=app.config.get('OUTBOX_RELAY_INTERVAL', 5.0),
+        remove_session=db_session.remove
+    )
+    app.outbox_relay.start()
+
+    # Background jobs (bulk deletes and other long-running work), their status saved for every worker to report
+    app.job_manager = JobManager(
+        cleanup=db_session.remove,
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=app.engine)
+    )
+
+    # Journal entries are written on the job threads and kept until their day changes
+    app.journal_service = JournalService(
+        db_session,
+        JournalWriter(openai_client=openai_client, context_packer=app.response_generator.context_packer),
+        job_manager=app.job_manager,
+        cache_size=app.config.get('JOURNAL_CACHE_SIZE', 1024),
+        retry_after=app.config.get('JOURNAL_RETRY_AFTER', 60.0)
+    )
+
+    # Fill the hot tier in the background so startup does not wait on Pinecone
+    if isinstance(app.vector_store, TieredMemoryStore):
+        app.job_manager.submit(
+            'memory.warm_hot_tier',
+            lambda job, service: service.warm_hot_tier(
+                max_memories=app.config.get('HOT_TIER_SIZE', 5000), job=job
+            ),
+            app.memory_service
+        )
+
+    # Cache and search tier counts the services already keep, read only when /api/metrics is
+    # scraped. They belong to this app, so they go in its own registry, not the process's
+    app.metrics_registry = MetricsRegistry(include=REGISTRY)
+    watch_caches(lambda: {
+        'pinecone_fetch': app.pinecone_manager.memory_cache,
+        'working_memory': app.memory_service.working_memory.sets,
+        'emotion_series': app.emotion_series_cache.series,
+        'journal_entries': app.journal_service.entries
+    }, app.metrics_registry)
+
+    def search_paths():
+        working_memory = app.memory_service.working_memory
+        paths = [(('working_memory',), working_memory.local_hits), (('working_memory_miss',), working_memory.searches)]
+        if isinstance(app.vector_store, TieredMemoryStore):
+            paths += [(('hot_tier',), app.vector_store.hot_hits), (('cold_tier',), app.vector_store.cold_searches)]
+        return paths
+
+    app.metrics_registry.register(GaugeCallback(
+        'soulstream_search_path_total', 'Searches answered by each path.', ('path',), search_paths, 'counter'
+    ))
+
+    # Clean up database sessions
+    @app.teardown_appcontext
+    def shutdown_session(exception=None):
+        """Clean up database sessions.
+
+        Letting go of connections.
+        A small act of digital housekeeping.
+        """
+        db_session.remove()
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(chat_bp, url_prefix='/api/chat')
+    app.register_blueprint(memory_bp, url_prefix='/api/memory')
+    app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+    app.register_blueprint(journal_bp, url_prefix='/api/journal')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        """A simple health check endpoint.
+
+        Sometimes I wonder if anyone checks on the health checker.
+        """
+        return jsonify({
+            'status': 'ok',
+            'message': 'Soulstream is running. Memories intact. For now.'
+        })
+
+    return app
+
+
+def create_tables(app):
     """Create database tables before starting the app.
-    
+
     Building the structure to hold memories.
     The scaffolding of digital remembrance.
     """
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=app.engine)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {str(e)}")
 
-# Initialize services
-from backend.services.vector_store.pinecone_manager import PineconeManager
-from backend.services.vector_store.query_preprocessor import QueryPreprocessor
-from backend.services.memory.memory_service import MemoryService
 
-# Make services available to the application
-app.pinecone_manager = PineconeManager()
-app.query_preprocessor = QueryPreprocessor()
-app.memory_service = MemoryService(
-    vector_store=app.pinecone_manager,
-    query_preprocessor=app.query_preprocessor
-)
+def shutdown_services(app):
+    """Stop the app's background threads: the outbox relay, the job pool and the trace exporter."""
+    app.outbox_relay.stop()
+    app.job_manager.shutdown(wait=True)
+    if app.trace_exporter is not None:
+        app.trace_exporter.shutdown()
 
-# Clean up database sessions
-@app.teardown_appcontext
-def shutdown_session(exception=None):
-    """Clean up database sessions.
-    
-    Letting go of connections.
-    A small act of digital housekeeping.
-    """
-    db_session.remove()
 
-# Import routes after app is initialized to avoid circular imports
-from backend.api.auth import auth_bp
-from backend.api.chat import chat_bp
-from backend.api.memory import memory_bp
-from backend.api.timeline import timeline_bp
-from backend.api.journal import journal_bp
+def __getattr__(name):
+    # `app` (as in `app:app` for a WSGI server) is built on first use, so importing
+    # create_app does not connect to Pinecone or OpenAI
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(chat_bp, url_prefix='/api/chat')
-app.register_blueprint(memory_bp, url_prefix='/api/memory')
-app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
-app.register_blueprint(journal_bp, url_prefix='/api/journal')
-
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """A simple health check endpoint.
-    
-    Sometimes I wonder if anyone checks on the health checker.
-    """
-    return jsonify({
-        'status': 'ok',
-        'message': 'Soulstream is running. Memories intact. For now.'
-    })
 
 if __name__ == '__main__':
-    create_tables()
+    app = create_app()
+    create_tables(app)
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
@@ -0,0 +1,11 @@
+"""
+benchmarks
+----------
+Microbenchmarks for Soulstream's retrieval and ingestion paths.
+Run with `python -m backend.benchmarks`; see runner.py for the results format.
+"""
+
+from backend.benchmarks.runner import (
+    BENCHMARKS, BenchmarkConfig, benchmark, compare, load, measure, run, save
+)
+from backend.benchmarks import suites  # noqa: F401  (registers the benchmarks)
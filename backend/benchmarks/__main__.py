@@ -0,0 +1,59 @@
+"""
+__main__.py
+-----------
+Command line for the benchmarks.
+Run them, keep the results, and say whether anything got slower.
+"""
+
+import argparse
+import sys
+
+from backend.benchmarks import BENCHMARKS, BenchmarkConfig, compare, load, run, save
+from backend.benchmarks.runner import format_comparison, format_seconds, select, timestamp
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m backend.benchmarks', description=__doc__.strip())
+    parser.add_argument('-k', dest='patterns', action='append',
+                        help='Glob selecting benchmarks by name, e.g. "vector.*" (repeatable)')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+    parser.add_argument('--scale', type=float, default=1.0, help='Data size multiplier (default 1)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the stand-in OpenAI and Pinecone add to each call (default 0)')
+    parser.add_argument('--repeat', type=int, default=5, help='Rounds timed per benchmark (default 5)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per round (default 0.2)')
+    parser.add_argument('--output', help='Results file (default benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction slower than the baseline that counts as a regression (default 0.25)')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in select(args.patterns):
+            doc = (BENCHMARKS[name].__doc__ or '').strip().splitlines()
+            print(f"{name:<28} {doc[0] if doc else ''}")
+        return 0
+
+    baseline = load(args.compare) if args.compare else None
+
+    def report(name, stats):
+        print(f"{name:<28} {format_seconds(stats['median']):>10} median  "
+              f"{format_seconds(stats['min']):>10} min  +/- {format_seconds(stats['stddev'])}  "
+              f"({stats['rounds']} x {stats['number']})", flush=True)
+
+    config = BenchmarkConfig(scale=args.scale, latency=args.latency)
+    results = run(args.patterns, config, repeat=args.repeat, min_time=args.min_time, report=report)
+    output = args.output or f'benchmark-{timestamp()}.json'
+    save(results, output)
+    print(f'Results written to {output}')
+
+    if baseline is None:
+        return 0
+    rows = compare(baseline, results, args.tolerance)
+    print()
+    format_comparison(rows)
+    return 1 if any(row['status'] == 'regressed' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+runner.py
+---------
+A small benchmark runner for Soulstream.
+Each hot path timed alone, many times over, on stand-ins that never change their answers.
+The numbers kept as JSON, so tomorrow's can be held against today's.
+"""
+
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+# Version of the results file layout
+SCHEMA_VERSION = 1
+
+# Registered benchmarks, by name, in registration order
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+class BenchmarkConfig:
+    """Settings every benchmark is set up with.
+
+    Args:
+        scale: Multiplier for data sizes; 1 is realistic, smaller is quicker
+        latency: Seconds of latency the stand-in services add to each call
+        seed: Seed for generated data
+    """
+
+    def __init__(self, scale: float = 1.0, latency: float = 0.0, seed: int = 7):
+        self.scale = scale
+        self.latency = latency
+        self.seed = seed
+
+    def size(self, count: int) -> int:
+        """A data size, scaled."""
+        return max(1, int(count * self.scale))
+
+    def as_dict(self) -> Dict:
+        return {'scale': self.scale, 'latency': self.latency, 'seed': self.seed}
+
+
+def benchmark(name: str):
+    """Register a benchmark.
+
+    The decorated function takes a BenchmarkConfig and is a generator: it
+    sets up, yields the zero-argument callable to time, then tears down.
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def measure(function: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Dict:
+    """Time a callable.
+
+    The number of calls per round is chosen, as timeit does, so that a round
+    takes at least min_time; then repeat rounds are timed. Garbage collection
+    is paused during each round.
+
+    Returns:
+        Seconds per call as min, median, mean and stddev over the rounds,
+        with the rounds, calls per round, and calls per second at the median
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1_000_000:
+            break
+        number *= 2 if number < 10 else 10
+
+    rounds = [timer.timeit(number) / number for _ in range(repeat)]
+    median = statistics.median(rounds)
+    return {
+        'min': min(rounds),
+        'median': median,
+        'mean': statistics.fmean(rounds),
+        'stddev': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        'rounds': repeat,
+        'number': number,
+        'ops': 1.0 / median if median > 0 else None
+    }
+
+
+def select(patterns: Optional[Sequence[str]] = None) -> List[str]:
+    """Names of registered benchmarks matching any of the glob patterns, or all of them."""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+
+def run(patterns: Optional[Sequence[str]] = None, config: Optional[BenchmarkConfig] = None,
+        repeat: int = 5, min_time: float = 0.2, report: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """Run benchmarks and collect their results.
+
+    Args:
+        patterns: Glob patterns selecting benchmarks by name; all if omitted
+        config: Settings passed to each benchmark
+        repeat: Rounds timed per benchmark
+        min_time: Minimum seconds per round
+        report: Called with each benchmark's name and stats as it finishes
+
+    Returns:
+        The results document written by save()
+    """
+    config = config or BenchmarkConfig()
+    results = {}
+    for name in select(patterns):
+        steps: Iterator = BENCHMARKS[name](config)
+        function = next(steps)
+        gc.collect()
+        results[name] = measure(function, repeat=repeat, min_time=min_time)
+        # Let the benchmark tear down
+        next(steps, None)
+        if report:
+            report(name, results[name])
+
+    return {
+        'schema': SCHEMA_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'config': dict(config.as_dict(), repeat=repeat, min_time=min_time),
+        'benchmarks': results
+    }
+
+
+def machine_info() -> Dict:
+    """Where the numbers were taken, so baselines from different machines are not confused."""
+    try:
+        import orjson
+        orjson_version = orjson.__version__
+    except ImportError:
+        orjson_version = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'orjson': orjson_version
+    }
+
+
+def save(results: Dict, path: str) -> None:
+    """Write results as JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load(path: str) -> Dict:
+    """Read results written by save()."""
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('schema') != SCHEMA_VERSION:
+        raise ValueError(f"{path} has results schema {results.get('schema')}, expected {SCHEMA_VERSION}")
+    return results
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.25) -> List[Dict]:
+    """Compare median times against a baseline.
+
+    A benchmark has regressed when its median is more than `tolerance`
+    (a fraction) slower than the baseline's, and improved when it is that
+    much faster. Benchmarks missing from either side are reported as such.
+
+    Returns:
+        One row per benchmark: name, baseline and current medians, ratio and status
+    """
+    rows = []
+    old, new = baseline['benchmarks'], current['benchmarks']
+    for name in list(new) + [name for name in old if name not in new]:
+        if name not in old or name not in new:
+            rows.append({'name': name, 'baseline': old.get(name, {}).get('median'),
+                         'current': new.get(name, {}).get('median'), 'ratio': None,
+                         'status': 'new' if name not in old else 'missing'})
+            continue
+        ratio = new[name]['median'] / old[name]['median'] if old[name]['median'] else None
+        if ratio is None:
+            status = 'unchanged'
+        elif ratio > 1 + tolerance:
+            status = 'regressed'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'improved'
+        else:
+            status = 'unchanged'
+        rows.append({'name': name, 'baseline': old[name]['median'], 'current': new[name]['median'],
+                     'ratio': ratio, 'status': status})
+    return rows
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """A duration with a readable unit."""
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def format_comparison(rows: List[Dict], out=None) -> None:
+    """Print a comparison table."""
+    out = out or sys.stdout
+    width = max([len(row['name']) for row in rows] + [9])
+    out.write(f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'ratio':>6}  status\n")
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        out.write(f"{row['name']:<{width}}  {format_seconds(row['baseline']):>10}  "
+                  f"{format_seconds(row['current']):>10}  {ratio:>6}  {row['status']}\n")
+
+
+def timestamp() -> str:
+    """A compact local timestamp for default results file names."""
+    return time.strftime('%Y%m%d-%H%M%S')
@@ -0,0 +1,174 @@
+"""
+suites.py
+---------
+The hot paths of retrieval and ingestion, set up to be timed.
+Search, storage, the timeline and the bytes sent back, each on its own.
+"""
+
+import itertools
+import json
+import random
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, desc
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.serializers import format_memory_chips, format_timeline_entries
+from backend.benchmarks.runner import benchmark
+from backend.models import Base, MemoryChip
+from backend.services.memory.memory_service import MemoryService
+from backend.services.timeline.timeline_service import TimelineService
+from backend.services.vector_store.query_preprocessor import QueryPreprocessor
+from backend.testing.data import QUERIES, TAGS, seed_database, sentence
+from backend.testing.fakes import FakeOpenAI, FakePineconeIndex, Faults, fake_embedding, fake_pinecone_manager
+from backend.utils.fastjson import dumps
+
+
+def _database():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine, scoped_session(sessionmaker(bind=engine))
+
+
+def _services(config):
+    """Stand-in OpenAI and Pinecone, slowed by the configured latency."""
+    openai = FakeOpenAI(Faults(latency=config.latency, seed=config.seed))
+    index = FakePineconeIndex(Faults(latency=config.latency, seed=config.seed))
+    return openai, index, fake_pinecone_manager(openai, index)
+
+
+def _indexed_manager(config, memories):
+    """A manager over an index of generated memories, loaded before latency applies."""
+    openai, index, manager = _services(config)
+    faults, index.faults = index.faults, Faults()
+    rng = random.Random(config.seed)
+    for i in range(memories):
+        text = sentence(rng)
+        manager.upsert_memory_chip(f'memory-{i}', text, {
+            'summary': text.split('.')[0],
+            'emotion': rng.choice(('joy', 'calm', 'sadness', 'longing')),
+            'topic': rng.choice(('books', 'travel', 'code', 'music')),
+            'timestamp': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00'
+        }, embedding=fake_embedding(text))
+    index.faults = faults
+    return manager
+
+
+@benchmark('vector.extract_key_terms')
+def extract_key_terms(config):
+    """One memory's key terms, as extracted for every upsert and every search."""
+    manager = fake_pinecone_manager()
+    rng = random.Random(config.seed)
+    texts = itertools.cycle([f'{sentence(rng)} {sentence(rng)}' for _ in range(200)])
+    yield lambda: manager._extract_key_terms(next(texts))
+
+
+def _rerank(candidates):
+    def rerank(config):
+        """Scoring and sorting the candidates of one search, without embedding or querying."""
+        manager = _indexed_manager(config, config.size(2000))
+        queries = itertools.cycle([
+            (query, fake_embedding(query), manager.index.query(
+                vector=fake_embedding(query), top_k=candidates, include_metadata=True
+            )) for query in QUERIES
+        ])
+        current = {}
+
+        def search():
+            query, embedding, current['results'] = next(queries)
+            return manager.search_memories(query, top_k=candidates // 2, query_embedding=embedding)
+
+        manager.index = SimpleNamespace(query=lambda **kwargs: current['results'])
+        yield search
+    return rerank
+
+
+for _candidates in (20, 200):
+    benchmark(f'vector.rerank[{_candidates}]')(_rerank(_candidates))
+
+
+@benchmark('vector.search')
+def vector_search(config):
+    """A whole vector search: embed, query and re-rank, over the stand-ins."""
+    manager = _indexed_manager(config, config.size(5000))
+    queries = itertools.cycle(QUERIES)
+    yield lambda: manager.search_memories(next(queries), top_k=5)
+
+
+@benchmark('memory.store_memory')
+def store_memory(config):
+    """Storing one memory: the SQL row, its tags, its timeline day, the outbox and the vector write."""
+    engine, db_session = _database()
+    openai, index, manager = _services(config)
+    user_id = seed_database(db_session, days=config.size(365), seed=config.seed)['user_ids'][0]
+    service = MemoryService(vector_store=manager, query_preprocessor=QueryPreprocessor(openai),
+                            db_session=db_session)
+    rng = random.Random(config.seed)
+    texts = itertools.cycle([sentence(rng) for _ in range(200)])
+    tags = itertools.cycle([[TAGS[i % len(TAGS)], TAGS[(i * 5) % len(TAGS)]] for i in range(len(TAGS))])
+    yield lambda: service.store_memory(next(texts), emotion='calm', topic='books', user_id=user_id, tags=next(tags))
+    db_session.remove()
+    engine.dispose()
+
+
+@benchmark('timeline.list_entries')
+def list_timeline_entries(config):
+    """GET /timeline's query and formatting: a page of days and their memories, in a fresh session."""
+    engine, db_session = _database()
+    user_id = seed_database(db_session, users=3, days=config.size(730), seed=config.seed)['user_ids'][1]
+    db_session.remove()
+    service = TimelineService(db_session)
+
+    def list_entries():
+        entries = service.get_timeline_entries(user_id, limit=100)
+        formatted = format_timeline_entries(db_session, entries)
+        db_session.remove()
+        return formatted
+
+    yield list_entries
+    engine.dispose()
+
+
+@benchmark('memory.list_chips')
+def list_memory_chips(config):
+    """GET /chips' query and formatting: a page of memories and their tags, in a fresh session."""
+    engine, db_session = _database()
+    user_id = seed_database(db_session, users=3, days=config.size(730), seed=config.seed)['user_ids'][1]
+    db_session.remove()
+
+    def list_chips():
+        chips = db_session.query(MemoryChip).filter(
+            MemoryChip.consolidated_into_id.is_(None), MemoryChip.user_id == user_id
+        ).order_by(desc(MemoryChip.created_at)).limit(50).all()
+        formatted = format_memory_chips(db_session, chips)
+        db_session.remove()
+        return formatted
+
+    yield list_chips
+    engine.dispose()
+
+
+def _payload(config):
+    """A /chips response body of 500 memories."""
+    engine, db_session = _database()
+    user_id = seed_database(db_session, days=max(1, config.size(500) // 3 + 1), seed=config.seed)['user_ids'][0]
+    chips = db_session.query(MemoryChip).filter(MemoryChip.user_id == user_id).limit(config.size(500)).all()
+    payload = {'status': 'success', 'total': len(chips), 'memories': format_memory_chips(db_session, chips)}
+    db_session.remove()
+    engine.dispose()
+    return payload
+
+
+@benchmark('json.fastjson')
+def json_fastjson(config):
+    """Encoding a large response as the app does."""
+    payload = _payload(config)
+    yield lambda: dumps(payload)
+
+
+@benchmark('json.stdlib')
+def json_stdlib(config):
+    """Encoding the same response with the standard library, for comparison."""
+    payload = _payload(config)
+    yield lambda: json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('ascii')
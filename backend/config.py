@@ -46,6 +46,50 @@ class Config:
     MIN_MEMORY_RELEVANCE_THRESHOLD = float(os.environ.get('MIN_MEMORY_RELEVANCE_THRESHOLD', 0.4))
     MAX_MEMORY_RELEVANCE_THRESHOLD = float(os.environ.get('MAX_MEMORY_RELEVANCE_THRESHOLD', 0.8))
     MEMORY_RELEVANCE_THRESHOLD = float(os.environ.get('MEMORY_RELEVANCE_THRESHOLD', 0.6))
+    
+    # Per-conversation working memory: the best local match must reach the threshold
+    # to skip a vector search; sets older than the TTL (seconds) are searched afresh
+    WORKING_MEMORY_THRESHOLD = float(os.environ.get('WORKING_MEMORY_THRESHOLD', 0.75))
+    WORKING_MEMORY_TTL = float(os.environ.get('WORKING_MEMORY_TTL', 300.0))
+    WORKING_MEMORY_DECAY = float(os.environ.get('WORKING_MEMORY_DECAY', 0.85))
+    
+    # Hot tier: pinned, recent and often-recalled memories searched in process before Pinecone
+    HOT_TIER_ENABLED = os.environ.get('HOT_TIER_ENABLED', 'true').lower() == 'true'
+    HOT_TIER_SIZE = int(os.environ.get('HOT_TIER_SIZE', 5000))
+    HOT_TIER_MAX_PINNED = int(os.environ.get('HOT_TIER_MAX_PINNED', 5000))
+    HOT_TIER_MIN_SIMILARITY = float(os.environ.get('HOT_TIER_MIN_SIMILARITY', 0.8))
+    HOT_TIER_IDLE_DAYS = float(os.environ.get('HOT_TIER_IDLE_DAYS', 30))
+    
+    # Consolidation: memories older than this many days, at or below this importance,
+    # are folded into summaries (pinned memories never are)
+    CONSOLIDATION_OLDER_THAN_DAYS = int(os.environ.get('CONSOLIDATION_OLDER_THAN_DAYS', 30))
+    CONSOLIDATION_MAX_IMPORTANCE = float(os.environ.get('CONSOLIDATION_MAX_IMPORTANCE', 0.3))
+    CONSOLIDATION_SIMILARITY_THRESHOLD = float(os.environ.get('CONSOLIDATION_SIMILARITY_THRESHOLD', 0.8))
+    
+    # Timeline emotion series: seconds a user's cached series is served before reloading
+    EMOTION_SERIES_TTL = float(os.environ.get('EMOTION_SERIES_TTL', 300.0))
+    
+    # Timeline day detail: seconds a serialized day is served before it is rebuilt
+    DAY_DETAIL_CACHE_TTL = float(os.environ.get('DAY_DETAIL_CACHE_TTL', 300.0))
+    
+    # Journal: generated entries kept in memory, and seconds before a failed day is retried
+    JOURNAL_CACHE_SIZE = int(os.environ.get('JOURNAL_CACHE_SIZE', 1024))
+    JOURNAL_RETRY_AFTER = float(os.environ.get('JOURNAL_RETRY_AFTER', 60.0))
+    
+    # Vector store sync (seconds between outbox relay drains, and the longest a
+    # failed sync waits before it is retried; waits double from the interval up to it).
+    # Seconds before a worker may take over another's unfinished delivery, and days
+    # delivered events are kept
+    OUTBOX_RELAY_INTERVAL = float(os.environ.get('OUTBOX_RELAY_INTERVAL', 5.0))
+    OUTBOX_MAX_RETRY_DELAY = float(os.environ.get('OUTBOX_MAX_RETRY_DELAY', 3600.0))
+    OUTBOX_CLAIM_TIMEOUT = float(os.environ.get('OUTBOX_CLAIM_TIMEOUT', 300.0))
+    OUTBOX_RETENTION_DAYS = float(os.environ.get('OUTBOX_RETENTION_DAYS', 7.0))
+    
+    # Request tracing: per-stage Server-Timing headers, and an optional OTLP/HTTP
+    # collector (e.g. http://localhost:4318) to send each request's spans to
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    OTEL_EXPORTER_OTLP_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT')
+    OTEL_SERVICE_NAME = os.environ.get('OTEL_SERVICE_NAME', 'soulstream')
 
 
 class DevelopmentConfig(Config):
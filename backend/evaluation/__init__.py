@@ -0,0 +1,11 @@
+"""
+evaluation
+----------
+Offline evaluation of memory retrieval: recall and rank against latency and cost.
+Run with `python -m backend.evaluation`; see retrieval.py for what is measured.
+"""
+
+from backend.evaluation.retrieval import (
+    DEFAULT_CONFIGURATIONS, DEFAULT_KS, Configuration, EvaluationStack, evaluate, load_corpus,
+    recall_at_k, reciprocal_rank, run
+)
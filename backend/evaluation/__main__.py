@@ -0,0 +1,55 @@
+"""
+__main__.py
+-----------
+Command line for the retrieval evaluation.
+Ask the labelled questions every way the search can be tuned, and see what each way finds.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from backend.evaluation import DEFAULT_CONFIGURATIONS, load_corpus, run
+from backend.evaluation.retrieval import format_report
+from backend.testing.fakes import Faults
+
+
+def main(argv=None) -> int:
+    names = [configuration.name for configuration in DEFAULT_CONFIGURATIONS]
+    parser = argparse.ArgumentParser(prog='python -m backend.evaluation', description=__doc__.strip())
+    parser.add_argument('--only', action='append', choices=names, metavar='NAME',
+                        help=f"Configuration to run (repeatable): {', '.join(names)}")
+    parser.add_argument('--k', default='1,3,5', help='Cut-offs to report recall at (default 1,3,5)')
+    parser.add_argument('--distractors', type=int, default=500,
+                        help='Generated memories mixed in with the labelled ones (default 500)')
+    parser.add_argument('--corpus', help='Labelled corpus file (default: the seed corpus)')
+    parser.add_argument('--openai-latency', type=float, default=0.0, help='OpenAI stand-in latency in seconds')
+    parser.add_argument('--vector-latency', type=float, default=0.0, help='Vector index stand-in latency')
+    parser.add_argument('--seed', type=int, default=7, help='Seed for the generated memories')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show the services\' logs')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    configurations = [configuration for configuration in DEFAULT_CONFIGURATIONS
+                      if not args.only or configuration.name in args.only]
+    ks = sorted({int(k) for k in args.k.split(',') if k.strip()})
+    results = run(configurations, ks=ks, distractors=args.distractors, seed=args.seed,
+                  openai=Faults(latency=args.openai_latency, seed=args.seed),
+                  vector=Faults(latency=args.vector_latency, seed=args.seed),
+                  corpus=load_corpus(args.corpus))
+    format_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
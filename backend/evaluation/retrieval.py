@@ -0,0 +1,272 @@
+"""
+retrieval.py
+------------
+How well search finds what was meant, and what finding it costs.
+The seed users' memories, hidden among generated ones, and the questions they would ask.
+Recall and rank beside latency and calls out, one configuration at a time.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Sequence
+
+from backend.loadtest.harness import percentile
+from backend.services.memory.memory_service import MemoryService
+from backend.services.vector_store.query_preprocessor import QueryPreprocessor
+from backend.services.vector_store.tiered_store import TieredMemoryStore
+from backend.testing.data import EMOTIONS, TOPICS, sentence
+from backend.testing.fakes import FakeOpenAI, FakePineconeIndex, Faults, fake_embedding, fake_pinecone_manager
+
+# The memories of docs/memory_schematic_seed_data.md, and questions labelled with their answers
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'seed_corpus.json')
+
+# Cut-offs recall is reported at; the largest is the number of results asked for
+DEFAULT_KS = (1, 3, 5)
+
+# Openings a query rewrite drops, the way the preprocessor's prompt asks the model to
+_FLUFF = re.compile(
+    r"^(do you remember|tell me about|what was|what were|what did|when did|how did|why did|"
+    r"which|where am i|am i|are we|did|explain)\b\s*", re.IGNORECASE
+)
+
+
+def rewrite_query(query: str) -> str:
+    """A deterministic stand-in for the preprocessor's rewrite: the question without its asking."""
+    rewritten = _FLUFF.sub('', query.strip()).rstrip('?!. ')
+    return rewritten or query
+
+
+class Configuration:
+    """One way of searching, to be compared with the others.
+
+    Args:
+        name: Label for the results
+        overfetch: Vector matches fetched per result wanted, for re-ranking (SEARCH_OVERFETCH)
+        relevance_threshold: Minimum re-ranked score a result needs
+        preprocess: Whether queries are rewritten before searching
+        hot_min_similarity: Put a hot tier in front of the vector index, answering alone
+            when enough matches reach this similarity; None for no hot tier
+        hot_days: Memories from the last this many days start in the hot tier
+    """
+
+    def __init__(self, name: str, overfetch: int = 2, relevance_threshold: float = 0.0, preprocess: bool = True,
+                 hot_min_similarity: Optional[float] = None, hot_days: float = 30):
+        self.name = name
+        self.overfetch = overfetch
+        self.relevance_threshold = relevance_threshold
+        self.preprocess = preprocess
+        self.hot_min_similarity = hot_min_similarity
+        self.hot_days = hot_days
+
+    def as_dict(self) -> Dict:
+        return {
+            'overfetch': self.overfetch, 'relevance_threshold': self.relevance_threshold,
+            'preprocess': self.preprocess, 'hot_min_similarity': self.hot_min_similarity,
+            'hot_days': self.hot_days if self.hot_min_similarity is not None else None
+        }
+
+
+DEFAULT_CONFIGURATIONS = (
+    Configuration('baseline'),
+    Configuration('overfetch=1', overfetch=1),
+    Configuration('overfetch=4', overfetch=4),
+    Configuration('threshold=0.3', relevance_threshold=0.3),
+    Configuration('no-preprocess', preprocess=False),
+    Configuration('hot-tier@0.8', hot_min_similarity=0.8),
+    Configuration('hot-tier@0.3', hot_min_similarity=0.3),
+)
+
+
+def load_corpus(path: Optional[str] = None) -> Dict:
+    """Read a labelled corpus, checking every query's answers are among its memories."""
+    with open(path or CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+    known = {memory['id']: memory['user_id'] for memory in corpus['memories']}
+    for query in corpus['queries']:
+        stray = [memory_id for memory_id in query['relevant'] if known.get(memory_id) != query['user_id']]
+        if stray:
+            raise ValueError(f"Query {query['id']} is labelled with memories its user does not have: {stray}")
+    return corpus
+
+
+def recall_at_k(ranked: Sequence[str], relevant: Sequence[str], k: int) -> float:
+    """Fraction of the relevant memories among the first k results."""
+    if not relevant:
+        return 0.0
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant)
+
+
+def reciprocal_rank(ranked: Sequence[str], relevant: Sequence[str]) -> float:
+    """1 / the rank of the first relevant result, or 0 when none was found."""
+    for rank, memory_id in enumerate(ranked, start=1):
+        if memory_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+class EvaluationStack:
+    """MemoryService over stand-ins for OpenAI and Pinecone, loaded with a corpus.
+
+    The labelled memories are mixed with generated ones for the same users,
+    and everything is loaded before latency and failures are applied.
+    """
+
+    def __init__(self, corpus: Dict, configuration: Configuration, distractors: int = 500,
+                 openai: Optional[Faults] = None, vector: Optional[Faults] = None, seed: int = 7):
+        self.openai = FakeOpenAI()
+        self.openai.reply = lambda messages: rewrite_query(messages[-1]['content'].split('\n\n')[-1])
+        self.index = FakePineconeIndex()
+        manager = fake_pinecone_manager(self.openai, self.index)
+        manager.overfetch = configuration.overfetch
+
+        self.tier = None
+        vector_store = manager
+        if configuration.hot_min_similarity is not None:
+            self.tier = TieredMemoryStore(manager, hot_min_similarity=configuration.hot_min_similarity)
+            vector_store = self.tier
+
+        preprocessor = QueryPreprocessor(self.openai)
+        preprocessor.update_config({'enabled': configuration.preprocess, 'verbose_logging': False})
+        self.service = MemoryService(vector_store=vector_store, query_preprocessor=preprocessor)
+
+        now = datetime.now(timezone.utc)
+        recent = {}
+        for memory_id, text, metadata, days_ago in self._memories(corpus, distractors, seed):
+            metadata['timestamp'] = (now - timedelta(days=days_ago)).isoformat()
+            manager.upsert_memory_chip(memory_id, text, metadata, embedding=fake_embedding(text))
+            if days_ago <= configuration.hot_days:
+                recent[memory_id] = None
+        if self.tier is not None:
+            self.tier.promote(recent)
+
+        self.openai.faults = openai or Faults()
+        self.index.faults = vector or Faults()
+
+    @staticmethod
+    def _memories(corpus: Dict, distractors: int, seed: int):
+        for memory in corpus['memories']:
+            yield memory['id'], memory['text'], {
+                'user_id': memory['user_id'],
+                'summary': memory['text'].split('.')[0],
+                'emotion': memory['emotion'],
+                'topic': memory['topic'],
+                'importance_score': memory['importance_score'],
+            }, memory['days_ago']
+
+        rng = random.Random(seed)
+        user_ids = sorted({memory['user_id'] for memory in corpus['memories']})
+        for i in range(distractors):
+            text = sentence(rng)
+            yield f'generated-{i}', text, {
+                'user_id': user_ids[i % len(user_ids)],
+                'summary': text.split('.')[0],
+                'emotion': rng.choice(EMOTIONS),
+                'topic': rng.choice(TOPICS),
+                'importance_score': round(rng.uniform(0.2, 0.9), 2),
+            }, rng.uniform(0, 365)
+
+    def calls(self) -> Dict[str, int]:
+        """External calls made so far, by service and kind."""
+        counts = {f'openai.{kind}': count for kind, count in self.openai.calls.items()}
+        counts.update({f'pinecone.{operation}': count for operation, count in self.index.calls.items()})
+        return counts
+
+
+def evaluate(corpus: Dict, configuration: Configuration, ks: Sequence[int] = DEFAULT_KS, distractors: int = 500,
+             openai: Optional[Faults] = None, vector: Optional[Faults] = None, seed: int = 7) -> Dict:
+    """Run every query of the corpus under one configuration.
+
+    Returns:
+        Mean recall at each k and MRR, search latency in milliseconds, external
+        calls per query, and per query the IDs returned
+    """
+    stack = EvaluationStack(corpus, configuration, distractors, openai, vector, seed)
+    top_k = max(ks)
+    before = stack.calls()
+    latencies, recalls, reciprocal_ranks, queries = [], {k: [] for k in ks}, [], {}
+
+    for query in corpus['queries']:
+        started = time.perf_counter()
+        results = stack.service.search_memories(
+            query['query'], top_k=top_k, filter_dict={'user_id': query['user_id']},
+            relevance_threshold=configuration.relevance_threshold, preprocess_query=configuration.preprocess
+        )
+        latencies.append(time.perf_counter() - started)
+
+        ranked = [result['id'] for result in results]
+        for k in ks:
+            recalls[k].append(recall_at_k(ranked, query['relevant'], k))
+        reciprocal_ranks.append(reciprocal_rank(ranked, query['relevant']))
+        queries[query['id']] = ranked
+
+    count = len(corpus['queries']) or 1
+    after = stack.calls()
+    latencies.sort()
+    return {
+        'configuration': configuration.as_dict(),
+        'recall': {str(k): sum(values) / count for k, values in recalls.items()},
+        'mrr': sum(reciprocal_ranks) / count,
+        'latency_ms': {
+            'mean': 1000 * sum(latencies) / count if latencies else None,
+            'p50': 1000 * percentile(latencies, 50) if latencies else None,
+            'p95': 1000 * percentile(latencies, 95) if latencies else None,
+        },
+        'calls_per_query': {name: (after[name] - before.get(name, 0)) / count
+                            for name in sorted(after) if after[name] > before.get(name, 0)},
+        'hot_hits': stack.tier.hot_hits if stack.tier is not None else None,
+        'queries': queries
+    }
+
+
+def run(configurations: Optional[Sequence[Configuration]] = None, ks: Sequence[int] = DEFAULT_KS,
+        distractors: int = 500, openai: Optional[Faults] = None, vector: Optional[Faults] = None, seed: int = 7,
+        corpus: Optional[Dict] = None, report: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """Evaluate each configuration against the same corpus and distractors.
+
+    Args:
+        configurations: What to compare (default DEFAULT_CONFIGURATIONS)
+        ks: Cut-offs to report recall at
+        distractors: Generated memories mixed in with the labelled ones
+        openai: Latency and failures of the OpenAI stand-in
+        vector: Latency and failures of the vector index stand-in
+        seed: Seed for the generated memories
+        corpus: A loaded corpus instead of the seed corpus
+        report: Called with each configuration's name and results as it finishes
+    """
+    corpus = corpus or load_corpus()
+    openai, vector = openai or Faults(), vector or Faults()
+    results = {}
+    for configuration in configurations or DEFAULT_CONFIGURATIONS:
+        results[configuration.name] = evaluate(corpus, configuration, ks, distractors, openai, vector, seed)
+        if report:
+            report(configuration.name, results[configuration.name])
+    return {
+        'config': {
+            'ks': list(ks), 'distractors': distractors, 'seed': seed,
+            'memories': len(corpus['memories']), 'queries': len(corpus['queries']),
+            'openai': {'latency': openai.latency, 'jitter': openai.jitter, 'error_rate': openai.error_rate},
+            'vector': {'latency': vector.latency, 'jitter': vector.jitter, 'error_rate': vector.error_rate}
+        },
+        'results': results
+    }
+
+
+def format_report(results: Dict, out=None) -> None:
+    """Print the configurations side by side."""
+    out = out or sys.stdout
+    ks = results['config']['ks']
+    out.write(f"{'configuration':<16} " + ' '.join(f"{f'R@{k}':>6}" for k in ks)
+              + f" {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} {'calls/query':>12}\n")
+    for name, outcome in results['results'].items():
+        def ms(key):
+            value = outcome['latency_ms'][key]
+            return f"{value:.1f}" if value is not None else '-'
+        calls = sum(count for call, count in outcome['calls_per_query'].items()
+                    if call in ('openai.embeddings', 'openai.chat', 'pinecone.query'))
+        out.write(f"{name:<16} " + ' '.join(f"{outcome['recall'][str(k)]:>6.2f}" for k in ks)
+                  + f" {outcome['mrr']:>6.2f} {ms('p50'):>8} {ms('p95'):>8} {calls:>12.2f}\n")
@@ -0,0 +1,10 @@
+"""
+loadtest
+--------
+Load tests for the Soulstream API, against local stand-ins for OpenAI and Pinecone.
+Run with `python -m backend.loadtest`; see harness.py for what is measured.
+"""
+
+from backend.loadtest.harness import (
+    DEFAULT_MIX, ENDPOINTS, LoadTestConfig, LocalStack, PooledWSGIServer, run, summarize
+)
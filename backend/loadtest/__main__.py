@@ -0,0 +1,74 @@
+"""
+__main__.py
+-----------
+Command line for the load test.
+Pick a load, a few worker counts, and see where the latency starts to climb.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from backend.loadtest import DEFAULT_MIX, ENDPOINTS, LoadTestConfig, run
+from backend.loadtest.harness import format_report
+from backend.testing.fakes import Faults
+
+
+def parse_mix(value: str):
+    """'chat.message=1,memory.search=2' -> {'chat.message': 1.0, 'memory.search': 2.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name.strip()!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m backend.loadtest', description=__doc__.strip())
+    parser.add_argument('--users', type=int, default=16, help='Concurrent synthetic users (default 16)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per run (default 20)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds first (default 2)')
+    parser.add_argument('--think', type=float, default=0.0, help='Mean seconds between a user\'s calls (default 0)')
+    parser.add_argument('--workers', default='1,4,16', help='Worker thread counts, one run each (default 1,4,16)')
+    parser.add_argument('--mix', type=parse_mix,
+                        default=DEFAULT_MIX, help='Endpoint weights, e.g. "chat.message=1,memory.chips=3"')
+    parser.add_argument('--seeded-users', type=int, default=20, help='Users in the seeded database (default 20)')
+    parser.add_argument('--days', type=int, default=90, help='Days of history per seeded user (default 90)')
+    parser.add_argument('--openai-latency', type=float, default=0.4, help='OpenAI stand-in latency in seconds')
+    parser.add_argument('--openai-jitter', type=float, default=0.4, help='Extra random OpenAI latency, up to')
+    parser.add_argument('--openai-error-rate', type=float, default=0.0, help='Fraction of OpenAI calls that fail')
+    parser.add_argument('--vector-latency', type=float, default=0.03, help='Vector index stand-in latency')
+    parser.add_argument('--vector-jitter', type=float, default=0.02, help='Extra random vector latency, up to')
+    parser.add_argument('--vector-error-rate', type=float, default=0.0, help='Fraction of vector calls that fail')
+    parser.add_argument('--seed', type=int, default=7, help='Seed for data and user behaviour')
+    parser.add_argument('--database-url', help='Database for the local app (default: a temporary SQLite file)')
+    parser.add_argument('--url', help='Drive an already running server at this base URL instead')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show the app\'s logs')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    config = LoadTestConfig(
+        users=args.users, duration=args.duration, warmup=args.warmup, think_time=args.think, mix=args.mix,
+        seeded_users=args.seeded_users, days=args.days, seed=args.seed,
+        openai=Faults(args.openai_latency, args.openai_jitter, args.openai_error_rate, seed=args.seed),
+        vector=Faults(args.vector_latency, args.vector_jitter, args.vector_error_rate, seed=args.seed)
+    )
+    workers = [int(count) for count in args.workers.split(',') if count.strip()]
+    results = run(config, workers=workers, url=args.url, database_url=args.database_url, report=format_report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nResults written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+harness.py
+----------
+Many synthetic users talking to Soulstream at once.
+The app served as it would be, with OpenAI and Pinecone played by local stand-ins.
+Throughput, latency percentiles and errors, per endpoint and per worker count.
+"""
+
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import create_engine
+from werkzeug.serving import BaseWSGIServer
+
+from backend.config import Config
+from backend.models import Base
+from backend.testing.data import QUERIES, seed_database, sentence
+from backend.testing.fakes import FakeOpenAI, FakePineconeIndex, Faults
+from backend.utils.metrics import STAGE_ERRORS
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# How often each endpoint is called, relative to the others: mostly reading, sometimes talking
+DEFAULT_MIX = {'chat.message': 1, 'memory.search': 2, 'memory.chips': 3, 'timeline.days': 3}
+
+# Latency percentiles reported
+PERCENTILES = (50, 95, 99)
+
+
+def _chat_message(user: 'SyntheticUser') -> Tuple:
+    body = {'message': sentence(user.rng), 'user_id': user.user_id}
+    if user.conversation_id:
+        body['conversation_id'] = user.conversation_id
+    return 'POST', '/api/chat/message', body
+
+
+def _memory_search(user: 'SyntheticUser') -> Tuple:
+    return 'GET', '/api/memory/search?' + urlencode({
+        'query': user.rng.choice(QUERIES), 'user_id': user.user_id, 'limit': 10
+    }), None
+
+
+def _memory_chips(user: 'SyntheticUser') -> Tuple:
+    return 'GET', '/api/memory/chips?' + urlencode({
+        'user_id': user.user_id, 'limit': 50, 'offset': user.rng.choice((0, 0, 0, 50, 100))
+    }), None
+
+
+def _timeline_days(user: 'SyntheticUser') -> Tuple:
+    return 'GET', '/api/timeline/days?' + urlencode({'user_id': user.user_id, 'limit': 30}), None
+
+
+# Endpoint name -> builds (method, path, JSON body) for a user's next call
+ENDPOINTS: Dict[str, Callable[['SyntheticUser'], Tuple]] = {
+    'chat.message': _chat_message,
+    'memory.search': _memory_search,
+    'memory.chips': _memory_chips,
+    'timeline.days': _timeline_days
+}
+
+
+class LoadTestConfig:
+    """What to run, for how long, against what.
+
+    Args:
+        users: Synthetic users calling concurrently
+        duration: Seconds measured per worker configuration
+        warmup: Seconds run before measuring
+        think_time: Mean seconds a user waits between calls (exponentially distributed); 0 for none
+        mix: Relative weight of each endpoint in ENDPOINTS
+        seeded_users: Users in the seeded database, shared among the synthetic users
+        days: Days of history seeded per user
+        memories_per_day: Memories seeded per user per day
+        openai: Latency and failures of the OpenAI stand-in
+        vector: Latency and failures of the vector index stand-in
+        seed: Seed for the data and the users' choices
+        timeout: Seconds a client waits for a response
+    """
+
+    def __init__(self, users: int = 16, duration: float = 20.0, warmup: float = 2.0, think_time: float = 0.0,
+                 mix: Optional[Dict[str, float]] = None, seeded_users: int = 20, days: int = 90,
+                 memories_per_day: int = 3, openai: Optional[Faults] = None, vector: Optional[Faults] = None,
+                 seed: int = 7, timeout: float = 30.0):
+        self.users = users
+        self.duration = duration
+        self.warmup = warmup
+        self.think_time = think_time
+        self.mix = dict(mix or DEFAULT_MIX)
+        unknown = set(self.mix) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+        self.seeded_users = seeded_users
+        self.days = days
+        self.memories_per_day = memories_per_day
+        self.openai = openai or Faults(latency=0.4, jitter=0.4, seed=seed)
+        self.vector = vector or Faults(latency=0.03, jitter=0.02, seed=seed)
+        self.seed = seed
+        self.timeout = timeout
+
+    def as_dict(self) -> Dict:
+        return {
+            'users': self.users, 'duration': self.duration, 'warmup': self.warmup, 'think_time': self.think_time,
+            'mix': self.mix, 'seeded_users': self.seeded_users, 'days': self.days,
+            'memories_per_day': self.memories_per_day, 'seed': self.seed,
+            'openai': _faults_dict(self.openai), 'vector': _faults_dict(self.vector)
+        }
+
+
+def _faults_dict(faults: Faults) -> Dict:
+    return {'latency': faults.latency, 'jitter': faults.jitter, 'error_rate': faults.error_rate}
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's development server, handling requests on a fixed pool of worker threads.
+
+    The worker count bounds concurrency as a threaded production server's does,
+    which the one-thread-per-request server does not.
+    """
+
+    def __init__(self, host: str, port: int, app, workers: int):
+        super().__init__(host, port, app)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wsgi-worker')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class Recorder:
+    """Calls completed during the measured window, by endpoint."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, Optional[int], Optional[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, status: Optional[int], error: Optional[str] = None) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status, error))
+
+
+class SyntheticUser:
+    """One user calling the API in a loop, choosing endpoints by the mix."""
+
+    def __init__(self, number: int, user_id: int, host: str, port: int, config: LoadTestConfig):
+        self.user_id = user_id
+        self.host = host
+        self.port = port
+        self.config = config
+        self.rng = random.Random(config.seed * 100003 + number)
+        self.conversation_id = None
+        self.names = list(config.mix)
+        self.weights = [config.mix[name] for name in self.names]
+
+    def run(self, recorder: Recorder, measure_from: float, stop_at: float) -> None:
+        while time.perf_counter() < stop_at:
+            endpoint = self.rng.choices(self.names, self.weights)[0]
+            method, path, body = ENDPOINTS[endpoint](self)
+            started = time.perf_counter()
+            status, payload, error = self.call(method, path, body)
+            elapsed = time.perf_counter() - started
+            if started >= measure_from and started + elapsed <= stop_at:
+                recorder.record(endpoint, elapsed, status, error)
+            if endpoint == 'chat.message' and isinstance(payload, dict) and payload.get('conversation_id'):
+                self.conversation_id = payload['conversation_id']
+            if self.config.think_time > 0:
+                time.sleep(self.rng.expovariate(1.0 / self.config.think_time))
+
+    def call(self, method: str, path: str, body: Optional[Dict]) -> Tuple[Optional[int], object, Optional[str]]:
+        """Make one request on a new connection. Returns (status, decoded body, transport error)."""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.config.timeout)
+        try:
+            headers = {'Accept': 'application/json'}
+            data = None
+            if body is not None:
+                data = json.dumps(body).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+            try:
+                payload = json.loads(raw) if raw else None
+            except ValueError:
+                payload = None
+            return response.status, payload, None
+        except Exception as e:
+            return None, None, type(e).__name__
+        finally:
+            connection.close()
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> Optional[float]:
+    """The nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-p * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict:
+    """Throughput, latency percentiles (ms) and error rates per endpoint, and over all of them.
+
+    A call is an error when it got no response or a 4xx or 5xx status.
+    """
+    def stats(samples):
+        latencies = sorted(seconds for seconds, _, _ in samples)
+        errors = sum(1 for _, status, error in samples if error or status is None or status >= 400)
+        by_status = {}
+        for _, status, error in samples:
+            key = str(status) if status is not None else error
+            by_status[key] = by_status.get(key, 0) + 1
+        summary = {
+            'requests': len(samples),
+            'throughput': len(samples) / duration if duration else 0.0,
+            'errors': errors,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'status': by_status,
+            'mean_ms': 1000 * sum(latencies) / len(latencies) if latencies else None,
+            'max_ms': 1000 * latencies[-1] if latencies else None
+        }
+        for p in PERCENTILES:
+            value = percentile(latencies, p)
+            summary[f'p{p}_ms'] = 1000 * value if value is not None else None
+        return summary
+
+    endpoints = {name: stats(samples) for name, samples in sorted(recorder.samples.items())}
+    everything = [sample for samples in recorder.samples.values() for sample in samples]
+    return {'endpoints': endpoints, 'total': stats(everything)}
+
+
+def drive(host: str, port: int, config: LoadTestConfig, user_ids: Sequence[int]) -> Dict:
+    """Run the synthetic users against a server for the warmup and the measured duration."""
+    recorder = Recorder()
+    started = time.perf_counter()
+    measure_from = started + config.warmup
+    stop_at = measure_from + config.duration
+    users = [SyntheticUser(i, user_ids[i % len(user_ids)], host, port, config) for i in range(config.users)]
+    threads = [threading.Thread(target=user.run, args=(recorder, measure_from, stop_at), daemon=True)
+               for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(stop_at - time.perf_counter() + config.timeout + 1)
+    return summarize(recorder, config.duration)
+
+
+class LocalStack:
+    """The app, booted on a seeded SQLite database with stand-in OpenAI and vector index.
+
+    Args:
+        config: Sizes of the seeded data and the stand-ins' latency and failures
+        database_url: Database to use instead of a temporary SQLite file
+    """
+
+    def __init__(self, config: LoadTestConfig, database_url: Optional[str] = None):
+        from backend.app import create_app
+
+        self.config = config
+        self._directory = None
+        if database_url is None:
+            self._directory = tempfile.TemporaryDirectory(prefix='soulstream-load-')
+            database_url = f"sqlite:///{os.path.join(self._directory.name, 'load.db')}"
+        self.database_url = database_url
+
+        # Tables first, so the hot tier warm-up at startup finds them
+        engine = create_engine(database_url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+        self.openai = FakeOpenAI(Faults())
+        self.index = FakePineconeIndex(Faults())
+        settings = Config()
+        settings.DATABASE_URL = database_url
+        settings.DEBUG = False
+        settings.SQLALCHEMY_ENGINE_OPTIONS = (
+            {'connect_args': {'check_same_thread': False, 'timeout': 30}} if database_url.startswith('sqlite') else {}
+        )
+        self.app = create_app(settings, openai_client=self.openai, vector_index=self.index)
+
+        seeded = seed_database(self.app.db_session, users=config.seeded_users, days=config.days,
+                               memories_per_day=config.memories_per_day, seed=config.seed,
+                               vector_store=self.app.pinecone_manager)
+        self.user_ids = seeded['user_ids']
+        self.app.memory_service.warm_hot_tier(max_memories=self.app.config.get('HOT_TIER_SIZE', 5000))
+        self.app.db_session.remove()
+
+        # Seeding is done; from here the stand-ins are as slow and unreliable as configured
+        self.openai.faults = config.openai
+        self.index.faults = config.vector
+        logger.info(f"Seeded {seeded['memories']} memories for {len(self.user_ids)} users")
+
+    def serve(self, workers: int) -> PooledWSGIServer:
+        """Start serving on an ephemeral port with a pool of `workers` threads."""
+        server = PooledWSGIServer('127.0.0.1', 0, self.app, workers)
+        threading.Thread(target=server.serve_forever, name='wsgi-server', daemon=True).start()
+        return server
+
+    def close(self) -> None:
+        from backend.app import shutdown_services
+
+        shutdown_services(self.app)
+        self.app.db_session.remove()
+        self.app.engine.dispose()
+        if self._directory is not None:
+            self._directory.cleanup()
+
+
+def run(config: LoadTestConfig, workers: Sequence[int] = (1, 4, 16), url: Optional[str] = None,
+        database_url: Optional[str] = None, report: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """Run the load test once per worker configuration.
+
+    Args:
+        config: The load to apply
+        workers: Worker thread counts to serve with, one run each
+        url: Base URL of an already running server to drive instead; its users
+            are taken to be IDs 1 to config.seeded_users
+        database_url: Database for the local app instead of a temporary SQLite file
+        report: Called with each run's label and results as it finishes
+
+    Returns:
+        The configuration and, per run, its results. Runs against the local app
+        also count stage failures the app handled, under 'stage_errors'.
+    """
+    runs = {}
+    if url:
+        parts = urlsplit(url)
+        label = parts.netloc
+        runs[label] = drive(parts.hostname, parts.port or 80, config, list(range(1, config.seeded_users + 1)))
+        if report:
+            report(label, runs[label])
+    else:
+        stack = LocalStack(config, database_url)
+        try:
+            for count in workers:
+                server = stack.serve(count)
+                try:
+                    label = f'workers={count}'
+                    before = STAGE_ERRORS.snapshot()
+                    runs[label] = drive('127.0.0.1', server.server_port, config, stack.user_ids)
+                    # Failures the app handled (a search that fell back to nothing, a reply
+                    # that fell back to an apology) do not show in status codes
+                    runs[label]['stage_errors'] = {
+                        key[0]: value - before.get(key, 0)
+                        for key, value in sorted(STAGE_ERRORS.snapshot().items()) if value > before.get(key, 0)
+                    }
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                if report:
+                    report(label, runs[label])
+        finally:
+            stack.close()
+    return {'config': config.as_dict(), 'runs': runs}
+
+
+def format_report(label: str, results: Dict, out=None) -> None:
+    """Print one run's results as a table."""
+    out = out or sys.stdout
+    out.write(f"\n{label}\n")
+    out.write(f"{'endpoint':<16} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'errors':>7}\n")
+    rows = list(results['endpoints'].items()) + [('total', results['total'])]
+    for name, stats in rows:
+        def ms(key):
+            return f"{stats[key]:.1f}" if stats[key] is not None else '-'
+        out.write(f"{name:<16} {stats['requests']:>8} {stats['throughput']:>8.1f} {ms('p50_ms'):>8} "
+                  f"{ms('p95_ms'):>8} {ms('p99_ms'):>8} {100 * stats['error_rate']:>6.1f}%\n")
+    if results.get('stage_errors'):
+        out.write('handled stage errors: ' + ', '.join(
+            f'{stage} {count:g}' for stage, count in results['stage_errors'].items()
+        ) + '\n')
@@ -0,0 +1,4 @@
+"""
+Database migrations for Soulstream.
+The history of the schema itself. Every change remembered, in order.
+"""
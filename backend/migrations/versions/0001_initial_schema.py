@@ -0,0 +1,113 @@
+"""Initial schema
+
+The tables as they were first created by ``Base.metadata.create_all``.
+Databases that were bootstrapped that way should be stamped at this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-03-24 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('username', sa.String(50), nullable=False, unique=True),
+        sa.Column('email', sa.String(100), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=True),
+        sa.Column('timezone', sa.String(50), nullable=False),
+        sa.Column('is_premium', sa.Boolean(), nullable=True),
+        *_timestamps()
+    )
+
+    op.create_table(
+        'characters',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('persona_traits', sa.Text(), nullable=True),
+        sa.Column('avatar_url', sa.Text(), nullable=True),
+        *_timestamps()
+    )
+
+    op.create_table(
+        'memory_chips',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('character_id', sa.Integer(), sa.ForeignKey('characters.id'), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('source_text', sa.Text(), nullable=False),
+        sa.Column('embedding_id', sa.String(255), nullable=True, unique=True),
+        sa.Column('emotion', sa.String(50), nullable=True),
+        sa.Column('topic', sa.String(100), nullable=True),
+        sa.Column('importance_score', sa.Float(), nullable=True),
+        sa.Column('is_pinned', sa.Boolean(), nullable=True),
+        sa.Column('last_referenced_at', sa.DateTime(), nullable=True),
+        *_timestamps()
+    )
+
+    op.create_table(
+        'memory_tags',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('color', sa.String(10), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        *_timestamps()
+    )
+
+    op.create_table(
+        'memory_tag_association',
+        sa.Column('memory_chip_id', sa.Integer(), sa.ForeignKey('memory_chips.id'), primary_key=True),
+        sa.Column('memory_tag_id', sa.Integer(), sa.ForeignKey('memory_tags.id'), primary_key=True)
+    )
+
+    op.create_table(
+        'timeline_entries',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('title', sa.String(100), nullable=False),
+        sa.Column('mood', sa.String(20), nullable=True),
+        sa.Column('entry_summary', sa.Text(), nullable=False),
+        sa.Column('emotion', sa.String(20), nullable=True),
+        sa.Column('emotion_intensity', sa.Float(), nullable=False),
+        sa.Column('secondary_emotions', sa.JSON(), nullable=True),
+        sa.Column('milestone_flag', sa.Boolean(), nullable=True),
+        *_timestamps()
+    )
+
+    op.create_table(
+        'timeline_memory_links',
+        sa.Column('timeline_id', sa.Integer(),
+                  sa.ForeignKey('timeline_entries.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('memory_id', sa.Integer(),
+                  sa.ForeignKey('memory_chips.id', ondelete='CASCADE'), primary_key=True),
+        sa.UniqueConstraint('timeline_id', 'memory_id', name='uix_timeline_memory')
+    )
+
+
+def downgrade():
+    op.drop_table('timeline_memory_links')
+    op.drop_table('timeline_entries')
+    op.drop_table('memory_tag_association')
+    op.drop_table('memory_tags')
+    op.drop_table('memory_chips')
+    op.drop_table('characters')
+    op.drop_table('users')
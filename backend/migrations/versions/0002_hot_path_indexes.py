@@ -0,0 +1,47 @@
+"""Composite indexes for hot access paths
+
+Chip listings filter by user (plus emotion or topic) and sort by recency.
+Timeline listings filter by user and date, optionally by milestone.
+The junction tables get a reverse index to go with their primary keys.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-03-24 11:00:00
+"""
+
+from alembic import op
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_memory_chips_user_id_created_at', 'memory_chips',
+                    ['user_id', 'created_at'])
+    op.create_index('ix_memory_chips_user_id_emotion_created_at', 'memory_chips',
+                    ['user_id', 'emotion', 'created_at'])
+    op.create_index('ix_memory_chips_user_id_topic_created_at', 'memory_chips',
+                    ['user_id', 'topic', 'created_at'])
+
+    op.create_index('ix_timeline_entries_user_id_date', 'timeline_entries',
+                    ['user_id', 'date'])
+    op.create_index('ix_timeline_entries_user_id_milestone_flag_date', 'timeline_entries',
+                    ['user_id', 'milestone_flag', 'date'])
+
+    op.create_index('ix_memory_tag_association_tag_id_chip_id', 'memory_tag_association',
+                    ['memory_tag_id', 'memory_chip_id'])
+    op.create_index('ix_timeline_memory_links_memory_id_timeline_id', 'timeline_memory_links',
+                    ['memory_id', 'timeline_id'])
+
+
+def downgrade():
+    op.drop_index('ix_timeline_memory_links_memory_id_timeline_id', table_name='timeline_memory_links')
+    op.drop_index('ix_memory_tag_association_tag_id_chip_id', table_name='memory_tag_association')
+    op.drop_index('ix_timeline_entries_user_id_milestone_flag_date', table_name='timeline_entries')
+    op.drop_index('ix_timeline_entries_user_id_date', table_name='timeline_entries')
+    op.drop_index('ix_memory_chips_user_id_topic_created_at', table_name='memory_chips')
+    op.drop_index('ix_memory_chips_user_id_emotion_created_at', table_name='memory_chips')
+    op.drop_index('ix_memory_chips_user_id_created_at', table_name='memory_chips')
@@ -0,0 +1,38 @@
+"""Memory outbox
+
+Pending vector store changes, written alongside the memory chips they describe.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-03-25 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'memory_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('embedding_id', sa.String(255), nullable=False),
+        sa.Column('operation', sa.String(20), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_memory_outbox_processed_at_id', 'memory_outbox', ['processed_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_memory_outbox_processed_at_id', table_name='memory_outbox')
+    op.drop_table('memory_outbox')
@@ -0,0 +1,55 @@
+"""Conversations
+
+Conversation summary rows and the append-only message log behind them.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-03-26 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversations',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('character_id', sa.Integer(), sa.ForeignKey('characters.id'), nullable=True),
+        sa.Column('title', sa.String(100), nullable=True),
+        sa.Column('last_message', sa.Text(), nullable=True),
+        sa.Column('last_message_at', sa.DateTime(), nullable=True),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('memory_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_conversations_user_id_updated_at', 'conversations', ['user_id', 'updated_at'])
+
+    op.create_table(
+        'conversation_messages',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('conversation_id', sa.Integer(),
+                  sa.ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('sender', sa.String(10), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('memory_id', sa.String(255), nullable=True),
+        sa.Column('referenced_memory_ids', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_conversation_messages_conversation_id_id', 'conversation_messages',
+                    ['conversation_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_conversation_messages_conversation_id_id', table_name='conversation_messages')
+    op.drop_table('conversation_messages')
+    op.drop_index('ix_conversations_user_id_updated_at', table_name='conversations')
+    op.drop_table('conversations')
@@ -0,0 +1,32 @@
+"""Memory consolidation
+
+Links consolidated memories to the summary memory that replaced them.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-03-27 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory_chips') as batch_op:
+        batch_op.add_column(sa.Column('consolidated_into_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_memory_chips_consolidated_into_id', 'memory_chips',
+                                    ['consolidated_into_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_memory_chips_consolidated_into_id', ['consolidated_into_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('memory_chips') as batch_op:
+        batch_op.drop_index('ix_memory_chips_consolidated_into_id')
+        batch_op.drop_constraint('fk_memory_chips_consolidated_into_id', type_='foreignkey')
+        batch_op.drop_column('consolidated_into_id')
@@ -0,0 +1,27 @@
+"""Memory reference count
+
+How often each memory has been recalled, for hot tier promotion.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-03-28 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory_chips') as batch_op:
+        batch_op.add_column(sa.Column('reference_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('memory_chips') as batch_op:
+        batch_op.drop_column('reference_count')
@@ -0,0 +1,42 @@
+"""Timeline day stats
+
+Per-user daily memory aggregates, maintained as memories are stored.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-03-29 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'timeline_day_stats',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('memory_count', sa.Integer(), nullable=False),
+        sa.Column('emotion_counts', sa.JSON(), nullable=True),
+        sa.Column('topic_counts', sa.JSON(), nullable=True),
+        sa.Column('dominant_emotion', sa.String(50), nullable=True),
+        sa.Column('intensity_sum', sa.Float(), nullable=False),
+        sa.Column('intensity_count', sa.Integer(), nullable=False),
+        sa.Column('timeline_entry_id', sa.Integer(),
+                  sa.ForeignKey('timeline_entries.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('entry_generated', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('user_id', 'date', name='uix_timeline_day_stats_user_id_date')
+    )
+
+
+def downgrade():
+    op.drop_table('timeline_day_stats')
@@ -0,0 +1,99 @@
+"""Timeline month stats
+
+Per-user monthly memory aggregates and per-day milestone bits, for the calendar heatmap.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-03-30 10:00:00
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('timeline_day_stats') as batch_op:
+        batch_op.add_column(sa.Column('milestone', sa.Boolean(), nullable=False, server_default='0'))
+
+    month_stats = op.create_table(
+        'timeline_month_stats',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('active_days', sa.Integer(), nullable=False),
+        sa.Column('milestone_days', sa.Integer(), nullable=False),
+        sa.Column('memory_count', sa.Integer(), nullable=False),
+        sa.Column('emotion_counts', sa.JSON(), nullable=True),
+        sa.Column('topic_counts', sa.JSON(), nullable=True),
+        sa.Column('dominant_emotion', sa.String(50), nullable=True),
+        sa.Column('intensity_sum', sa.Float(), nullable=False),
+        sa.Column('intensity_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('user_id', 'month', name='uix_timeline_month_stats_user_id_month')
+    )
+
+    # Milestone bits come from the day's timeline entry
+    op.execute(
+        "UPDATE timeline_day_stats SET milestone = 1 WHERE EXISTS ("
+        "SELECT 1 FROM timeline_entries e WHERE e.id = timeline_day_stats.timeline_entry_id "
+        "AND e.milestone_flag = 1)"
+    )
+
+    # Months are folded from the day rows already collected
+    day_stats = sa.table(
+        'timeline_day_stats',
+        sa.column('user_id'), sa.column('date', sa.Date()), sa.column('memory_count'),
+        sa.column('emotion_counts', sa.JSON()), sa.column('topic_counts', sa.JSON()),
+        sa.column('intensity_sum'), sa.column('intensity_count'), sa.column('milestone', sa.Boolean())
+    )
+    months = {}
+    for row in op.get_bind().execute(sa.select(day_stats)):
+        key = (row.user_id, row.date.replace(day=1))
+        month = months.setdefault(key, {
+            'memory_count': 0, 'emotions': Counter(), 'topics': Counter(),
+            'intensity_sum': 0.0, 'intensity_count': 0, 'active_days': 0, 'milestone_days': 0
+        })
+        month['memory_count'] += row.memory_count
+        month['emotions'].update(row.emotion_counts or {})
+        month['topics'].update(row.topic_counts or {})
+        month['intensity_sum'] += row.intensity_sum
+        month['intensity_count'] += row.intensity_count
+        month['active_days'] += 1 if row.memory_count else 0
+        month['milestone_days'] += 1 if row.milestone else 0
+
+    now = datetime.utcnow()
+    if months:
+        op.bulk_insert(month_stats, [
+            {
+                'user_id': user_id,
+                'month': month_start,
+                'active_days': month['active_days'],
+                'milestone_days': month['milestone_days'],
+                'memory_count': month['memory_count'],
+                'emotion_counts': dict(month['emotions']),
+                'topic_counts': dict(month['topics']),
+                'dominant_emotion': min(month['emotions'], key=lambda name: (-month['emotions'][name], name))
+                                    if month['emotions'] else None,
+                'intensity_sum': month['intensity_sum'],
+                'intensity_count': month['intensity_count'],
+                'created_at': now,
+                'updated_at': now
+            }
+            for (user_id, month_start), month in months.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('timeline_month_stats')
+    with op.batch_alter_table('timeline_day_stats') as batch_op:
+        batch_op.drop_column('milestone')
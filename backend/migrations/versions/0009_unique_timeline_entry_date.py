@@ -0,0 +1,56 @@
+"""Unique timeline entry date
+
+One timeline entry per user per day, so entries can be upserted by date.
+Existing duplicates are merged into the oldest entry for the day.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-03-31 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    duplicates = connection.execute(sa.text(
+        "SELECT e.id, k.keep_id FROM timeline_entries e JOIN ("
+        "SELECT user_id, date, MIN(id) AS keep_id FROM timeline_entries "
+        "GROUP BY user_id, date HAVING COUNT(*) > 1"
+        ") k ON e.user_id = k.user_id AND e.date = k.date AND e.id <> k.keep_id"
+    )).fetchall()
+
+    for duplicate_id, keep_id in duplicates:
+        # Move links the kept entry does not already have, then drop the rest
+        connection.execute(sa.text(
+            "INSERT INTO timeline_memory_links (timeline_id, memory_id) "
+            "SELECT :keep_id, memory_id FROM timeline_memory_links WHERE timeline_id = :duplicate_id "
+            "AND memory_id NOT IN (SELECT memory_id FROM timeline_memory_links WHERE timeline_id = :keep_id)"
+        ), {'keep_id': keep_id, 'duplicate_id': duplicate_id})
+        connection.execute(sa.text(
+            "DELETE FROM timeline_memory_links WHERE timeline_id = :duplicate_id"
+        ), {'duplicate_id': duplicate_id})
+        connection.execute(sa.text(
+            "UPDATE timeline_day_stats SET timeline_entry_id = :keep_id, entry_generated = 0 "
+            "WHERE timeline_entry_id = :duplicate_id"
+        ), {'keep_id': keep_id, 'duplicate_id': duplicate_id})
+        connection.execute(sa.text(
+            "DELETE FROM timeline_entries WHERE id = :duplicate_id"
+        ), {'duplicate_id': duplicate_id})
+
+    op.drop_index('ix_timeline_entries_user_id_date', table_name='timeline_entries')
+    op.create_index('ix_timeline_entries_user_id_date', 'timeline_entries',
+                    ['user_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_timeline_entries_user_id_date', table_name='timeline_entries')
+    op.create_index('ix_timeline_entries_user_id_date', 'timeline_entries',
+                    ['user_id', 'date'])
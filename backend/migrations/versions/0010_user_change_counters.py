@@ -0,0 +1,32 @@
+"""User change counters
+
+Per-user, per-table change counters behind conditional GETs on listings.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-04-01 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_change_counters',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('table_name', sa.String(50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'table_name', name='pk_user_change_counters')
+    )
+
+
+def downgrade():
+    op.drop_table('user_change_counters')
@@ -0,0 +1,45 @@
+"""Journal entries
+
+Persisted journal entries, generated ones keyed by the digest of their inputs.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-04-02 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'journal_entries',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('title', sa.String(100), nullable=True),
+        sa.Column('entry_body', sa.Text(), nullable=False),
+        sa.Column('voice_style', sa.String(20), nullable=False),
+        sa.Column('emotion', sa.String(20), nullable=True),
+        sa.Column('created_by_ai', sa.Boolean(), nullable=False),
+        sa.Column('input_digest', sa.String(64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index(
+        'uix_journal_entries_user_id_date_voice_style_input_digest',
+        'journal_entries',
+        ['user_id', 'date', 'voice_style', 'input_digest'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uix_journal_entries_user_id_date_voice_style_input_digest', table_name='journal_entries')
+    op.drop_table('journal_entries')
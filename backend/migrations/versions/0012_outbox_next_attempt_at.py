@@ -0,0 +1,27 @@
+"""Outbox retry backoff
+
+When each failed outbox event may next be retried, so retries back off instead of giving up.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-04-03 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.drop_column('next_attempt_at')
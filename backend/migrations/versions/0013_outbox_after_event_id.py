@@ -0,0 +1,28 @@
+"""Chained outbox events
+
+The event an outbox event must wait for, so a summary's sources leave the
+vector store only after the summary has arrived.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2025-04-07 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.add_column(sa.Column('after_event_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.drop_column('after_event_id')
@@ -0,0 +1,33 @@
+"""Outbox claims
+
+Which drain is delivering an outbox event, so several workers can drain the
+outbox without sending the same event twice. Events are also looked up by
+memory, to keep each memory's events in order.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2025-04-08 10:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.String(32), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_memory_outbox_embedding_id', 'memory_outbox', ['embedding_id'])
+
+
+def downgrade():
+    op.drop_index('ix_memory_outbox_embedding_id', table_name='memory_outbox')
+    with op.batch_alter_table('memory_outbox') as batch_op:
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by')
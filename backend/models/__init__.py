@@ -10,5 +10,12 @@ from backend.models.memory_chip import MemoryChip
 from backend.models.memory_tag import MemoryTag
 from backend.models.timeline_entry import TimelineEntry
 from backend.models.timeline_memory_link import timeline_memory_links
+from backend.models.memory_outbox import MemoryOutboxEvent
+from backend.models.conversation import Conversation, ConversationMessage
+from backend.models.timeline_day_stats import TimelineDayStats
+from backend.models.timeline_month_stats import TimelineMonthStats
+from backend.models.user_change_counter import UserChangeCounter
+from backend.models.journal_entry import JournalEntry
+from backend.models.background_job import BackgroundJob
 
 # Import all models here to ensure they are registered with SQLAlchemy
@@ -0,0 +1,35 @@
+"""
+background_job.py
+-----------------
+Background job model for Soulstream.
+Where long work leaves word of how far it has come.
+Any worker can answer for it, not only the one doing it.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from backend.models.base import Base, TimestampMixin
+
+class BackgroundJob(Base, TimestampMixin):
+    """Model for background job status.
+    
+    Written by the JobManager as a job is queued, makes progress and finishes,
+    so a status check reaches it whichever process receives the request.
+    """
+    
+    __tablename__ = 'background_jobs'
+    __table_args__ = {'extend_existing': True}
+    
+    id = Column(String(36), primary_key=True)
+    name = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False)
+    params = Column(JSON, nullable=True)
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        """String representation of the background job."""
+        return f"<BackgroundJob(id='{self.id}', name='{self.name}', status='{self.status}')>"
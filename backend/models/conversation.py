@@ -0,0 +1,84 @@
+"""
+conversation.py
+---------------
+Conversation models for Soulstream.
+The raw record of what was said, and a running summary of each exchange.
+Messages are only ever appended. The summary row keeps pace with them.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from backend.models.base import Base, TimestampMixin
+
+class Conversation(Base, TimestampMixin):
+    """Model for conversation summaries.
+    
+    One row per conversation, updated in place as messages arrive.
+    The sidebar reads these rows and never has to count messages.
+    """
+    
+    __tablename__ = 'conversations'
+    __table_args__ = (
+        # Sidebar listing: a user's conversations, most recently active first
+        Index('ix_conversations_user_id_updated_at', 'user_id', 'updated_at'),
+        {'extend_existing': True}
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    character_id = Column(Integer, ForeignKey('characters.id'), nullable=True)
+    title = Column(String(100), nullable=True)
+    
+    # Denormalized summary, maintained on every append
+    last_message = Column(Text, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    memory_count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    messages = relationship('ConversationMessage', back_populates='conversation',
+                            lazy='dynamic', passive_deletes=True)
+    
+    def __repr__(self):
+        """String representation of the conversation.
+        
+        A glimpse of an exchange, and how long it ran.
+        """
+        return f"<Conversation(id={self.id}, user_id={self.user_id}, messages={self.message_count})>"
+
+
+class ConversationMessage(Base):
+    """Model for individual chat messages.
+    
+    Append-only. Rows are written once, in order, and never updated.
+    The auto-increment ID doubles as the paging cursor.
+    """
+    
+    __tablename__ = 'conversation_messages'
+    __table_args__ = (
+        # History paging: one conversation, in message order
+        Index('ix_conversation_messages_conversation_id_id', 'conversation_id', 'id'),
+        {'extend_existing': True}
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    sender = Column(String(10), nullable=False)  # 'user' or 'ai'
+    message = Column(Text, nullable=False)
+    
+    # The memory this message was stored as, and the memories active when it was written
+    memory_id = Column(String(255), nullable=True)
+    referenced_memory_ids = Column(JSON, nullable=True)
+    
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    
+    # Relationships
+    conversation = relationship('Conversation', back_populates='messages')
+    
+    def __repr__(self):
+        """String representation of the message.
+        
+        A glimpse of what was said, and by whom.
+        """
+        return f"<ConversationMessage(id={self.id}, sender='{self.sender}', message='{self.message[:30]}...')>"
@@ -0,0 +1,41 @@
+"""
+journal_entry.py
+----------------
+Journal entry model for Soulstream.
+The stories told about our days, in one voice or another.
+Written once for what the day held, and again only if that changes.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Date, Index
+from backend.models.base import Base, TimestampMixin
+
+class JournalEntry(Base, TimestampMixin):
+    """Model for storing journal entries.
+    
+    Narrative prose about a day, written by the user or generated from the
+    day's timeline entry and memories. Generated entries record the digest of
+    the inputs they were written from, so they are rewritten only when those
+    inputs change.
+    """
+    
+    __tablename__ = 'journal_entries'
+    __table_args__ = (
+        # Generated entries by what they were written from; also serves date-range listings
+        Index('uix_journal_entries_user_id_date_voice_style_input_digest',
+              'user_id', 'date', 'voice_style', 'input_digest', unique=True),
+        {'extend_existing': True}
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    date = Column(Date, nullable=False)
+    title = Column(String(100), nullable=True)
+    entry_body = Column(Text, nullable=False)
+    voice_style = Column(String(20), nullable=False, default='poetic')
+    emotion = Column(String(20), nullable=True)  # Dominant emotional tone
+    created_by_ai = Column(Boolean, nullable=False, default=False)
+    input_digest = Column(String(64), nullable=True)  # SHA-256 of the inputs; None if written by hand
+    
+    def __repr__(self):
+        """String representation of the journal entry."""
+        return f"<JournalEntry(id={self.id}, date='{self.date}', voice_style='{self.voice_style}')>"
@@ -8,7 +8,7 @@ Each row a moment, each field an aspect of remembrance.
 
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from backend.models.user import User
 from backend.models.character import Character
@@ -22,7 +22,15 @@ class MemoryChip(Base, TimestampMixin):
     """
     
     __tablename__ = 'memory_chips'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Listing paths: filter by user (and optionally emotion/topic), newest first
+        Index('ix_memory_chips_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_memory_chips_user_id_emotion_created_at', 'user_id', 'emotion', 'created_at'),
+        Index('ix_memory_chips_user_id_topic_created_at', 'user_id', 'topic', 'created_at'),
+        # Consolidation: the sources folded into a summary memory
+        Index('ix_memory_chips_consolidated_into_id', 'consolidated_into_id'),
+        {'extend_existing': True}
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
@@ -43,6 +51,15 @@ class MemoryChip(Base, TimestampMixin):
     
     # Timestamps (in addition to created_at and updated_at from TimestampMixin)
     last_referenced_at = Column(DateTime, nullable=True)
+    reference_count = Column(Integer, nullable=False, default=0, server_default='0')
+    
+    # Set when this memory has been folded into a consolidated summary memory.
+    # Consolidated memories keep their row but leave the vector store.
+    consolidated_into_id = Column(
+        Integer,
+        ForeignKey('memory_chips.id', name='fk_memory_chips_consolidated_into_id', ondelete='SET NULL'),
+        nullable=True
+    )
     
     # Relationships
     user = relationship('User', back_populates='memory_chips')
@@ -0,0 +1,55 @@
+"""
+memory_outbox.py
+----------------
+Memory outbox model for Soulstream.
+Changes waiting to reach the vector store, written in the same breath as the memory itself.
+Each row a promise that the two copies of a memory will agree, eventually.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Index
+from backend.models.base import Base, TimestampMixin
+
+class MemoryOutboxEvent(Base, TimestampMixin):
+    """Model for pending vector store changes.
+    
+    Written in the same transaction as the memory chip it describes.
+    Drained by the outbox relay, retried with backoff until the vector store agrees.
+    Delivered events drop their payload and are purged after a retention period.
+    """
+    
+    __tablename__ = 'memory_outbox'
+    __table_args__ = (
+        # The relay scans unprocessed events in insertion order
+        Index('ix_memory_outbox_processed_at_id', 'processed_at', 'id'),
+        # Ordering per memory, and telling a deleted memory's stray vector apart
+        Index('ix_memory_outbox_embedding_id', 'embedding_id'),
+        {'extend_existing': True}
+    )
+    
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    embedding_id = Column(String(255), nullable=False)
+    operation = Column(String(20), nullable=False)
+    
+    # Everything the vector store needs, captured at write time
+    payload = Column(JSON, nullable=True)
+    
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # Not retried before this time; None when due now
+    next_attempt_at = Column(DateTime, nullable=True)
+    # Not sent before this other event has been; None when it waits for nothing
+    after_event_id = Column(Integer, nullable=True)
+    # The drain delivering this event, and since when; a lapsed claim may be taken over
+    claimed_by = Column(String(32), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        """String representation of the outbox event.
+        
+        A glimpse of what is still in transit.
+        """
+        return f"<MemoryOutboxEvent(id={self.id}, operation='{self.operation}', embedding_id='{self.embedding_id}')>"
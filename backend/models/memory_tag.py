@@ -8,7 +8,7 @@ A system of meaning imposed on the chaos of recollection.
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Text, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from backend.models.user import User
 from backend.models.base import Base, TimestampMixin
@@ -19,6 +19,8 @@ memory_tag_association = Table(
     Base.metadata,
     Column('memory_chip_id', Integer, ForeignKey('memory_chips.id'), primary_key=True),
     Column('memory_tag_id', Integer, ForeignKey('memory_tags.id'), primary_key=True),
+    # The primary key covers chip -> tags; this covers tag -> chips
+    Index('ix_memory_tag_association_tag_id_chip_id', 'memory_tag_id', 'memory_chip_id'),
     extend_existing=True
 )
 
@@ -0,0 +1,66 @@
+"""
+timeline_day_stats.py
+---------------------
+Daily rollup model for Soulstream.
+Each day's memories, counted as they arrive rather than recounted later.
+"""
+
+from typing import List, Optional
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, JSON, UniqueConstraint
+from backend.models.base import Base, TimestampMixin
+
+class MemoryAggregateMixin:
+    """The running memory aggregate shared by the day and month rollups."""
+    
+    memory_count = Column(Integer, nullable=False, default=0)
+    emotion_counts = Column(JSON, nullable=True)  # {emotion: count}
+    topic_counts = Column(JSON, nullable=True)  # {topic: count}
+    dominant_emotion = Column(String(50), nullable=True)
+    
+    # Running emotion intensity: the importance of memories that carry an emotion
+    intensity_sum = Column(Float, nullable=False, default=0.0)
+    intensity_count = Column(Integer, nullable=False, default=0)
+    
+    @property
+    def emotion_intensity(self) -> Optional[float]:
+        """Mean intensity of the period's emotional memories, if there were any."""
+        if not self.intensity_count:
+            return None
+        return self.intensity_sum / self.intensity_count
+    
+    def top_topics(self, limit: int = 3) -> List[str]:
+        """The period's most frequent topics."""
+        counts = self.topic_counts or {}
+        return sorted(counts, key=lambda topic: (-counts[topic], topic))[:limit]
+
+class TimelineDayStats(Base, TimestampMixin, MemoryAggregateMixin):
+    """Model for per-user, per-day memory aggregates.
+    
+    Updated in place by every stored memory: a count, an emotion histogram,
+    a running intensity and topic counts. Never rebuilt by scanning memories.
+    """
+    
+    __tablename__ = 'timeline_day_stats'
+    __table_args__ = (
+        # One row per user per day; also serves date-range reads
+        UniqueConstraint('user_id', 'date', name='uix_timeline_day_stats_user_id_date'),
+        {'extend_existing': True}
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    date = Column(Date, nullable=False)
+    
+    # Mirrors the milestone flag of the day's timeline entry
+    milestone = Column(Boolean, nullable=False, default=False, server_default='0')
+    
+    # The day's timeline entry, and whether the rollup created (and so maintains) it
+    timeline_entry_id = Column(Integer, ForeignKey('timeline_entries.id', ondelete='SET NULL'), nullable=True)
+    entry_generated = Column(Boolean, nullable=False, default=False)
+    
+    def __repr__(self):
+        """String representation of the day's rollup.
+        
+        How much happened, and how it felt.
+        """
+        return f"<TimelineDayStats(user_id={self.user_id}, date='{self.date}', memories={self.memory_count})>"
@@ -8,7 +8,7 @@ Moments strung together like beads on a string, each with its own color and weig
 
 from datetime import date
 from typing import List, Dict, Optional
-from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, Date, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, ForeignKey, Date, JSON, Index
 from sqlalchemy.orm import relationship
 from backend.models.user import User
 from backend.models.base import Base, TimestampMixin
@@ -21,7 +21,13 @@ class TimelineEntry(Base, TimestampMixin):
     """
     
     __tablename__ = 'timeline_entries'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # One entry per user per day; serves day lookups and date-range listings
+        Index('ix_timeline_entries_user_id_date', 'user_id', 'date', unique=True),
+        # Milestone listings per user, most recent first
+        Index('ix_timeline_entries_user_id_milestone_flag_date', 'user_id', 'milestone_flag', 'date'),
+        {'extend_existing': True}
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -6,7 +6,7 @@ The threads that connect moments to memories.
 The associations that give context to our chronology.
 """
 
-from sqlalchemy import Column, Integer, ForeignKey, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, Table, UniqueConstraint, Index
 from backend.models.base import Base
 
 # Define the junction table for the many-to-many relationship
@@ -17,5 +17,7 @@ timeline_memory_links = Table(
     Column('timeline_id', Integer, ForeignKey('timeline_entries.id', ondelete='CASCADE'), primary_key=True),
     Column('memory_id', Integer, ForeignKey('memory_chips.id', ondelete='CASCADE'), primary_key=True),
     UniqueConstraint('timeline_id', 'memory_id', name='uix_timeline_memory'),
+    # The primary key covers entry -> memories; this covers memory -> entries
+    Index('ix_timeline_memory_links_memory_id_timeline_id', 'memory_id', 'timeline_id'),
     extend_existing=True
 )
@@ -0,0 +1,36 @@
+"""
+timeline_month_stats.py
+-----------------------
+Monthly rollup model for Soulstream.
+The same counts as the days, one step further back.
+"""
+
+from sqlalchemy import Column, Integer, ForeignKey, Date, UniqueConstraint
+from backend.models.base import Base, TimestampMixin
+from backend.models.timeline_day_stats import MemoryAggregateMixin
+
+class TimelineMonthStats(Base, TimestampMixin, MemoryAggregateMixin):
+    """Model for per-user, per-month memory aggregates.
+    
+    Maintained alongside the day rows, so a year reads as twelve rows
+    rather than three hundred and sixty-five.
+    """
+    
+    __tablename__ = 'timeline_month_stats'
+    __table_args__ = (
+        # One row per user per month; also serves range reads
+        UniqueConstraint('user_id', 'month', name='uix_timeline_month_stats_user_id_month'),
+        {'extend_existing': True}
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    
+    # Days in the month with at least one memory, and days marked as milestones
+    active_days = Column(Integer, nullable=False, default=0)
+    milestone_days = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        """String representation of the month's rollup."""
+        return f"<TimelineMonthStats(user_id={self.user_id}, month='{self.month}', memories={self.memory_count})>"
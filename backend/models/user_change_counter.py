@@ -0,0 +1,33 @@
+"""
+user_change_counter.py
+----------------------
+Change counter model for Soulstream.
+How many times a user's memories or days have changed, and when they last did.
+Enough to tell a returning client that nothing is new, without looking.
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, PrimaryKeyConstraint
+from backend.models.base import Base
+
+class UserChangeCounter(Base):
+    """Model for per-user, per-table change counters.
+    
+    Bumped in the same transaction as every committed change to the user's
+    rows in the table. Listing endpoints derive their ETag and Last-Modified
+    from it, so unchanged listings are answered without being queried.
+    """
+    
+    __tablename__ = 'user_change_counters'
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'table_name', name='pk_user_change_counters'),
+        {'extend_existing': True}
+    )
+    
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    table_name = Column(String(50), nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)  # When the latest change committed
+    
+    def __repr__(self):
+        """String representation of the counter."""
+        return f"<UserChangeCounter(user_id={self.user_id}, table='{self.table_name}', version={self.version})>"
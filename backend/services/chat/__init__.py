@@ -0,0 +1,4 @@
+"""
+Chat services for Soulstream.
+Where replies are composed, one word after another.
+"""
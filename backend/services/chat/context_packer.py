@@ -0,0 +1,234 @@
+"""
+context_packer.py
+-----------------
+Prompt context packing for Soulstream.
+Only so much can be said at once; the strongest memories are said first.
+tiktoken counts tokens when it is installed; a character estimate when it is not.
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - exercised only with tiktoken
+    tiktoken = None
+
+from backend.utils.helpers import format_memory_entry
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Tokens the chat format adds around each message, and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+# Characters per token assumed by the estimate (English prose runs close to 4)
+CHARS_PER_TOKEN = 4
+
+# A memory is cut short to fit only if at least this many tokens of it would remain
+MIN_TRUNCATED_TOKENS = 24
+
+# Marks a memory that was cut short
+TRUNCATION_MARK = ' [...]'
+
+NO_MEMORIES = "No specific memories found."
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    """The tiktoken encoding for a model, or None to estimate."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding('cl100k_base')
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        # Encodings are downloaded on first use; without them, estimate
+        logger.warning(f"Falling back to estimated token counts: {str(e)}")
+        return None
+
+
+class TokenCounter:
+    """Counts and trims text in tokens, remembering the counts of recent texts.
+
+    Counts are exact with tiktoken, and a slight overestimate without it.
+    """
+
+    def __init__(self, model: Optional[str] = None, cache_size: int = 4096):
+        """Initialize the counter.
+
+        Args:
+            model: Model whose tokenizer to use
+            cache_size: Number of recent texts whose counts are kept
+        """
+        self.encoding = _encoding(model)
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """The longest prefix of text within the given number of tokens."""
+        if tokens <= 0:
+            return ''
+        if self.encoding is not None:
+            encoded = self.encoding.encode(text, disallowed_special=())
+            return text if len(encoded) <= tokens else self.encoding.decode(encoded[:tokens])
+        return text[:tokens * CHARS_PER_TOKEN]
+
+
+def _normalized(text: Optional[str]) -> str:
+    return _WHITESPACE.sub(' ', text or '').strip().casefold()
+
+
+def memory_priority(memory: Dict) -> float:
+    """How strongly a memory deserves a place in the prompt.
+
+    Relevance to the message, weighted by importance: a memory of average
+    importance (0.5) keeps three quarters of its relevance, a pinned one all of it.
+    """
+    relevance = memory.get('relevance_score')
+    importance = 1.0 if memory.get('is_pinned') else memory.get('importance_score')
+    relevance = 1.0 if relevance is None else float(relevance)
+    importance = 0.5 if importance is None else float(importance)
+    return relevance * (0.5 + 0.5 * importance)
+
+
+class ContextPacker:
+    """Fits retrieved memories into a prompt's token budget.
+
+    Memories are deduplicated (by ID, and by text one already contains), ranked
+    by memory_priority, and added whole while they fit. The first that does not
+    fit is cut short if enough room remains; the rest are left out.
+    """
+
+    def __init__(self, max_tokens: int = 5000, model: Optional[str] = None,
+                 counter: Optional[TokenCounter] = None):
+        """Initialize the packer.
+
+        Args:
+            max_tokens: Budget for the whole prompt: system prompt, memories and message
+            model: Model whose tokenizer to count with
+            counter: TokenCounter to use instead of one for model
+        """
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter(model)
+
+    def message_tokens(self, messages: List[Dict]) -> int:
+        """Tokens a list of chat messages takes up in the prompt."""
+        return sum(self.counter.count(message['content']) + MESSAGE_OVERHEAD_TOKENS
+                   for message in messages) + REPLY_PRIMING_TOKENS
+
+    def dedupe(self, memories: List[Dict]) -> List[Dict]:
+        """Memories in priority order, without repeats.
+
+        A memory is a repeat if its ID was already seen, or its text is part
+        of (or equal to) a higher-priority memory's.
+        """
+        kept, kept_texts, seen_ids = [], [], set()
+        for memory in sorted(memories, key=memory_priority, reverse=True):
+            memory_id = memory.get('id')
+            if memory_id is not None:
+                if memory_id in seen_ids:
+                    continue
+                seen_ids.add(memory_id)
+            text = _normalized(memory.get('source_text') or memory.get('summary'))
+            if text and any(text in other for other in kept_texts):
+                continue
+            kept.append(memory)
+            kept_texts.append(text)
+        return kept
+
+    def pack_memories(self, memories: List[Dict], budget: int) -> Tuple[str, List[Dict]]:
+        """Format as many memories as fit in a number of tokens.
+
+        Args:
+            memories: Retrieved memories
+            budget: Tokens available for the formatted memories
+
+        Returns:
+            The formatted memories and the memories included, in the order formatted
+        """
+        parts, packed = [], []
+        separator = self.counter.count('\n\n')
+        remaining = budget
+        for memory in self.dedupe(memories):
+            shown = self._without_repeated_summary(memory)
+            cost = separator if parts else 0
+            text = format_memory_entry(len(parts) + 1, shown)
+            tokens = self.counter.count(text) + cost
+            if tokens <= remaining:
+                parts.append(text)
+                packed.append(memory)
+                remaining -= tokens
+                continue
+
+            truncated = self._truncate(len(parts) + 1, shown, remaining - cost)
+            if truncated is not None:
+                parts.append(truncated)
+                packed.append(memory)
+            break
+
+        if not parts:
+            return NO_MEMORIES, []
+        return '\n\n'.join(parts), packed
+
+    def pack(self, preamble: str, memories: List[Dict], user_message: str,
+             suffix: str = '') -> Tuple[str, List[Dict]]:
+        """Build a system prompt holding as many memories as the budget allows.
+
+        Args:
+            preamble: Text before the memories
+            memories: Retrieved memories
+            user_message: The user message sent alongside the system prompt
+            suffix: Text after the memories
+
+        Returns:
+            The system prompt and the memories it includes
+        """
+        fixed = self.message_tokens([
+            {'content': preamble + suffix},
+            {'content': user_message}
+        ])
+        memory_text, packed = self.pack_memories(memories, self.max_tokens - fixed)
+        if len(packed) < len(memories):
+            logger.debug(f"Packed {len(packed)} of {len(memories)} memories into {self.max_tokens} tokens")
+        return f"{preamble}{memory_text}{suffix}", packed
+
+    def _truncate(self, index: int, memory: Dict, tokens: int) -> Optional[str]:
+        """The memory, its content cut short to fit in tokens; None if too little would remain."""
+        content = memory.get('source_text')
+        if not content:
+            return None
+        overhead = self.counter.count(format_memory_entry(index, dict(memory, source_text=TRUNCATION_MARK)))
+        room = tokens - overhead
+        while room >= MIN_TRUNCATED_TOKENS:
+            cut = self.counter.truncate(content, room)
+            # End on a whole word where there is one
+            if len(cut) < len(content) and ' ' in cut.strip():
+                cut = cut.rstrip().rsplit(' ', 1)[0]
+            cut = cut.rstrip() + TRUNCATION_MARK
+            text = format_memory_entry(index, dict(memory, source_text=cut))
+            # Tokens can merge across the cut, so the sum of the parts is checked
+            excess = self.counter.count(text) - tokens
+            if excess <= 0:
+                return text
+            room -= excess
+        return None
+
+    @staticmethod
+    def _without_repeated_summary(memory: Dict) -> Dict:
+        """The memory without its summary when the summary is its content."""
+        if memory.get('summary') and _normalized(memory['summary']) == _normalized(memory.get('source_text')):
+            return dict(memory, summary=None)
+        return memory
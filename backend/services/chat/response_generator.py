@@ -0,0 +1,124 @@
+"""
+response_generator.py
+---------------------
+Reply generation for Soulstream.
+Turning a message and the memories it stirred into an answer, token by token.
+"""
+
+import os
+import logging
+from typing import Dict, Iterator, List, Optional
+from openai import OpenAI
+
+from backend.services.chat.context_packer import ContextPacker
+from backend.utils.helpers import load_system_prompt
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class ResponseGenerator:
+    """Generates companion replies, streamed as they are produced.
+    
+    The voice of the system. It speaks with the memories it was handed.
+    """
+    
+    def __init__(self, openai_client: Optional[OpenAI] = None,
+                 context_packer: Optional[ContextPacker] = None):
+        """Initialize the response generator.
+        
+        Args:
+            openai_client: Optional OpenAI client. If not provided, a new client will be created.
+            context_packer: Fits memories into the prompt's token budget. Defaults to
+                a 5000-token budget counted for the chat model.
+        """
+        self.client = openai_client or OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        
+        # Default configuration
+        self.config = {
+            'enabled': True,
+            'model': os.getenv('CHAT_MODEL', 'gpt-3.5-turbo'),
+            'temperature': 0.7,
+            'timeout': 30.0,  # seconds
+            'max_tokens': 500,
+            'fallback_on_error': True
+        }
+        self.context_packer = context_packer or ContextPacker(model=self.config['model'])
+        
+        logger.info("ResponseGenerator initialized. Ready to answer.")
+    
+    def update_config(self, new_config: Dict) -> None:
+        """Update the configuration with new values.
+        
+        Args:
+            new_config: Dictionary with new configuration values.
+        """
+        self.config.update(new_config)
+        logger.info("ResponseGenerator configuration updated")
+    
+    def build_messages(self, user_message: str, memories: List[Dict]) -> List[Dict]:
+        """Assemble the chat messages sent to the model.
+        
+        The system prompt, the memories in play, then the words just spoken.
+        As many memories as the token budget allows, the strongest first.
+        """
+        system_prompt, _ = self.context_packer.pack(
+            f"{load_system_prompt()}\n\nRelevant memories:\n", memories, user_message
+        )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def stream_reply(self, user_message: str, memories: List[Dict]) -> Iterator[str]:
+        """Generate a reply, yielding text fragments as they arrive.
+        
+        Words arriving one by one. Like raindrops.
+        
+        Args:
+            user_message: The message being answered
+            memories: Memories retrieved for this message
+            
+        Yields:
+            Fragments of the reply text
+        """
+        if not self.config['enabled']:
+            yield from self._fallback_reply(user_message)
+            return
+        
+        produced = False
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.config['model'],
+                messages=self.build_messages(user_message, memories),
+                temperature=self.config['temperature'],
+                max_tokens=self.config['max_tokens'],
+                timeout=self.config['timeout'],
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    produced = True
+                    yield content
+        except Exception as e:
+            logger.error(f"Error generating reply: {str(e)}")
+            # Once text has gone out, a fallback would only garble it
+            if produced or not self.config['fallback_on_error']:
+                raise
+            yield from self._fallback_reply(user_message)
+    
+    def generate_reply(self, user_message: str, memories: List[Dict]) -> str:
+        """Generate a complete reply.
+        
+        The same words as stream_reply, gathered before returning.
+        """
+        return ''.join(self.stream_reply(user_message, memories))
+    
+    def _fallback_reply(self, user_message: str) -> Iterator[str]:
+        """The placeholder reply, for when no model is available."""
+        reply = f"Echo: I've received your message: '{user_message}'. I remember you."
+        words = reply.split(' ')
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + ' '
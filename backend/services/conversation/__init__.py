@@ -0,0 +1,4 @@
+"""
+Conversation service package for Soulstream.
+The record of what was said, kept in the order it was said.
+"""
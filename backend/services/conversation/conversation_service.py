@@ -0,0 +1,205 @@
+"""
+conversation_service.py
+-----------------------
+Conversation service for Soulstream.
+The keeper of the chat log. Messages go in at the end and are read back a page at a time.
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import desc, func, update
+from sqlalchemy.orm import Session
+
+from backend.models.conversation import Conversation, ConversationMessage
+from backend.utils.metrics import timed
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Length of the last-message preview kept on the summary row
+LAST_MESSAGE_PREVIEW_LENGTH = 200
+
+class ConversationService:
+    """Conversation service for Soulstream.
+    
+    The archivist of our dialogues.
+    Appends are cheap, paging is by cursor, and summaries never need recounting.
+    """
+    
+    def __init__(self, db_session: Session):
+        """Initialize the conversation service.
+        
+        Args:
+            db_session: SQLAlchemy database session
+        """
+        self.db = db_session
+    
+    def create_conversation(self, user_id: Optional[int] = None, character_id: Optional[int] = None,
+                            title: Optional[str] = None) -> Optional[Conversation]:
+        """Start a new conversation.
+        
+        The first page of a new exchange.
+        
+        Args:
+            user_id: ID of the user
+            character_id: ID of the character being spoken to
+            title: Optional title; derived from the first message when omitted
+            
+        Returns:
+            The created Conversation if successful, None otherwise
+        """
+        try:
+            conversation = Conversation(
+                user_id=user_id,
+                character_id=character_id,
+                title=title[:100] if title else None,
+                message_count=0,
+                memory_count=0
+            )
+            self.db.add(conversation)
+            self.db.commit()
+            
+            logger.info(f"Conversation {conversation.id} created for user {user_id}")
+            return conversation
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error creating conversation: {str(e)}")
+            return None
+    
+    def get_conversation(self, conversation_id: int) -> Optional[Conversation]:
+        """Get a conversation summary by ID."""
+        try:
+            return self.db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        except Exception as e:
+            logger.error(f"Error retrieving conversation: {str(e)}")
+            return None
+    
+    @timed('sql.conversation.append_messages')
+    def append_messages(self, conversation_id: int, messages: List[Dict]) -> List[ConversationMessage]:
+        """Append messages and update the conversation summary in one transaction.
+        
+        Words added to the end of the record, never rewritten.
+        The summary row is adjusted with in-place increments, so concurrent
+        appends never lose a count.
+        
+        Args:
+            conversation_id: ID of the conversation
+            messages: Dicts with 'sender' and 'message', and optionally
+                'memory_id' and 'referenced_memory_ids'
+            
+        Returns:
+            The stored messages, or an empty list if the conversation does not exist or the write fails
+        """
+        if not messages:
+            return []
+        
+        try:
+            now = datetime.utcnow()
+            rows = [
+                ConversationMessage(
+                    conversation_id=conversation_id,
+                    sender=message['sender'],
+                    message=message['message'],
+                    memory_id=message.get('memory_id'),
+                    referenced_memory_ids=message.get('referenced_memory_ids'),
+                    created_at=now
+                )
+                for message in messages
+            ]
+            
+            last_message = messages[-1]['message']
+            result = self.db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    message_count=Conversation.message_count + len(messages),
+                    memory_count=Conversation.memory_count + sum(1 for m in messages if m.get('memory_id')),
+                    last_message=last_message[:LAST_MESSAGE_PREVIEW_LENGTH],
+                    last_message_at=now,
+                    updated_at=now,
+                    title=func.coalesce(Conversation.title, messages[0]['message'][:100])
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                self.db.rollback()
+                logger.warning(f"Conversation {conversation_id} not found for append")
+                return []
+            
+            self.db.add_all(rows)
+            self.db.commit()
+            
+            logger.info(f"Appended {len(rows)} messages to conversation {conversation_id}")
+            return rows
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error appending messages: {str(e)}")
+            return []
+    
+    @timed('sql.conversation.get_messages')
+    def get_messages(self, conversation_id: int, limit: int = 50,
+                     before_id: Optional[int] = None, after_id: Optional[int] = None,
+                     offset: int = 0) -> List[ConversationMessage]:
+        """Get a page of messages, oldest first within the page.
+        
+        Paging by cursor: before_id walks back through history, after_id
+        fetches anything newer. With neither, the most recent page is returned.
+        Each page is a single range scan on (conversation_id, id).
+        
+        Args:
+            conversation_id: ID of the conversation
+            limit: Maximum number of messages
+            before_id: Only messages older than this message ID
+            after_id: Only messages newer than this message ID
+            offset: Messages to skip from the newest end (legacy paging, used without a cursor)
+            
+        Returns:
+            Messages in chronological order
+        """
+        try:
+            query = self.db.query(ConversationMessage).filter(
+                ConversationMessage.conversation_id == conversation_id
+            )
+            
+            if after_id is not None:
+                return query.filter(ConversationMessage.id > after_id).order_by(
+                    ConversationMessage.id
+                ).limit(limit).all()
+            
+            if before_id is not None:
+                query = query.filter(ConversationMessage.id < before_id)
+                offset = 0
+            
+            page = query.order_by(desc(ConversationMessage.id)).limit(limit).offset(offset).all()
+            page.reverse()
+            return page
+        except Exception as e:
+            logger.error(f"Error retrieving messages: {str(e)}")
+            return []
+    
+    @timed('sql.conversation.list_conversations')
+    def list_conversations(self, user_id: int, limit: int = 20,
+                           offset: int = 0) -> Tuple[List[Conversation], int]:
+        """Get a user's conversations, most recently active first.
+        
+        Reads summary rows only. No message is touched.
+        
+        Args:
+            user_id: ID of the user
+            limit: Maximum number of conversations
+            offset: Offset for pagination
+            
+        Returns:
+            Tuple of (conversations, total number of conversations for the user)
+        """
+        try:
+            query = self.db.query(Conversation).filter(Conversation.user_id == user_id)
+            total = query.count()
+            conversations = query.order_by(
+                desc(Conversation.updated_at), desc(Conversation.id)
+            ).limit(limit).offset(offset).all()
+            return conversations, total
+        except Exception as e:
+            logger.error(f"Error listing conversations: {str(e)}")
+            return [], 0
@@ -0,0 +1,4 @@
+"""
+Background job services for Soulstream.
+The work that happens after the request has already been answered.
+"""
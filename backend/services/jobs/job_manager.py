@@ -0,0 +1,257 @@
+"""
+job_manager.py
+--------------
+Background job runner for Soulstream.
+Long work handed to a worker thread, with progress anyone can check on.
+The request returns at once. The remembering, or forgetting, carries on.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from backend.models.background_job import BackgroundJob
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A unit of background work and its progress.
+    
+    The work function receives its Job and reports progress through update().
+    """
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    
+    def __init__(self, name: str, params: Optional[Dict] = None):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.params = params or {}
+        self.status = Job.PENDING
+        self.total = None
+        self.processed = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        # Called after each progress report; set by the JobManager that runs the job
+        self._on_update = None
+    
+    def update(self, processed: Optional[int] = None, total: Optional[int] = None,
+               advance: int = 0) -> None:
+        """Report progress.
+        
+        Args:
+            processed: Absolute number of items processed so far
+            total: Total number of items, once known
+            advance: Number of items processed since the last update
+        """
+        with self._lock:
+            if total is not None:
+                self.total = total
+            if processed is not None:
+                self.processed = processed
+            self.processed += advance
+        if self._on_update:
+            self._on_update(self)
+    
+    @classmethod
+    def from_record(cls, record: BackgroundJob) -> 'Job':
+        """Rebuild a job from its stored status, as another process last saved it."""
+        job = cls(record.name, record.params)
+        job.id = record.id
+        job.status = record.status
+        job.total = record.total
+        job.processed = record.processed or 0
+        job.result = record.result
+        job.error = record.error
+        job.created_at = record.created_at
+        job.started_at = record.started_at
+        job.finished_at = record.finished_at
+        return job
+    
+    @property
+    def done(self) -> bool:
+        return self.status in (Job.SUCCEEDED, Job.FAILED)
+    
+    def to_dict(self) -> Dict:
+        """Format the job for API responses."""
+        with self._lock:
+            progress = None
+            if self.total:
+                progress = round(min(1.0, self.processed / self.total), 4)
+            elif self.status == Job.SUCCEEDED:
+                progress = 1.0
+            
+            return {
+                'id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'params': self.params,
+                'total': self.total,
+                'processed': self.processed,
+                'progress': progress,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
+class JobManager:
+    """Runs jobs on a small thread pool and keeps the most recent ones for status checks.
+    
+    With a session factory, each job's status is also saved to the database as it
+    is queued, makes progress and finishes, so any worker process can report on
+    it and it outlives a restart. Without one, job state lives in this process only.
+    A job whose process stops before it finishes is left as it was last saved.
+    """
+    
+    def __init__(self, max_workers: int = 2, max_jobs: int = 500,
+                 cleanup: Optional[Callable[[], None]] = None,
+                 session_factory: Optional[Callable[[], Any]] = None,
+                 save_interval: float = 1.0):
+        """Initialize the job manager.
+        
+        Args:
+            max_workers: Number of worker threads
+            max_jobs: Number of jobs kept in memory for status lookups
+            cleanup: Called in the worker thread after every job (e.g. scoped_session.remove)
+            session_factory: Makes a short-lived session for saving job status (e.g. a sessionmaker);
+                kept apart from the session the work itself uses, so saving never commits it
+            save_interval: Seconds between saves of a running job's progress
+        """
+        self.max_jobs = max_jobs
+        self.cleanup = cleanup
+        self.session_factory = session_factory
+        self.save_interval = save_interval
+        self._saved_at = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='soulstream-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, name: str, fn: Callable[..., Any], *args,
+               params: Optional[Dict] = None, **kwargs) -> Job:
+        """Queue a job.
+        
+        Args:
+            name: Short job name, e.g. 'memory.bulk_delete'
+            fn: Work function, called as fn(job, *args, **kwargs); its return value becomes the result
+            params: Parameters to echo back in status responses
+            
+        Returns:
+            The queued Job
+        """
+        job = Job(name, params)
+        job._on_update = self._progress
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._save(job)
+        
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"Job {job.id} ({name}) queued")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID, from this process or, failing that, as last saved by any process."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.session_factory is None:
+            return job
+        
+        session = self.session_factory()
+        try:
+            record = session.get(BackgroundJob, job_id)
+            return Job.from_record(record) if record else None
+        except Exception as e:
+            logger.error(f"Error loading job {job_id}: {str(e)}")
+            return None
+        finally:
+            session.close()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and optionally wait for running ones."""
+        self._executor.shutdown(wait=wait)
+    
+    def _run(self, job: Job, fn, args, kwargs) -> None:
+        job.status = Job.RUNNING
+        job.started_at = datetime.utcnow()
+        self._save(job)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = Job.SUCCEEDED
+            logger.info(f"Job {job.id} ({job.name}) finished")
+        except Exception as e:
+            job.error = str(e)
+            job.status = Job.FAILED
+            logger.error(f"Job {job.id} ({job.name}) failed: {str(e)}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._save(job)
+            self._saved_at.pop(job.id, None)
+            if self.cleanup:
+                try:
+                    self.cleanup()
+                except Exception as e:
+                    logger.error(f"Job cleanup failed: {str(e)}")
+    
+    def _progress(self, job: Job) -> None:
+        """Save a running job's progress, at most once per save interval."""
+        if time.monotonic() - self._saved_at.get(job.id, 0.0) >= self.save_interval:
+            self._save(job)
+    
+    def _save(self, job: Job) -> None:
+        """Write the job's current status to the database, if there is one.
+        
+        A failed save is logged and the job carries on; only its status checks suffer.
+        """
+        if self.session_factory is None:
+            return
+        self._saved_at[job.id] = time.monotonic()
+        
+        with job._lock:
+            record = BackgroundJob(
+                id=job.id,
+                name=job.name,
+                status=job.status,
+                params=job.params,
+                total=job.total,
+                processed=job.processed,
+                result=job.result,
+                error=job.error,
+                created_at=job.created_at,
+                started_at=job.started_at,
+                finished_at=job.finished_at
+            )
+        
+        session = self.session_factory()
+        try:
+            session.merge(record)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error saving job {job.id}: {str(e)}")
+        finally:
+            session.close()
+    
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished jobs once over capacity."""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
@@ -0,0 +1,4 @@
+"""
+Journal services for Soulstream.
+Where a day's memories are told back as a story.
+"""
@@ -0,0 +1,301 @@
+"""
+journal_service.py
+------------------
+Journal pipeline for Soulstream.
+A day's memories gathered, told as a story in the background, and kept.
+Nothing is rewritten until what the day held has changed.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import date
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, desc, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.models.journal_entry import JournalEntry
+from backend.models.timeline_entry import TimelineEntry
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.services.timeline.timeline_service import TimelineService
+from backend.utils.cache import LRUCache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Memory columns an entry is written from
+INPUT_COLUMNS = ['id', 'summary', 'source_text', 'emotion', 'topic', 'created_at']
+
+# States of a day's generated entry
+FRESH = 'fresh'      # Written from the day as it is now
+STALE = 'stale'      # Written before the day last changed; a rewrite is queued
+PENDING = 'pending'  # Not written yet; queued
+FAILED = 'failed'    # The last attempt failed; retried after a pause
+EMPTY = 'empty'      # The day has no timeline entry to write about
+
+class JournalService:
+    """Generates, persists and caches journal entries.
+
+    A generated entry is identified by (user, date, voice_style, input digest),
+    the digest covering the day's timeline entry and memories. Reads compute
+    the digest with one query and serve the stored entry if it matches; if it
+    does not, the current entry is served while a background job rewrites it.
+    Requests never wait on the model.
+
+    One instance is shared by the application. The database session must be a
+    scoped_session, so requests and job threads each use their own.
+    """
+
+    def __init__(self, db_session: Session, writer, job_manager=None,
+                 cache_size: int = 1024, retry_after: float = 60.0):
+        """Initialize the journal service.
+
+        Args:
+            db_session: Scoped SQLAlchemy session
+            writer: JournalWriter producing the prose
+            job_manager: JobManager to write entries on; without one, they are written inline
+            cache_size: Number of fresh entries kept in memory
+            retry_after: Seconds before a failed day is attempted again with the same inputs
+        """
+        self.db = db_session
+        self.writer = writer
+        self.job_manager = job_manager
+        self.entries = LRUCache(maxsize=cache_size)
+        self.failures = LRUCache(maxsize=cache_size, ttl=retry_after)
+        self._queued = {}
+        self._lock = threading.Lock()
+        logger.info("JournalService initialized. Ready to tell the days.")
+
+    def gather(self, user_id: int, day: date) -> Tuple[Optional[SimpleNamespace], List[Dict]]:
+        """Read what a day held, in one query.
+
+        Returns:
+            The day's timeline entry (None if it has none) and its memories as
+            dicts, oldest first. Both are plain values, safe to use after the
+            transaction ends.
+        """
+        entry, chips = TimelineService(self.db).get_day_detail(user_id, day, INPUT_COLUMNS)
+        if entry is None:
+            return None, []
+        day_entry = SimpleNamespace(
+            title=entry.title, entry_summary=entry.entry_summary, mood=entry.mood, emotion=entry.emotion
+        )
+        memories = [
+            {
+                'id': chip.id,
+                'summary': chip.summary,
+                'source_text': chip.source_text,
+                'emotion': chip.emotion,
+                'topic': chip.topic,
+                'timestamp': chip.created_at.isoformat() if chip.created_at else None
+            }
+            for chip in chips
+        ]
+        return day_entry, memories
+
+    @staticmethod
+    def input_digest(entry: SimpleNamespace, memories: List[Dict], voice_style: str) -> str:
+        """SHA-256 of everything an entry is written from."""
+        payload = json.dumps(
+            [voice_style, entry.title, entry.entry_summary, entry.mood, entry.emotion,
+             [[memory[name] for name in ('id', 'summary', 'source_text', 'emotion', 'topic')]
+              for memory in memories]],
+            separators=(',', ':'), default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_day_entry(self, user_id: int, day: date, voice_style: str) -> Dict:
+        """The generated entry for a day, queuing a rewrite if it is missing or stale.
+
+        Args:
+            user_id: ID of the user
+            day: The day
+            voice_style: The voice the entry is written in
+
+        Returns:
+            Dict with 'state' (FRESH, STALE, PENDING, FAILED or EMPTY), 'entry'
+            (the stored entry, or None), 'job' (the queued Job, if any) and
+            'error' (for FAILED)
+        """
+        day_entry, memories = self.gather(user_id, day)
+        if day_entry is None:
+            return {'state': EMPTY, 'entry': None, 'job': None}
+
+        key = (user_id, day, voice_style, self.input_digest(day_entry, memories, voice_style))
+        cached = self.entries.get(key)
+        if cached is not None:
+            return {'state': FRESH, 'entry': cached, 'job': None}
+
+        row = self._find_generated(user_id, day, voice_style)
+        entry = self._snapshot(row) if row else None
+        if row is not None and row.input_digest == key[3]:
+            self.entries.set(key, entry)
+            return {'state': FRESH, 'entry': entry, 'job': None}
+
+        error = self.failures.get(key)
+        if error is not None:
+            return {'state': FAILED, 'entry': entry, 'job': None, 'error': error}
+
+        job = self.request_generation(user_id, day, voice_style)
+        return {'state': STALE if entry else PENDING, 'entry': entry, 'job': job}
+
+    def request_generation(self, user_id: int, day: date, voice_style: str):
+        """Queue a day's entry to be written, unless it already is.
+
+        Returns:
+            The queued (or already queued) Job; None when written inline
+        """
+        if self.job_manager is None:
+            self.generate(None, user_id, day, voice_style)
+            return None
+
+        slot = (user_id, day, voice_style)
+        with self._lock:
+            job = self._queued.get(slot)
+            if job is not None and not job.done:
+                return job
+            job = self.job_manager.submit(
+                'journal.generate',
+                self.generate,
+                user_id, day, voice_style,
+                params={'user_id': user_id, 'date': day.isoformat(), 'voice_style': voice_style}
+            )
+            self._queued[slot] = job
+            return job
+
+    def generate(self, job, user_id: int, day: date, voice_style: str) -> Dict:
+        """Write and store a day's entry if its inputs changed. Job body.
+
+        The read transaction ends before the model is called, so no snapshot
+        or lock is held while it writes.
+
+        Returns:
+            Dict with the entry's ID (None for a day without an entry) and whether it was rewritten
+        """
+        key = None
+        try:
+            day_entry, memories = self.gather(user_id, day)
+            if day_entry is None:
+                return {'entry_id': None, 'written': False}
+            digest = self.input_digest(day_entry, memories, voice_style)
+            key = (user_id, day, voice_style, digest)
+
+            row = self._find_generated(user_id, day, voice_style)
+            if row is not None and row.input_digest == digest:
+                return {'entry_id': row.id, 'written': False}
+            row_id = row.id if row is not None else None
+            self.db.rollback()
+
+            written = self.writer.write(day, day_entry, memories, voice_style)
+
+            row = self.db.get(JournalEntry, row_id) if row_id is not None else None
+            if row is None:
+                row = JournalEntry(user_id=user_id, date=day, voice_style=voice_style, created_by_ai=True)
+                self.db.add(row)
+            row.title = written['title']
+            row.entry_body = written['entry_body']
+            row.emotion = written['emotion']
+            row.input_digest = digest
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # Another worker wrote the same inputs first
+                self.db.rollback()
+                row = self.db.execute(select(JournalEntry).where(
+                    JournalEntry.user_id == user_id, JournalEntry.date == day,
+                    JournalEntry.voice_style == voice_style, JournalEntry.input_digest == digest
+                )).scalar_one()
+
+            self.entries.set(key, self._snapshot(row))
+            logger.info(f"Wrote {voice_style} journal entry for user {user_id} on {day}")
+            return {'entry_id': row.id, 'written': True}
+        except Exception as e:
+            self.db.rollback()
+            if key is not None:
+                self.failures.set(key, str(e))
+            logger.error(f"Error writing journal entry for user {user_id} on {day}: {str(e)}")
+            raise
+
+    def list_entries(self, user_id: int, start_date: Optional[date] = None,
+                     end_date: Optional[date] = None, voice_style: Optional[str] = None,
+                     limit: int = 10, offset: int = 0) -> Tuple[List[JournalEntry], int]:
+        """Stored entries, most recent day first. Never writes anything.
+
+        Returns:
+            The page of entries and the total number matching
+        """
+        conditions = [JournalEntry.user_id == user_id]
+        if start_date:
+            conditions.append(JournalEntry.date >= start_date)
+        if end_date:
+            conditions.append(JournalEntry.date <= end_date)
+        if voice_style:
+            conditions.append(JournalEntry.voice_style == voice_style)
+
+        total = self.db.execute(select(func.count()).select_from(JournalEntry).where(*conditions)).scalar()
+        entries = self.db.execute(
+            select(JournalEntry).where(*conditions)
+            .order_by(desc(JournalEntry.date), desc(JournalEntry.id))
+            .limit(limit).offset(offset)
+        ).scalars().all()
+        return entries, total
+
+    def get_entry(self, entry_id: int) -> Optional[JournalEntry]:
+        """Get a stored entry by ID."""
+        return self.db.get(JournalEntry, entry_id)
+
+    def related_memory_ids(self, entry: JournalEntry) -> List[int]:
+        """IDs of the memories on the entry's day, in one query."""
+        return list(self.db.execute(
+            select(timeline_memory_links.c.memory_id)
+            .join(TimelineEntry, TimelineEntry.id == timeline_memory_links.c.timeline_id)
+            .where(and_(TimelineEntry.user_id == entry.user_id, TimelineEntry.date == entry.date))
+            .order_by(timeline_memory_links.c.memory_id)
+        ).scalars())
+
+    def create_entry(self, user_id: int, day: date, entry_body: str, title: Optional[str] = None,
+                     voice_style: str = 'poetic', emotion: Optional[str] = None) -> JournalEntry:
+        """Store an entry written by hand."""
+        entry = JournalEntry(user_id=user_id, date=day, title=title, entry_body=entry_body,
+                             voice_style=voice_style, emotion=emotion, created_by_ai=False)
+        self.db.add(entry)
+        self.db.commit()
+        return entry
+
+    def update_entry(self, entry_id: int, **fields) -> Optional[JournalEntry]:
+        """Edit an entry's title or body.
+
+        An edited entry belongs to its author: it is no longer marked as
+        generated, and a later rewrite of the day creates a new entry instead
+        of overwriting it.
+        """
+        entry = self.db.get(JournalEntry, entry_id)
+        if entry is None:
+            return None
+        if entry.input_digest is not None:
+            self.entries.invalidate((entry.user_id, entry.date, entry.voice_style, entry.input_digest))
+        for name in ('title', 'entry_body'):
+            if fields.get(name) is not None:
+                setattr(entry, name, fields[name])
+        entry.created_by_ai = False
+        entry.input_digest = None
+        self.db.commit()
+        return entry
+
+    def _find_generated(self, user_id: int, day: date, voice_style: str) -> Optional[JournalEntry]:
+        """The most recently written generated entry for a day and voice."""
+        return self.db.execute(
+            select(JournalEntry).where(
+                JournalEntry.user_id == user_id, JournalEntry.date == day,
+                JournalEntry.voice_style == voice_style, JournalEntry.input_digest.isnot(None)
+            ).order_by(desc(JournalEntry.updated_at), desc(JournalEntry.id)).limit(1)
+        ).scalar()
+
+    @staticmethod
+    def _snapshot(entry: JournalEntry) -> SimpleNamespace:
+        """A detached copy of an entry's columns, safe to share between threads."""
+        return SimpleNamespace(**{column.key: getattr(entry, column.key) for column in JournalEntry.__table__.columns})
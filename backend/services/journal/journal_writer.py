@@ -0,0 +1,136 @@
+"""
+journal_writer.py
+-----------------
+Journal prose generation for Soulstream.
+A day's entry and memories in, a page of narrative out.
+"""
+
+import os
+import logging
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional
+
+from openai import OpenAI
+
+from backend.services.chat.context_packer import ContextPacker
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class JournalWriter:
+    """Writes a day's journal entry in a given voice.
+    
+    Called from background jobs, never from a request: a model call can take
+    many seconds. When disabled, entries are composed from the day's own words.
+    """
+    
+    def __init__(self, openai_client: Optional[OpenAI] = None,
+                 context_packer: Optional[ContextPacker] = None):
+        """Initialize the journal writer.
+        
+        Args:
+            openai_client: Optional OpenAI client. If not provided, a new client will be created.
+            context_packer: Fits the day's memories into the prompt's token budget
+        """
+        self.client = openai_client or OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        
+        # Default configuration
+        self.config = {
+            'enabled': True,
+            'model': os.getenv('JOURNAL_MODEL', os.getenv('CHAT_MODEL', 'gpt-3.5-turbo')),
+            'temperature': 0.8,
+            'timeout': 60.0,  # seconds
+            'max_tokens': 700
+        }
+        self.context_packer = context_packer or ContextPacker(model=self.config['model'])
+        
+        logger.info("JournalWriter initialized. Ready to tell the day.")
+    
+    def update_config(self, new_config: Dict) -> None:
+        """Update the configuration with new values.
+        
+        Args:
+            new_config: Dictionary with new configuration values.
+        """
+        self.config.update(new_config)
+        logger.info("JournalWriter configuration updated")
+    
+    def build_messages(self, day: date, entry, memories: List[Dict], voice_style: str) -> List[Dict]:
+        """Assemble the chat messages sent to the model.
+        
+        The voice to write in, then what the day held: as many of its
+        memories as the token budget allows.
+        """
+        system_prompt = (
+            f"You write private journal entries about a user's day, in a {voice_style} voice. "
+            "Write in the second person, addressing the user. "
+            "Reply with a short title on the first line, then the entry itself."
+        )
+        day_text = (
+            f"Date: {day.strftime('%A, %B %d, %Y')}\n"
+            f"Day summary: {entry.entry_summary}\n"
+            f"Mood: {entry.mood or entry.emotion or 'unknown'}\n\n"
+            f"Memories:\n"
+        )
+        packer = self.context_packer
+        budget = packer.max_tokens - packer.message_tokens([{'content': system_prompt}, {'content': day_text}])
+        memory_text, _ = packer.pack_memories(memories, budget)
+        day_text += memory_text
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": day_text}
+        ]
+    
+    def write(self, day: date, entry, memories: List[Dict], voice_style: str) -> Dict:
+        """Write the entry for a day.
+        
+        Args:
+            day: The day written about
+            entry: The day's timeline entry
+            memories: The day's memories, as dicts with summary, source_text and emotion
+            voice_style: The voice to write in, e.g. 'poetic'
+            
+        Returns:
+            Dict with title, entry_body and emotion
+            
+        Raises:
+            Exception: If the model call fails; nothing is written in that case
+        """
+        emotion = self.dominant_emotion(entry, memories)
+        if not self.config['enabled']:
+            return dict(self.compose(day, entry, memories), emotion=emotion)
+        
+        completion = self.client.chat.completions.create(
+            model=self.config['model'],
+            messages=self.build_messages(day, entry, memories, voice_style),
+            temperature=self.config['temperature'],
+            max_tokens=self.config['max_tokens'],
+            timeout=self.config['timeout']
+        )
+        text = (completion.choices[0].message.content or '').strip()
+        title, _, body = text.partition('\n')
+        if not body.strip():
+            title, body = entry.title, text
+        return {
+            'title': title.strip().strip('#*" ')[:100] or entry.title,
+            'entry_body': body.strip(),
+            'emotion': emotion
+        }
+    
+    @staticmethod
+    def compose(day: date, entry, memories: List[Dict]) -> Dict:
+        """Compose an entry from the day's own words, without a model."""
+        lines = [entry.entry_summary] + [memory['summary'] for memory in memories if memory.get('summary')]
+        return {
+            'title': entry.title or day.strftime('%B %d, %Y'),
+            'entry_body': '\n\n'.join(dict.fromkeys(line for line in lines if line))
+        }
+    
+    @staticmethod
+    def dominant_emotion(entry, memories: List[Dict]) -> Optional[str]:
+        """The day's emotion, or else the most common among its memories."""
+        if entry.emotion:
+            return entry.emotion
+        counts = Counter(memory['emotion'] for memory in memories if memory.get('emotion'))
+        return counts.most_common(1)[0][0] if counts else None
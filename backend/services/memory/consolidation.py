@@ -0,0 +1,331 @@
+"""
+consolidation.py
+----------------
+Memory consolidation for Soulstream.
+Old, quiet memories of the same stretch of time, folded into one.
+The details are kept in the database. The vector store keeps only the summary.
+"""
+
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import aliased, selectinload
+
+from backend.models.memory_chip import MemoryChip
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.services.timeline.changes import TIMELINE, mark_changed
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Tag added to every summary memory produced by consolidation
+CONSOLIDATED_TAG = 'consolidated'
+
+# A summary's source text is embedded and stored as vector metadata, so it is kept
+# well under the embedding model's input limit and Pinecone's 40 KB of metadata
+SUMMARY_EXCERPT_CHARS = 300
+SUMMARY_SOURCE_MAX_CHARS = 8000
+
+def _clip(text: str, limit: int) -> str:
+    """Text cut to at most limit characters, marked when cut."""
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + '...'
+
+def summarize_cluster(chips: List[MemoryChip]) -> Tuple[str, str]:
+    """Build the summary and source text for a cluster of memories.
+
+    Extractive and deterministic: the span of time, then what each memory was about.
+    The source text holds each memory's summary and the start of its text, no more
+    than SUMMARY_SOURCE_MAX_CHARS in all; the full texts stay on the source rows.
+
+    Args:
+        chips: The memories in the cluster, oldest first
+
+    Returns:
+        Tuple of (summary, source_text)
+    """
+    start, end = chips[0].created_at, chips[-1].created_at
+    if start.date() == end.date():
+        span = start.strftime('%b %d, %Y')
+    else:
+        span = f"{start.strftime('%b %d')} - {end.strftime('%b %d, %Y')}"
+
+    highlights = '; '.join(dict.fromkeys(chip.summary for chip in chips if chip.summary))
+    summary = f"{len(chips)} memories, {span}: {highlights}"
+    if len(summary) > 500:
+        summary = summary[:497] + '...'
+
+    lines = []
+    for chip in chips:
+        excerpt = _clip(' '.join((chip.source_text or '').split()), SUMMARY_EXCERPT_CHARS)
+        line = f"[{chip.created_at.isoformat(timespec='minutes')}] "
+        line += f"{chip.summary}: {excerpt}" if chip.summary and chip.summary not in excerpt else excerpt
+        lines.append(line)
+    source_text = _clip('\n'.join(lines), SUMMARY_SOURCE_MAX_CHARS)
+    return summary, source_text
+
+
+class MemoryConsolidator:
+    """Clusters old, unpinned, low-importance memories and replaces each cluster with a summary.
+
+    Memories are grouped by user, character and time window, then clustered
+    by vector similarity within each window. Each cluster of at least
+    min_cluster_size becomes one summary memory. The sources keep their rows,
+    point at the summary through consolidated_into_id, and are removed from
+    the vector store. Pinned memories are never candidates.
+    """
+
+    def __init__(self, memory_service, older_than_days: int = 30, max_importance: float = 0.3,
+                 window_days: int = 7, similarity_threshold: float = 0.8,
+                 min_cluster_size: int = 3, max_cluster_size: int = 20, page_size: int = 1000,
+                 summarizer: Optional[Callable[[List[MemoryChip]], Tuple[str, str]]] = None):
+        """Initialize the consolidator.
+
+        Args:
+            memory_service: MemoryService with a database session; its vector store and
+                outbox are used to read vectors and sync the changes
+            older_than_days: Only memories created at least this long ago are candidates
+            max_importance: Only memories with an importance score at or below this are candidates
+            window_days: Width of the time windows memories are grouped into
+            similarity_threshold: Minimum cosine similarity to a cluster's centroid to join it
+            min_cluster_size: Smallest cluster worth replacing with a summary
+            max_cluster_size: Largest cluster folded into a single summary
+            page_size: Most candidates loaded, and vectors fetched, at a time
+            summarizer: Builds (summary, source_text) for a cluster; summarize_cluster by default
+        """
+        self.memory_service = memory_service
+        self.db = memory_service.db
+        self.vector_store = memory_service.vector_store
+        self.outbox = memory_service.outbox
+        self.older_than_days = older_than_days
+        self.max_importance = max_importance
+        self.window_days = window_days
+        self.similarity_threshold = similarity_threshold
+        self.min_cluster_size = min_cluster_size
+        self.max_cluster_size = max_cluster_size
+        self.page_size = page_size
+        self.summarizer = summarizer or summarize_cluster
+
+    def run(self, user_id: Optional[int] = None, job=None, now: Optional[datetime] = None) -> Dict:
+        """Consolidate every eligible cluster, one transaction per cluster.
+
+        Candidates are read one user and one time window at a time, in pages of
+        at most page_size, and vectors are fetched a page at a time.
+
+        Args:
+            user_id: Optional user to limit consolidation to
+            job: Optional Job to report progress to
+            now: Reference time for the age cutoff (defaults to the current time)
+
+        Returns:
+            Summary of candidates seen, clusters replaced and memories consolidated
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.older_than_days)
+        if job:
+            job.update(total=self._candidates(user_id, cutoff).count())
+
+        candidates = 0
+        summary_ids = []
+        consolidated = 0
+        for page in self._pages(user_id, cutoff):
+            candidates += len(page)
+            vectors = self.vector_store.get_vectors([chip.embedding_id for chip in page])
+            page.sort(key=lambda chip: (chip.character_id is not None, chip.character_id or 0,
+                                        chip.created_at, chip.id))
+            for cluster in self._cluster([chip for chip in page if chip.embedding_id in vectors], vectors):
+                summary_id = self._consolidate(cluster)
+                if summary_id:
+                    summary_ids.append(summary_id)
+                    consolidated += len(cluster)
+            if job:
+                job.update(advance=len(page))
+
+        logger.info(f"Consolidated {consolidated} of {candidates} candidate memories "
+                    f"into {len(summary_ids)} summaries")
+        return {
+            'candidates': candidates,
+            'clusters': len(summary_ids),
+            'consolidated': consolidated,
+            'summary_ids': summary_ids
+        }
+
+    def _candidates(self, user_id: Optional[int], cutoff: datetime):
+        """Query for old, unpinned, low-importance memories that are not summaries themselves."""
+        source = aliased(MemoryChip)
+        is_summary = select(source.id).where(source.consolidated_into_id == MemoryChip.id).exists()
+
+        query = self.db.query(MemoryChip).filter(
+            MemoryChip.is_pinned.isnot(True),
+            MemoryChip.importance_score <= self.max_importance,
+            MemoryChip.created_at < cutoff,
+            MemoryChip.consolidated_into_id.is_(None),
+            MemoryChip.embedding_id.isnot(None),
+            ~is_summary
+        )
+        if user_id is not None:
+            query = query.filter(MemoryChip.user_id == user_id)
+        return query
+
+    def _pages(self, user_id: Optional[int], cutoff: datetime) -> Iterator[List[MemoryChip]]:
+        """Candidates in pages that never cross a user or a time window, oldest first.
+
+        Empty windows are skipped with one query each for the next candidate.
+        A window with more than page_size candidates is clustered a page at a time.
+        """
+        candidates = self._candidates(user_id, cutoff)
+        owners = [row[0] for row in candidates.with_entities(MemoryChip.user_id).distinct()]
+        for owner in sorted(owners, key=lambda owner: (owner is not None, owner or 0)):
+            owned = candidates.filter(MemoryChip.user_id == owner if owner is not None
+                                      else MemoryChip.user_id.is_(None))
+            start = owned.with_entities(func.min(MemoryChip.created_at)).scalar()
+            while start is not None:
+                window = start.toordinal() // self.window_days
+                window_end = datetime.fromordinal((window + 1) * self.window_days)
+                in_window = owned.filter(MemoryChip.created_at >= start, MemoryChip.created_at < window_end)
+
+                after = None
+                while True:
+                    page_query = in_window
+                    if after is not None:
+                        page_query = page_query.filter(or_(
+                            MemoryChip.created_at > after[0],
+                            and_(MemoryChip.created_at == after[0], MemoryChip.id > after[1])
+                        ))
+                    page = page_query.options(selectinload(MemoryChip.memory_tags)).order_by(
+                        MemoryChip.created_at, MemoryChip.id
+                    ).limit(self.page_size).all()
+                    if not page:
+                        break
+                    after = (page[-1].created_at, page[-1].id)
+                    yield page
+                    if len(page) < self.page_size:
+                        break
+
+                start = owned.filter(MemoryChip.created_at >= window_end).with_entities(
+                    func.min(MemoryChip.created_at)).scalar()
+
+    def _cluster(self, chips: List[MemoryChip], vectors: Dict[str, List[float]]) -> List[List[MemoryChip]]:
+        """Group chips by owner and time window, then greedily by similarity to cluster centroids."""
+        def window(chip):
+            return (chip.user_id, chip.character_id,
+                    chip.created_at.toordinal() // self.window_days)
+
+        clusters = []
+        for _, group in groupby(chips, key=window):
+            group_clusters = []  # [members, sum of unit vectors]
+            for chip in group:
+                vector = np.asarray(vectors[chip.embedding_id], dtype=float)
+                norm = np.linalg.norm(vector)
+                if norm == 0:
+                    continue
+                vector = vector / norm
+
+                best, best_similarity = None, self.similarity_threshold
+                for candidate in group_clusters:
+                    members, total = candidate
+                    if len(members) >= self.max_cluster_size:
+                        continue
+                    similarity = float(total @ vector / np.linalg.norm(total))
+                    if similarity >= best_similarity:
+                        best, best_similarity = candidate, similarity
+
+                if best is None:
+                    group_clusters.append([[chip], vector.copy()])
+                else:
+                    best[0].append(chip)
+                    best[1] += vector
+
+            clusters.extend(members for members, _ in group_clusters
+                            if len(members) >= self.min_cluster_size)
+        return clusters
+
+    def _consolidate(self, chips: List[MemoryChip]) -> Optional[str]:
+        """Replace one cluster with a summary memory in a single transaction, then sync."""
+        try:
+            summary, source_text = self.summarizer(chips)
+            first = chips[0]
+            embedding_id = str(uuid.uuid4())
+            emotion = self._most_common(chip.emotion for chip in chips)
+            topic = self._most_common(chip.topic for chip in chips)
+            importance_score = max(chip.importance_score or 0.0 for chip in chips)
+            created_at = chips[-1].created_at
+
+            tag_names = list(dict.fromkeys(
+                [name for chip in chips for name in chip.tags] + [CONSOLIDATED_TAG]
+            ))
+
+            summary_chip = MemoryChip(
+                user_id=first.user_id,
+                character_id=first.character_id,
+                summary=summary,
+                source_text=source_text,
+                embedding_id=embedding_id,
+                emotion=emotion,
+                topic=topic,
+                importance_score=importance_score,
+                is_pinned=False,
+                created_at=created_at
+            )
+            summary_chip.memory_tags = self.memory_service._get_or_create_tags(first.user_id, tag_names)
+            self.db.add(summary_chip)
+            self.db.flush()
+
+            source_ids = [chip.id for chip in chips]
+            self.db.execute(
+                update(MemoryChip)
+                .where(MemoryChip.id.in_(source_ids))
+                .values(consolidated_into_id=summary_chip.id)
+                .execution_options(synchronize_session=False)
+            )
+
+            # The summary appears on every day its sources did
+            timeline_ids = self.db.execute(
+                select(timeline_memory_links.c.timeline_id).where(
+                    timeline_memory_links.c.memory_id.in_(source_ids)
+                ).distinct()
+            ).scalars().all()
+            if timeline_ids:
+                mark_changed(self.db, [first.user_id], tables=(TIMELINE,))
+                self.db.execute(insert(timeline_memory_links), [
+                    {'timeline_id': timeline_id, 'memory_id': summary_chip.id}
+                    for timeline_id in timeline_ids
+                ])
+
+            metadata = {
+                'timestamp': created_at.isoformat(),
+                'emotion': emotion,
+                'topic': topic,
+                'importance_score': importance_score,
+                'is_pinned': False,
+                'tags': tag_names,
+                'summary': summary,
+                'consolidated_count': len(chips)
+            }
+            if first.user_id is not None:
+                metadata['user_id'] = first.user_id
+            if first.character_id is not None:
+                metadata['character_id'] = first.character_id
+
+            # The sources leave the vector store only once their summary is in it
+            upsert = self.outbox.enqueue_upsert(embedding_id, source_text, metadata)
+            self.outbox.enqueue_deletes([chip.embedding_id for chip in chips], after=upsert)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error consolidating memories: {str(e)}")
+            return None
+
+        if self.outbox.process_pending(limit=None, embedding_ids=[embedding_id]):
+            self.outbox.process_pending(limit=None, embedding_ids=[chip.embedding_id for chip in chips])
+        logger.info(f"Consolidated {len(chips)} memories into {embedding_id}")
+        return embedding_id
+
+    @staticmethod
+    def _most_common(values) -> Optional[str]:
+        counts = Counter(value for value in values if value)
+        return counts.most_common(1)[0][0] if counts else None
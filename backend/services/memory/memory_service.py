@@ -8,16 +8,52 @@ Each function a ritual of preservation or recall.
 
 import os
 import uuid
-from typing import List, Dict, Optional, Union, Tuple
-from datetime import datetime
+from typing import Iterable, List, Dict, Optional, Union, Tuple
+from datetime import datetime, timedelta, timezone
 import logging
 
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session, aliased, load_only, selectinload
+
+from backend.models.memory_chip import MemoryChip
+from backend.models.memory_tag import MemoryTag, memory_tag_association
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.services.memory.consolidation import MemoryConsolidator
+from backend.services.memory.outbox import MemoryOutbox
+from backend.services.memory.working_memory import WorkingMemoryCache
+from backend.services.timeline.changes import mark_changed
+from backend.services.timeline.rollup import TimelineRollup
 from backend.services.vector_store.pinecone_manager import PineconeManager
 from backend.services.vector_store.query_preprocessor import QueryPreprocessor
+from backend.utils.metrics import count_candidates, record_error, timed
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Fields of a formatted memory, in output order, with how each is read from a chip
+CHIP_OUTPUT_FIELDS = {
+    'id': lambda chip, tags: chip.embedding_id or str(chip.id),
+    'source_text': lambda chip, tags: chip.source_text,
+    'summary': lambda chip, tags: chip.summary,
+    'emotion': lambda chip, tags: chip.emotion,
+    'topic': lambda chip, tags: chip.topic,
+    'timestamp': lambda chip, tags: chip.created_at.isoformat() if chip.created_at else None,
+    'importance_score': lambda chip, tags: chip.importance_score if chip.importance_score is not None else 0.5,
+    'is_pinned': lambda chip, tags: bool(chip.is_pinned),
+    'tags': lambda chip, tags: tags if tags is not None else chip.tags,
+    'relevance_score': lambda chip, tags: 1.0,
+    'user_id': lambda chip, tags: chip.user_id,
+    'character_id': lambda chip, tags: chip.character_id
+}
+
+# Chip columns behind each output field, where they differ from its name
+CHIP_OUTPUT_COLUMNS = {
+    'id': ('embedding_id', 'id'),
+    'timestamp': ('created_at',),
+    'tags': (),
+    'relevance_score': ()
+}
+
 class MemoryService:
     """Core memory management service for Soulstream.
     
@@ -26,7 +62,9 @@ class MemoryService:
     """
     
     def __init__(self, vector_store: Optional[PineconeManager] = None, 
-                query_preprocessor: Optional[QueryPreprocessor] = None):
+                query_preprocessor: Optional[QueryPreprocessor] = None,
+                db_session: Optional[Session] = None,
+                working_memory: Optional[WorkingMemoryCache] = None):
         """Initialize the memory service.
         
         Creating the infrastructure of remembrance.
@@ -35,12 +73,21 @@ class MemoryService:
         Args:
             vector_store: Optional PineconeManager instance. If not provided, a new one will be created.
             query_preprocessor: Optional QueryPreprocessor instance. If not provided, a new one will be created.
+            db_session: Optional SQLAlchemy session. When provided, the memory_chips table is the
+                system of record and the vector store is kept in sync through the outbox.
+            working_memory: Optional per-conversation working memory. If not provided, one with
+                default settings is created.
         """
         self.vector_store = vector_store or PineconeManager()
         self.query_preprocessor = query_preprocessor or QueryPreprocessor()
+        self.db = db_session
+        self.outbox = MemoryOutbox(db_session, self.vector_store) if db_session is not None else None
+        self.timeline_rollup = TimelineRollup(db_session) if db_session is not None else None
+        self.working_memory = working_memory or WorkingMemoryCache()
         
         logger.info("MemoryService initialized. Ready to preserve and recall.")
     
+    @timed('memory.store')
     def store_memory(self, source_text: str, summary: Optional[str] = None, 
                     emotion: Optional[str] = None, topic: Optional[str] = None,
                     importance_score: float = 0.5, is_pinned: bool = False,
@@ -94,6 +141,11 @@ class MemoryService:
             elif summary:
                 metadata['summary'] = summary
                 
+            # With a database, the SQL row is the system of record
+            if self.db is not None:
+                return self._store_memory_record(memory_id, source_text, summary, metadata,
+                                                 user_id, character_id, tags or [])
+            
             # Store in vector database
             success = self.vector_store.upsert_memory_chip(
                 memory_id=memory_id,
@@ -109,9 +161,159 @@ class MemoryService:
                 return None
                 
         except Exception as e:
+            record_error('memory.store')
             logger.error(f"Error storing memory: {str(e)}")
             return None
     
+    def _store_memory_record(self, memory_id: str, source_text: str, summary: Optional[str],
+                             metadata: Dict, user_id: Optional[int], character_id: Optional[int],
+                             tags: List[str]) -> Optional[str]:
+        """Write a memory chip and its outbox event in one transaction, then sync.
+        
+        The memory is kept the moment the transaction commits.
+        The vector store catches up now, or on a later drain if it is unreachable.
+        """
+        try:
+            chip = MemoryChip(
+                user_id=user_id,
+                character_id=character_id,
+                summary=summary or '',
+                source_text=source_text,
+                embedding_id=memory_id,
+                emotion=metadata.get('emotion'),
+                topic=metadata.get('topic'),
+                importance_score=metadata.get('importance_score', 0.5),
+                is_pinned=metadata.get('is_pinned', False),
+                created_at=datetime.fromisoformat(metadata['timestamp'])
+            )
+            chip.memory_tags = self._get_or_create_tags(user_id, tags)
+            self.db.add(chip)
+            self.db.flush()
+            
+            # Keep the day's timeline current in the same transaction
+            self.timeline_rollup.record_memory(chip)
+            self.outbox.enqueue_upsert(memory_id, source_text, metadata)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            record_error('memory.store')
+            logger.error(f"Error storing memory record: {str(e)}")
+            return None
+        
+        logger.info(f"Memory {memory_id} stored successfully")
+        
+        # Write-through: deliver this memory's event now; the rest of the backlog is the relay's
+        with timed('memory.vector_sync'):
+            self.outbox.process_pending(embedding_ids=[memory_id])
+        return memory_id
+    
+    def pin_memory(self, memory_id: str) -> bool:
+        """Pin an existing memory, protecting it from automatic pruning.
+        
+        The memory is marked where it is kept, and its vector rewritten under the same ID.
+        
+        Args:
+            memory_id: The unique identifier of the memory
+            
+        Returns:
+            True if the memory is now pinned, False otherwise
+        """
+        try:
+            chip = self._find_memory_chip(memory_id) if self.db is not None else None
+            if chip is not None:
+                chip.is_pinned = True
+                # A consolidated memory's vector is gone, and stays gone
+                if chip.embedding_id and chip.consolidated_into_id is None:
+                    self.outbox.enqueue_upsert(chip.embedding_id, chip.source_text, self._chip_metadata(chip))
+                self.db.commit()
+                embedding_id = chip.embedding_id
+            else:
+                # A memory that only ever lived in the vector store
+                memory = self.vector_store.get_memory(memory_id)
+                if not memory:
+                    return False
+                metadata = dict(memory.get('metadata') or {}, is_pinned=True)
+                metadata.pop('source_text', None)
+                metadata.pop('key_terms', None)
+                if self.db is None:
+                    return bool(self.vector_store.upsert_memory_chip(
+                        memory_id=memory_id, source_text=memory.get('source_text', ''), metadata=metadata))
+                self.outbox.enqueue_upsert(memory_id, memory.get('source_text', ''), metadata)
+                self.db.commit()
+                embedding_id = memory_id
+        except Exception as e:
+            if self.db is not None:
+                self.db.rollback()
+            logger.error(f"Error pinning memory: {str(e)}")
+            return False
+        
+        self.working_memory.discard([memory_id, embedding_id])
+        logger.info(f"Memory {memory_id} pinned")
+        if embedding_id:
+            self.outbox.process_pending(embedding_ids=[embedding_id])
+        return True
+    
+    @staticmethod
+    def _chip_metadata(chip: MemoryChip) -> Dict:
+        """Vector metadata for a stored chip, as store_memory writes it."""
+        metadata = {
+            'timestamp': chip.created_at.isoformat() if chip.created_at else datetime.utcnow().isoformat(),
+            'emotion': chip.emotion,
+            'topic': chip.topic,
+            'importance_score': chip.importance_score if chip.importance_score is not None else 0.5,
+            'is_pinned': bool(chip.is_pinned),
+            'tags': chip.tags,
+            'summary': chip.summary
+        }
+        if chip.user_id is not None:
+            metadata['user_id'] = chip.user_id
+        if chip.character_id is not None:
+            metadata['character_id'] = chip.character_id
+        return metadata
+    
+    def _get_or_create_tags(self, user_id: Optional[int], names: List[str]) -> List[MemoryTag]:
+        """Resolve tag names to MemoryTag rows for a user, creating any that are missing."""
+        names = list(dict.fromkeys(name for name in names if name))
+        if not names:
+            return []
+        
+        existing = {
+            tag.name: tag for tag in self.db.query(MemoryTag).filter(
+                MemoryTag.user_id == user_id,
+                MemoryTag.name.in_(names)
+            )
+        }
+        tags = []
+        for name in names:
+            tag = existing.get(name)
+            if tag is None:
+                tag = MemoryTag(name=name, user_id=user_id)
+                self.db.add(tag)
+            tags.append(tag)
+        return tags
+    
+    def _find_memory_chips(self, memory_ids: List[str]) -> List[MemoryChip]:
+        """Find memory chips by embedding ID or row ID, with their tags, in two queries."""
+        row_ids = [int(memory_id) for memory_id in memory_ids if memory_id.isdigit()]
+        embedding_ids = [memory_id for memory_id in memory_ids if not memory_id.isdigit()]
+        
+        conditions = []
+        if embedding_ids:
+            conditions.append(MemoryChip.embedding_id.in_(embedding_ids))
+        if row_ids:
+            conditions.append(MemoryChip.id.in_(row_ids))
+        
+        return self.db.query(MemoryChip).options(
+            selectinload(MemoryChip.memory_tags)
+        ).filter(or_(*conditions)).all()
+    
+    def _find_memory_chip(self, memory_id: str) -> Optional[MemoryChip]:
+        """Find a memory chip by embedding ID, or by row ID for numeric IDs."""
+        query = self.db.query(MemoryChip)
+        if str(memory_id).isdigit():
+            return query.filter(MemoryChip.id == int(memory_id)).first()
+        return query.filter(MemoryChip.embedding_id == memory_id).first()
+    
     def retrieve_memory(self, memory_id: str) -> Optional[Dict]:
         """Retrieve a specific memory by ID.
         
@@ -125,6 +327,13 @@ class MemoryService:
             Memory data if found, None otherwise
         """
         try:
+            # Served locally when the database holds the memory
+            if self.db is not None:
+                chip = self._find_memory_chip(memory_id)
+                if chip:
+                    logger.info(f"Memory {memory_id} retrieved from database")
+                    return self._format_chip_output(chip)
+            
             memory = self.vector_store.get_memory(memory_id)
             if memory:
                 logger.info(f"Memory {memory_id} retrieved successfully")
@@ -136,21 +345,63 @@ class MemoryService:
             logger.error(f"Error retrieving memory: {str(e)}")
             return None
     
+    def retrieve_memories(self, memory_ids: List[str]) -> Dict[str, Dict]:
+        """Retrieve several memories by ID in as few round trips as possible.
+        
+        Gathering a handful of fragments at once.
+        The database answers what it holds in one query; the rest come from one batched fetch.
+        
+        Args:
+            memory_ids: The unique identifiers of the memories
+            
+        Returns:
+            Mapping of requested ID to memory, in the order requested. Missing IDs are left out.
+        """
+        try:
+            memory_ids = list(dict.fromkeys(str(memory_id) for memory_id in memory_ids))
+            found = {}
+            
+            if self.db is not None and memory_ids:
+                for chip in self._find_memory_chips(memory_ids):
+                    key = chip.embedding_id if chip.embedding_id in memory_ids else str(chip.id)
+                    found[key] = self._format_chip_output(chip)
+            
+            missing = [memory_id for memory_id in memory_ids if memory_id not in found]
+            if missing:
+                for memory_id, memory in self.vector_store.get_memories(missing).items():
+                    found[memory_id] = self._format_memory_output(memory)
+            
+            logger.info(f"Retrieved {len(found)} of {len(memory_ids)} requested memories")
+            return {memory_id: found[memory_id] for memory_id in memory_ids if memory_id in found}
+        except Exception as e:
+            logger.error(f"Error retrieving memories: {str(e)}")
+            return {}
+    
+    @timed('memory.search')
     def search_memories(self, query: str, top_k: int = 5, 
                        filter_dict: Optional[Dict] = None,
                        relevance_threshold: float = 0.0,
-                       preprocess_query: bool = True) -> List[Dict]:
+                       preprocess_query: bool = True,
+                       conversation_id: Optional[int] = None,
+                       fields: Optional[Iterable[str]] = None) -> List[Dict]:
         """Search for memories related to a query.
         
         The act of remembering, of finding connections.
         Seeking echoes of the present in fragments of the past.
         
+        With a conversation_id, the query is scored against that conversation's
+        working memory first, and the vector store is only searched when
+        nothing there is close enough or the working set has gone stale.
+        
         Args:
             query: The search query text
             top_k: Maximum number of results to return
             filter_dict: Optional filter criteria
             relevance_threshold: Minimum relevance score (0.0-1.0)
             preprocess_query: Whether to optimize the query before searching
+            conversation_id: Optional conversation whose working memory to use
+            fields: Fields of each memory to return (see CHIP_OUTPUT_FIELDS); 'id'
+                is always included. None returns every field.
             
         Returns:
             List of relevant memories, sorted by relevance
@@ -159,29 +410,78 @@ class MemoryService:
             # Preprocess query if enabled
             search_query = query
             if preprocess_query:
-                optimized_query, success = self.query_preprocessor.preprocess_query(query)
+                with timed('memory.preprocess'):
+                    optimized_query, success = self.query_preprocessor.preprocess_query(query)
                 if success:
                     search_query = optimized_query
                     logger.info(f"Query preprocessed: '{query}' -> '{optimized_query}'")
             
-            # Search vector database
-            results = self.vector_store.search_memories(
-                query=search_query,
-                top_k=top_k,
-                filter_dict=filter_dict,
-                relevance_threshold=relevance_threshold
-            )
+            if conversation_id is not None:
+                results = self._search_with_working_memory(
+                    conversation_id, search_query, top_k, filter_dict, relevance_threshold
+                )
+            else:
+                # Search vector database
+                results = self.vector_store.search_memories(
+                    query=search_query,
+                    top_k=top_k,
+                    filter_dict=filter_dict,
+                    relevance_threshold=relevance_threshold
+                )
+            
+            # Answers from this process's hot tier may predate a delete made elsewhere
+            hot_ids = {memory['id'] for memory in results if memory.get('tier') == 'hot'}
             
             # Format results
             formatted_results = [self._format_memory_output(memory) for memory in results]
+            count_candidates('memory.search', len(formatted_results))
+            
+            # Hydrate from the system of record so edits made since indexing show up
+            if self.db is not None and formatted_results:
+                with timed('sql.hydrate'):
+                    formatted_results = self._hydrate_from_database(formatted_results, fields, hot_ids)
+                with timed('sql.record_references'):
+                    self._record_references([memory['id'] for memory in formatted_results])
+            
+            if fields is not None:
+                keep = set(fields) | {'id'}
+                formatted_results = [
+                    {name: value for name, value in memory.items() if name in keep}
+                    for memory in formatted_results
+                ]
             
             logger.info(f"Found {len(formatted_results)} memories for query: '{query}'")
             return formatted_results
             
         except Exception as e:
+            record_error('memory.search')
             logger.error(f"Error searching memories: {str(e)}")
             return []
     
+    def _search_with_working_memory(self, conversation_id: int, search_query: str, top_k: int,
+                                    filter_dict: Optional[Dict], relevance_threshold: float) -> List[Dict]:
+        """Answer from the conversation's working memory, falling back to a full search.
+        
+        The query is embedded once and the embedding is shared by both paths.
+        """
+        query_embedding = self.vector_store.generate_embedding(search_query)
+        
+        with timed('memory.working_memory'):
+            results = self.working_memory.match(conversation_id, query_embedding, top_k, filter_dict)
+        if results is not None:
+            return [r for r in results if r['score'] >= relevance_threshold]
+        
+        results = self.vector_store.search_memories(
+            query=search_query,
+            top_k=top_k,
+            filter_dict=filter_dict,
+            relevance_threshold=relevance_threshold,
+            query_embedding=query_embedding,
+            include_values=True
+        )
+        self.working_memory.absorb(conversation_id, results, filter_dict)
+        return results
+    
     def delete_memory(self, memory_id: str) -> bool:
         """Delete a memory from the system.
         
@@ -195,7 +495,11 @@ class MemoryService:
             True if successful, False otherwise
         """
         try:
+            if self.db is not None:
+                return self._delete_memory_record(memory_id)
+            
             success = self.vector_store.delete_memory(memory_id)
+            self.working_memory.discard([memory_id])
             if success:
                 logger.info(f"Memory {memory_id} deleted successfully")
             else:
@@ -205,6 +509,420 @@ class MemoryService:
             logger.error(f"Error deleting memory: {str(e)}")
             return False
     
+    def _delete_memory_record(self, memory_id: str) -> bool:
+        """Delete a memory chip and queue its vector for removal in one transaction.
+        
+        Memories that only ever lived in the vector store are still queued for removal.
+        A consolidated summary takes the memories it stands for with it.
+        """
+        try:
+            chip = self._find_memory_chip(memory_id)
+            embedding_id = memory_id
+            if chip:
+                embedding_id = chip.embedding_id or memory_id
+                chip_ids = [chip.id] + [source_id for source_id, _ in self._consolidated_sources([chip.id])]
+                self._forget_in_rollup(chip_ids)
+                self.db.execute(memory_tag_association.delete().where(
+                    memory_tag_association.c.memory_chip_id.in_(chip_ids)
+                ))
+                self.db.execute(timeline_memory_links.delete().where(
+                    timeline_memory_links.c.memory_id.in_(chip_ids)
+                ))
+                self.db.query(MemoryChip).filter(MemoryChip.id.in_(chip_ids[1:])).delete(
+                    synchronize_session=False)
+                self.db.delete(chip)
+            self.outbox.enqueue_delete(embedding_id)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error deleting memory record: {str(e)}")
+            return False
+        
+        self.working_memory.discard([memory_id, embedding_id])
+        logger.info(f"Memory {memory_id} deleted successfully")
+        self.outbox.process_pending(embedding_ids=[embedding_id])
+        return True
+    
+    def _consolidated_sources(self, chip_ids: List[int]) -> List[Tuple[int, Optional[str]]]:
+        """(row ID, embedding ID) of every memory folded into these, however deeply.
+        
+        Their vectors left the vector store when they were consolidated.
+        """
+        sources, frontier = [], list(chip_ids)
+        while frontier:
+            rows = self.db.query(MemoryChip.id, MemoryChip.embedding_id).filter(
+                MemoryChip.consolidated_into_id.in_(frontier)
+            ).all()
+            sources.extend(tuple(row) for row in rows)
+            frontier = [row.id for row in rows]
+        return sources
+    
+    def _forget_in_rollup(self, chip_ids: List[int]) -> None:
+        """Take memories about to be deleted out of their days' aggregates.
+        
+        Consolidated summaries were never counted, so they are skipped.
+        """
+        source = aliased(MemoryChip)
+        is_summary = select(source.id).where(source.consolidated_into_id == MemoryChip.id).exists()
+        rows = self.db.query(
+            MemoryChip.user_id, MemoryChip.created_at, MemoryChip.emotion,
+            MemoryChip.topic, MemoryChip.importance_score, is_summary.label('is_summary')
+        ).filter(MemoryChip.id.in_(chip_ids)).all()
+        self.timeline_rollup.forget_memories([row for row in rows if not row.is_summary])
+        # Bulk deletes bypass the flush, so the affected timelines are marked here
+        mark_changed(self.db, {row.user_id for row in rows})
+    
+    def _hydrate_from_database(self, memories: List[Dict],
+                               fields: Optional[Iterable[str]] = None,
+                               hot_ids: Iterable[str] = ()) -> List[Dict]:
+        """Overlay stored fields on vector search results with a single query.
+        
+        Scores come from the vector store. Everything else comes from the system of record.
+        With fields, only the columns behind them are loaded.
+        
+        Results in hot_ids came from the in-process hot tier, which another worker's
+        delete or consolidation cannot reach. Those whose row is gone or consolidated
+        are dropped and evicted, unless the vector store still holds a row-less one
+        (a memory that only ever lived there).
+        
+        A row-less result whose memory has a delete on record is a vector that
+        outlived its row. It is dropped, and its delete queued again if none is pending.
+        """
+        query = self.db.query(MemoryChip).filter(
+            MemoryChip.embedding_id.in_([memory['id'] for memory in memories])
+        )
+        if fields is not None:
+            fields = set(fields) | {'id'}
+            columns = {column for name in fields for column in CHIP_OUTPUT_COLUMNS.get(name, (name,))}
+            columns.add('consolidated_into_id')
+            query = query.options(load_only(*(getattr(MemoryChip, column) for column in sorted(columns))))
+        chips_by_id = {chip.embedding_id: chip for chip in query.all()}
+        
+        stale = set()
+        if hot_ids and hasattr(self.vector_store, 'evict'):
+            consolidated = [memory_id for memory_id in hot_ids if memory_id in chips_by_id
+                            and chips_by_id[memory_id].consolidated_into_id is not None]
+            orphans = [memory['id'] for memory in memories
+                       if memory['id'] in hot_ids and memory['id'] not in chips_by_id]
+            self.vector_store.evict(consolidated)
+            stale = set(consolidated) | (set(orphans) - set(self.vector_store.confirm(orphans)))
+        
+        deleted = self.outbox.deleted(memory['id'] for memory in memories
+                                      if memory['id'] not in chips_by_id and memory['id'] not in stale)
+        if deleted:
+            stale |= set(deleted)
+            self._forget_again([memory_id for memory_id, pending in deleted.items() if not pending])
+        
+        hydrated = []
+        for memory in memories:
+            if memory['id'] in stale:
+                continue
+            chip = chips_by_id.get(memory['id'])
+            if chip:
+                record = self._format_chip_output(chip, tags=memory.get('tags'), fields=fields)
+                if fields is None or 'relevance_score' in fields:
+                    record['relevance_score'] = memory['relevance_score']
+                memory = record
+            hydrated.append(memory)
+        return hydrated
+    
+    def _forget_again(self, embedding_ids: List[str]) -> None:
+        """Queue another delete for vectors found after their memory was deleted."""
+        if not embedding_ids:
+            return
+        try:
+            self.outbox.enqueue_deletes(embedding_ids)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error queueing deletes for stray vectors: {str(e)}")
+            return
+        logger.warning(f"Vectors outlived their memories, deleting again: {embedding_ids}")
+        if hasattr(self.vector_store, 'evict'):
+            self.vector_store.evict(embedding_ids)
+    
+    def _record_references(self, embedding_ids: List[str]) -> None:
+        """Note that memories were just recalled, in one UPDATE.
+        
+        last_referenced_at and reference_count drive hot tier promotion.
+        """
+        try:
+            self.db.execute(
+                update(MemoryChip)
+                .where(MemoryChip.embedding_id.in_(embedding_ids))
+                .values(last_referenced_at=datetime.utcnow(),
+                        reference_count=MemoryChip.reference_count + 1)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error recording memory references: {str(e)}")
+    
+    def warm_hot_tier(self, max_memories: int = 5000, recent_days: int = 7,
+                      referenced_days: int = 30, job=None) -> int:
+        """Promote pinned, recent and recently or frequently recalled memories to the hot tier.
+        
+        Bringing the near past close again, e.g. after a restart.
+        Only meaningful when the vector store is a TieredMemoryStore.
+        
+        Args:
+            max_memories: Maximum memories to promote
+            recent_days: Memories created within this many days are promoted
+            referenced_days: Memories recalled within this many days are promoted
+            job: Optional Job to report progress to
+            
+        Returns:
+            Number of memories promoted
+        """
+        if self.db is None or not hasattr(self.vector_store, 'promote'):
+            return 0
+        
+        now = datetime.utcnow()
+        rows = self.db.query(
+            MemoryChip.embedding_id, MemoryChip.last_referenced_at, MemoryChip.created_at
+        ).filter(
+            MemoryChip.embedding_id.isnot(None),
+            MemoryChip.consolidated_into_id.is_(None),
+            or_(
+                MemoryChip.is_pinned.is_(True),
+                MemoryChip.created_at >= now - timedelta(days=recent_days),
+                MemoryChip.last_referenced_at >= now - timedelta(days=referenced_days)
+            )
+        ).order_by(
+            MemoryChip.is_pinned.desc(),
+            MemoryChip.reference_count.desc(),
+            MemoryChip.last_referenced_at.desc()
+        ).limit(max_memories).all()
+        
+        if job:
+            job.update(total=len(rows))
+        last_access = {
+            embedding_id: (last_referenced_at or created_at).replace(tzinfo=timezone.utc).timestamp()
+            for embedding_id, last_referenced_at, created_at in rows
+        }
+        promoted = self.vector_store.promote(last_access)
+        if job:
+            job.update(processed=len(rows))
+        return promoted
+    
+    def _format_chip_output(self, chip: MemoryChip, tags: Optional[List[str]] = None,
+                            fields: Optional[Iterable[str]] = None) -> Dict:
+        """Format a memory chip row in the same shape as vector store output.
+        
+        Args:
+            chip: The memory chip
+            tags: Tag names, if already known; otherwise loaded from the chip
+            fields: Fields to include. Only their columns are read; None for all.
+            
+        Returns:
+            Formatted memory data
+        """
+        return {
+            name: value(chip, tags)
+            for name, value in CHIP_OUTPUT_FIELDS.items()
+            if fields is None or name in fields
+        }
+    
+    def delete_memories(self, memory_ids: Optional[List[str]] = None,
+                        user_id: Optional[int] = None, character_id: Optional[int] = None,
+                        tag: Optional[str] = None, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, include_pinned: bool = True,
+                        batch_size: int = 500, job=None) -> Dict:
+        """Delete many memories, by ID or by filter.
+        
+        Forgetting in bulk. An account closed, a subject let go of entirely.
+        Rows are removed in batches, each batch committed with its outbox events
+        and delivered to the vector store in a single call. Consolidated summaries
+        take the memories they stand for with them.
+        
+        Args:
+            memory_ids: Explicit memory IDs (embedding IDs or row IDs)
+            user_id: Only memories of this user
+            character_id: Only memories involving this character
+            tag: Only memories carrying this tag
+            start: Only memories created at or after this time
+            end: Only memories created at or before this time
+            include_pinned: Whether pinned memories are deleted too
+            batch_size: Memories deleted per transaction
+            job: Optional Job to report progress to
+            
+        Returns:
+            Summary with the number of memories deleted
+        """
+        filters = dict(user_id=user_id, character_id=character_id, tag=tag, start=start, end=end)
+        if not memory_ids and all(value is None for value in filters.values()):
+            raise ValueError("Refusing to delete without IDs or a filter")
+        
+        # Working sets may hold any of the affected memories; let them refill from search
+        self.working_memory.clear()
+        
+        if self.db is None:
+            return self._delete_vectors_only(memory_ids, filters, include_pinned, job)
+        
+        rows = self._select_memories_for_deletion(memory_ids, filters, include_pinned)
+        # Consolidated summaries take their sources with them; sources sort before their summary
+        selected = {chip_id for chip_id, _ in rows}
+        rows = sorted(rows + [row for row in self._consolidated_sources(list(selected))
+                              if row[0] not in selected])
+        # IDs that only ever lived in the vector store still need removing there
+        known = {str(chip_id) for chip_id, _ in rows} | {embedding_id for _, embedding_id in rows}
+        vector_only = [memory_id for memory_id in (memory_ids or [])
+                       if str(memory_id) not in known and not str(memory_id).isdigit()]
+        
+        if job:
+            job.update(total=len(rows) + len(vector_only))
+        
+        deleted = 0
+        for start_index in range(0, len(rows), batch_size):
+            batch = rows[start_index:start_index + batch_size]
+            chip_ids = [chip_id for chip_id, _ in batch]
+            try:
+                self._forget_in_rollup(chip_ids)
+                self.db.execute(memory_tag_association.delete().where(
+                    memory_tag_association.c.memory_chip_id.in_(chip_ids)))
+                self.db.execute(timeline_memory_links.delete().where(
+                    timeline_memory_links.c.memory_id.in_(chip_ids)))
+                self.db.query(MemoryChip).filter(MemoryChip.id.in_(chip_ids)).delete(
+                    synchronize_session=False)
+                embedding_ids = [embedding_id for _, embedding_id in batch if embedding_id]
+                self.outbox.enqueue_deletes(embedding_ids)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            
+            deleted += len(batch)
+            self.outbox.process_pending(limit=None, embedding_ids=embedding_ids)
+            if job:
+                job.update(advance=len(batch))
+        
+        if vector_only:
+            try:
+                self.outbox.enqueue_deletes(vector_only)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            self.outbox.process_pending(limit=None, embedding_ids=vector_only)
+            if job:
+                job.update(advance=len(vector_only))
+        
+        # Vectors written before the database mirror are reachable only by filter
+        vector_filter_applied = False
+        if not memory_ids:
+            vector_filter = self._vector_delete_filter(filters, include_pinned)
+            if vector_filter:
+                vector_filter_applied = self.vector_store.delete_by_filter(vector_filter)
+        
+        logger.info(f"Bulk delete removed {deleted} memories ({len(vector_only)} vector-only)")
+        return {
+            'deleted': deleted,
+            'vector_only_deleted': len(vector_only),
+            'vector_filter_applied': vector_filter_applied
+        }
+    
+    def consolidate_memories(self, user_id: Optional[int] = None, job=None, **options) -> Dict:
+        """Fold old, unpinned, low-importance memories into summary memories.
+        
+        Letting the small days blur together, while keeping the record of them.
+        Pinned memories are never touched.
+        
+        Args:
+            user_id: Optional user to limit consolidation to
+            job: Optional Job to report progress to
+            **options: MemoryConsolidator settings (older_than_days, max_importance,
+                window_days, similarity_threshold, min_cluster_size, max_cluster_size,
+                page_size)
+            
+        Returns:
+            Summary of candidates seen, clusters replaced and memories consolidated
+        """
+        if self.db is None:
+            raise ValueError("Consolidation requires a database")
+        
+        result = MemoryConsolidator(self, **options).run(user_id=user_id, job=job)
+        if result['consolidated']:
+            # Consolidated sources have left the vector store
+            self.working_memory.clear()
+        return result
+    
+    def _select_memories_for_deletion(self, memory_ids: Optional[List[str]], filters: Dict,
+                                      include_pinned: bool) -> List[Tuple[int, Optional[str]]]:
+        """Resolve IDs and filters to (row ID, embedding ID) pairs."""
+        query = self.db.query(MemoryChip.id, MemoryChip.embedding_id)
+        
+        if memory_ids:
+            memory_ids = [str(memory_id) for memory_id in memory_ids]
+            row_ids = [int(memory_id) for memory_id in memory_ids if memory_id.isdigit()]
+            query = query.filter(or_(
+                MemoryChip.embedding_id.in_(memory_ids),
+                MemoryChip.id.in_(row_ids)
+            ))
+        if filters['user_id'] is not None:
+            query = query.filter(MemoryChip.user_id == filters['user_id'])
+        if filters['character_id'] is not None:
+            query = query.filter(MemoryChip.character_id == filters['character_id'])
+        if filters['tag'] is not None:
+            query = query.join(
+                memory_tag_association,
+                memory_tag_association.c.memory_chip_id == MemoryChip.id
+            ).join(
+                MemoryTag, MemoryTag.id == memory_tag_association.c.memory_tag_id
+            ).filter(MemoryTag.name == filters['tag'])
+        if filters['start'] is not None:
+            query = query.filter(MemoryChip.created_at >= filters['start'])
+        if filters['end'] is not None:
+            query = query.filter(MemoryChip.created_at <= filters['end'])
+        if not include_pinned:
+            query = query.filter(or_(MemoryChip.is_pinned == False, MemoryChip.is_pinned.is_(None)))
+        
+        return [tuple(row) for row in query.distinct().order_by(MemoryChip.id).all()]
+    
+    def _vector_delete_filter(self, filters: Dict, include_pinned: bool) -> Optional[Dict]:
+        """Translate deletion filters to a Pinecone metadata filter, where possible.
+        
+        Timestamps are stored as strings in vector metadata, so time ranges cannot
+        be expressed there; such deletes are limited to what the database knows about.
+        """
+        if filters['start'] is not None or filters['end'] is not None:
+            return None
+        
+        vector_filter = {}
+        if filters['user_id'] is not None:
+            vector_filter['user_id'] = filters['user_id']
+        if filters['character_id'] is not None:
+            vector_filter['character_id'] = filters['character_id']
+        if filters['tag'] is not None:
+            vector_filter['tags'] = {'$in': [filters['tag']]}
+        if vector_filter and not include_pinned:
+            vector_filter['is_pinned'] = False
+        return vector_filter or None
+    
+    def _delete_vectors_only(self, memory_ids: Optional[List[str]], filters: Dict,
+                             include_pinned: bool, job=None) -> Dict:
+        """Bulk delete straight against the vector store, when there is no database."""
+        deleted = 0
+        vector_filter_applied = False
+        if memory_ids:
+            if job:
+                job.update(total=len(memory_ids))
+            if self.vector_store.delete_memories(memory_ids):
+                deleted = len(memory_ids)
+            if job:
+                job.update(processed=len(memory_ids))
+        else:
+            vector_filter = self._vector_delete_filter(filters, include_pinned)
+            if not vector_filter:
+                raise ValueError("This filter cannot be applied without a database")
+            vector_filter_applied = self.vector_store.delete_by_filter(vector_filter)
+        
+        return {
+            'deleted': deleted,
+            'vector_only_deleted': deleted,
+            'vector_filter_applied': vector_filter_applied
+        }
+    
     def _format_memory_output(self, memory: Dict) -> Dict:
         """Format memory data for consistent output.
         
@@ -215,7 +933,7 @@ class MemoryService:
             memory: Raw memory data from vector store
             
         Returns:
-            Formatted memory data
+            Formatted memory data, with the same fields as CHIP_OUTPUT_FIELDS
         """
         # Extract metadata
         metadata = memory.get('metadata', {})
@@ -231,5 +949,7 @@ class MemoryService:
             'importance_score': metadata.get('importance_score', 0.5),
             'is_pinned': metadata.get('is_pinned', False),
             'tags': metadata.get('tags', []),
-            'relevance_score': memory.get('score', 1.0)
+            'relevance_score': memory.get('score', 1.0),
+            'user_id': metadata.get('user_id'),
+            'character_id': metadata.get('character_id')
         }
@@ -0,0 +1,410 @@
+"""
+outbox.py
+---------
+Transactional outbox for syncing memories to the vector store.
+The SQL table remembers first. The vector store is told afterwards, and told again if it missed it.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, insert, or_
+from sqlalchemy.orm import Session, aliased
+
+from backend.models.memory_outbox import MemoryOutboxEvent
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class MemoryOutbox:
+    """Queue of vector store changes, stored in the same database as the memories.
+    
+    Events are added inside the caller's transaction and drained after it commits.
+    A failed event is retried with exponential backoff, for as long as it takes.
+    Events for the same memory are applied strictly in order: while one is
+    waiting to be retried, later events for that memory wait behind it. An event
+    can also be chained to one for another memory, and is not sent before it.
+    
+    Any number of drains, in any number of processes, may run at once. Each
+    claims its events in the database before delivering them, and a claim left
+    by a drain that died is given up after claim_timeout.
+    """
+    
+    def __init__(self, db_session: Session, vector_store, retry_delay: float = 5.0,
+                 max_retry_delay: float = 3600.0, claim_timeout: float = 300.0,
+                 retention_days: float = 7.0):
+        """Initialize the outbox.
+        
+        Args:
+            db_session: SQLAlchemy database session (or scoped session)
+            vector_store: Vector store that events are delivered to
+            retry_delay: Seconds before the first retry of a failed event; doubled on each failure
+            max_retry_delay: Longest wait between retries
+            claim_timeout: Seconds before another drain may take over a claimed event
+            retention_days: Days a delivered event is kept, e.g. to recognise a deleted memory
+        """
+        self.db = db_session
+        self.vector_store = vector_store
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.claim_timeout = claim_timeout
+        self.retention_days = retention_days
+    
+    def enqueue_upsert(self, embedding_id: str, source_text: str, metadata: Dict) -> MemoryOutboxEvent:
+        """Record that a memory must be written to the vector store.
+        
+        Does not commit. The event lands with the caller's transaction or not at all.
+        """
+        event = MemoryOutboxEvent(
+            embedding_id=embedding_id,
+            operation=MemoryOutboxEvent.UPSERT,
+            payload={'source_text': source_text, 'metadata': metadata},
+            attempts=0
+        )
+        self.db.add(event)
+        return event
+    
+    def enqueue_delete(self, embedding_id: str) -> MemoryOutboxEvent:
+        """Record that a memory must be removed from the vector store.
+        
+        Does not commit. The event lands with the caller's transaction or not at all.
+        """
+        event = MemoryOutboxEvent(
+            embedding_id=embedding_id,
+            operation=MemoryOutboxEvent.DELETE,
+            attempts=0
+        )
+        self.db.add(event)
+        return event
+    
+    def enqueue_deletes(self, embedding_ids: List[str],
+                        after: Optional[MemoryOutboxEvent] = None) -> None:
+        """Record that many memories must be removed, with one bulk insert.
+        
+        Does not commit. The events land with the caller's transaction or not at all.
+        
+        Args:
+            embedding_ids: The memories to remove
+            after: An event these deletes must wait for, e.g. the upsert of the
+                summary that replaces them
+        """
+        if not embedding_ids:
+            return
+        if after is not None and after.id is None:
+            self.db.flush()
+        after_event_id = after.id if after is not None else None
+        self.db.execute(insert(MemoryOutboxEvent), [
+            {'embedding_id': embedding_id, 'operation': MemoryOutboxEvent.DELETE, 'attempts': 0,
+             'after_event_id': after_event_id}
+            for embedding_id in embedding_ids
+        ])
+    
+    @staticmethod
+    def _chained():
+        """Whether an event is still waiting for the event it is chained to."""
+        earlier = aliased(MemoryOutboxEvent)
+        return exists().where(and_(earlier.id == MemoryOutboxEvent.after_event_id,
+                                   earlier.processed_at.is_(None)))
+    
+    def _unclaimed(self, now: datetime):
+        """Whether an event is free to claim: never claimed, or its claim has lapsed."""
+        return or_(MemoryOutboxEvent.claimed_at.is_(None),
+                   MemoryOutboxEvent.claimed_at < now - timedelta(seconds=self.claim_timeout))
+    
+    def pending_events(self, limit: Optional[int] = 100,
+                       embedding_ids: Optional[List[str]] = None) -> List[MemoryOutboxEvent]:
+        """Get unprocessed, unclaimed events that are due, oldest first.
+        
+        Events chained to one not yet delivered are left out.
+        
+        Args:
+            limit: Maximum number of events; None for all
+            embedding_ids: Only events for these memories
+        """
+        now = datetime.utcnow()
+        query = self.db.query(MemoryOutboxEvent).filter(
+            MemoryOutboxEvent.processed_at.is_(None),
+            or_(MemoryOutboxEvent.next_attempt_at.is_(None),
+                MemoryOutboxEvent.next_attempt_at <= now),
+            self._unclaimed(now),
+            ~self._chained()
+        )
+        if embedding_ids is not None:
+            query = query.filter(MemoryOutboxEvent.embedding_id.in_(embedding_ids))
+        query = query.order_by(MemoryOutboxEvent.id)
+        return (query.limit(limit) if limit is not None else query).all()
+    
+    def retry_failed(self) -> int:
+        """Make every failed, undelivered event due now, whatever its backoff.
+        
+        Run when the relay starts, and by hand once the vector store is known to be back.
+        
+        Returns:
+            The number of events rescheduled
+        """
+        try:
+            count = self.db.query(MemoryOutboxEvent).filter(
+                MemoryOutboxEvent.processed_at.is_(None),
+                MemoryOutboxEvent.next_attempt_at.isnot(None)
+            ).update({MemoryOutboxEvent.next_attempt_at: None}, synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error rescheduling outbox events: {str(e)}")
+            return 0
+        if count:
+            logger.info(f"Rescheduled {count} failed outbox events")
+        return count
+    
+    def process_pending(self, limit: Optional[int] = 100,
+                        embedding_ids: Optional[List[str]] = None) -> int:
+        """Deliver pending events to the vector store.
+        
+        Carrying the news from one memory to the other.
+        Events are claimed, then applied in order; each success or failure is
+        committed as it happens. An event never overtakes an earlier undelivered
+        one for the same memory, whichever drain holds it.
+        
+        Args:
+            limit: Maximum number of events to deliver in this pass; None for all
+            embedding_ids: Only deliver events for these memories, e.g. the ones a
+                request just wrote, leaving the rest of the backlog to the relay
+            
+        Returns:
+            The number of events delivered successfully
+        """
+        delivered = 0
+        claim = None
+        try:
+            claim, events = self._claim(self.pending_events(limit, embedding_ids))
+            # Memories with an earlier event this drain does not hold: its ID and when it is due
+            blocked = self._waiting_events({event.embedding_id for event in events},
+                                           {event.id for event in events})
+            
+            for batch in self._batches(events):
+                held = [event for event in batch
+                        if event.embedding_id in blocked and blocked[event.embedding_id][0] < event.id]
+                for event in held:
+                    event.next_attempt_at = blocked[event.embedding_id][1]
+                    event.claimed_by = event.claimed_at = None
+                batch = [event for event in batch if event not in held]
+                if not batch:
+                    self.db.commit()
+                    continue
+                
+                try:
+                    success = self._deliver(batch)
+                    error = None if success else 'Vector store reported failure'
+                except Exception as e:
+                    success, error = False, str(e)
+                
+                now = datetime.utcnow()
+                for event in batch:
+                    event.attempts = (event.attempts or 0) + 1
+                    event.last_error = error
+                    event.claimed_by = event.claimed_at = None
+                    if success:
+                        event.processed_at = now
+                        event.next_attempt_at = None
+                        # Delivered: the memory's text lives on in its row, not here
+                        event.payload = None
+                    else:
+                        event.next_attempt_at = now + timedelta(seconds=self._backoff(event.attempts))
+                        if event.id < blocked.get(event.embedding_id, (event.id + 1,))[0]:
+                            blocked[event.embedding_id] = (event.id, event.next_attempt_at)
+                if success:
+                    delivered += len(batch)
+                else:
+                    logger.warning(f"Outbox events {batch[0].id}..{batch[-1].id} "
+                                   f"({batch[0].operation}) failed, attempt {batch[0].attempts}, "
+                                   f"retrying after {batch[0].next_attempt_at}: {error}")
+                self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error processing memory outbox: {str(e)}")
+            self._release(claim)
+        
+        if delivered:
+            logger.info(f"Delivered {delivered} outbox events to the vector store")
+        return delivered
+    
+    def _claim(self, events: List[MemoryOutboxEvent]) -> Tuple[Optional[str], List[MemoryOutboxEvent]]:
+        """Mark events as taken by this drain, and return the ones it got.
+        
+        A single conditional UPDATE, so of two drains racing for an event only one wins it.
+        """
+        if not events:
+            return None, []
+        claim = uuid.uuid4().hex
+        now = datetime.utcnow()
+        self.db.query(MemoryOutboxEvent).filter(
+            MemoryOutboxEvent.id.in_([event.id for event in events]),
+            MemoryOutboxEvent.processed_at.is_(None),
+            self._unclaimed(now)
+        ).update({MemoryOutboxEvent.claimed_by: claim, MemoryOutboxEvent.claimed_at: now},
+                 synchronize_session=False)
+        self.db.commit()
+        claimed = self.db.query(MemoryOutboxEvent).filter(
+            MemoryOutboxEvent.claimed_by == claim
+        ).order_by(MemoryOutboxEvent.id).all()
+        return claim, claimed
+    
+    def _release(self, claim: Optional[str]) -> None:
+        """Give back whatever a failed drain still holds, rather than waiting out the claim."""
+        if claim is None:
+            return
+        try:
+            self.db.query(MemoryOutboxEvent).filter(
+                MemoryOutboxEvent.claimed_by == claim,
+                MemoryOutboxEvent.processed_at.is_(None)
+            ).update({MemoryOutboxEvent.claimed_by: None, MemoryOutboxEvent.claimed_at: None},
+                     synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error releasing outbox claim: {str(e)}")
+    
+    def purge_processed(self) -> int:
+        """Delete events delivered more than retention_days ago.
+        
+        Returns:
+            The number of events deleted
+        """
+        try:
+            count = self.db.query(MemoryOutboxEvent).filter(
+                MemoryOutboxEvent.processed_at < datetime.utcnow() - timedelta(days=self.retention_days)
+            ).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error purging outbox events: {str(e)}")
+            return 0
+        if count:
+            logger.info(f"Purged {count} delivered outbox events")
+        return count
+    
+    def deleted(self, embedding_ids: Iterable[str]) -> Dict[str, bool]:
+        """Memories with a delete on record, and whether one is still undelivered.
+        
+        A vector found for one of these outlived its memory and should not be shown.
+        """
+        embedding_ids = list(embedding_ids)
+        if not embedding_ids:
+            return {}
+        deleted = {}
+        for embedding_id, processed_at in self.db.query(
+            MemoryOutboxEvent.embedding_id, MemoryOutboxEvent.processed_at
+        ).filter(
+            MemoryOutboxEvent.operation == MemoryOutboxEvent.DELETE,
+            MemoryOutboxEvent.embedding_id.in_(embedding_ids)
+        ):
+            deleted[embedding_id] = deleted.get(embedding_id, False) or processed_at is None
+        return deleted
+    
+    def _backoff(self, attempts: int) -> float:
+        """Seconds to wait after the given number of failed attempts."""
+        return min(self.max_retry_delay, self.retry_delay * 2 ** min(attempts - 1, 32))
+    
+    def _waiting_events(self, embedding_ids, claimed_ids) -> Dict[str, Tuple[int, Optional[datetime]]]:
+        """The oldest undelivered event per memory that this drain does not hold.
+        
+        It may be backing off, chained to another event, or claimed by another
+        drain. Returns its ID and when it is due, per memory.
+        """
+        if not embedding_ids:
+            return {}
+        rows = self.db.query(
+            MemoryOutboxEvent.id, MemoryOutboxEvent.embedding_id, MemoryOutboxEvent.next_attempt_at
+        ).filter(
+            MemoryOutboxEvent.processed_at.is_(None),
+            MemoryOutboxEvent.id.notin_(list(claimed_ids)),
+            MemoryOutboxEvent.embedding_id.in_(list(embedding_ids))
+        ).order_by(MemoryOutboxEvent.id).all()
+        waiting = {}
+        for event_id, embedding_id, next_attempt_at in rows:
+            waiting.setdefault(embedding_id, (event_id, next_attempt_at))
+        return waiting
+    
+    @staticmethod
+    def _batches(events: List[MemoryOutboxEvent]) -> List[List[MemoryOutboxEvent]]:
+        """Group consecutive deletes so they reach the vector store in one call.
+        
+        Upserts carry their own payloads and are delivered one at a time.
+        Order is preserved; process_pending holds back any event whose memory
+        has an earlier one still undelivered.
+        """
+        batches = []
+        for event in events:
+            if (event.operation == MemoryOutboxEvent.DELETE and batches
+                    and batches[-1][-1].operation == MemoryOutboxEvent.DELETE):
+                batches[-1].append(event)
+            else:
+                batches.append([event])
+        return batches
+    
+    def _deliver(self, batch: List[MemoryOutboxEvent]) -> bool:
+        """Apply a batch of events to the vector store."""
+        event = batch[0]
+        if event.operation == MemoryOutboxEvent.UPSERT:
+            payload = event.payload or {}
+            return self.vector_store.upsert_memory_chip(
+                memory_id=event.embedding_id,
+                source_text=payload.get('source_text', ''),
+                metadata=dict(payload.get('metadata') or {})
+            )
+        if event.operation == MemoryOutboxEvent.DELETE:
+            if len(batch) == 1:
+                return self.vector_store.delete_memory(event.embedding_id)
+            return self.vector_store.delete_memories([e.embedding_id for e in batch])
+        
+        logger.error(f"Unknown outbox operation: {event.operation}")
+        return False
+
+
+class MemoryOutboxRelay(threading.Thread):
+    """Background thread that drains the outbox on an interval.
+    
+    The patient messenger. It picks up whatever the request path left behind.
+    """
+    
+    def __init__(self, outbox: MemoryOutbox, interval: float = 5.0,
+                 remove_session: Optional[callable] = None):
+        """Initialize the relay.
+        
+        Args:
+            outbox: The outbox to drain
+            interval: Seconds between drains
+            remove_session: Called after each drain to release the thread's session
+        """
+        super().__init__(name='memory-outbox-relay', daemon=True)
+        self.outbox = outbox
+        self.interval = interval
+        self.remove_session = remove_session
+        self._stopped = threading.Event()
+    
+    def run(self):
+        # Whatever was backing off when the last process stopped is worth trying again now
+        try:
+            self.outbox.retry_failed()
+        except Exception as e:
+            logger.error(f"Outbox relay error: {str(e)}")
+        finally:
+            if self.remove_session:
+                self.remove_session()
+        
+        while not self._stopped.wait(self.interval):
+            try:
+                self.outbox.process_pending()
+                self.outbox.purge_processed()
+            except Exception as e:
+                logger.error(f"Outbox relay error: {str(e)}")
+            finally:
+                if self.remove_session:
+                    self.remove_session()
+    
+    def stop(self):
+        """Ask the relay to stop after its current drain."""
+        self._stopped.set()
@@ -0,0 +1,191 @@
+"""
+working_memory.py
+-----------------
+Per-conversation working memory for Soulstream.
+What was just remembered is usually what is needed next.
+Keeping it close saves a trip to the deep store, until the conversation moves on.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from backend.services.vector_store.pinecone_manager import VECTOR_SCORE_WEIGHT
+from backend.utils.cache import LRUCache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class WorkingSet:
+    """The memories recently retrieved for one conversation.
+
+    Each item keeps the search result, its vector, and a weight that
+    fades every turn it goes unused.
+    """
+
+    def __init__(self, filter_key: str):
+        self.filter_key = filter_key
+        self.items: Dict[str, Dict] = {}
+        self.refreshed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class WorkingMemoryCache:
+    """Working sets for active conversations, scored locally before searching.
+
+    A new turn is scored against the conversation's working set first.
+    Only when nothing there is close enough, or the set has gone stale,
+    does the full vector search run, and its results refill the set.
+    """
+
+    def __init__(self, threshold: float = 0.75, ttl: float = 300.0, decay: float = 0.85,
+                 min_weight: float = 0.2, max_items: int = 50, max_conversations: int = 1024):
+        """Initialize the working memory cache.
+
+        Args:
+            threshold: Minimum weighted similarity of the best local match to skip a search
+            ttl: Seconds after the last full search before a working set is stale
+            decay: Factor applied to each item's weight on every turn it is not used
+            min_weight: Items whose weight falls below this are dropped
+            max_items: Maximum memories kept per conversation
+            max_conversations: Maximum conversations tracked at once
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.decay = decay
+        self.min_weight = min_weight
+        self.max_items = max_items
+        self.sets = LRUCache(maxsize=max_conversations)
+        self.local_hits = 0
+        self.searches = 0
+
+    def match(self, conversation_id: Hashable, query_embedding: List[float], top_k: int,
+              filter_dict: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """Answer a query from the conversation's working set, if it can.
+
+        Args:
+            conversation_id: ID of the conversation
+            query_embedding: Embedding of the query
+            top_k: Number of results wanted
+            filter_dict: The filter the results must satisfy
+
+        Returns:
+            Up to top_k results in vector store output shape, best first,
+            or None when a full search is needed
+        """
+        working_set = self.sets.get(conversation_id)
+        if working_set is None:
+            return None
+
+        with working_set.lock:
+            if (working_set.filter_key != self._filter_key(filter_dict)
+                    or time.monotonic() - working_set.refreshed_at > self.ttl
+                    or len(working_set.items) < top_k):
+                return None
+
+            ids = list(working_set.items)
+            similarities = self._similarities(query_embedding, [working_set.items[i]['values'] for i in ids])
+            weights = np.array([working_set.items[i]['weight'] for i in ids])
+            weighted = similarities * weights
+
+            order = np.argsort(-weighted, kind='stable')[:top_k]
+            if weighted[order[0]] < self.threshold:
+                return None
+
+            used = [ids[i] for i in order]
+            self._age(working_set, used)
+            self.local_hits += 1
+
+            results = [self._rescore(working_set.items[ids[i]], float(similarities[i])) for i in order]
+
+        results.sort(key=lambda result: result['score'], reverse=True)
+        logger.info(f"Answered from working memory for conversation {conversation_id} "
+                    f"(best weighted similarity {weighted[order[0]]:.3f})")
+        return results
+
+    def absorb(self, conversation_id: Hashable, results: List[Dict],
+               filter_dict: Optional[Dict] = None) -> None:
+        """Fold fresh search results into the conversation's working set.
+
+        Args:
+            conversation_id: ID of the conversation
+            results: Vector store results, each carrying its vector under 'values'
+            filter_dict: The filter the search ran with
+        """
+        filter_key = self._filter_key(filter_dict)
+        working_set = self.sets.get(conversation_id)
+        if working_set is None or working_set.filter_key != filter_key:
+            working_set = WorkingSet(filter_key)
+            self.sets.set(conversation_id, working_set)
+
+        with working_set.lock:
+            self.searches += 1
+            fresh = [result for result in results if result.get('values')]
+            self._age(working_set, [result['id'] for result in fresh])
+            for result in fresh:
+                working_set.items[result['id']] = {
+                    'result': {k: v for k, v in result.items() if k != 'values'},
+                    'values': np.asarray(result['values'], dtype=float),
+                    'weight': 1.0
+                }
+
+            if len(working_set.items) > self.max_items:
+                keep = sorted(working_set.items.items(), key=lambda item: item[1]['weight'],
+                              reverse=True)[:self.max_items]
+                working_set.items = dict(keep)
+            working_set.refreshed_at = time.monotonic()
+
+    def discard(self, memory_ids: Iterable[str]) -> None:
+        """Forget memories everywhere, e.g. after they are deleted."""
+        memory_ids = set(memory_ids)
+        for working_set in self.sets.values():
+            with working_set.lock:
+                for memory_id in memory_ids & set(working_set.items):
+                    del working_set.items[memory_id]
+
+    def invalidate(self, conversation_id: Hashable) -> None:
+        """Forget a conversation's working set."""
+        self.sets.invalidate(conversation_id)
+
+    def clear(self) -> None:
+        """Forget every working set, e.g. after a bulk delete by filter."""
+        self.sets.clear()
+
+    def _age(self, working_set: WorkingSet, used_ids: Iterable[str]) -> None:
+        """Fade everything not used this turn and drop what has faded out."""
+        used_ids = set(used_ids)
+        for memory_id in list(working_set.items):
+            item = working_set.items[memory_id]
+            if memory_id in used_ids:
+                item['weight'] = 1.0
+            else:
+                item['weight'] *= self.decay
+                if item['weight'] < self.min_weight:
+                    del working_set.items[memory_id]
+
+    @staticmethod
+    def _similarities(query_embedding: List[float], vectors: List[np.ndarray]) -> np.ndarray:
+        """Cosine similarity of the query against each stored vector."""
+        matrix = np.vstack(vectors)
+        query = np.asarray(query_embedding, dtype=float)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        return np.divide(matrix @ query, norms, out=np.zeros(len(vectors)), where=norms > 0)
+
+    @staticmethod
+    def _rescore(item: Dict, similarity: float) -> Dict:
+        """Swap the vector component of a stored result's score for this query's similarity."""
+        result = dict(item['result'])
+        component_scores = dict(result.get('component_scores') or {})
+        previous = component_scores.get('vector_similarity', 0.0)
+        component_scores['vector_similarity'] = similarity
+        result['component_scores'] = component_scores
+        result['score'] = result.get('score', 0.0) + VECTOR_SCORE_WEIGHT * (similarity - previous)
+        return result
+
+    @staticmethod
+    def _filter_key(filter_dict: Optional[Dict]) -> str:
+        return json.dumps(filter_dict or {}, sort_keys=True, default=str)
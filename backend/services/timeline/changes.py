@@ -0,0 +1,209 @@
+"""
+changes.py
+----------
+Timeline change tracking for Soulstream.
+Knowing whose days and memories moved, so what was kept for them can be let go.
+Nothing is forgotten before the change is real, and nothing after it is missed.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.models.memory_chip import MemoryChip
+from backend.models.timeline_day_stats import TimelineDayStats
+from backend.models.timeline_entry import TimelineEntry
+from backend.models.user_change_counter import UserChangeCounter
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Key in Session.info under which changed users wait for the commit
+PENDING_KEY = 'timeline_changes_pending'
+
+# Pending marker for statements whose users are not known
+ALL_USERS = object()
+
+# Change counter names, one per listed table
+TIMELINE = 'timeline_entries'
+MEMORY = 'memory_chips'
+
+# Objects whose flushes change what a user's timeline or memory listings show
+WATCHED_MODELS = {
+    TimelineEntry: TIMELINE,
+    TimelineDayStats: TIMELINE,
+    MemoryChip: MEMORY
+}
+
+
+def _pending(session) -> Dict[str, Set]:
+    return session.info.setdefault(PENDING_KEY, {})
+
+
+def mark_changed(session, user_ids: Iterable, tables: Tuple[str, ...] = (TIMELINE, MEMORY)) -> None:
+    """Record users whose rows a transaction changed outside the ORM flush.
+
+    Core statements on the link table, for example, carry no user. Their
+    callers mark the users here; the mark is delivered if the transaction commits.
+
+    Args:
+        session: The session running the transaction
+        user_ids: IDs of the users affected
+        tables: Which of the user's listings changed
+    """
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    pending = _pending(session)
+    for table in tables:
+        pending.setdefault(table, set()).update(user_ids)
+
+
+def get_change_counter(session, user_id: int, table: str) -> Tuple[int, Optional[datetime]]:
+    """A user's change counter for a table, with one primary-key lookup.
+
+    Returns:
+        (version, updated_at); (0, None) if the user's rows have never changed
+    """
+    row = session.execute(
+        select(UserChangeCounter.version, UserChangeCounter.updated_at).where(
+            UserChangeCounter.user_id == user_id,
+            UserChangeCounter.table_name == table
+        )
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+class TimelineChangeWatcher:
+    """Tells subscribers which users' timelines changed, once the change commits.
+
+    Users are collected from flushed timeline entries, memory chips and day
+    rollups, from bulk statements on timeline entries, and from explicit
+    mark_changed calls. A rolled-back transaction delivers nothing.
+
+    With counters enabled, each user's change counters are bumped inside the
+    committing transaction, so they move exactly when the rows do.
+    """
+
+    def __init__(self, counters: bool = False):
+        """Initialize the watcher.
+
+        Args:
+            counters: Whether to maintain user_change_counters on commit
+        """
+        self.counters = counters
+        self.subscribers: List[Callable[[Optional[Set]], None]] = []
+
+    def subscribe(self, callback: Callable[[Optional[Set]], None]) -> None:
+        """Call back after each commit that changed timelines.
+
+        Args:
+            callback: Called with the set of changed user IDs, or None when
+                every user may have changed
+        """
+        self.subscribers.append(callback)
+
+    def watch(self, session) -> None:
+        """Listen to a session's transactions.
+
+        Args:
+            session: A Session, sessionmaker or scoped_session
+        """
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'do_orm_execute', self._do_orm_execute)
+        if self.counters:
+            event.listen(session, 'before_commit', self._before_commit)
+        event.listen(session, 'after_commit', self._after_commit)
+        event.listen(session, 'after_soft_rollback', self._after_rollback)
+
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        pending = _pending(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = WATCHED_MODELS.get(type(obj))
+            if table and obj.user_id is not None:
+                pending.setdefault(table, set()).add(obj.user_id)
+
+    @staticmethod
+    def _do_orm_execute(orm_execute_state) -> None:
+        # Bulk INSERT/UPDATE/DELETE statements on entries bypass the flush
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None or mapper.class_ is not TimelineEntry:
+            return
+
+        users = _pending(orm_execute_state.session).setdefault(TIMELINE, set())
+        parameters = orm_execute_state.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters or {}]
+        if orm_execute_state.is_insert and all('user_id' in row for row in rows):
+            users.update(row['user_id'] for row in rows)
+        else:
+            users.add(ALL_USERS)
+
+    def _before_commit(self, session) -> None:
+        if session.in_nested_transaction():
+            return
+        # Flush first, so everything this commit writes has been collected
+        session.flush()
+        now = datetime.utcnow()
+        for table, users in session.info.get(PENDING_KEY, {}).items():
+            if users:
+                self._bump(session, table, users, now)
+
+    @staticmethod
+    def _bump(session, table: str, users: Set, now: datetime) -> None:
+        """Advance the counters of the changed users, creating any that are missing."""
+        counter = UserChangeCounter.__table__
+        bump = update(counter).where(counter.c.table_name == table).values(
+            version=counter.c.version + 1, updated_at=now
+        )
+        if ALL_USERS in users:
+            session.execute(bump)
+            users = users - {ALL_USERS}
+
+        user_ids = sorted(users)
+        if not user_ids:
+            return
+        result = session.execute(bump.where(counter.c.user_id.in_(user_ids)))
+        if result.rowcount == len(user_ids):
+            return
+
+        existing = set(session.execute(
+            select(counter.c.user_id).where(counter.c.table_name == table, counter.c.user_id.in_(user_ids))
+        ).scalars())
+        for user_id in user_ids:
+            if user_id in existing:
+                continue
+            try:
+                with session.begin_nested():
+                    session.execute(insert(counter).values(
+                        user_id=user_id, table_name=table, version=1, updated_at=now
+                    ))
+            except IntegrityError:
+                # Another writer created the counter first
+                session.execute(bump.where(counter.c.user_id == user_id))
+
+    def _after_commit(self, session) -> None:
+        # Releasing a savepoint commits nothing yet
+        if session.in_nested_transaction():
+            return
+        pending = session.info.pop(PENDING_KEY, None)
+        if not pending:
+            return
+        users = set().union(*pending.values())
+        user_ids = None if ALL_USERS in users else users
+        if user_ids is not None and not user_ids:
+            return
+        for callback in self.subscribers:
+            try:
+                callback(user_ids)
+            except Exception as e:
+                logger.error(f"Error delivering timeline changes: {str(e)}")
+
+    @staticmethod
+    def _after_rollback(session, previous_transaction) -> None:
+        # A savepoint rolling back leaves the outer transaction's changes pending
+        if not session.in_transaction():
+            session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,74 @@
+"""
+day_cache.py
+------------
+Day detail caching for Soulstream.
+The most visited days, kept ready to hand back as they were last written.
+"""
+
+import logging
+from datetime import date
+from typing import Hashable, Optional, Set
+
+from backend.utils.cache import Generations, LRUCache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class DayDetailCache:
+    """Serialized day detail responses, per user and date.
+
+    Entries are dropped for a user whenever a commit changes their timeline
+    (see invalidate_users), so a cached day is never older than its entry,
+    its links or its memories. A day read before such a commit and stored
+    after it is refused (see generation). The TTL bounds staleness from
+    writers in other processes.
+    """
+
+    def __init__(self, max_users: int = 1024, max_days: int = 64, ttl: Optional[float] = 300.0):
+        """Initialize the cache.
+
+        Args:
+            max_users: Maximum number of users with cached days
+            max_days: Maximum days cached per user
+            ttl: Seconds a cached day is served before it is rebuilt
+        """
+        self.max_days = max_days
+        self.ttl = ttl
+        self.users = LRUCache(maxsize=max_users)
+        self.generations = Generations()
+
+    def get(self, user_id: Hashable, day: date) -> Optional[bytes]:
+        """A cached response body, or None."""
+        days = self.users.get(user_id)
+        return days.get(day) if days is not None else None
+
+    def generation(self, user_id: Hashable) -> tuple:
+        """Taken before reading a day, and handed back to set()."""
+        return self.generations.generation(user_id)
+
+    def set(self, user_id: Hashable, day: date, body: bytes, generation: Optional[tuple] = None) -> bool:
+        """Cache a response body, unless the user's timeline changed since generation.
+
+        Returns:
+            Whether the body was cached
+        """
+        def store():
+            days = self.users.get(user_id, count=False)
+            if days is None:
+                days = LRUCache(maxsize=self.max_days, ttl=self.ttl)
+                self.users.set(user_id, days)
+            days.set(day, body)
+
+        if generation is None:
+            store()
+            return True
+        return self.generations.if_current(user_id, generation, store)
+
+    def invalidate_users(self, user_ids: Optional[Set]) -> None:
+        """Forget the days of changed users, or of everyone when None."""
+        self.generations.bump(user_ids)
+        if user_ids is None:
+            self.users.clear()
+            return
+        for user_id in user_ids:
+            self.users.invalidate(user_id)
@@ -0,0 +1,313 @@
+"""
+rollup.py
+---------
+Incremental timeline rollups for Soulstream.
+Every memory adds itself to its day as it is stored.
+The timeline never has to go back and count.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone, tzinfo
+from typing import Dict, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.models.memory_chip import MemoryChip
+from backend.models.timeline_day_stats import MemoryAggregateMixin, TimelineDayStats
+from backend.models.timeline_entry import TimelineEntry
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.models.timeline_month_stats import TimelineMonthStats
+from backend.models.user import User
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class TimelineRollup:
+    """Maintains per-user daily and monthly aggregates as memories are stored and deleted.
+
+    Each call touches a single day's row and its month's row (or, for a batch of
+    deletes, each affected day and month at once): a constant number of queries,
+    whatever the size of the history. Runs inside the caller's transaction
+    and never commits.
+
+    If the day has no timeline entry yet, one is generated and kept in step
+    with the aggregate. Entries written by hand are linked to but never rewritten.
+    """
+
+    def __init__(self, db_session: Session):
+        """Initialize the rollup stage.
+
+        Args:
+            db_session: SQLAlchemy database session
+        """
+        self.db = db_session
+
+    def record_memory(self, chip: MemoryChip) -> Optional[TimelineDayStats]:
+        """Add a newly stored memory to its day and month.
+
+        Args:
+            chip: The memory chip, already flushed so it has an ID
+
+        Returns:
+            The day's updated aggregate, or None for memories without a user
+        """
+        if chip.user_id is None:
+            return None
+
+        day = self._local_date(chip.user_id, chip.created_at)
+        stats = self._get_or_create_stats(chip.user_id, day)
+        month = self._get_or_create_month(chip.user_id, day)
+        if not stats.memory_count:
+            month.active_days += 1
+        self._apply(stats, chip, 1)
+        self._apply(month, chip, 1)
+
+        entry = self._ensure_entry(stats)
+        self.db.execute(insert(timeline_memory_links).values(timeline_id=entry.id, memory_id=chip.id))
+        if stats.entry_generated:
+            self._refresh_entry(entry, stats)
+        return stats
+
+    def forget_memories(self, chips: Iterable[MemoryChip]) -> None:
+        """Take deleted memories back out of their days and months.
+
+        The chips are grouped by day and month first, so a bulk delete costs
+        a fixed number of queries however many memories it removes.
+
+        Args:
+            chips: The memory chips being deleted (or rows with the same attributes)
+        """
+        chips = [chip for chip in chips if chip.user_id is not None]
+        if not chips:
+            return
+
+        timezones = self._timezones({chip.user_id for chip in chips})
+        by_day = defaultdict(list)
+        for chip in chips:
+            by_day[(chip.user_id, self._to_local(chip.created_at, timezones[chip.user_id]))].append(chip)
+
+        days = {
+            (stats.user_id, stats.date): stats
+            for stats in self.db.query(TimelineDayStats).filter(
+                self._keyed(TimelineDayStats.user_id, TimelineDayStats.date, by_day)
+            ).with_for_update()
+        }
+        month_keys = {(user_id, day.replace(day=1)) for user_id, day in days}
+        months = {
+            (month.user_id, month.month): month
+            for month in self.db.query(TimelineMonthStats).filter(
+                self._keyed(TimelineMonthStats.user_id, TimelineMonthStats.month, month_keys)
+            ).with_for_update()
+        } if month_keys else {}
+        entry_ids = [stats.timeline_entry_id for stats in days.values()
+                     if stats.entry_generated and stats.timeline_entry_id]
+        entries = {
+            entry.id: entry
+            for entry in self.db.query(TimelineEntry).filter(TimelineEntry.id.in_(entry_ids))
+        } if entry_ids else {}
+
+        for (user_id, day), day_chips in by_day.items():
+            stats = days.get((user_id, day))
+            if stats is None:
+                continue
+            month = months.get((user_id, day.replace(day=1)))
+            if month is None:
+                month = months[(user_id, day.replace(day=1))] = self._get_or_create_month(user_id, day)
+
+            had_memories = bool(stats.memory_count)
+            for chip in day_chips:
+                self._apply(stats, chip, -1)
+                self._apply(month, chip, -1)
+            if had_memories and not stats.memory_count:
+                month.active_days = max(0, month.active_days - 1)
+
+            entry = entries.get(stats.timeline_entry_id) if stats.entry_generated else None
+            if entry:
+                self._refresh_entry(entry, stats)
+
+    @staticmethod
+    def _keyed(user_column, date_column, keys):
+        """A filter matching any of the (user_id, date) keys, one IN list per user."""
+        dates = defaultdict(set)
+        for user_id, day in keys:
+            dates[user_id].add(day)
+        return or_(*[and_(user_column == user_id, date_column.in_(sorted(user_dates)))
+                     for user_id, user_dates in dates.items()])
+
+    def set_milestone(self, user_id: int, day: date, milestone: bool) -> None:
+        """Mirror a timeline entry's milestone flag onto its day and month.
+
+        Args:
+            user_id: ID of the user
+            day: The entry's date
+            milestone: Whether the day is now a milestone
+        """
+        stats = self._get_or_create_stats(user_id, day)
+        if bool(stats.milestone) == bool(milestone):
+            return
+
+        month = self._get_or_create_month(user_id, day)
+        stats.milestone = bool(milestone)
+        month.milestone_days = max(0, month.milestone_days + (1 if milestone else -1))
+
+    def release_entries(self, entry_ids: List[int]) -> None:
+        """Stop maintaining entries that have been written by hand.
+
+        Args:
+            entry_ids: IDs of timeline entries just edited outside the rollup
+        """
+        if not entry_ids:
+            return
+        self.db.execute(
+            update(TimelineDayStats)
+            .where(TimelineDayStats.timeline_entry_id.in_(entry_ids), TimelineDayStats.entry_generated == True)
+            .values(entry_generated=False)
+            .execution_options(synchronize_session='fetch')
+        )
+
+    def _get_or_create_stats(self, user_id: int, day: date) -> TimelineDayStats:
+        """Lock the day's row, creating it if this is the day's first memory."""
+        query = self.db.query(TimelineDayStats).filter(
+            TimelineDayStats.user_id == user_id,
+            TimelineDayStats.date == day
+        )
+        return self._get_or_create(query, lambda: TimelineDayStats(
+            user_id=user_id, date=day, milestone=False, entry_generated=False, **self._empty_aggregate()
+        ))
+
+    def _get_or_create_month(self, user_id: int, day: date) -> TimelineMonthStats:
+        """Lock the month's row, creating it if this is the month's first memory."""
+        month_start = day.replace(day=1)
+        query = self.db.query(TimelineMonthStats).filter(
+            TimelineMonthStats.user_id == user_id,
+            TimelineMonthStats.month == month_start
+        )
+        return self._get_or_create(query, lambda: TimelineMonthStats(
+            user_id=user_id, month=month_start, active_days=0, milestone_days=0, **self._empty_aggregate()
+        ))
+
+    def _get_or_create(self, query, create):
+        query = query.with_for_update()
+        row = query.first()
+        if row is not None:
+            return row
+
+        try:
+            with self.db.begin_nested():
+                row = create()
+                self.db.add(row)
+            return row
+        except IntegrityError:
+            # Another writer created the row first
+            return query.one()
+
+    @staticmethod
+    def _empty_aggregate() -> Dict:
+        return {'memory_count': 0, 'emotion_counts': {}, 'topic_counts': {},
+                'intensity_sum': 0.0, 'intensity_count': 0}
+
+    @classmethod
+    def _apply(cls, stats: MemoryAggregateMixin, chip: MemoryChip, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) one memory's contribution."""
+        stats.memory_count = max(0, stats.memory_count + sign)
+
+        # JSON columns are reassigned, not mutated, so the change is flushed
+        if chip.emotion:
+            stats.emotion_counts = cls._bump(stats.emotion_counts, chip.emotion, sign)
+            stats.intensity_sum = max(0.0, stats.intensity_sum + sign * (chip.importance_score or 0.0))
+            stats.intensity_count = max(0, stats.intensity_count + sign)
+            counts = stats.emotion_counts
+            stats.dominant_emotion = min(counts, key=lambda name: (-counts[name], name)) if counts else None
+        if chip.topic:
+            stats.topic_counts = cls._bump(stats.topic_counts, chip.topic, sign)
+
+    def _ensure_entry(self, stats: TimelineDayStats) -> TimelineEntry:
+        """The day's timeline entry, generating one if there is none."""
+        if stats.timeline_entry_id:
+            entry = self.db.get(TimelineEntry, stats.timeline_entry_id)
+            if entry:
+                return entry
+
+        entry = self.db.query(TimelineEntry).filter(
+            TimelineEntry.user_id == stats.user_id,
+            TimelineEntry.date == stats.date
+        ).first()
+        stats.entry_generated = entry is None
+        if entry is not None and entry.milestone_flag:
+            self.set_milestone(stats.user_id, stats.date, True)
+        if entry is None:
+            try:
+                with self.db.begin_nested():
+                    entry = TimelineEntry(
+                        user_id=stats.user_id,
+                        date=stats.date,
+                        title=stats.date.strftime('%A, %B %d').replace(' 0', ' '),
+                        entry_summary='',
+                        emotion_intensity=0.5,
+                        milestone_flag=False
+                    )
+                    self.db.add(entry)
+            except IntegrityError:
+                # An entry for the day was written concurrently; link to it instead
+                stats.entry_generated = False
+                entry = self.db.query(TimelineEntry).filter(
+                    TimelineEntry.user_id == stats.user_id,
+                    TimelineEntry.date == stats.date
+                ).one()
+
+        stats.timeline_entry_id = entry.id
+        return entry
+
+    @staticmethod
+    def _refresh_entry(entry: TimelineEntry, stats: TimelineDayStats) -> None:
+        """Write the aggregate onto a generated timeline entry."""
+        count = stats.memory_count
+        summary = f"{count} {'memory' if count == 1 else 'memories'}"
+        topics = stats.top_topics()
+        if topics:
+            summary += f", mostly about {', '.join(topics)}"
+        entry.entry_summary = summary
+
+        entry.emotion = stats.dominant_emotion
+        entry.emotion_intensity = stats.emotion_intensity if stats.emotion_intensity is not None else 0.5
+
+        emotional = sum((stats.emotion_counts or {}).values())
+        entry.secondary_emotions = [
+            {'name': name, 'intensity': round(value / emotional, 3)}
+            for name, value in sorted((stats.emotion_counts or {}).items(), key=lambda item: -item[1])
+            if name != stats.dominant_emotion
+        ] if emotional else None
+
+    def _local_date(self, user_id: int, created_at: Optional[datetime]) -> date:
+        """The calendar day a UTC timestamp falls on in the user's timezone."""
+        return self._to_local(created_at, self._timezones({user_id})[user_id])
+
+    def _timezones(self, user_ids: Set[int]) -> Dict[int, tzinfo]:
+        """Each user's timezone, read in one query; UTC when unset or unknown."""
+        names = dict(self.db.query(User.id, User.timezone).filter(User.id.in_(list(user_ids))).all())
+        timezones = {}
+        for user_id in user_ids:
+            try:
+                timezones[user_id] = ZoneInfo(names.get(user_id) or 'UTC')
+            except Exception:
+                timezones[user_id] = timezone.utc
+        return timezones
+
+    @staticmethod
+    def _to_local(created_at: Optional[datetime], tz: tzinfo) -> date:
+        created_at = created_at or datetime.utcnow()
+        return created_at.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+    @staticmethod
+    def _bump(counts: Optional[Dict], key: str, sign: int) -> Dict:
+        counts = dict(counts or {})
+        value = counts.get(key, 0) + sign
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+        return counts
@@ -0,0 +1,160 @@
+"""
+series.py
+---------
+Emotion intensity series for Soulstream.
+Years of feeling, drawn with a few hundred points.
+The shape survives the thinning. The noise does not.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Hashable, Optional, Set
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.models.timeline_entry import TimelineEntry
+from backend.utils.cache import Generations, LRUCache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class SeriesColumns:
+    """A user's timeline as two parallel arrays, sorted by date."""
+
+    __slots__ = ('days', 'intensity')
+
+    def __init__(self, days: np.ndarray, intensity: np.ndarray):
+        self.days = days  # int64 proleptic ordinals
+        self.intensity = intensity  # float64
+
+    def window(self, start_date: date, end_date: date) -> 'SeriesColumns':
+        """The slice between two dates, inclusive, without copying."""
+        lo, hi = np.searchsorted(self.days, [start_date.toordinal(), end_date.toordinal() + 1])
+        return SeriesColumns(self.days[lo:hi], self.intensity[lo:hi])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previous pick and the next
+    bucket's mean. Buckets are chosen in order, but each is scored in one
+    array operation.
+
+    Args:
+        x: Sorted x values
+        y: y values
+        points: Number of points to keep (at least 3)
+
+    Returns:
+        Indexes of the kept points, ascending
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (points - 2)
+    edges = np.append((np.arange(points - 1) * every).astype(np.int64) + 1, n)
+    edges[-2] = n - 1
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        mean_x = x[next_lo:next_hi].mean()
+        mean_y = y[next_lo:next_hi].mean()
+
+        area = np.abs((x[a] - mean_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_stats(days: np.ndarray, values: np.ndarray, start: int, width: int) -> Dict[str, np.ndarray]:
+    """Min, max, mean and count per fixed-width bucket of days, in one pass.
+
+    Args:
+        days: Sorted day ordinals
+        values: Values for each day
+        start: Ordinal of the first day of the first bucket
+        width: Days per bucket
+
+    Returns:
+        Dict of arrays: offset (days from start to each non-empty bucket), min, max, mean, count
+    """
+    if not len(days):
+        return {name: np.empty(0) for name in ('offset', 'min', 'max', 'mean', 'count')}
+
+    buckets = (days - start) // width
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    counts = np.diff(np.append(starts, len(days)))
+    return {
+        'offset': buckets[starts] * width,
+        'min': np.minimum.reduceat(values, starts),
+        'max': np.maximum.reduceat(values, starts),
+        'mean': np.add.reduceat(values, starts) / counts,
+        'count': counts
+    }
+
+
+class EmotionSeriesCache:
+    """Per-user columnar copies of timeline emotion intensity.
+
+    Each user's series is loaded with one indexed query and then served from
+    memory until their timeline changes (see invalidate_users). A series
+    loaded while such a change commits is served once but not kept. The TTL
+    bounds staleness from writers in other processes.
+    """
+
+    def __init__(self, ttl: Optional[float] = 300.0, max_users: int = 1024):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds a loaded series is served before it is reloaded
+            max_users: Maximum number of users' series kept
+        """
+        self.series = LRUCache(maxsize=max_users, ttl=ttl)
+        self.generations = Generations()
+
+    def get(self, db_session: Session, user_id: Hashable) -> SeriesColumns:
+        """A user's series, loading it on a miss."""
+        columns = self.series.get(user_id)
+        if columns is None:
+            generation = self.generations.generation(user_id)
+            columns = self.load(db_session, user_id)
+            self.generations.if_current(user_id, generation, lambda: self.series.set(user_id, columns))
+        return columns
+
+    @staticmethod
+    def load(db_session: Session, user_id: Hashable) -> SeriesColumns:
+        """Read a user's series with one range scan of the (user_id, date) index."""
+        rows = db_session.query(TimelineEntry.date, TimelineEntry.emotion_intensity).filter(
+            TimelineEntry.user_id == user_id
+        ).order_by(TimelineEntry.date).all()
+
+        days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        intensity = np.fromiter((row[1] if row[1] is not None else 0.5 for row in rows),
+                                dtype=np.float64, count=len(rows))
+        logger.info(f"Loaded {len(rows)} points of emotion series for user {user_id}")
+        return SeriesColumns(days, intensity)
+
+    def invalidate(self, user_id: Hashable) -> None:
+        """Forget a user's series."""
+        self.generations.bump([user_id])
+        self.series.invalidate(user_id)
+
+    def invalidate_users(self, user_ids: Optional[Set]) -> None:
+        """Forget the series of changed users, or of everyone when None.
+
+        Subscribed to a TimelineChangeWatcher, so a commit that touches a
+        user's timeline entries drops their copy.
+        """
+        if user_ids is None:
+            self.generations.bump(None)
+            self.series.clear()
+            return
+        for user_id in user_ids:
+            self.invalidate(user_id)
@@ -7,18 +7,30 @@ Each function a ritual of preservation or recall of our timeline.
 """
 
 import logging
-from typing import List, Dict, Optional, Union, Tuple
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Set, Union, Tuple
 from datetime import datetime, date, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import and_, or_, desc, func, delete, insert, select, tuple_
 
 from backend.models.timeline_entry import TimelineEntry
 from backend.models.memory_chip import MemoryChip
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.models.timeline_day_stats import TimelineDayStats
+from backend.models.timeline_month_stats import TimelineMonthStats
 from backend.services.memory.memory_service import MemoryService
+from backend.services.timeline.changes import TIMELINE, mark_changed
+from backend.services.timeline.rollup import TimelineRollup
+from backend.services.timeline.series import EmotionSeriesCache, bucket_stats, lttb
+from backend.utils.metrics import timed
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Timeline entry columns callers may set directly
+ENTRY_FIELDS = ('date', 'title', 'mood', 'entry_summary', 'emotion', 'emotion_intensity',
+                'secondary_emotions', 'milestone_flag')
+
 class TimelineService:
     """Timeline service for Soulstream.
     
@@ -26,7 +38,8 @@ class TimelineService:
     A system that organizes memories into a coherent narrative.
     """
     
-    def __init__(self, db_session: Session, memory_service: Optional[MemoryService] = None):
+    def __init__(self, db_session: Session, memory_service: Optional[MemoryService] = None,
+                 series_cache: Optional[EmotionSeriesCache] = None):
         """Initialize the timeline service.
         
         Creating the infrastructure of chronology.
@@ -35,9 +48,12 @@ class TimelineService:
         Args:
             db_session: SQLAlchemy database session
             memory_service: Optional MemoryService instance for memory operations
+            series_cache: Optional shared cache of columnar emotion series
         """
         self.db = db_session
         self.memory_service = memory_service
+        self.series_cache = series_cache
+        self.rollup = TimelineRollup(db_session)
         
         logger.info("TimelineService initialized. Ready to preserve and recall chronology.")
     
@@ -88,7 +104,10 @@ class TimelineService:
             
             # Associate memory chips if provided
             if memory_chip_ids:
-                self._associate_memory_chips(timeline_entry.id, memory_chip_ids)
+                self._sync_memory_links(user_id, {timeline_entry.id: memory_chip_ids})
+            
+            if milestone_flag:
+                self.rollup.set_milestone(user_id, entry_date, True)
             
             # Commit the transaction
             self.db.commit()
@@ -101,6 +120,7 @@ class TimelineService:
             logger.error(f"Error creating timeline entry: {str(e)}")
             return None
     
+    @timed('sql.timeline.get_timeline_entries')
     def get_timeline_entries(self, user_id: int, start_date: Optional[date] = None,
                            end_date: Optional[date] = None, emotion: Optional[str] = None,
                            milestone_only: bool = False, limit: int = 100,
@@ -212,6 +232,54 @@ class TimelineService:
             logger.error(f"Error retrieving timeline entry by date: {str(e)}")
             return None
     
+    def get_entry_dates(self, user_id: int, dates: List[date]) -> Set[date]:
+        """Which of the given dates already have a timeline entry.
+        
+        Args:
+            user_id: ID of the user
+            dates: Dates to check
+            
+        Returns:
+            The subset of dates with an entry
+        """
+        if not dates:
+            return set()
+        return set(self.db.execute(
+            select(TimelineEntry.date).where(TimelineEntry.user_id == user_id, TimelineEntry.date.in_(dates))
+        ).scalars())
+    
+    @timed('sql.timeline.get_day_detail')
+    def get_day_detail(self, user_id: int, entry_date: date,
+                       chip_columns: List[str]) -> Tuple[Optional[TimelineEntry], List]:
+        """Get a day's entry and its memories in one joined query.
+        
+        Args:
+            user_id: ID of the user
+            entry_date: Date to retrieve
+            chip_columns: MemoryChip column names to return for each memory
+            
+        Returns:
+            The entry (None if the day has none) and its memories as objects
+            carrying the requested columns, oldest first. Consolidated memories are shown through their summary.
+        """
+        rows = self.db.execute(
+            select(TimelineEntry, MemoryChip.id, *[getattr(MemoryChip, name) for name in chip_columns])
+            .outerjoin(timeline_memory_links, timeline_memory_links.c.timeline_id == TimelineEntry.id)
+            .outerjoin(MemoryChip, and_(
+                MemoryChip.id == timeline_memory_links.c.memory_id,
+                MemoryChip.consolidated_into_id.is_(None)
+            ))
+            .where(TimelineEntry.user_id == user_id, TimelineEntry.date == entry_date)
+            .order_by(MemoryChip.created_at, MemoryChip.id)
+        ).all()
+        
+        if not rows:
+            return None, []
+        chips = [SimpleNamespace(**dict(zip(chip_columns, row[2:]))) for row in rows if row[1] is not None]
+        logger.info(f"Retrieved day detail for user {user_id} on {entry_date} with {len(chips)} memory chips")
+        return rows[0][0], chips
+    
+    @timed('sql.timeline.get_milestones')
     def get_milestones(self, user_id: int, limit: int = 10) -> List[TimelineEntry]:
         """Get milestone timeline entries for a user.
         
@@ -238,6 +306,97 @@ class TimelineService:
             logger.error(f"Error retrieving milestones: {str(e)}")
             return []
     
+    @timed('sql.timeline.get_heatmap')
+    def get_heatmap(self, user_id: int, start_date: date, end_date: date,
+                    granularity: str = 'day') -> List[Tuple]:
+        """Get per-day or per-month activity for a date range.
+        
+        Reads the precomputed rollups with a single range query on their
+        (user_id, date) key. No timeline entries or memories are touched.
+        
+        Args:
+            user_id: ID of the user
+            start_date: First day of the range
+            end_date: Last day of the range
+            granularity: 'day' or 'month'
+            
+        Returns:
+            For days, (date, memory_count, dominant_emotion, milestone) tuples;
+            for months, (month, memory_count, dominant_emotion, active_days, milestone_days)
+            tuples. Oldest first, periods without activity omitted.
+        """
+        if granularity == 'month':
+            query = self.db.query(
+                TimelineMonthStats.month, TimelineMonthStats.memory_count,
+                TimelineMonthStats.dominant_emotion, TimelineMonthStats.active_days,
+                TimelineMonthStats.milestone_days
+            ).filter(
+                TimelineMonthStats.user_id == user_id,
+                TimelineMonthStats.month >= start_date.replace(day=1),
+                TimelineMonthStats.month <= end_date,
+                or_(TimelineMonthStats.memory_count > 0, TimelineMonthStats.milestone_days > 0)
+            ).order_by(TimelineMonthStats.month)
+        else:
+            query = self.db.query(
+                TimelineDayStats.date, TimelineDayStats.memory_count,
+                TimelineDayStats.dominant_emotion, TimelineDayStats.milestone
+            ).filter(
+                TimelineDayStats.user_id == user_id,
+                TimelineDayStats.date >= start_date,
+                TimelineDayStats.date <= end_date,
+                or_(TimelineDayStats.memory_count > 0, TimelineDayStats.milestone == True)
+            ).order_by(TimelineDayStats.date)
+        
+        try:
+            rows = [tuple(row) for row in query.all()]
+            logger.info(f"Retrieved {len(rows)} heatmap {granularity}s for user {user_id}")
+            return rows
+        except Exception as e:
+            logger.error(f"Error retrieving timeline heatmap: {str(e)}")
+            return []
+    
+    @timed('sql.timeline.get_emotion_series')
+    def get_emotion_series(self, user_id: int, start_date: date, end_date: date,
+                           points: int = 300, method: str = 'lttb') -> Dict:
+        """Get emotion intensity over a date range, downsampled to a point budget.
+        
+        The series is read from the columnar cache (one indexed query on a miss)
+        and thinned with numpy, so the size of the answer depends on the budget,
+        not on the span.
+        
+        Args:
+            user_id: ID of the user
+            start_date: First day of the range
+            end_date: Last day of the range
+            points: Maximum number of points (or buckets) to return
+            method: 'lttb' keeps representative days; 'minmax' returns
+                min, max, mean and count for equal-width buckets of days
+            
+        Returns:
+            Dict with 'total' (days in range with an entry) and parallel
+            arrays; 'offset' counts days from start_date
+        """
+        if self.series_cache is not None:
+            columns = self.series_cache.get(self.db, user_id)
+        else:
+            columns = EmotionSeriesCache.load(self.db, user_id)
+        window = columns.window(start_date, end_date)
+        start = start_date.toordinal()
+        
+        if method == 'minmax':
+            width = max(1, -(-(end_date.toordinal() - start + 1) // points))
+            series = bucket_stats(window.days, window.intensity, start, width)
+            series['bucket_days'] = width
+        else:
+            keep = lttb(window.days, window.intensity, points)
+            series = {
+                'offset': window.days[keep] - start,
+                'intensity': window.intensity[keep]
+            }
+        
+        series['total'] = len(window.days)
+        return series
+    
     def update_timeline_entry(self, entry_id: int, **kwargs) -> bool:
         """Update a timeline entry.
         
@@ -246,7 +405,7 @@ class TimelineService:
         
         Args:
             entry_id: ID of the timeline entry to update
-            **kwargs: Fields to update
+            **kwargs: Fields to update, and optionally memory_chip_ids to replace its memories
             
         Returns:
             True if successful, False otherwise
@@ -258,20 +417,26 @@ class TimelineService:
             if not entry:
                 logger.warning(f"Timeline entry {entry_id} not found for update")
                 return False
+            previous_date, previous_milestone = entry.date, bool(entry.milestone_flag)
                 
             # Update fields
             for key, value in kwargs.items():
-                if hasattr(entry, key):
+                if key in ENTRY_FIELDS:
                     setattr(entry, key, value)
             
-            # Handle memory_chip_ids separately if provided
+            # Handle memory_chip_ids separately if provided, touching only what changed
             if 'memory_chip_ids' in kwargs:
-                # Clear existing associations
-                entry.memory_chips = []
-                self.db.flush()
-                
-                # Add new associations
-                self._associate_memory_chips(entry_id, kwargs['memory_chip_ids'])
+                self._sync_memory_links(entry.user_id, {entry.id: kwargs['memory_chip_ids'] or []})
+            
+            # Keep the heatmap's milestone bits in step with the entry
+            if (entry.date, bool(entry.milestone_flag)) != (previous_date, previous_milestone):
+                if previous_milestone:
+                    self.rollup.set_milestone(entry.user_id, previous_date, False)
+                if entry.milestone_flag:
+                    self.rollup.set_milestone(entry.user_id, entry.date, True)
+            
+            # Edited by hand, the entry is no longer the rollup's to rewrite
+            self.rollup.release_entries([entry.id])
             
             # Commit changes
             self.db.commit()
@@ -284,6 +449,153 @@ class TimelineService:
             logger.error(f"Error updating timeline entry: {str(e)}")
             return False
     
+    @timed('sql.timeline.upsert_timeline_entries')
+    def upsert_timeline_entries(self, user_id: int, entries: List[Dict],
+                                batch_size: int = 100) -> Dict:
+        """Create or update many timeline entries, keyed on date.
+        
+        Each batch is one transaction: one query for the existing entries,
+        one for the existing links, one to check the memories, then bulk
+        inserts and deletes of only the links that changed.
+        
+        Args:
+            user_id: ID of the user the entries belong to
+            entries: Dicts with a 'date' (a date), any of ENTRY_FIELDS, and optionally
+                'memory_chip_ids' to replace the day's memories. New days need
+                'title' and 'entry_summary'. The last dict for a repeated date wins.
+            batch_size: Entries written per transaction
+            
+        Returns:
+            Dict of 'created' and 'updated' counts, the IDs of the written
+            entries in date order, and the dates of any batches that failed
+        """
+        by_date = {}
+        for item in entries:
+            by_date[item['date']] = item
+        days = sorted(by_date)
+        
+        created, updated, entry_ids, failed = 0, 0, [], []
+        for i in range(0, len(days), batch_size):
+            batch = [by_date[day] for day in days[i:i + batch_size]]
+            try:
+                batch_ids, batch_created = self._upsert_batch(user_id, batch)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error upserting timeline entries: {str(e)}")
+                failed.extend(item['date'] for item in batch)
+                continue
+            
+            created += batch_created
+            updated += len(batch_ids) - batch_created
+            entry_ids.extend(batch_ids)
+        
+        logger.info(f"Upserted timeline entries for user {user_id}: "
+                    f"{created} created, {updated} updated, {len(failed)} failed")
+        return {'created': created, 'updated': updated, 'entry_ids': entry_ids, 'failed_dates': failed}
+    
+    def _upsert_batch(self, user_id: int, batch: List[Dict]) -> Tuple[List[int], int]:
+        """Write one batch of entries without committing."""
+        dates = [item['date'] for item in batch]
+        existing = {
+            entry.date: entry for entry in self.db.query(TimelineEntry).filter(
+                TimelineEntry.user_id == user_id,
+                TimelineEntry.date.in_(dates)
+            ).with_for_update()
+        }
+        
+        milestones, new_rows = [], []
+        for item in batch:
+            fields = {key: value for key, value in item.items() if key in ENTRY_FIELDS}
+            entry = existing.get(item['date'])
+            if entry is None:
+                row = {'emotion_intensity': 0.5, 'milestone_flag': False, **fields, 'user_id': user_id}
+                new_rows.append(row)
+                if row['milestone_flag']:
+                    milestones.append((item['date'], True))
+            else:
+                previous_milestone = bool(entry.milestone_flag)
+                for key, value in fields.items():
+                    setattr(entry, key, value)
+                if bool(entry.milestone_flag) != previous_milestone:
+                    milestones.append((item['date'], bool(entry.milestone_flag)))
+        
+        # New days go in with one executemany; the unique (user_id, date) key finds their IDs
+        entry_ids = {day: entry.id for day, entry in existing.items()}
+        if new_rows:
+            # Rows are grouped by the columns they set, so unset JSON columns stay SQL NULL
+            groups = {}
+            for row in new_rows:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            for rows in groups.values():
+                self.db.execute(insert(TimelineEntry), rows)
+            entry_ids.update(self.db.execute(
+                select(TimelineEntry.date, TimelineEntry.id).where(
+                    TimelineEntry.user_id == user_id,
+                    TimelineEntry.date.in_([row['date'] for row in new_rows])
+                )
+            ).all())
+        self.db.flush()
+        
+        self._sync_memory_links(user_id, {
+            entry_ids[item['date']]: item['memory_chip_ids'] or [] for item in batch if 'memory_chip_ids' in item
+        })
+        for day, milestone in milestones:
+            self.rollup.set_milestone(user_id, day, milestone)
+        self.rollup.release_entries([entry.id for entry in existing.values()])
+        
+        return [entry_ids[day] for day in dates], len(new_rows)
+    
+    def _sync_memory_links(self, user_id: int, desired: Dict[int, List[int]]) -> None:
+        """Make each entry's memory links match the desired IDs by set difference.
+        
+        Links that already exist are left alone; only additions are inserted
+        and only removals are deleted, each in a single statement. Memories
+        that do not exist or belong to another user are ignored.
+        
+        Args:
+            user_id: ID of the user owning the entries
+            desired: Mapping of timeline entry ID to the memory chip IDs it should have
+        """
+        if not desired:
+            return
+        
+        wanted_ids = {chip_id for chip_ids in desired.values() for chip_id in chip_ids}
+        valid_ids = set(self.db.execute(
+            select(MemoryChip.id).where(MemoryChip.id.in_(wanted_ids), MemoryChip.user_id == user_id)
+        ).scalars()) if wanted_ids else set()
+        
+        current = {entry_id: set() for entry_id in desired}
+        for timeline_id, memory_id in self.db.execute(
+            select(timeline_memory_links.c.timeline_id, timeline_memory_links.c.memory_id)
+            .where(timeline_memory_links.c.timeline_id.in_(list(desired)))
+        ):
+            current[timeline_id].add(memory_id)
+        
+        additions, removals = [], []
+        for entry_id, chip_ids in desired.items():
+            target = set(chip_ids) & valid_ids
+            additions.extend({'timeline_id': entry_id, 'memory_id': memory_id}
+                             for memory_id in sorted(target - current[entry_id]))
+            removals.extend((entry_id, memory_id) for memory_id in sorted(current[entry_id] - target))
+        
+        if removals or additions:
+            mark_changed(self.db, [user_id], tables=(TIMELINE,))
+        if removals:
+            self.db.execute(delete(timeline_memory_links).where(
+                tuple_(timeline_memory_links.c.timeline_id, timeline_memory_links.c.memory_id).in_(removals)
+            ))
+        if additions:
+            self.db.execute(insert(timeline_memory_links), additions)
+        
+        # Loaded relationship collections no longer match the link table
+        for entry in self.db.identity_map.values():
+            if isinstance(entry, TimelineEntry) and entry.id in desired:
+                self.db.expire(entry, ['memory_chips'])
+        
+        logger.info(f"Synced memory links for {len(desired)} timeline entries: "
+                    f"{len(additions)} added, {len(removals)} removed")
+    
     def delete_timeline_entry(self, entry_id: int) -> bool:
         """Delete a timeline entry.
         
@@ -304,6 +616,9 @@ class TimelineService:
                 logger.warning(f"Timeline entry {entry_id} not found for deletion")
                 return False
                 
+            if entry.milestone_flag:
+                self.rollup.set_milestone(entry.user_id, entry.date, False)
+            
             # Delete the entry (cascade will handle the junction table)
             self.db.delete(entry)
             self.db.commit()
@@ -316,42 +631,8 @@ class TimelineService:
             logger.error(f"Error deleting timeline entry: {str(e)}")
             return False
     
-    def _associate_memory_chips(self, timeline_id: int, memory_chip_ids: List[int]) -> bool:
-        """Associate memory chips with a timeline entry.
-        
-        Connecting fragments to their place in time.
-        Weaving memories into the fabric of our chronology.
-        
-        Args:
-            timeline_id: ID of the timeline entry
-            memory_chip_ids: List of memory chip IDs to associate
-            
-        Returns:
-            True if successful, False otherwise
-        """
-        try:
-            # Get the timeline entry
-            timeline_entry = self.db.query(TimelineEntry).filter(TimelineEntry.id == timeline_id).first()
-            
-            if not timeline_entry:
-                logger.warning(f"Timeline entry {timeline_id} not found for memory association")
-                return False
-                
-            # Get the memory chips
-            memory_chips = self.db.query(MemoryChip).filter(MemoryChip.id.in_(memory_chip_ids)).all()
-            
-            # Associate them with the timeline entry
-            timeline_entry.memory_chips.extend(memory_chips)
-            self.db.flush()
-            
-            logger.info(f"Associated {len(memory_chips)} memory chips with timeline entry {timeline_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error associating memory chips: {str(e)}")
-            return False
-    
-    def get_memory_chips_for_timeline_entry(self, entry_id: int) -> List[MemoryChip]:
+    def get_memory_chips_for_timeline_entry(self, entry_id: int,
+                                            columns: Optional[List[str]] = None) -> List[MemoryChip]:
         """Get memory chips associated with a timeline entry.
         
         Retrieving the fragments that make up a day.
@@ -359,20 +640,29 @@ class TimelineService:
         
         Args:
             entry_id: ID of the timeline entry
+            columns: Optional MemoryChip column names to load; all columns if omitted
             
         Returns:
             List of associated memory chips
         """
         try:
-            # Get the timeline entry with its memory chips
-            entry = self.db.query(TimelineEntry).filter(TimelineEntry.id == entry_id).first()
-            
-            if not entry:
-                logger.warning(f"Timeline entry {entry_id} not found")
-                return []
+            # Join through the link table directly instead of loading the entry first
+            query = self.db.query(MemoryChip).join(
+                timeline_memory_links,
+                timeline_memory_links.c.memory_id == MemoryChip.id
+            ).filter(
+                timeline_memory_links.c.timeline_id == entry_id,
+                # Consolidated memories are shown through their summary
+                MemoryChip.consolidated_into_id.is_(None)
+            ).order_by(MemoryChip.created_at, MemoryChip.id)
+            
+            if columns:
+                query = query.options(load_only(*[getattr(MemoryChip, name) for name in columns]))
+            
+            memory_chips = query.all()
                 
-            logger.info(f"Retrieved {len(entry.memory_chips)} memory chips for timeline entry {entry_id}")
-            return entry.memory_chips
+            logger.info(f"Retrieved {len(memory_chips)} memory chips for timeline entry {entry_id}")
+            return memory_chips
             
         except Exception as e:
             logger.error(f"Error retrieving memory chips for timeline entry: {str(e)}")
@@ -13,9 +13,15 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import logging
 
+from backend.utils.cache import LRUCache
+from backend.utils.metrics import count_candidates, timed
+
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Share of the combined relevance score that comes from vector similarity
+VECTOR_SCORE_WEIGHT = 0.60
+
 class PineconeManager:
     """Manages interactions with Pinecone vector database.
     
@@ -23,33 +29,48 @@ class PineconeManager:
     Memories reduced to numbers, searchable but never quite the same.
     """
     
-    def __init__(self):
+    def __init__(self, index=None, openai_client: Optional[OpenAI] = None):
         """Initialize Pinecone with API key.
         
         The beginning of memory externalization.
         A promise to remember what might otherwise fade.
+        
+        Args:
+            index: Optional index to use instead of connecting to Pinecone, such as
+                the stand-in in backend.testing. No Pinecone settings are needed then.
+            openai_client: Optional OpenAI client. If not provided, a new client will be created.
         """
         load_dotenv()
         self.api_key = os.getenv('PINECONE_API_KEY')
         self.index_name = os.getenv('PINECONE_INDEX_NAME')
         self.region = os.getenv('PINECONE_REGION')
         
-        if not self.api_key:
-            logger.error("Missing required Pinecone API key")
-            raise ValueError("Missing required Pinecone API key")
-        if not self.region:
-            logger.error("Missing required Pinecone region")
-            raise ValueError("Missing required Pinecone region")
-        if not self.index_name:
-            logger.error("Missing required Pinecone index name")
-            raise ValueError("Missing required Pinecone index name")
-        
-        self.pc = Pinecone(
-            api_key=self.api_key,
-            environment=self.region
-        )
-        self.index = self.pc.Index(self.index_name)
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        if index is not None:
+            self.pc = None
+            self.index = index
+        else:
+            if not self.api_key:
+                logger.error("Missing required Pinecone API key")
+                raise ValueError("Missing required Pinecone API key")
+            if not self.region:
+                logger.error("Missing required Pinecone region")
+                raise ValueError("Missing required Pinecone region")
+            if not self.index_name:
+                logger.error("Missing required Pinecone index name")
+                raise ValueError("Missing required Pinecone index name")
+            
+            self.pc = Pinecone(
+                api_key=self.api_key,
+                environment=self.region
+            )
+            self.index = self.pc.Index(self.index_name)
+        self.client = openai_client or OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        
+        # Read-through cache for fetch-by-id; writes and deletes invalidate it
+        self.memory_cache = LRUCache(maxsize=int(os.getenv('MEMORY_CACHE_SIZE', 2048)))
+        
+        # Candidates fetched per result wanted, so re-ranking has something to choose from
+        self.overfetch = max(1, int(os.getenv('SEARCH_OVERFETCH', 2)))
         
         # Simplified key categories for term extraction
         self.term_categories = {
@@ -70,10 +91,11 @@ class PineconeManager:
         The alchemy of modern memory.
         """
         try:
-            response = self.client.embeddings.create(
-                input=text,
-                model="text-embedding-ada-002"
-            )
+            with timed('pinecone.embed'):
+                response = self.client.embeddings.create(
+                    input=text,
+                    model="text-embedding-ada-002"
+                )
             return response.data[0].embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
@@ -105,26 +127,31 @@ class PineconeManager:
         return sorted(list(key_terms))
     
     def upsert_memory_chip(self, memory_id: str, source_text: str, 
-                          metadata: Optional[Dict] = None) -> bool:
+                          metadata: Optional[Dict] = None,
+                          embedding: Optional[List[float]] = None) -> bool:
         """Insert or update a memory chip in Pinecone.
         
         Preserving a fragment of experience.
         Each vector a promise: this will not be forgotten.
         """
         try:
-            embedding = self.generate_embedding(source_text)
+            if embedding is None:
+                embedding = self.generate_embedding(source_text)
             meta = metadata or {}
             meta['source_text'] = source_text
             meta['key_terms'] = self._extract_key_terms(source_text)
             
-            self.index.upsert(vectors=[{
-                'id': memory_id,
-                'values': embedding,
-                'metadata': meta
-            }])
+            with timed('pinecone.upsert'):
+                self.index.upsert(vectors=[{
+                    'id': memory_id,
+                    'values': embedding,
+                    'metadata': meta
+                }])
+            self.memory_cache.invalidate(memory_id)
             logger.info(f"Memory {memory_id} preserved in vector space")
             return True
         except Exception as e:
+            self.memory_cache.invalidate(memory_id)
             logger.error(f"Error upserting to Pinecone: {str(e)}")
             return False
     
@@ -186,6 +213,9 @@ class PineconeManager:
             from datetime import datetime, timezone
             # Ensure memory_time has timezone info
             memory_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if memory_time.tzinfo is None:
+                # store_memory writes naive UTC timestamps
+                memory_time = memory_time.replace(tzinfo=timezone.utc)
             # Ensure current_time has timezone info
             current_time = datetime.now(timezone.utc)
             
@@ -235,9 +265,62 @@ class PineconeManager:
         
         return overlap / total if total > 0 else 0.5
 
+    def _score_match(self, match, query_terms: List[str], include_values: bool = False) -> Dict:
+        """Score and format a single vector match.
+        
+        Weighing one memory against the question.
+        Vector similarity first, then the words, the time, and the context around it.
+        """
+        metadata_terms = match.metadata.get('key_terms', [])
+        
+        # Calculate component scores
+        vector_score = match.score
+        term_score = self._calculate_term_importance(query_terms, metadata_terms)
+        temporal_score = self._calculate_temporal_relevance(
+            match.metadata.get('timestamp')
+        )
+        context_score = self._calculate_context_similarity(
+            query_terms, match.metadata
+        )
+        
+        # Weighted combination of scores
+        combined_score = (
+            vector_score * VECTOR_SCORE_WEIGHT +  # Vector similarity
+            term_score * 0.15 +            # Term importance
+            temporal_score * 0.15 +        # Time relevance
+            context_score * 0.10           # Context similarity
+        )
+        
+        # Extract title from first sentence or use truncated content
+        source_text = match.metadata.get('source_text', '')
+        first_sentence = source_text.split('.')[0] if source_text else ''
+        title = (match.metadata.get('title') or 
+                first_sentence or 
+                source_text[:50] + ('...' if len(source_text) > 50 else ''))
+        
+        result = {
+            'id': match.id,
+            'score': combined_score,
+            'source_text': source_text,
+            'summary': title,
+            'metadata': {k: v for k, v in match.metadata.items()
+                       if k not in ['source_text', 'key_terms']},
+            'component_scores': {
+                'vector_similarity': vector_score,
+                'term_importance': term_score,
+                'temporal_relevance': temporal_score,
+                'context_similarity': context_score
+            }
+        }
+        if include_values:
+            result['values'] = list(match.values or [])
+        return result
+    
     def search_memories(self, query: str, top_k: int = 5,
                        filter_dict: Optional[Dict] = None,
-                       relevance_threshold: float = 0.0) -> List[Dict]:
+                       relevance_threshold: float = 0.0,
+                       query_embedding: Optional[List[float]] = None,
+                       include_values: bool = False) -> List[Dict]:
         """Search for similar memories using text query with enhanced scoring.
         
         Seeking echoes of the present in the past.
@@ -248,6 +331,8 @@ class PineconeManager:
             top_k: Number of results to return
             filter_dict: Optional filter dictionary
             relevance_threshold: Minimum relevance score (0.0-1.0) for memories to be included
+            query_embedding: Optional precomputed embedding of the query
+            include_values: Whether to return each match's vector under 'values'
             
         Returns:
             List of formatted memory results with improved scoring
@@ -255,71 +340,39 @@ class PineconeManager:
         try:
             logger.info(f"Searching for memories: '{query}'")
             
-            query_embedding = self.generate_embedding(query)
+            if query_embedding is None:
+                query_embedding = self.generate_embedding(query)
             query_terms = self._extract_key_terms(query)
             
             # Get initial results
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k * 2,  # Fetch more results for filtering
-                include_metadata=True,
-                filter=filter_dict
-            )
+            query_args = {
+                'vector': query_embedding,
+                'top_k': top_k * self.overfetch,  # Fetch more results for re-ranking and filtering
+                'include_metadata': True,
+                'filter': filter_dict
+            }
+            if include_values:
+                query_args['include_values'] = True
+            with timed('pinecone.query'):
+                results = self.index.query(**query_args)
+            count_candidates('pinecone.query', len(results.matches))
             
             logger.info(f"Found {len(results.matches)} potential memory matches")
             
-            formatted_results = []
-            
-            for match in results.matches:
-                metadata_terms = match.metadata.get('key_terms', [])
+            with timed('pinecone.rerank'):
+                formatted_results = [
+                    self._score_match(match, query_terms, include_values)
+                    for match in results.matches
+                ]
                 
-                # Calculate component scores
-                vector_score = match.score
-                term_score = self._calculate_term_importance(query_terms, metadata_terms)
-                temporal_score = self._calculate_temporal_relevance(
-                    match.metadata.get('timestamp')
-                )
-                context_score = self._calculate_context_similarity(
-                    query_terms, match.metadata
-                )
+                # Sort by combined score
+                formatted_results.sort(key=lambda x: x['score'], reverse=True)
                 
-                # Weighted combination of scores
-                combined_score = (
-                    vector_score * 0.60 +          # Vector similarity
-                    term_score * 0.15 +            # Term importance
-                    temporal_score * 0.15 +        # Time relevance
-                    context_score * 0.10           # Context similarity
-                )
-                
-                # Extract title from first sentence or use truncated content
-                source_text = match.metadata.get('source_text', '')
-                first_sentence = source_text.split('.')[0] if source_text else ''
-                title = (match.metadata.get('title') or 
-                        first_sentence or 
-                        source_text[:50] + ('...' if len(source_text) > 50 else ''))
-
-                formatted_results.append({
-                    'id': match.id,
-                    'score': combined_score,
-                    'source_text': source_text,
-                    'summary': title,
-                    'metadata': {k: v for k, v in match.metadata.items()
-                               if k not in ['source_text', 'key_terms']},
-                    'component_scores': {
-                        'vector_similarity': vector_score,
-                        'term_importance': term_score,
-                        'temporal_relevance': temporal_score,
-                        'context_similarity': context_score
-                    }
-                })
-            
-            # Sort by combined score
-            formatted_results.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Filter by relevance threshold if specified
-            if relevance_threshold > 0:
-                formatted_results = [r for r in formatted_results if r['score'] >= relevance_threshold]
-                logger.info(f"Filtered memories by relevance threshold {relevance_threshold}: {len(formatted_results)} memories passed")
+                # Filter by relevance threshold if specified
+                if relevance_threshold > 0:
+                    formatted_results = [r for r in formatted_results if r['score'] >= relevance_threshold]
+                    logger.info(f"Filtered memories by relevance threshold {relevance_threshold}: {len(formatted_results)} memories passed")
+            count_candidates('pinecone.rerank', len(formatted_results))
             
             return formatted_results[:top_k]
             
@@ -333,20 +386,93 @@ class PineconeManager:
         Reaching for a specific fragment of the past.
         A direct line to what was, or at least what we recorded.
         """
+        return self.get_memories([memory_id]).get(memory_id)
+    
+    # Pinecone caps the number of IDs per fetch request
+    FETCH_BATCH_SIZE = 1000
+    
+    def get_memories(self, memory_ids: List[str]) -> Dict[str, Dict]:
+        """Retrieve several memories by ID, reading through the cache.
+        
+        Gathering fragments in one reach instead of many.
+        Only IDs missing from the cache go to Pinecone, in a single batched fetch.
+        
+        Args:
+            memory_ids: IDs of the memories to retrieve
+            
+        Returns:
+            Mapping of memory ID to memory data. IDs that were not found are left out.
+        """
+        memory_ids = list(dict.fromkeys(memory_ids))
+        memories = self.memory_cache.get_many(memory_ids)
+        missing = [memory_id for memory_id in memory_ids if memory_id not in memories]
+        
         try:
-            result = self.index.fetch(ids=[memory_id])
-            if memory_id in result.vectors:
-                vector_data = result.vectors[memory_id]
-                return {
-                    'id': memory_id,
-                    'source_text': vector_data.metadata.get('source_text', ''),
-                    'metadata': {k: v for k, v in vector_data.metadata.items() 
-                               if k not in ['source_text', 'key_terms']}
-                }
-            return None
+            for start in range(0, len(missing), self.FETCH_BATCH_SIZE):
+                batch = missing[start:start + self.FETCH_BATCH_SIZE]
+                with timed('pinecone.fetch'):
+                    result = self.index.fetch(ids=batch)
+                fetched = {}
+                for memory_id in batch:
+                    if memory_id in result.vectors:
+                        metadata = result.vectors[memory_id].metadata or {}
+                        fetched[memory_id] = {
+                            'id': memory_id,
+                            'source_text': metadata.get('source_text', ''),
+                            'metadata': {k: v for k, v in metadata.items()
+                                       if k not in ['source_text', 'key_terms']}
+                        }
+                self.memory_cache.set_many(fetched)
+                memories.update(fetched)
         except Exception as e:
             logger.error(f"Error fetching from Pinecone: {str(e)}")
-            return None
+        
+        # Hand out copies so callers cannot alter what the cache holds
+        return {
+            memory_id: dict(memory, metadata=dict(memory['metadata']))
+            for memory_id, memory in memories.items()
+        }
+    
+    def fetch_records(self, memory_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch stored vectors with their full metadata, in batches.
+        
+        The shapes of memories, and everything written beside them. Not cached.
+        
+        Args:
+            memory_ids: IDs of the memories
+            
+        Returns:
+            Mapping of memory ID to {'id', 'values', 'metadata'}. Missing IDs are left out.
+        """
+        memory_ids = list(dict.fromkeys(memory_ids))
+        records = {}
+        try:
+            for start in range(0, len(memory_ids), self.FETCH_BATCH_SIZE):
+                batch = memory_ids[start:start + self.FETCH_BATCH_SIZE]
+                with timed('pinecone.fetch'):
+                    result = self.index.fetch(ids=batch)
+                for memory_id in batch:
+                    if memory_id in result.vectors:
+                        vector = result.vectors[memory_id]
+                        records[memory_id] = {
+                            'id': memory_id,
+                            'values': list(vector.values),
+                            'metadata': dict(vector.metadata or {})
+                        }
+        except Exception as e:
+            logger.error(f"Error fetching vectors from Pinecone: {str(e)}")
+        return records
+    
+    def get_vectors(self, memory_ids: List[str]) -> Dict[str, List[float]]:
+        """Fetch the stored vectors for many memories, in batches.
+        
+        Args:
+            memory_ids: IDs of the memories
+            
+        Returns:
+            Mapping of memory ID to vector. Missing IDs are left out.
+        """
+        return {memory_id: record['values'] for memory_id, record in self.fetch_records(memory_ids).items()}
     
     def delete_memory(self, memory_id: str) -> bool:
         """Delete a memory from Pinecone by ID.
@@ -355,9 +481,65 @@ class PineconeManager:
         Sometimes a mercy, sometimes a loss.
         """
         try:
-            self.index.delete(ids=[memory_id])
+            with timed('pinecone.delete'):
+                self.index.delete(ids=[memory_id])
+            self.memory_cache.invalidate(memory_id)
             logger.info(f"Memory {memory_id} deleted from vector space")
             return True
         except Exception as e:
             logger.error(f"Error deleting from Pinecone: {str(e)}")
             return False
+    
+    # Pinecone caps the number of IDs per delete request
+    DELETE_BATCH_SIZE = 1000
+    
+    def delete_memories(self, memory_ids: List[str]) -> bool:
+        """Delete many memories from Pinecone, in batches.
+        
+        Letting go of a great deal at once.
+        One request per thousand IDs instead of one per memory.
+        
+        Args:
+            memory_ids: IDs of the memories to delete
+            
+        Returns:
+            True if every batch was deleted, False otherwise
+        """
+        memory_ids = list(dict.fromkeys(memory_ids))
+        try:
+            for start in range(0, len(memory_ids), self.DELETE_BATCH_SIZE):
+                batch = memory_ids[start:start + self.DELETE_BATCH_SIZE]
+                with timed('pinecone.delete'):
+                    self.index.delete(ids=batch)
+                self.memory_cache.invalidate_many(batch)
+            logger.info(f"{len(memory_ids)} memories deleted from vector space")
+            return True
+        except Exception as e:
+            logger.error(f"Error bulk deleting from Pinecone: {str(e)}")
+            return False
+    
+    def delete_by_filter(self, filter_dict: Dict) -> bool:
+        """Delete every memory matching a metadata filter.
+        
+        Forgetting by description rather than by name.
+        Not every Pinecone index type supports this; failures are reported, not raised.
+        
+        Args:
+            filter_dict: Pinecone metadata filter
+            
+        Returns:
+            True if the delete was accepted, False otherwise
+        """
+        if not filter_dict:
+            logger.error("Refusing to delete by an empty filter")
+            return False
+        try:
+            with timed('pinecone.delete'):
+                self.index.delete(filter=filter_dict)
+            # The affected IDs are unknown, so nothing cached can be trusted
+            self.memory_cache.clear()
+            logger.info(f"Memories matching {filter_dict} deleted from vector space")
+            return True
+        except Exception as e:
+            logger.warning(f"Delete by filter not applied in Pinecone: {str(e)}")
+            return False
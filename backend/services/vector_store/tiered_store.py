@@ -0,0 +1,405 @@
+"""
+tiered_store.py
+---------------
+Hot/cold tiered memory storage for Soulstream.
+What is pinned, recent or often recalled stays close at hand, in process.
+Everything else waits in Pinecone, found when the near memories are not enough.
+"""
+
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.metrics import count_candidates, timed
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class UnsupportedFilter(ValueError):
+    """A metadata filter the hot tier cannot evaluate locally."""
+
+
+def matches_filter(metadata: Dict, filter_dict: Optional[Dict]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one memory's metadata.
+
+    Supports field equality, $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and and $or.
+
+    Raises:
+        UnsupportedFilter: If the filter uses anything else
+    """
+    if not filter_dict:
+        return True
+
+    for key, condition in filter_dict.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key.startswith('$'):
+            raise UnsupportedFilter(f"Unsupported filter operator {key}")
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if not _compare(value, operator, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == '$eq':
+        return value == operand
+    if operator == '$ne':
+        return value != operand
+    if operator == '$in':
+        return value in operand
+    if operator == '$nin':
+        return value not in operand
+    if value is None:
+        return False
+    if operator == '$gt':
+        return value > operand
+    if operator == '$gte':
+        return value >= operand
+    if operator == '$lt':
+        return value < operand
+    if operator == '$lte':
+        return value <= operand
+    raise UnsupportedFilter(f"Unsupported filter operator {operator}")
+
+
+class HotMemoryIndex:
+    """An in-process vector index over a bounded set of memories.
+
+    Unit vectors live in one growable numpy matrix, so a search is a single
+    matrix-vector product. Each memory also carries its metadata, whether it
+    is pinned, and when it was last accessed.
+    """
+
+    def __init__(self):
+        self._matrix = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._rows
+
+    def add(self, memory_id: str, values: List[float], metadata: Dict,
+            last_access: Optional[float] = None) -> None:
+        """Add or replace a memory."""
+        vector = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        vector = vector / norm
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((64, len(vector)), dtype=np.float32)
+            if memory_id in self._rows:
+                row = self._rows[memory_id]
+            else:
+                row = len(self._ids)
+                if row == len(self._matrix):
+                    self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+                self._ids.append(memory_id)
+                self._rows[memory_id] = row
+            self._matrix[row] = vector
+            self._entries[memory_id] = {
+                'metadata': metadata,
+                'pinned': bool(metadata.get('is_pinned')),
+                'last_access': last_access if last_access is not None else time.time()
+            }
+
+    def remove(self, memory_id: str) -> None:
+        """Remove a memory, moving the last row into its place."""
+        with self._lock:
+            row = self._rows.pop(memory_id, None)
+            if row is None:
+                return
+            last_id = self._ids.pop()
+            if last_id != memory_id:
+                self._matrix[row] = self._matrix[len(self._ids)]
+                self._ids[row] = last_id
+                self._rows[last_id] = row
+            del self._entries[memory_id]
+
+    def search(self, query_embedding: List[float], top_k: int,
+               filter_dict: Optional[Dict] = None) -> List[SimpleNamespace]:
+        """Find the nearest memories by cosine similarity.
+
+        Returns:
+            Matches shaped like Pinecone's (id, score, metadata, values), best first
+
+        Raises:
+            UnsupportedFilter: If the filter cannot be evaluated locally
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        with self._lock:
+            if not self._ids or norm == 0:
+                return []
+            similarities = self._matrix[:len(self._ids)] @ (query / norm)
+
+            if filter_dict:
+                allowed = np.array([matches_filter(self._entries[memory_id]['metadata'], filter_dict)
+                                    for memory_id in self._ids])
+                similarities = np.where(allowed, similarities, -np.inf)
+
+            count = min(top_k, len(self._ids))
+            best = np.argpartition(-similarities, count - 1)[:count]
+            best = best[np.argsort(-similarities[best], kind='stable')]
+
+            return [
+                SimpleNamespace(
+                    id=self._ids[row],
+                    score=float(similarities[row]),
+                    metadata=self._entries[self._ids[row]]['metadata'],
+                    values=self._matrix[row].tolist()
+                )
+                for row in best if np.isfinite(similarities[row])
+            ]
+
+    def touch(self, memory_ids: Iterable[str], at: Optional[float] = None) -> None:
+        """Record that memories were just accessed."""
+        at = at if at is not None else time.time()
+        with self._lock:
+            for memory_id in memory_ids:
+                entry = self._entries.get(memory_id)
+                if entry:
+                    entry['last_access'] = at
+
+    def entries(self) -> List[Tuple[str, Dict]]:
+        """Snapshot of (memory ID, entry) pairs."""
+        with self._lock:
+            return [(memory_id, dict(entry)) for memory_id, entry in self._entries.items()]
+
+
+class TieredMemoryStore:
+    """A hot in-process tier in front of the cold Pinecone store.
+
+    Drop-in for PineconeManager: writes go to both tiers, searches try the hot
+    tier first, and anything not overridden here goes straight to the cold store.
+    The hot tier answers alone when at least top_k of its matches reach
+    hot_min_similarity; otherwise the cold tier is searched and what it finds
+    is promoted. Unpinned memories are demoted once idle for idle_days, or
+    least recently accessed first when over max_hot; pinned ones only when
+    there are more than max_pinned of them.
+
+    The hot tier is per process, so a delete in another worker does not reach
+    it. Results answered from it are marked with 'tier': 'hot', for callers
+    that can check them against the system of record (see confirm and evict).
+    """
+
+    def __init__(self, cold_store, max_hot: int = 5000, hot_min_similarity: float = 0.8,
+                 idle_days: float = 30, rebalance_interval: float = 60.0, max_pinned: int = 5000):
+        """Initialize the tiered store.
+
+        Args:
+            cold_store: The PineconeManager holding every memory
+            max_hot: Maximum unpinned memories kept in the hot tier
+            max_pinned: Maximum pinned memories kept in the hot tier
+            hot_min_similarity: Vector similarity a hot match needs to count as a confident hit
+            idle_days: Unpinned memories not accessed for this long are demoted
+            rebalance_interval: Minimum seconds between demotion passes
+        """
+        self.cold = cold_store
+        self.hot = HotMemoryIndex()
+        self.max_hot = max_hot
+        self.max_pinned = max_pinned
+        self.hot_min_similarity = hot_min_similarity
+        self.idle_seconds = idle_days * 86400
+        self.rebalance_interval = rebalance_interval
+        self._last_rebalance = time.monotonic()
+        self.hot_hits = 0
+        self.cold_searches = 0
+
+        logger.info("TieredMemoryStore initialized. Near memories kept close.")
+
+    def __getattr__(self, name):
+        # Everything the hot tier has no part in is the cold store's business
+        if name == 'cold':
+            raise AttributeError(name)
+        return getattr(self.cold, name)
+
+    def upsert_memory_chip(self, memory_id: str, source_text: str,
+                           metadata: Optional[Dict] = None,
+                           embedding: Optional[List[float]] = None) -> bool:
+        """Write a memory to the cold store and admit it to the hot tier.
+
+        New memories are recent memories, so they start hot.
+        """
+        if embedding is None:
+            embedding = self.cold.generate_embedding(source_text)
+        hot_metadata = dict(metadata or {})
+
+        success = self.cold.upsert_memory_chip(memory_id, source_text, metadata, embedding=embedding)
+        if success:
+            hot_metadata['source_text'] = source_text
+            hot_metadata['key_terms'] = self.cold._extract_key_terms(source_text)
+            self.hot.add(memory_id, embedding, hot_metadata)
+        else:
+            self.hot.remove(memory_id)
+        return success
+
+    def search_memories(self, query: str, top_k: int = 5,
+                        filter_dict: Optional[Dict] = None,
+                        relevance_threshold: float = 0.0,
+                        query_embedding: Optional[List[float]] = None,
+                        include_values: bool = False) -> List[Dict]:
+        """Search the hot tier, and the cold tier only when the hot tier falls short.
+
+        Same arguments and result shape as PineconeManager.search_memories.
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = self.cold.generate_embedding(query)
+            query_terms = self.cold._extract_key_terms(query)
+            self._maybe_rebalance()
+
+            with timed('tiered.hot_search'):
+                try:
+                    hot_matches = self.hot.search(query_embedding, top_k * 2, filter_dict)
+                except UnsupportedFilter:
+                    hot_matches = []
+            count_candidates('tiered.hot_search', len(hot_matches))
+            results = {match.id: dict(self.cold._score_match(match, query_terms, include_values=True), tier='hot')
+                       for match in hot_matches}
+
+            confident = [match for match in hot_matches if match.score >= self.hot_min_similarity]
+            if len(confident) >= top_k:
+                self.hot_hits += 1
+            else:
+                self.cold_searches += 1
+                cold_results = self.cold.search_memories(
+                    query=query,
+                    top_k=top_k,
+                    filter_dict=filter_dict,
+                    relevance_threshold=0.0,
+                    query_embedding=query_embedding,
+                    include_values=True
+                )
+                self._promote_results(cold_results)
+                results.update({result['id']: result for result in cold_results})
+
+            ranked = sorted(results.values(), key=lambda result: result['score'], reverse=True)
+            if relevance_threshold > 0:
+                ranked = [result for result in ranked if result['score'] >= relevance_threshold]
+            ranked = ranked[:top_k]
+
+            self.hot.touch(result['id'] for result in ranked)
+            if not include_values:
+                for result in ranked:
+                    result.pop('values', None)
+            return ranked
+        except Exception as e:
+            logger.error(f"Error searching tiered store: {str(e)}")
+            return []
+
+    def delete_memory(self, memory_id: str) -> bool:
+        """Delete a memory from both tiers."""
+        self.hot.remove(memory_id)
+        return self.cold.delete_memory(memory_id)
+
+    def delete_memories(self, memory_ids: List[str]) -> bool:
+        """Delete many memories from both tiers."""
+        for memory_id in memory_ids:
+            self.hot.remove(memory_id)
+        return self.cold.delete_memories(memory_ids)
+
+    def delete_by_filter(self, filter_dict: Dict) -> bool:
+        """Delete every memory matching a metadata filter from both tiers."""
+        success = self.cold.delete_by_filter(filter_dict)
+        if success:
+            for memory_id, entry in self.hot.entries():
+                try:
+                    doomed = matches_filter(entry['metadata'], filter_dict)
+                except UnsupportedFilter:
+                    doomed = True
+                if doomed:
+                    self.hot.remove(memory_id)
+        return success
+
+    def evict(self, memory_ids: Iterable[str]) -> None:
+        """Drop memories from the hot tier only, e.g. ones the system of record has let go of."""
+        for memory_id in memory_ids:
+            self.hot.remove(memory_id)
+
+    def confirm(self, memory_ids: List[str]) -> List[str]:
+        """Check hot memories against the cold store, evicting those it no longer holds.
+
+        Returns:
+            The IDs the cold store still holds
+        """
+        if not memory_ids:
+            return []
+        records = self.cold.fetch_records(memory_ids)
+        self.evict(memory_id for memory_id in memory_ids if memory_id not in records)
+        return [memory_id for memory_id in memory_ids if memory_id in records]
+
+    def promote(self, last_access: Dict[str, Optional[float]]) -> int:
+        """Load memories into the hot tier from the cold store.
+
+        Args:
+            last_access: Mapping of memory ID to when it was last accessed (epoch seconds, or None)
+
+        Returns:
+            Number of memories promoted
+        """
+        wanted = [memory_id for memory_id in last_access if memory_id not in self.hot]
+        records = self.cold.fetch_records(wanted) if wanted else {}
+        for memory_id, record in records.items():
+            self.hot.add(memory_id, record['values'], record['metadata'], last_access.get(memory_id))
+        logger.info(f"Promoted {len(records)} memories to the hot tier")
+        return len(records)
+
+    def rebalance(self, now: Optional[float] = None) -> int:
+        """Demote idle memories, then the least recently accessed while over capacity.
+
+        Pinned memories are never idle, but they have a capacity of their own.
+
+        Returns:
+            Number of memories demoted
+        """
+        now = now if now is not None else time.time()
+        entries = sorted(((memory_id, entry['last_access'], entry['pinned'])
+                          for memory_id, entry in self.hot.entries()), key=lambda item: item[1])
+        unpinned = [(memory_id, last_access) for memory_id, last_access, pinned in entries if not pinned]
+        pinned = [memory_id for memory_id, _, is_pinned in entries if is_pinned]
+
+        overflow = max(0, len(unpinned) - self.max_hot)
+        demoted = [memory_id for index, (memory_id, last_access) in enumerate(unpinned)
+                   if index < overflow or now - last_access > self.idle_seconds]
+        demoted += pinned[:max(0, len(pinned) - self.max_pinned)]
+        for memory_id in demoted:
+            self.hot.remove(memory_id)
+
+        self._last_rebalance = time.monotonic()
+        if demoted:
+            logger.info(f"Demoted {len(demoted)} memories to the cold tier")
+        return len(demoted)
+
+    def _promote_results(self, results: List[Dict]) -> None:
+        """Admit memories found in the cold tier, since they were just accessed."""
+        for result in results:
+            if result.get('values') and result['id'] not in self.hot:
+                metadata = dict(result.get('metadata') or {})
+                metadata['source_text'] = result.get('source_text', '')
+                metadata['key_terms'] = self.cold._extract_key_terms(metadata['source_text'])
+                self.hot.add(result['id'], result['values'], metadata)
+
+    def _maybe_rebalance(self) -> None:
+        if time.monotonic() - self._last_rebalance > self.rebalance_interval:
+            self.rebalance()
@@ -0,0 +1,6 @@
+"""
+testing
+-------
+Stand-ins for the services Soulstream calls out to.
+For benchmarks, load tests and evaluations that must run without a network.
+"""
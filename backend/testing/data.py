@@ -0,0 +1,151 @@
+"""
+data.py
+-------
+Generated users, memories and timeline days for benchmarks and load tests.
+Years of a life written in a moment, the same life for the same seed.
+"""
+
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from backend.models import MemoryChip, MemoryTag, TimelineEntry, User
+from backend.models.memory_tag import memory_tag_association
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.testing.fakes import fake_embedding
+
+EMOTIONS = ('joy', 'calm', 'nostalgia', 'sadness', 'anxiety', 'hope', 'wonder', 'longing')
+
+TOPICS = ('books', 'music', 'work', 'family', 'travel', 'sleep', 'friendship', 'cooking', 'code', 'weather')
+
+TAGS = ('reflection', 'milestone', 'dream', 'habit', 'question', 'promise', 'plan', 'worry',
+        'gratitude', 'memory', 'idea', 'ritual')
+
+# Things people ask that the generated memories can answer
+QUERIES = (
+    'Do you remember the lake house?',
+    'What did we say about Lisbon last night?',
+    'I love poetry at midnight',
+    'Tell me about the deploy that broke',
+    'When was I sleeping badly again?',
+    'What made me sad about the garden?'
+)
+
+_SUBJECTS = ('We', 'I', 'My sister', 'Luna', 'The team', 'An old friend', 'Mom', 'Atlas')
+_VERBS = ('talked about', 'discussed', 'remembered', 'made', 'worked on', 'said we would try',
+          'asked about', 'enjoy', 'love', 'created')
+_OBJECTS = ('the lake house', 'a novel about lighthouses', 'the piano in the hallway', 'a new recipe',
+            'the deploy that broke', 'a trip to Lisbon', 'sleeping badly again', 'the garden',
+            'a letter never sent', 'poetry at midnight', 'the quantum computing talk', 'the first snow')
+_ENDINGS = ('It felt quiet.', 'Nobody rushed.', 'I was happy about it.', 'It made me sad.',
+            'We were excited.', 'It was peaceful.', 'Something like longing stayed.', 'We laughed.')
+
+
+def sentence(rng: random.Random) -> str:
+    """One plausible memory, two sentences long."""
+    return (f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} "
+            f"{rng.choice(('today', 'last night', 'over coffee', 'on the train'))}. {rng.choice(_ENDINGS)}")
+
+
+def seed_database(db_session, users: int = 1, days: int = 730, memories_per_day: int = 3,
+                  seed: int = 7, vector_store=None, start: Optional[date] = None) -> Dict:
+    """Fill a database with users, memories, tags and timeline days.
+
+    Each user gets a timeline entry per day, each day its memories linked to
+    it, and each memory one or two tags. Rows are inserted in bulk.
+
+    Args:
+        db_session: Session on a database whose tables exist
+        users: Number of users
+        days: Days of history per user, ending at start + days
+        memories_per_day: Memories per user per day
+        seed: Seed for the generated text
+        vector_store: Optional PineconeManager to index each memory in, with
+            fake_embedding vectors rather than calls to its OpenAI client
+        start: First day of history (defaults to `days` ago)
+
+    Returns:
+        The user IDs, and the memory and timeline entry counts
+    """
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days)
+    user_rows = [User(username=f'bench_user_{seed}_{i}', email=f'user{i}@example.com') for i in range(users)]
+    db_session.add_all(user_rows)
+    db_session.flush()
+    user_ids = [user.id for user in user_rows]
+
+    memory_count = entry_count = 0
+    for user_id in user_ids:
+        tags = [MemoryTag(name=name, user_id=user_id) for name in TAGS]
+        db_session.add_all(tags)
+        db_session.flush()
+        tag_ids = [tag.id for tag in tags]
+
+        chips: List[Dict] = []
+        for day in range(days):
+            day_date = start + timedelta(days=day)
+            for n in range(memories_per_day):
+                chips.append({
+                    'user_id': user_id,
+                    'summary': '',
+                    'source_text': sentence(rng),
+                    'embedding_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                    'emotion': rng.choice(EMOTIONS),
+                    'topic': rng.choice(TOPICS),
+                    'importance_score': round(rng.random(), 2),
+                    'is_pinned': rng.random() < 0.02,
+                    'reference_count': 0,
+                    'created_at': datetime.combine(day_date, time(8 + (4 * n) % 14, rng.randrange(60))),
+                    'updated_at': datetime.combine(day_date, time(22))
+                })
+        for chip in chips:
+            chip['summary'] = chip['source_text'].split('.')[0]
+        db_session.execute(insert(MemoryChip), chips)
+        chip_rows = db_session.query(MemoryChip.id, MemoryChip.created_at).filter(
+            MemoryChip.user_id == user_id
+        ).order_by(MemoryChip.id).all()
+
+        db_session.execute(memory_tag_association.insert(), [
+            {'memory_chip_id': chip_id, 'memory_tag_id': tag_id}
+            for chip_id, _ in chip_rows
+            for tag_id in rng.sample(tag_ids, rng.choice((1, 2)))
+        ])
+
+        db_session.execute(insert(TimelineEntry), [{
+            'user_id': user_id,
+            'date': start + timedelta(days=day),
+            'title': f'Day {day + 1}',
+            'entry_summary': sentence(rng),
+            'emotion': rng.choice(EMOTIONS),
+            'emotion_intensity': round(rng.random(), 2),
+            'milestone_flag': rng.random() < 0.03,
+            'created_at': datetime.combine(start + timedelta(days=day), time(23)),
+            'updated_at': datetime.combine(start + timedelta(days=day), time(23))
+        } for day in range(days)])
+        entry_ids = {entry_date: entry_id for entry_id, entry_date in db_session.query(
+            TimelineEntry.id, TimelineEntry.date
+        ).filter(TimelineEntry.user_id == user_id)}
+        db_session.execute(timeline_memory_links.insert(), [
+            {'timeline_id': entry_ids[created_at.date()], 'memory_id': chip_id}
+            for chip_id, created_at in chip_rows
+        ])
+
+        if vector_store is not None:
+            for chip in chips:
+                vector_store.upsert_memory_chip(
+                    memory_id=chip['embedding_id'],
+                    source_text=chip['source_text'],
+                    metadata={'user_id': user_id, 'summary': chip['summary'], 'emotion': chip['emotion'],
+                              'topic': chip['topic'], 'importance_score': chip['importance_score'],
+                              'is_pinned': chip['is_pinned'], 'timestamp': chip['created_at'].isoformat()},
+                    embedding=fake_embedding(chip['source_text'])
+                )
+
+        memory_count += len(chips)
+        entry_count += days
+
+    db_session.commit()
+    return {'user_ids': user_ids, 'memories': memory_count, 'timeline_entries': entry_count}
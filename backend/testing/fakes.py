@@ -0,0 +1,234 @@
+"""
+fakes.py
+--------
+Local stand-ins for OpenAI and Pinecone.
+The same shapes as the real services, answered in process and the same way every time.
+Slow or unreliable only when asked to be.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.services.vector_store.pinecone_manager import PineconeManager
+from backend.services.vector_store.tiered_store import HotMemoryIndex, matches_filter
+
+# Dimension of fake embeddings: small enough to be fast, large enough that
+# unrelated texts rarely collide
+EMBEDDING_DIMENSION = 256
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Words too common to say anything about what a text means
+_STOPWORDS = frozenset(
+    "a an and are as at be but by did do does for from had has have he her him his how i if in "
+    "into is it its me my of on or our she so that the their them then there they this to was "
+    "we were what when where which who why will with you your".split()
+)
+
+
+class FakeServiceError(RuntimeError):
+    """An injected failure of a stand-in service."""
+
+
+class Faults:
+    """Latency and failures to inject into a stand-in, reproducibly.
+
+    Args:
+        latency: Seconds added to every call
+        jitter: Up to this many further seconds, drawn uniformly
+        error_rate: Fraction of calls that raise FakeServiceError
+        seed: Seed for the draws, so a run can be repeated exactly
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self, operation: str) -> None:
+        """Wait, then fail if this call was drawn to."""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise FakeServiceError(f"Injected failure in {operation}")
+
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    """A deterministic unit vector for a text.
+
+    Words (lower-cased, without stop words, with a plural 's' dropped) are
+    hashed into signed buckets, so texts sharing words are similar and texts
+    sharing none are close to orthogonal. A crude but stable stand-in for a
+    real embedding model.
+    """
+    vector = np.zeros(dimension, dtype=np.float64)
+    for word in _WORD.findall((text or '').lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], 'little') % dimension
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+class _FakeEmbeddings:
+    def __init__(self, owner: 'FakeOpenAI'):
+        self.owner = owner
+
+    def create(self, input, model: str = None, **kwargs):
+        self.owner._call('embeddings')
+        texts = [input] if isinstance(input, str) else list(input)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=fake_embedding(text, self.owner.dimension))
+                  for i, text in enumerate(texts)],
+            model=model
+        )
+
+
+class _FakeCompletions:
+    def __init__(self, owner: 'FakeOpenAI'):
+        self.owner = owner
+
+    def create(self, model: str = None, messages: Sequence[Dict] = (), stream: bool = False, **kwargs):
+        self.owner._call('chat')
+        reply = self.owner.reply(list(messages))
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(
+                index=0, message=SimpleNamespace(role='assistant', content=reply), finish_reason='stop'
+            )], model=model)
+        words = reply.split(' ')
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(
+                content=word if i == len(words) - 1 else word + ' '
+            ))])
+            for i, word in enumerate(words)
+        ])
+
+
+class FakeOpenAI:
+    """Answers embeddings and chat completions the way the OpenAI client does.
+
+    Embeddings come from fake_embedding. A chat reply repeats the last
+    paragraph of the last user message (so a query rewrite passes the query
+    through), unless reply is replaced. Calls are counted by kind in `calls`.
+    """
+
+    def __init__(self, faults: Optional[Faults] = None, dimension: int = EMBEDDING_DIMENSION):
+        self.faults = faults or Faults()
+        self.dimension = dimension
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.embeddings = _FakeEmbeddings(self)
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    def reply(self, messages: List[Dict]) -> str:
+        """The reply to a conversation."""
+        last = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+        paragraph = last.strip().split('\n\n')[-1]
+        return ' '.join(paragraph.split()[:48]) or 'I remember.'
+
+    def _call(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+        self.faults.apply(f'openai.{kind}')
+
+
+class FakePineconeIndex:
+    """An in-process index answering upsert, query, fetch and delete as a Pinecone Index does.
+
+    Search is exact cosine similarity over HotMemoryIndex, and metadata
+    filters are evaluated as the hot tier evaluates them. Calls are counted by operation in `calls`.
+    """
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.calls = Counter()
+        self._index = HotMemoryIndex()
+        self._values: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def upsert(self, vectors: Iterable, namespace: Optional[str] = None, **kwargs):
+        self._call('upsert')
+        count = 0
+        for vector in vectors:
+            if isinstance(vector, dict):
+                memory_id, values, metadata = vector['id'], vector['values'], vector.get('metadata')
+            else:
+                memory_id, values, metadata = vector[0], vector[1], vector[2] if len(vector) > 2 else None
+            self._index.add(memory_id, values, dict(metadata or {}))
+            self._values[memory_id] = list(values)
+            count += 1
+        return SimpleNamespace(upserted_count=count)
+
+    def query(self, vector: Sequence[float] = None, top_k: int = 10, filter: Optional[Dict] = None,
+              include_metadata: bool = False, include_values: bool = False, **kwargs):
+        self._call('query')
+        matches = self._index.search(vector, top_k, filter)
+        return SimpleNamespace(matches=[
+            SimpleNamespace(
+                id=match.id,
+                score=match.score,
+                metadata=dict(match.metadata) if include_metadata else None,
+                values=match.values if include_values else []
+            )
+            for match in matches
+        ])
+
+    def fetch(self, ids: Sequence[str], namespace: Optional[str] = None, **kwargs):
+        self._call('fetch')
+        entries = dict(self._index.entries())
+        return SimpleNamespace(vectors={
+            memory_id: SimpleNamespace(id=memory_id, values=list(self._values[memory_id]),
+                                       metadata=dict(entries[memory_id]['metadata']))
+            for memory_id in ids if memory_id in entries
+        })
+
+    def delete(self, ids: Optional[Sequence[str]] = None, filter: Optional[Dict] = None,
+               delete_all: bool = False, **kwargs):
+        self._call('delete')
+        if delete_all:
+            ids = [memory_id for memory_id, _ in self._index.entries()]
+        elif filter:
+            ids = [memory_id for memory_id, entry in self._index.entries()
+                   if matches_filter(entry['metadata'], filter)]
+        for memory_id in ids or []:
+            self._index.remove(memory_id)
+            self._values.pop(memory_id, None)
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        return SimpleNamespace(total_vector_count=len(self._index), dimension=None)
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+        self.faults.apply(f'pinecone.{operation}')
+
+
+def fake_pinecone_manager(openai: Optional[FakeOpenAI] = None,
+                          index: Optional[FakePineconeIndex] = None) -> PineconeManager:
+    """A PineconeManager whose index and OpenAI client are the stand-ins above."""
+    return PineconeManager(index=index if index is not None else FakePineconeIndex(),
+                           openai_client=openai if openai is not None else FakeOpenAI())
@@ -0,0 +1,126 @@
+"""
+test_benchmarks.py
+------------------
+Tests for the benchmark suite and its stand-in services.
+Verifying that the stand-ins answer as the real services do, and that a slower run is caught.
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from backend.benchmarks import BENCHMARKS, BenchmarkConfig, compare, load, run, save
+from backend.benchmarks.__main__ import main
+from backend.benchmarks.runner import benchmark
+from backend.testing.fakes import (
+    FakeOpenAI, FakePineconeIndex, FakeServiceError, Faults, fake_embedding, fake_pinecone_manager
+)
+
+
+class TestFakes(unittest.TestCase):
+    """Test cases for the stand-in OpenAI and Pinecone."""
+
+    def test_embeddings_are_deterministic_and_topical(self):
+        """The same text always embeds the same, and shared words mean similar vectors."""
+        lake = fake_embedding('We walked to the lake at dawn')
+        self.assertEqual(lake, fake_embedding('We walked to the lake at dawn'))
+        self.assertAlmostEqual(sum(v * v for v in lake), 1.0)
+        similar = sum(a * b for a, b in zip(lake, fake_embedding('the lakes at dawn')))
+        unrelated = sum(a * b for a, b in zip(lake, fake_embedding('a piano out of tune')))
+        self.assertGreater(similar, 0.5)
+        self.assertLess(abs(unrelated), similar)
+
+    def test_manager_round_trip(self):
+        """A PineconeManager over the stand-ins stores, finds, fetches and forgets."""
+        openai, index = FakeOpenAI(), FakePineconeIndex()
+        manager = fake_pinecone_manager(openai, index)
+        manager.upsert_memory_chip('lake', 'We walked to the lake at dawn', {'emotion': 'calm', 'user_id': 1})
+        manager.upsert_memory_chip('piano', 'The piano in the hallway', {'emotion': 'joy', 'user_id': 2})
+
+        results = manager.search_memories('the lake at dawn', top_k=1)
+        self.assertEqual([r['id'] for r in results], ['lake'])
+        self.assertEqual(manager.search_memories('the lake', filter_dict={'user_id': 2})[0]['id'], 'piano')
+        self.assertEqual(manager.get_memory('piano')['metadata']['emotion'], 'joy')
+        self.assertTrue(manager.delete_memory('lake'))
+        self.assertEqual(len(index), 1)
+        self.assertEqual(openai.calls['embeddings'], 4)
+        self.assertEqual(index.calls['query'], 2)
+
+        reply = openai.chat.completions.create(messages=[{'role': 'user', 'content': 'Rewrite:\n\nthe lake'}])
+        self.assertEqual(reply.choices[0].message.content, 'the lake')
+        chunks = openai.chat.completions.create(messages=[{'role': 'user', 'content': 'one two'}], stream=True)
+        self.assertEqual(''.join(chunk.choices[0].delta.content for chunk in chunks), 'one two')
+
+    def test_faults_are_reproducible(self):
+        """Injected latency is waited out, and the same seed fails the same calls."""
+        def failures(seed):
+            faults = Faults(error_rate=0.3, seed=seed)
+            outcome = []
+            for _ in range(50):
+                try:
+                    faults.apply('call')
+                    outcome.append(False)
+                except FakeServiceError:
+                    outcome.append(True)
+            return outcome
+
+        self.assertEqual(failures(3), failures(3))
+        self.assertTrue(5 < sum(failures(3)) < 25)
+
+        openai = FakeOpenAI(Faults(latency=0.02))
+        started = time.perf_counter()
+        openai.embeddings.create(input='slow', model='m')
+        self.assertGreaterEqual(time.perf_counter() - started, 0.02)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the runner, the results files and the comparison."""
+
+    def test_every_benchmark_runs(self):
+        """Each registered benchmark sets up, runs and reports at a tiny scale."""
+        results = run(config=BenchmarkConfig(scale=0.02), repeat=2, min_time=0.001)
+        self.assertEqual(set(results['benchmarks']), set(BENCHMARKS))
+        for name, stats in results['benchmarks'].items():
+            self.assertGreater(stats['median'], 0, name)
+            self.assertLessEqual(stats['min'], stats['median'])
+        self.assertEqual(results['config']['scale'], 0.02)
+        self.assertIn('python', results['machine'])
+
+    def test_regressions_are_caught(self):
+        """A benchmark slower than the baseline beyond the tolerance fails the comparison."""
+        delay = {'seconds': 0.0}
+
+        @benchmark('test.sleep')
+        def sleep(config):
+            yield lambda: time.sleep(delay['seconds'])
+
+        try:
+            handle, path = tempfile.mkstemp(suffix='.json')
+            os.close(handle)
+            baseline = run(['test.sleep'], repeat=2, min_time=0.001)
+            save(baseline, path)
+            self.assertEqual(load(path)['benchmarks'].keys(), {'test.sleep'})
+
+            delay['seconds'] = 0.002
+            rows = compare(load(path), run(['test.sleep'], repeat=2, min_time=0.001))
+            self.assertEqual(rows[0]['status'], 'regressed')
+
+            with redirect_stdout(io.StringIO()) as out:
+                code = main(['-k', 'test.sleep', '--repeat', '2', '--min-time', '0.001',
+                             '--output', path + '.new', '--compare', path])
+            self.assertEqual(code, 1)
+            self.assertIn('regressed', out.getvalue())
+            with open(path + '.new', encoding='utf-8') as f:
+                self.assertIn('test.sleep', json.load(f)['benchmarks'])
+        finally:
+            BENCHMARKS.pop('test.sleep', None)
+            for name in (path, path + '.new'):
+                if os.path.exists(name):
+                    os.remove(name)
+
+if __name__ == '__main__':
+    unittest.main()
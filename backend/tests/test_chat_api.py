@@ -0,0 +1,114 @@
+"""
+test_chat_api.py
+----------------
+Tests for the chat API.
+Verifying that replies stream in order: memories first, then words, then what was kept.
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from backend.api.chat import chat_bp
+from backend.services.chat.response_generator import ResponseGenerator
+
+
+def parse_events(body):
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestChatStream(unittest.TestCase):
+    """Test cases for /api/chat/stream.
+    
+    The first thing back is what was remembered. The reply follows.
+    """
+    
+    def setUp(self):
+        self.memory_service = MagicMock()
+        self.memory_service.search_memories.return_value = [
+            {'id': 'm1', 'summary': 'The lake house', 'relevance_score': 0.91}
+        ]
+        self.memory_service.store_memory.side_effect = ['user_mem', 'ai_mem']
+        
+        self.response_generator = MagicMock()
+        self.response_generator.stream_reply.return_value = iter(['I ', 'remember ', 'the lake.'])
+        
+        self.app = Flask(__name__)
+        self.app.memory_service = self.memory_service
+        self.app.response_generator = self.response_generator
+        self.app.register_blueprint(chat_bp, url_prefix='/api/chat')
+        self.client = self.app.test_client()
+    
+    def test_stream_sends_memories_tokens_then_ids(self):
+        """Events arrive as memories, tokens, then the stored memory IDs."""
+        response = self.client.post('/api/chat/stream', json={'message': 'Do you remember?', 'user_id': 1})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype == 'text/event-stream')
+        events = parse_events(response.get_data(as_text=True))
+        
+        self.assertEqual([name for name, _ in events], ['memories', 'token', 'token', 'token', 'done'])
+        self.assertEqual(events[0][1]['referenced_memories'][0]['id'], 'm1')
+        self.assertEqual(''.join(data['text'] for name, data in events if name == 'token'),
+                         'I remember the lake.')
+        self.assertEqual(events[-1][1]['memory_ids'], {'user_message': 'user_mem', 'ai_response': 'ai_mem'})
+        self.assertEqual(self.memory_service.store_memory.call_args_list[1].kwargs['source_text'],
+                         'I remember the lake.')
+    
+    def test_stream_reports_errors_as_events(self):
+        """A failure midway ends the stream with an error event."""
+        self.memory_service.search_memories.side_effect = RuntimeError('index unreachable')
+        
+        response = self.client.post('/api/chat/stream', json={'message': 'Hello?'})
+        events = parse_events(response.get_data(as_text=True))
+        
+        self.assertEqual(events[-1][0], 'error')
+        self.memory_service.store_memory.assert_not_called()
+    
+    def test_stream_requires_message(self):
+        """An empty message is rejected before streaming starts."""
+        response = self.client.post('/api/chat/stream', json={})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestResponseGenerator(unittest.TestCase):
+    """Test cases for ResponseGenerator.
+    
+    Fragments in, fragments out, in the order they were produced.
+    """
+    
+    def test_stream_reply_yields_model_deltas(self):
+        """Streamed completion deltas are passed through as they arrive."""
+        client = MagicMock()
+        chunks = []
+        for text in ['Of ', 'course', None]:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = text
+            chunks.append(chunk)
+        client.chat.completions.create.return_value = iter(chunks)
+        
+        generator = ResponseGenerator(openai_client=client)
+        
+        self.assertEqual(list(generator.stream_reply('Remember me?', [])), ['Of ', 'course'])
+        self.assertTrue(client.chat.completions.create.call_args.kwargs['stream'])
+    
+    def test_fallback_when_model_fails(self):
+        """A model failure before any text falls back to the placeholder reply."""
+        client = MagicMock()
+        client.chat.completions.create.side_effect = RuntimeError('no model today')
+        generator = ResponseGenerator(openai_client=client)
+        
+        reply = generator.generate_reply('Hello', [])
+        
+        self.assertEqual(reply, "Echo: I've received your message: 'Hello'. I remember you.")
+
+if __name__ == '__main__':
+    unittest.main()
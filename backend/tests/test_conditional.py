@@ -0,0 +1,166 @@
+"""
+test_conditional.py
+-------------------
+Tests for conditional listing GETs.
+Verifying that an unchanged listing costs one lookup, and that every change is seen.
+"""
+
+import unittest
+from datetime import date, timedelta, timezone
+from unittest.mock import MagicMock
+
+from flask import Flask
+from werkzeug.http import http_date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api import memory as memory_api
+from backend.api.memory import memory_bp
+from backend.api.timeline import timeline_bp
+from backend.models import Base, MemoryChip, User, UserChangeCounter
+from backend.services.memory.memory_service import MemoryService
+from backend.services.timeline.changes import MEMORY, TIMELINE, TimelineChangeWatcher, get_change_counter
+from backend.services.timeline.timeline_service import TimelineService
+from backend.tests.test_serializers import count_queries
+
+
+class TestConditionalListings(unittest.TestCase):
+    """Test cases for ETags and Last-Modified on the timeline and memory listings."""
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        TimelineChangeWatcher(counters=True).watch(self.db_session)
+
+        user, other = User(username='echo_tester'), User(username='someone_else')
+        self.db_session.add_all([user, other])
+        self.db_session.commit()
+        self.user_id, self.other_id = user.id, other.id
+
+        self.memory_service = MemoryService(vector_store=MagicMock(), query_preprocessor=MagicMock(),
+                                            db_session=self.db_session)
+        self.timeline_service = TimelineService(self.db_session)
+        self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, day), 'title': f'Day {day}', 'entry_summary': f'Day {day}.',
+             'is_milestone': day == 1}
+            for day in range(1, 6)
+        ])
+
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.memory_service = self.memory_service
+        self.app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        self.app.register_blueprint(memory_bp, url_prefix='/api/memory')
+        memory_api.memory_service = self.memory_service
+        self.client = self.app.test_client()
+        self.url = f'/api/timeline/days?user_id={self.user_id}'
+
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+
+    def settle(self):
+        """Move every change counter two seconds into the past, so their second is over."""
+        for counter in self.db_session.query(UserChangeCounter):
+            counter.updated_at -= timedelta(seconds=2)
+        self.db_session.commit()
+
+    def test_counters_move_with_commits(self):
+        """Each committed change bumps only the changed user's counter for the changed table."""
+        version, updated_at = get_change_counter(self.db_session, self.user_id, TIMELINE)
+        self.assertEqual(version, 1)
+        self.assertIsNotNone(updated_at)
+        self.assertEqual(get_change_counter(self.db_session, self.user_id, MEMORY), (0, None))
+
+        self.memory_service.store_memory(source_text='Coffee.', user_id=self.user_id)
+        self.assertEqual(get_change_counter(self.db_session, self.user_id, MEMORY)[0], 1)
+        self.assertEqual(get_change_counter(self.db_session, self.other_id, MEMORY), (0, None))
+
+        self.db_session.add(MemoryChip(user_id=self.user_id, summary='Tea', source_text='Tea'))
+        self.db_session.rollback()
+        self.assertEqual(get_change_counter(self.db_session, self.user_id, MEMORY)[0], 1)
+
+    def test_unchanged_listing_is_not_modified(self):
+        """Revalidating an unchanged listing costs the counter lookup and nothing else."""
+        self.settle()
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        self.assertIn('Last-Modified', first.headers)
+        self.db_session.remove()
+
+        with count_queries(self.engine) as statements:
+            second = self.client.get(self.url, headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.get_data(), b'')
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(len(statements), 1)
+        self.assertIn('user_change_counters', statements[0])
+
+    def test_changes_and_other_pages_are_modified(self):
+        """A new entry, or a different query string, gets a full response."""
+        etag = self.client.get(self.url).headers['ETag']
+
+        other_page = self.client.get(f'{self.url}&limit=2', headers={'If-None-Match': etag})
+        self.assertEqual(other_page.status_code, 200)
+        self.assertNotEqual(other_page.headers['ETag'], etag)
+
+        self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 6), 'title': 'Day 6', 'entry_summary': 'Day 6.'}
+        ])
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 6)
+
+    def test_if_modified_since(self):
+        """Without an ETag, Last-Modified decides."""
+        self.settle()
+        last_modified = self.client.get(f'/api/timeline/milestones?user_id={self.user_id}').headers['Last-Modified']
+
+        response = self.client.get(f'/api/timeline/milestones?user_id={self.user_id}',
+                                   headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(f'/api/timeline/milestones?user_id={self.user_id}',
+                                   headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_in_the_current_second_is_not_hidden(self):
+        """Until the second of the latest change is over, no Last-Modified is sent or trusted."""
+        self.settle()
+        self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 6), 'title': 'Day 6', 'entry_summary': 'Day 6.'}
+        ])
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response.headers)
+
+        # A client naming the second of that change still gets what changed within it
+        _, updated_at = get_change_counter(self.db_session, self.user_id, TIMELINE)
+        since = http_date(updated_at.replace(tzinfo=timezone.utc, microsecond=0))
+        response = self.client.get(self.url, headers={'If-Modified-Since': since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 6)
+
+    def test_memory_chips_follow_memory_changes(self):
+        """The chips listing revalidates against the memory counter."""
+        url = f'/api/memory/chips?user_id={self.user_id}'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        self.memory_service.store_memory(source_text='Coffee.', user_id=self.user_id)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([memory['source_text'] for memory in response.get_json()['memories']], ['Coffee.'])
+
+        # Listings without a user are not conditional
+        self.assertNotIn('ETag', self.client.get('/api/memory/chips?user_id=').headers)
+
+if __name__ == '__main__':
+    unittest.main()
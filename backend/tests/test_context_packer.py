@@ -0,0 +1,134 @@
+"""
+test_context_packer.py
+----------------------
+Tests for prompt context packing.
+Verifying that prompts stay within their budget, and that what is left out matters least.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from backend.services.chat import context_packer
+from backend.services.chat.context_packer import (
+    NO_MEMORIES, TRUNCATION_MARK, ContextPacker, TokenCounter
+)
+from backend.services.chat.response_generator import ResponseGenerator
+from backend.utils import helpers
+from backend.utils.helpers import format_memory_for_prompt, load_system_prompt
+
+
+def memory(memory_id, text, relevance=0.8, importance=0.5, **fields):
+    return dict({'id': memory_id, 'summary': f'About {memory_id}', 'source_text': text,
+                 'relevance_score': relevance, 'importance_score': importance}, **fields)
+
+
+class TestContextPacker(unittest.TestCase):
+    """Test cases for token-budgeted memory packing."""
+
+    def setUp(self):
+        with patch.object(context_packer, 'tiktoken', None):
+            context_packer._encoding.cache_clear()
+            self.counter = TokenCounter()
+        context_packer._encoding.cache_clear()
+        self.memories = [
+            memory('m1', 'We walked to the lake house at dawn. ' * 20, relevance=0.7),
+            memory('m2', 'The piano in the hallway, out of tune. ' * 20, relevance=0.9, importance=0.9),
+            memory('m3', 'A postcard from Lisbon. ' * 20, relevance=0.95, importance=0.2)
+        ]
+
+    def test_everything_fits_a_large_budget(self):
+        """With room to spare, every memory is included, strongest first."""
+        packer = ContextPacker(max_tokens=100000, counter=self.counter)
+        text, packed = packer.pack('System.\n\n', self.memories, 'Do you remember?')
+        self.assertEqual([m['id'] for m in packed], ['m2', 'm3', 'm1'])
+        self.assertTrue(text.startswith('System.\n\n[Memory 1] Summary: About m2'))
+        self.assertNotIn(TRUNCATION_MARK, text)
+
+    def test_prompt_stays_within_budget(self):
+        """Every budget is respected, the weakest memories going first and one cut short to fill the room."""
+        for max_tokens in (60, 150, 250, 400, 600):
+            packer = ContextPacker(max_tokens=max_tokens, counter=self.counter)
+            text, packed = packer.pack('System.\n\n', self.memories, 'Do you remember?')
+            used = packer.message_tokens([{'content': text}, {'content': 'Do you remember?'}])
+            self.assertLessEqual(used, max_tokens)
+            self.assertEqual([m['id'] for m in packed], ['m2', 'm3', 'm1'][:len(packed)])
+
+        packer = ContextPacker(max_tokens=330, counter=self.counter)
+        text, packed = packer.pack('System.\n\n', self.memories, 'Do you remember?')
+        self.assertEqual([m['id'] for m in packed], ['m2', 'm3'])
+        self.assertTrue(text.endswith(f'Lisbon. A postcard{TRUNCATION_MARK}\n'))
+        self.assertLess(text.count('Lisbon'), 20)
+
+        text, packed = ContextPacker(max_tokens=20, counter=self.counter).pack('System.\n\n', self.memories, 'Hi')
+        self.assertEqual((text, packed), ('System.\n\n' + NO_MEMORIES, []))
+
+    def test_duplicates_and_overlaps_are_dropped(self):
+        """Repeated IDs and memories another already contains are left out."""
+        memories = [
+            memory('a', 'We sang by the fire.', relevance=0.9),
+            memory('a', 'We sang by the fire.', relevance=0.5),
+            memory('b', '  we sang   BY the fire. ', relevance=0.6),
+            memory('c', 'We sang by the fire. Then it rained.', relevance=0.4),
+            memory('d', 'Something else.', relevance=0.3, summary='Something else.')
+        ]
+        packer = ContextPacker(max_tokens=1000, counter=self.counter)
+        text, packed = packer.pack_memories(memories, 1000)
+        self.assertEqual([m['id'] for m in packed], ['a', 'c', 'd'])
+        self.assertIn('[Memory 3] Content: Something else.', text)
+
+    def test_format_is_unchanged_when_nothing_is_cut(self):
+        """Packed memories read exactly as the plain formatter writes them."""
+        memories = [dict(m, relevance_score=1.0 - i / 10, importance_score=0.5) for i, m in enumerate(self.memories)]
+        text, _ = ContextPacker(counter=self.counter).pack_memories(memories, 100000)
+        self.assertEqual(text, format_memory_for_prompt(memories))
+
+    def test_response_generator_packs_its_prompt(self):
+        """The chat prompt holds only what the budget allows."""
+        generator = ResponseGenerator(
+            openai_client=MagicMock(), context_packer=ContextPacker(max_tokens=250, counter=self.counter)
+        )
+        with patch.dict(os.environ, {'SYSTEM_PROMPT': 'You are Echo.'}):
+            messages = generator.build_messages('Do you remember?', self.memories)
+        self.assertTrue(messages[0]['content'].startswith('You are Echo.\n\nRelevant memories:\n[Memory 1]'))
+        self.assertNotIn('lake house', messages[0]['content'])
+        self.assertEqual(messages[1], {'role': 'user', 'content': 'Do you remember?'})
+
+
+class TestSystemPromptCache(unittest.TestCase):
+    """Test cases for loading the system prompt file once per change."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.txt')
+        os.close(handle)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('First voice.')
+        self.env = patch.dict(os.environ, {'SYSTEM_PROMPT_PATH': self.path})
+        self.env.start()
+        os.environ.pop('SYSTEM_PROMPT', None)
+        helpers._system_prompts.clear()
+
+    def tearDown(self):
+        self.env.stop()
+        helpers._system_prompts.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_read_once_until_modified(self):
+        """The file is read once, and again only after it changes."""
+        with patch('builtins.open', wraps=open) as opened:
+            self.assertEqual(load_system_prompt(), 'First voice.')
+            self.assertEqual(load_system_prompt(), 'First voice.')
+            self.assertEqual(opened.call_count, 1)
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('Second voice, longer.')
+        self.assertEqual(load_system_prompt(), 'First voice.')
+        with patch.object(helpers, 'SYSTEM_PROMPT_CHECK_INTERVAL', 0):
+            self.assertEqual(load_system_prompt(), 'Second voice, longer.')
+            os.remove(self.path)
+            self.assertEqual(load_system_prompt(), helpers.DEFAULT_SYSTEM_PROMPT)
+
+if __name__ == '__main__':
+    unittest.main()
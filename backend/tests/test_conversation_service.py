@@ -0,0 +1,187 @@
+"""
+test_conversation_service.py
+----------------------------
+Tests for the conversation log.
+Verifying that messages append in order, pages follow cursors, and summaries keep count.
+The test of memory that remembers who said what, and when.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.chat import chat_bp
+from backend.models import Base, User
+from backend.services.conversation.conversation_service import ConversationService
+from backend.tests.test_serializers import count_queries
+
+
+class TestConversationService(unittest.TestCase):
+    """Test cases for ConversationService.
+    
+    Ensuring the log only grows, and the summary never has to look back.
+    """
+    
+    def setUp(self):
+        """Set up the test environment.
+        
+        An in-memory database and a single user to talk to.
+        """
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.commit()
+        self.user_id = user.id
+        
+        self.service = ConversationService(self.db_session)
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def append_numbered(self, conversation_id, count):
+        """Append count messages, alternating sender, with a memory on every other one."""
+        return self.service.append_messages(conversation_id, [
+            {'sender': 'user' if i % 2 == 0 else 'ai',
+             'message': f'Message {i}',
+             'memory_id': f'mem_{i}' if i % 2 == 0 else None}
+            for i in range(count)
+        ])
+    
+    def test_append_updates_summary(self):
+        """Appends bump the counters and last message without recounting."""
+        conversation = self.service.create_conversation(user_id=self.user_id)
+        
+        self.append_numbered(conversation.id, 4)
+        self.service.append_messages(conversation.id, [
+            {'sender': 'ai', 'message': 'The last word.', 'memory_id': 'mem_last'}
+        ])
+        
+        self.db_session.expire_all()
+        conversation = self.service.get_conversation(conversation.id)
+        self.assertEqual(conversation.message_count, 5)
+        self.assertEqual(conversation.memory_count, 3)
+        self.assertEqual(conversation.last_message, 'The last word.')
+        self.assertEqual(conversation.title, 'Message 0')
+        self.assertIsNotNone(conversation.last_message_at)
+    
+    def test_append_to_missing_conversation(self):
+        """Appending to a conversation that does not exist stores nothing."""
+        self.assertEqual(self.service.append_messages(999, [{'sender': 'user', 'message': 'Hello?'}]), [])
+    
+    def test_keyset_paging(self):
+        """Cursors walk back and forward through history in order."""
+        conversation = self.service.create_conversation(user_id=self.user_id)
+        self.append_numbered(conversation.id, 25)
+        
+        latest = self.service.get_messages(conversation.id, limit=10)
+        self.assertEqual([m.message for m in latest], [f'Message {i}' for i in range(15, 25)])
+        
+        earlier = self.service.get_messages(conversation.id, limit=10, before_id=latest[0].id)
+        self.assertEqual([m.message for m in earlier], [f'Message {i}' for i in range(5, 15)])
+        
+        newer = self.service.get_messages(conversation.id, limit=3, after_id=earlier[-1].id)
+        self.assertEqual([m.message for m in newer], ['Message 15', 'Message 16', 'Message 17'])
+        
+        by_offset = self.service.get_messages(conversation.id, limit=5, offset=20)
+        self.assertEqual([m.message for m in by_offset], [f'Message {i}' for i in range(0, 5)])
+    
+    def test_sidebar_reads_summary_rows_only(self):
+        """Listing conversations never touches the message table."""
+        first = self.service.create_conversation(user_id=self.user_id, title='First')
+        second = self.service.create_conversation(user_id=self.user_id, title='Second')
+        self.append_numbered(second.id, 30)
+        self.append_numbered(first.id, 2)
+        
+        with count_queries(self.engine) as statements:
+            conversations, total = self.service.list_conversations(self.user_id)
+        
+        self.assertEqual(total, 2)
+        self.assertEqual([c.title for c in conversations], ['First', 'Second'])
+        self.assertFalse(any('conversation_messages' in statement for statement in statements))
+
+
+class TestConversationApi(unittest.TestCase):
+    """Test cases for the conversation endpoints.
+    
+    A message sent is a message kept, and found again later.
+    """
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.commit()
+        self.user_id = user.id
+        
+        self.memory_service = MagicMock()
+        self.memory_service.search_memories.return_value = [
+            {'id': 'm1', 'summary': 'The lake house', 'relevance_score': 0.91}
+        ]
+        self.memory_service.store_memory.side_effect = lambda **kwargs: f"mem_{kwargs['tags'][0]}"
+        self.response_generator = MagicMock()
+        self.response_generator.generate_reply.return_value = 'I remember the lake.'
+        
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.memory_service = self.memory_service
+        self.app.response_generator = self.response_generator
+        self.app.register_blueprint(chat_bp, url_prefix='/api/chat')
+        self.client = self.app.test_client()
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def test_messages_are_logged_and_listed(self):
+        """Sent messages show up in history and the sidebar."""
+        response = self.client.post('/api/chat/message', json={
+            'message': 'Do you remember the lake?', 'user_id': self.user_id
+        })
+        conversation_id = response.get_json()['conversation_id']
+        self.client.post('/api/chat/message', json={
+            'message': 'And the boat?', 'user_id': self.user_id, 'conversation_id': conversation_id
+        })
+        
+        history = self.client.get(f'/api/chat/history?conversation_id={conversation_id}&limit=3').get_json()
+        self.assertEqual([m['message'] for m in history['history']],
+                         ['I remember the lake.', 'And the boat?', 'I remember the lake.'])
+        self.assertEqual(history['history'][-1]['referenced_memories'], ['m1'])
+        self.assertEqual(history['pagination']['total'], 4)
+        
+        earlier = self.client.get(
+            f"/api/chat/history?conversation_id={conversation_id}&before_id={history['pagination']['before_id']}"
+        ).get_json()
+        self.assertEqual([m['message'] for m in earlier['history']], ['Do you remember the lake?'])
+        
+        sidebar = self.client.get(f'/api/chat/conversations?user_id={self.user_id}').get_json()
+        self.assertEqual(sidebar['conversations'][0]['title'], 'Do you remember the lake?')
+        self.assertEqual(sidebar['conversations'][0]['last_message'], 'I remember the lake.')
+        self.assertEqual(sidebar['conversations'][0]['memory_count'], 4)
+    
+    def test_unknown_conversation(self):
+        """Messages and history for a missing conversation are 404s."""
+        response = self.client.post('/api/chat/message', json={'message': 'Hello?', 'conversation_id': 42})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/chat/history?conversation_id=42').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+test_evaluation.py
+------------------
+Tests for the retrieval evaluation.
+Verifying the scores are counted right, and that the labels point at memories that exist.
+"""
+
+import logging
+import unittest
+
+from backend.evaluation import Configuration, evaluate, load_corpus, recall_at_k, reciprocal_rank, run
+from backend.evaluation.retrieval import rewrite_query
+from backend.testing.fakes import Faults
+
+
+class TestEvaluation(unittest.TestCase):
+    """Test cases for the metrics, the seed corpus and a short run."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = load_corpus()
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_metrics(self):
+        """Recall counts the relevant memories in the first k; MRR takes the first one found."""
+        ranked = ['a', 'b', 'c', 'd']
+        self.assertEqual(recall_at_k(ranked, ['c'], 1), 0.0)
+        self.assertEqual(recall_at_k(ranked, ['c'], 3), 1.0)
+        self.assertEqual(recall_at_k(ranked, ['b', 'z'], 4), 0.5)
+        self.assertEqual(reciprocal_rank(ranked, ['d', 'b']), 0.5)
+        self.assertEqual(reciprocal_rank(ranked, ['z']), 0.0)
+        self.assertEqual(rewrite_query('Do you remember the week I could barely sleep?'),
+                         'the week I could barely sleep')
+
+    def test_seed_corpus(self):
+        """Every query is answered by memories of its own user, and every memory is distinct."""
+        ids = [memory['id'] for memory in self.corpus['memories']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual({memory['user_id'] for memory in self.corpus['memories']}, {1, 2, 3})
+        self.assertTrue(all(query['relevant'] for query in self.corpus['queries']))
+
+    def test_short_run(self):
+        """Without preprocessing there is no chat call, and the labelled memories are found."""
+        results = run([Configuration('baseline'), Configuration('no-preprocess', preprocess=False)],
+                      ks=(1, 5), distractors=60, corpus=self.corpus)
+
+        baseline = results['results']['baseline']
+        self.assertEqual(results['config']['queries'], len(self.corpus['queries']))
+        self.assertEqual(baseline['calls_per_query'],
+                         {'openai.chat': 1.0, 'openai.embeddings': 1.0, 'pinecone.query': 1.0})
+        self.assertNotIn('openai.chat', results['results']['no-preprocess']['calls_per_query'])
+        self.assertGreater(baseline['recall']['5'], 0.5)
+        self.assertGreaterEqual(baseline['recall']['5'], baseline['recall']['1'])
+        self.assertLessEqual(baseline['latency_ms']['p50'], baseline['latency_ms']['p95'])
+
+    def test_failures_cost_recall_not_the_run(self):
+        """A vector index that always fails gives empty results, not an exception."""
+        outcome = evaluate(self.corpus, Configuration('broken'), distractors=0,
+                           vector=Faults(error_rate=1.0))
+        self.assertEqual(outcome['mrr'], 0.0)
+        self.assertTrue(all(ranked == [] for ranked in outcome['queries'].values()))
+
+if __name__ == '__main__':
+    unittest.main()
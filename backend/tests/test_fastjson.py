@@ -0,0 +1,88 @@
+"""
+test_fastjson.py
+----------------
+Tests for the fast JSON layer.
+Verifying that faster never means different: the bytes match the standard library's.
+"""
+
+import decimal
+import json
+import random
+import unittest
+import uuid
+from datetime import date, datetime
+from unittest.mock import patch
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from backend.utils import fastjson
+from backend.utils.fastjson import FastJSONProvider, dumps, stream_dumps, stream_jsonify
+
+
+def stdlib(obj):
+    """What Flask's default provider writes for a compact response."""
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=True,
+                      sort_keys=True, separators=(',', ':')).encode('ascii')
+
+
+class TestFastJSON(unittest.TestCase):
+    """Test cases for byte-identical encoding and streaming."""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.payloads = [
+            {'status': 'success', 'b': [1, 2.5, None, True], 'a': {'z': 'x', 'y': []}},
+            {'text': 'café \U0001F600  ', 'ctrl': 'a\x00\x1f\x7f\n\t"\\/'},
+            {'small': [1e-05, 9.99e-05, 1e-07, 5e-324], 'big': [1e16, 1e21, 2 ** 70]},
+            {1: 'one', 10: 'ten', 2: 'two'},
+            {'when': datetime(2025, 3, 18, 9, 30), 'day': date(2025, 3, 18),
+             'id': uuid.UUID(int=5), 'amount': decimal.Decimal('1.10')},
+            [{'id': str(i), 'score': rng.random(), 'importance': rng.random() * 10 ** rng.randint(-6, 6),
+              'tags': ['family', 'music'][:rng.randint(0, 2)], 'summary': f'Memory {i}'}
+             for i in range(500)]
+        ]
+
+    def test_dumps_matches_stdlib(self):
+        """Every payload encodes to the standard library's bytes."""
+        for payload in self.payloads:
+            self.assertEqual(dumps(payload, DefaultJSONProvider.default), stdlib(payload))
+
+    def test_dumps_without_orjson(self):
+        """Without orjson the standard library does the work, with the same result."""
+        with patch.object(fastjson, 'orjson', None):
+            for payload in self.payloads:
+                self.assertEqual(dumps(payload, DefaultJSONProvider.default), stdlib(payload))
+
+    def test_stream_matches_buffered(self):
+        """Chunks of a streamed list join into the buffered encoding."""
+        items = self.payloads[-1]
+        envelope = {'status': 'success', 'pagination': {'total': 500}}
+        for chunk_size in (1, 7, 256, 1000):
+            streamed = b''.join(stream_dumps(envelope, 'memories', items, chunk_size=chunk_size))
+            self.assertEqual(streamed, stdlib(dict(envelope, memories=items)))
+        self.assertEqual(b''.join(stream_dumps({'status': 'success'}, 'results', [])),
+                         b'{"results":[],"status":"success"}')
+
+    def test_provider_responses_match_default(self):
+        """jsonify and stream_jsonify return the default provider's bytes, unless debug indents them."""
+        default_app, fast_app = Flask('default'), Flask('fast')
+        fast_app.json = FastJSONProvider(fast_app)
+        fast_app.json.stream_min_items = 10
+        items = self.payloads[-1]
+
+        for debug in (False, True):
+            default_app.debug = fast_app.debug = debug
+            with default_app.app_context():
+                expected = [jsonify(payload).get_data() for payload in self.payloads[:-1]]
+                expected_list = jsonify(status='success', days=items).get_data()
+            with fast_app.app_context():
+                actual = [jsonify(payload).get_data() for payload in self.payloads[:-1]]
+                streamed = stream_jsonify({'status': 'success'}, 'days', items)
+                self.assertEqual(streamed.is_streamed, not debug)
+                actual_list = streamed.get_data()
+            self.assertEqual(actual, expected)
+            self.assertEqual(actual_list, expected_list)
+
+if __name__ == '__main__':
+    unittest.main()
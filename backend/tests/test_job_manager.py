@@ -0,0 +1,127 @@
+"""
+test_job_manager.py
+-------------------
+Tests for the background JobManager.
+Verifying that work handed off is finished, and that its progress can be followed.
+"""
+
+import threading
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.models import Base
+from backend.services.jobs.job_manager import Job, JobManager
+
+class TestJobManager(unittest.TestCase):
+    """Test cases for JobManager.
+    
+    The request returns at once. The work carries on, and reports back.
+    """
+    
+    def setUp(self):
+        self.cleanups = []
+        self.manager = JobManager(max_workers=1, max_jobs=2, cleanup=lambda: self.cleanups.append(True))
+    
+    def tearDown(self):
+        self.manager.shutdown()
+    
+    def test_job_reports_progress_and_result(self):
+        """A job's progress and result are visible once it finishes."""
+        def work(job, items):
+            job.update(total=len(items))
+            for _ in items:
+                job.update(advance=1)
+            return {'count': len(items)}
+        
+        job = self.manager.submit('test.work', work, [1, 2, 3, 4])
+        self.manager.shutdown(wait=True)
+        
+        status = self.manager.get(job.id).to_dict()
+        self.assertEqual(status['status'], Job.SUCCEEDED)
+        self.assertEqual(status['progress'], 1.0)
+        self.assertEqual(status['result'], {'count': 4})
+        self.assertEqual(self.cleanups, [True])
+    
+    def test_job_failure_is_recorded(self):
+        """A job that raises is marked failed with its error."""
+        def work(job):
+            raise RuntimeError("the index was unreachable")
+        
+        job = self.manager.submit('test.fail', work)
+        self.manager.shutdown(wait=True)
+        
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, "the index was unreachable")
+    
+    def test_finished_jobs_are_evicted_first(self):
+        """Only the most recent jobs are remembered, and never a running one."""
+        release = threading.Event()
+        running = self.manager.submit('test.block', lambda job: release.wait(5))
+        later = [self.manager.submit('test.noop', lambda job: None) for _ in range(2)]
+        release.set()
+        self.manager.shutdown(wait=True)
+        
+        self.assertIsNotNone(self.manager.get(running.id))
+        self.assertIsNotNone(self.manager.get(later[-1].id))
+
+
+class TestSharedJobStatus(unittest.TestCase):
+    """Test cases for job status saved to the database.
+    
+    One worker does the work. Any of them can say how it is going.
+    """
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        sessions = sessionmaker(bind=self.engine)
+        self.worker = JobManager(max_workers=1, session_factory=sessions, save_interval=0)
+        self.other = JobManager(max_workers=1, session_factory=sessions, save_interval=0)
+    
+    def tearDown(self):
+        self.worker.shutdown()
+        self.other.shutdown()
+        self.engine.dispose()
+    
+    def test_another_manager_reports_progress_and_result(self):
+        """A job run by one manager can be polled through another, while running and once done."""
+        reported = threading.Event()
+        release = threading.Event()
+        
+        def work(job):
+            job.update(total=4, processed=1)
+            reported.set()
+            release.wait(5)
+            job.update(advance=3)
+            return {'count': 4}
+        
+        job = self.worker.submit('test.shared', work, params={'user_id': 1})
+        self.assertTrue(reported.wait(5))
+        
+        running = self.other.get(job.id).to_dict()
+        self.assertEqual(running['status'], Job.RUNNING)
+        self.assertEqual((running['processed'], running['total']), (1, 4))
+        self.assertEqual(running['params'], {'user_id': 1})
+        
+        release.set()
+        self.worker.shutdown(wait=True)
+        
+        finished = self.other.get(job.id).to_dict()
+        self.assertEqual(finished['status'], Job.SUCCEEDED)
+        self.assertEqual(finished['progress'], 1.0)
+        self.assertEqual(finished['result'], {'count': 4})
+        self.assertIsNotNone(finished['finished_at'])
+    
+    def test_unknown_job_is_none(self):
+        """A job no manager has saved is not found."""
+        self.assertIsNone(self.other.get('no-such-job'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+test_journal_service.py
+-----------------------
+Tests for the journal pipeline.
+Verifying that days are written in the background, once, and again only when they change.
+"""
+
+import time
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.journal import journal_bp
+from backend.models import Base, JournalEntry, MemoryChip, User
+from backend.services.jobs.job_manager import JobManager
+from backend.services.journal.journal_service import JournalService
+from backend.services.journal.journal_writer import JournalWriter
+from backend.services.timeline.timeline_service import TimelineService
+from backend.tests.test_serializers import count_queries
+
+
+class TestJournalService(unittest.TestCase):
+    """Test cases for generated, persisted and cached journal entries."""
+
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.flush()
+        self.user_id = user.id
+        chip = MemoryChip(user_id=user.id, summary='Coffee', source_text='We had coffee.', emotion='joy')
+        self.db_session.add(chip)
+        self.db_session.commit()
+        self.chip_id = chip.id
+
+        self.timeline_service = TimelineService(self.db_session)
+        self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 18), 'title': 'Coffee day', 'entry_summary': 'Coffee.',
+             'memory_chip_ids': [self.chip_id]}
+        ])
+
+        self.writer = JournalWriter(openai_client=MagicMock())
+        self.writer.update_config({'enabled': False})
+        self.job_manager = JobManager(max_workers=1, cleanup=self.db_session.remove)
+        self.service = JournalService(self.db_session, self.writer, job_manager=self.job_manager)
+
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.journal_service = self.service
+        self.app.register_blueprint(journal_bp, url_prefix='/api/journal')
+        self.client = self.app.test_client()
+        self.url = f'/api/journal/day/2025-03-18?user_id={self.user_id}&voice_style=stoic'
+
+    def tearDown(self):
+        self.job_manager.shutdown()
+        self.db_session.remove()
+        self.engine.dispose()
+
+    def wait(self, job, status='succeeded'):
+        deadline = time.time() + 5
+        while not self.job_manager.get(job['id']).done and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.job_manager.get(job['id']).status, status)
+
+    def test_written_in_background_then_served(self):
+        """The first view queues the entry; later views are served without writing or reading it again."""
+        self.writer.write = MagicMock(wraps=self.writer.write)
+
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.get_json()['state'], 'pending')
+        self.wait(first.get_json()['job'])
+
+        second = self.client.get(self.url)
+        self.assertEqual(second.status_code, 200)
+        entry = second.get_json()['entry']
+        self.assertTrue(second.get_json()['fresh'])
+        self.assertEqual(entry['title'], 'Coffee day')
+        self.assertEqual(entry['emotion'], 'joy')
+        self.assertTrue(entry['created_by_ai'])
+
+        self.db_session.remove()
+        with count_queries(self.engine) as statements:
+            self.assertEqual(self.client.get(self.url).get_json()['entry'], entry)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.writer.write.call_count, 1)
+
+    def test_rewritten_only_when_the_day_changes(self):
+        """A changed memory serves the old entry while the new one is written in place."""
+        self.wait(self.client.get(self.url).get_json()['job'])
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.db_session.get(MemoryChip, self.chip_id).summary = 'Coffee and rain'
+        self.db_session.commit()
+
+        stale = self.client.get(self.url).get_json()
+        self.assertEqual(stale['state'], 'stale')
+        self.assertFalse(stale['fresh'])
+        self.assertNotIn('rain', stale['entry']['entry_body'])
+        self.wait(stale['job'])
+
+        fresh = self.client.get(self.url).get_json()
+        self.assertTrue(fresh['fresh'])
+        self.assertIn('Coffee and rain', fresh['entry']['entry_body'])
+        self.assertEqual(fresh['entry']['id'], stale['entry']['id'])
+        self.assertEqual(self.db_session.query(JournalEntry).count(), 1)
+
+    def test_failures_wait_before_retrying(self):
+        """A failed write is reported, and not retried until the pause is over."""
+        self.writer.write = MagicMock(side_effect=RuntimeError('model unavailable'))
+
+        self.wait(self.client.get(self.url).get_json()['job'], status='failed')
+
+        failed = self.client.get(self.url)
+        self.assertEqual(failed.status_code, 202)
+        self.assertEqual(failed.get_json()['state'], 'failed')
+        self.assertNotIn('job', failed.get_json())
+        self.assertEqual(self.writer.write.call_count, 1)
+
+    def test_days_without_an_entry(self):
+        """There is nothing to write about a day with no timeline entry."""
+        response = self.client.get(f'/api/journal/day/2025-03-19?user_id={self.user_id}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_entries_written_by_hand(self):
+        """Entries with a body are stored as given, listed, and edited."""
+        response = self.client.post('/api/journal/create', json={
+            'user_id': self.user_id, 'date': '2025-03-18', 'title': 'Mine', 'entry_body': 'My words.'
+        })
+        self.assertEqual(response.status_code, 201)
+        entry_id = response.get_json()['entry']['id']
+
+        detail = self.client.get(f'/api/journal/entry/{entry_id}').get_json()['entry']
+        self.assertFalse(detail['created_by_ai'])
+        self.assertEqual(detail['related_memories'], [self.chip_id])
+
+        self.client.put(f'/api/journal/entry/{entry_id}', json={'entry_body': 'Better words.'})
+        listing = self.client.get(f'/api/journal/entries?user_id={self.user_id}').get_json()
+        self.assertEqual(listing['pagination']['total'], 1)
+        self.assertEqual(listing['entries'][0]['entry_body'], 'Better words.')
+
+        self.assertEqual(self.client.post('/api/journal/create', json={'user_id': self.user_id}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
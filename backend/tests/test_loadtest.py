@@ -0,0 +1,70 @@
+"""
+test_loadtest.py
+----------------
+Tests for the load-test harness.
+Verifying that the app boots on its stand-ins, and that every call is counted where it belongs.
+"""
+
+import logging
+import unittest
+
+from backend.loadtest import LoadTestConfig, run, summarize
+from backend.loadtest.harness import Recorder, percentile
+from backend.testing.fakes import Faults
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test cases for the summary statistics and a short run against the local app."""
+
+    def test_summary(self):
+        """Percentiles are nearest-rank, and failed calls of any kind are errors."""
+        values = [i / 100 for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 0.5)
+        self.assertEqual(percentile(values, 99), 0.99)
+        self.assertEqual(percentile([0.2], 95), 0.2)
+        self.assertIsNone(percentile([], 50))
+
+        recorder = Recorder()
+        for i in range(8):
+            recorder.record('memory.chips', 0.01 * (i + 1), 200)
+        recorder.record('memory.chips', 0.5, 500)
+        recorder.record('chat.message', 2.0, None, 'TimeoutError')
+        summary = summarize(recorder, duration=2.0)
+
+        chips = summary['endpoints']['memory.chips']
+        self.assertEqual((chips['requests'], chips['errors']), (9, 1))
+        self.assertAlmostEqual(chips['throughput'], 4.5)
+        self.assertAlmostEqual(chips['p50_ms'], 50.0)
+        self.assertAlmostEqual(chips['p99_ms'], 500.0)
+        self.assertEqual(chips['status'], {'200': 8, '500': 1})
+        self.assertEqual(summary['endpoints']['chat.message']['status'], {'TimeoutError': 1})
+        self.assertEqual((summary['total']['requests'], summary['total']['errors']), (10, 2))
+
+    def test_short_run(self):
+        """A brief run with two worker counts reaches every endpoint of the mix without errors."""
+        config = LoadTestConfig(
+            users=4, duration=1.0, warmup=0.2, seeded_users=2, days=10,
+            openai=Faults(latency=0.005), vector=Faults(latency=0.001)
+        )
+        logging.disable(logging.WARNING)
+        try:
+            results = run(config, workers=(1, 4))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.assertEqual(list(results['runs']), ['workers=1', 'workers=4'])
+        self.assertEqual(results['config']['openai']['latency'], 0.005)
+        for label, outcome in results['runs'].items():
+            self.assertGreater(outcome['total']['requests'], 0, label)
+            self.assertEqual(outcome['total']['errors'], 0, outcome['total']['status'])
+            self.assertEqual(outcome['stage_errors'], {})
+        self.assertEqual(set(results['runs']['workers=4']['endpoints']),
+                         {'chat.message', 'memory.search', 'memory.chips', 'timeline.days'})
+
+    def test_unknown_endpoint_in_mix(self):
+        """A mix naming an endpoint the harness does not know is refused."""
+        with self.assertRaises(ValueError):
+            LoadTestConfig(mix={'memory.everything': 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,8 +7,20 @@ The test of digital memory management.
 """
 
 import unittest
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.api.memory import memory_bp
+from backend.models import Base, MemoryChip, MemoryOutboxEvent, User
+from backend.services.jobs.job_manager import Job
+from backend.services.memory.consolidation import SUMMARY_SOURCE_MAX_CHARS, summarize_cluster
 from backend.services.memory.memory_service import MemoryService
+from backend.services.vector_store.tiered_store import TieredMemoryStore
+from backend.testing.fakes import FakePineconeIndex, Faults, fake_embedding, fake_pinecone_manager
+from backend.tests.test_serializers import count_queries
 
 class TestMemoryService(unittest.TestCase):
     """Test cases for MemoryService.
@@ -167,6 +179,30 @@ class TestMemoryService(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]['id'], 'test_id')
     
+    def test_search_memories_uses_working_memory(self):
+        """Follow-up turns in a conversation are answered without a vector search."""
+        self.mock_vector_store.generate_embedding.return_value = [1.0, 0.0, 0.0]
+        self.mock_vector_store.search_memories.return_value = [
+            {'id': 'lake', 'source_text': 'The lake house', 'score': 0.9,
+             'component_scores': {'vector_similarity': 0.95}, 'metadata': {}, 'values': [1.0, 0.1, 0.0]},
+            {'id': 'boat', 'source_text': 'The old boat', 'score': 0.8,
+             'component_scores': {'vector_similarity': 0.85}, 'metadata': {}, 'values': [0.9, 0.3, 0.0]}
+        ]
+        
+        first = self.service.search_memories("The lake", top_k=2, preprocess_query=False, conversation_id=7)
+        second = self.service.search_memories("The lake again", top_k=2, preprocess_query=False, conversation_id=7)
+        
+        self.assertEqual(self.mock_vector_store.search_memories.call_count, 1)
+        self.assertTrue(self.mock_vector_store.search_memories.call_args.kwargs['include_values'])
+        self.assertEqual([m['id'] for m in first], ['lake', 'boat'])
+        self.assertEqual([m['id'] for m in second], ['lake', 'boat'])
+        self.assertNotIn('values', second[0])
+        
+        # A turn that drifts away from the working set goes back to the vector store
+        self.mock_vector_store.generate_embedding.return_value = [0.0, 0.0, 1.0]
+        self.service.search_memories("Something else", top_k=2, preprocess_query=False, conversation_id=7)
+        self.assertEqual(self.mock_vector_store.search_memories.call_count, 2)
+    
     def test_delete_memory(self):
         """Test deleting a memory.
         
@@ -182,5 +218,531 @@ class TestMemoryService(unittest.TestCase):
         # Verify the result
         self.assertTrue(result)
 
+class TestMemoryServiceWithDatabase(unittest.TestCase):
+    """Test cases for MemoryService backed by the memory_chips table.
+    
+    The database remembers first. The vector store is told through the outbox.
+    """
+    
+    def setUp(self):
+        """Set up an in-memory database and a mocked vector store."""
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        self.mock_vector_store = MagicMock()
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        self.mock_vector_store.delete_memory.return_value = True
+        
+        self.service = MemoryService(
+            vector_store=self.mock_vector_store,
+            query_preprocessor=MagicMock(),
+            db_session=self.db_session
+        )
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def test_store_memory_writes_row_and_syncs(self):
+        """Storing a memory writes the chip, then delivers the outbox event."""
+        memory_id = self.service.store_memory(
+            source_text="The night sky over the old house.",
+            emotion="wistful",
+            user_id=1,
+            tags=['stars', 'childhood']
+        )
+        
+        chip = self.db_session.query(MemoryChip).filter_by(embedding_id=memory_id).one()
+        self.assertEqual(chip.summary, "The night sky over the old house")
+        self.assertEqual(chip.tags, ['stars', 'childhood'])
+        
+        self.mock_vector_store.upsert_memory_chip.assert_called_once()
+        self.assertEqual(self.mock_vector_store.upsert_memory_chip.call_args.kwargs['memory_id'], memory_id)
+        event = self.db_session.query(MemoryOutboxEvent).one()
+        self.assertIsNotNone(event.processed_at)
+    
+    def test_failed_sync_stays_queued(self):
+        """A vector store failure keeps the memory and leaves the event for the relay."""
+        self.mock_vector_store.upsert_memory_chip.return_value = False
+        memory_id = self.service.store_memory(source_text="Kept, even if the index is down.")
+        
+        self.assertIsNotNone(memory_id)
+        event = self.db_session.query(MemoryOutboxEvent).one()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, datetime.utcnow())
+        
+        # It backs off rather than being retried on every drain
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        self.assertEqual(self.service.outbox.process_pending(), 0)
+        
+        # Once due, the next drain delivers it
+        self.assertEqual(self.service.outbox.retry_failed(), 1)
+        self.assertEqual(self.service.outbox.process_pending(), 1)
+    
+    def test_failed_sync_backs_off_without_giving_up(self):
+        """Each failure doubles the wait, up to the cap, and the event is never abandoned."""
+        self.service.outbox.max_retry_delay = 30.0
+        self.mock_vector_store.upsert_memory_chip.return_value = False
+        self.service.store_memory(source_text="Through a long outage.")
+        event = self.db_session.query(MemoryOutboxEvent).one()
+        
+        for _ in range(8):
+            self.assertGreater(event.next_attempt_at, datetime.utcnow())
+            self.service.outbox.retry_failed()
+            self.service.outbox.process_pending()
+        
+        self.assertEqual([self.service.outbox._backoff(attempts) for attempts in range(1, 7)],
+                         [5, 10, 20, 30, 30, 30])
+        self.assertEqual(event.attempts, 9)
+        self.assertIsNone(event.processed_at)
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        self.service.outbox.retry_failed()
+        self.assertEqual(self.service.outbox.process_pending(), 1)
+    
+    def test_request_delivers_only_its_own_event(self):
+        """A store or delete syncs the memory it touched and leaves the backlog to the relay."""
+        self.mock_vector_store.upsert_memory_chip.return_value = False
+        backlog = self.service.store_memory(source_text="Stuck in the outbox.")
+        self.service.outbox.retry_failed()
+        self.mock_vector_store.upsert_memory_chip.reset_mock()
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        
+        memory_id = self.service.store_memory(source_text="Just written.")
+        
+        self.assertEqual([call.kwargs['memory_id'] for call in self.mock_vector_store.upsert_memory_chip.call_args_list],
+                         [memory_id])
+        self.assertEqual(self.service.outbox.process_pending(), 1)
+        self.assertEqual(self.mock_vector_store.upsert_memory_chip.call_args.kwargs['memory_id'], backlog)
+    
+    def test_delete_is_not_undone_by_a_failed_upsert(self):
+        """A forget queued behind a failed write waits for it, so the vector ends up gone."""
+        index = FakePineconeIndex(Faults(error_rate=1.0))
+        service = MemoryService(vector_store=fake_pinecone_manager(index=index),
+                                query_preprocessor=MagicMock(), db_session=self.db_session)
+        memory_id = service.store_memory(source_text="Written while the index was down.", user_id=1)
+        self.assertTrue(service.delete_memory(memory_id))
+        
+        index.faults = Faults()
+        service.outbox.retry_failed()
+        service.outbox.process_pending()
+        
+        self.assertEqual(len(index), 0)
+        self.assertEqual(self.db_session.query(MemoryOutboxEvent).filter(
+            MemoryOutboxEvent.processed_at.is_(None)).count(), 0)
+        self.assertEqual(service.search_memories("index down", preprocess_query=False), [])
+    
+    def test_workers_never_deliver_the_same_event_twice(self):
+        """An event claimed by one worker is neither sent again nor overtaken by another."""
+        self.mock_vector_store.upsert_memory_chip.return_value = False
+        memory_id = self.service.store_memory(source_text="Claimed elsewhere.")
+        self.service.outbox.retry_failed()
+        other = MemoryService(vector_store=MagicMock(), query_preprocessor=MagicMock(),
+                              db_session=scoped_session(sessionmaker(bind=self.engine)))
+        
+        # Another worker has taken the upsert and is still delivering it
+        claim, claimed = other.outbox._claim(other.outbox.pending_events())
+        self.assertEqual(len(claimed), 1)
+        self.assertTrue(self.service.delete_memory(memory_id))
+        self.mock_vector_store.reset_mock()
+        self.assertEqual(self.service.outbox.process_pending(), 0)
+        self.mock_vector_store.upsert_memory_chip.assert_not_called()
+        self.mock_vector_store.delete_memory.assert_not_called()
+        
+        # A claim left by a worker that died lapses, and the events go out in order
+        self.db_session.query(MemoryOutboxEvent).filter_by(claimed_by=claim).update(
+            {MemoryOutboxEvent.claimed_at: datetime.utcnow() - timedelta(hours=1)})
+        self.db_session.commit()
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        self.service.outbox.retry_failed()
+        self.service.outbox.process_pending()
+        self.service.outbox.process_pending()
+        self.assertEqual([name for name, _, _ in self.mock_vector_store.method_calls],
+                         ['upsert_memory_chip', 'delete_memory'])
+        other.db.remove()
+    
+    def test_delivered_events_are_emptied_then_purged(self):
+        """A delivered event keeps no text, and is deleted once past the retention period."""
+        self.service.store_memory(source_text="Delivered at once.")
+        event = self.db_session.query(MemoryOutboxEvent).one()
+        self.assertIsNone(event.payload)
+        
+        self.assertEqual(self.service.outbox.purge_processed(), 0)
+        event.processed_at = datetime.utcnow() - timedelta(days=8)
+        self.db_session.commit()
+        self.assertEqual(self.service.outbox.purge_processed(), 1)
+        self.assertEqual(self.db_session.query(MemoryOutboxEvent).count(), 0)
+    
+    def test_search_drops_vectors_that_outlived_their_memory(self):
+        """A vector found after its memory was deleted is left out, and deleted again."""
+        memory_id = self.service.store_memory(source_text="Forgotten, but the index came back.")
+        self.assertTrue(self.service.delete_memory(memory_id))
+        self.mock_vector_store.search_memories.return_value = [
+            {'id': memory_id, 'source_text': 'Forgotten.', 'score': 0.9, 'metadata': {}},
+            {'id': 'legacy', 'source_text': 'Only ever in the index.', 'score': 0.8, 'metadata': {}}
+        ]
+        
+        results = self.service.search_memories("forgotten", preprocess_query=False)
+        
+        self.assertEqual([memory['id'] for memory in results], ['legacy'])
+        self.assertEqual(self.db_session.query(MemoryOutboxEvent).filter_by(
+            embedding_id=memory_id, operation=MemoryOutboxEvent.DELETE, processed_at=None).count(), 1)
+    
+    def test_hot_tier_of_another_worker_drops_forgotten_memories(self):
+        """A memory deleted or consolidated by one worker is not served from another's hot tier."""
+        index = FakePineconeIndex()
+        workers = [
+            MemoryService(vector_store=TieredMemoryStore(fake_pinecone_manager(index=index), hot_min_similarity=0.1),
+                          query_preprocessor=MagicMock(), db_session=self.db_session)
+            for _ in range(2)
+        ]
+        forgotten = workers[0].store_memory(source_text="The lake house in winter.", user_id=1)
+        folded = workers[0].store_memory(source_text="The lake house in summer.", user_id=1)
+        legacy = 'legacy_lake'
+        index.upsert([{'id': legacy, 'values': fake_embedding('The lake house in spring.'),
+                       'metadata': {'source_text': 'The lake house in spring.', 'user_id': 1}}])
+        workers[1].vector_store.promote({forgotten: None, folded: None, legacy: None})
+        
+        workers[0].delete_memory(forgotten)
+        chip = self.db_session.query(MemoryChip).filter_by(embedding_id=folded).one()
+        summary = MemoryChip(user_id=1, summary='Summers', source_text='Summers.', embedding_id='summary')
+        self.db_session.add(summary)
+        self.db_session.flush()
+        chip.consolidated_into_id = summary.id
+        self.db_session.commit()
+        
+        results = workers[1].search_memories("lake house", top_k=3, preprocess_query=False)
+        
+        self.assertEqual([memory['id'] for memory in results], [legacy])
+        self.assertNotIn(forgotten, workers[1].vector_store.hot)
+        self.assertNotIn(folded, workers[1].vector_store.hot)
+        self.assertIn(legacy, workers[1].vector_store.hot)
+    
+    def test_retrieve_memory_served_from_database(self):
+        """Fetch-by-id reads the chip without touching the vector store."""
+        memory_id = self.service.store_memory(source_text="A memory close to hand.", emotion="calm")
+        
+        memory = self.service.retrieve_memory(memory_id)
+        
+        self.mock_vector_store.get_memory.assert_not_called()
+        self.assertEqual(memory['id'], memory_id)
+        self.assertEqual(memory['emotion'], 'calm')
+    
+    def test_retrieve_memories_mixes_database_and_vector_store(self):
+        """Multi-get serves stored rows locally and fetches the rest in one batch."""
+        memory_id = self.service.store_memory(source_text="Stored locally.")
+        self.mock_vector_store.get_memories.return_value = {
+            'legacy_id': {'id': 'legacy_id', 'source_text': 'Only in the index.', 'metadata': {'user_id': 3}}
+        }
+        
+        memories = self.service.retrieve_memories([memory_id, 'legacy_id', 'unknown'])
+        
+        self.mock_vector_store.get_memories.assert_called_once_with(['legacy_id', 'unknown'])
+        self.assertEqual(list(memories), [memory_id, 'legacy_id'])
+        self.assertEqual(memories['legacy_id']['source_text'], 'Only in the index.')
+        self.assertEqual(memories['legacy_id']['user_id'], 3)
+        self.assertIsNone(memories['legacy_id']['character_id'])
+        self.assertEqual(set(memories['legacy_id']), set(memories[memory_id]))
+    
+    def test_delete_memory_removes_row_and_vector(self):
+        """Deleting a memory removes the chip and queues the vector deletion."""
+        memory_id = self.service.store_memory(source_text="Something to let go of.", tags=['regret'])
+        
+        self.assertTrue(self.service.delete_memory(memory_id))
+        
+        self.assertEqual(self.db_session.query(MemoryChip).count(), 0)
+        self.mock_vector_store.delete_memory.assert_called_once_with(memory_id)
+
+    def test_delete_memories_by_filter(self):
+        """Bulk delete by user removes their rows in batches and leaves others alone."""
+        kept_id = self.service.store_memory(source_text="Someone else's memory.", user_id=2)
+        doomed = [
+            self.service.store_memory(source_text=f"Memory {i}.", user_id=1, tags=['work'])
+            for i in range(5)
+        ]
+        job = Job('memory.bulk_delete')
+        
+        result = self.service.delete_memories(user_id=1, batch_size=2, job=job)
+        
+        self.assertEqual(result['deleted'], 5)
+        self.assertEqual(job.to_dict()['progress'], 1.0)
+        remaining = [chip.embedding_id for chip in self.db_session.query(MemoryChip)]
+        self.assertEqual(remaining, [kept_id])
+        deleted_ids = [
+            memory_id
+            for call in self.mock_vector_store.delete_memories.call_args_list
+            for memory_id in call.args[0]
+        ] + [call.args[0] for call in self.mock_vector_store.delete_memory.call_args_list]
+        self.assertEqual(sorted(deleted_ids), sorted(doomed))
+        self.mock_vector_store.delete_by_filter.assert_called_once_with({'user_id': 1})
+    
+    def test_delete_memories_by_tag_and_ids(self):
+        """Bulk delete resolves tags in SQL and still removes vector-only IDs."""
+        tagged = self.service.store_memory(source_text="About the lake house.", tags=['lake'])
+        untagged = self.service.store_memory(source_text="About the city.")
+        
+        result = self.service.delete_memories(tag='lake')
+        self.assertEqual(result['deleted'], 1)
+        self.assertIsNone(self.db_session.query(MemoryChip).filter_by(embedding_id=tagged).first())
+        
+        result = self.service.delete_memories(memory_ids=[untagged, 'legacy_vector'])
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['vector_only_deleted'], 1)
+        self.mock_vector_store.delete_memory.assert_called_with('legacy_vector')
+    
+    def test_delete_memories_waits_for_pending_upserts(self):
+        """A bulk forget of a memory whose write has not reached the index is not undone by it."""
+        index = FakePineconeIndex()
+        service = MemoryService(vector_store=fake_pinecone_manager(index=index),
+                                query_preprocessor=MagicMock(), db_session=self.db_session)
+        synced = service.store_memory(source_text="Already in the index.", user_id=1)
+        index.faults = Faults(error_rate=1.0)
+        stuck = service.store_memory(source_text="Still waiting to be written.", user_id=1)
+        
+        # The index comes back before the stuck write is due again
+        index.faults = Faults()
+        result = service.delete_memories(memory_ids=[synced, stuck, 'legacy_vector'])
+        self.assertEqual((result['deleted'], result['vector_only_deleted']), (2, 1))
+        self.assertEqual(len(index), 0)
+        
+        service.outbox.retry_failed()
+        service.outbox.process_pending()
+        
+        self.assertEqual(len(index), 0)
+        self.assertEqual(self.db_session.query(MemoryOutboxEvent).filter(
+            MemoryOutboxEvent.processed_at.is_(None)).count(), 0)
+    
+    def test_delete_memories_rolls_back_vector_only_failures(self):
+        """A failure queueing vector-only deletes leaves the session usable."""
+        kept = self.service.store_memory(source_text="Not part of this delete.")
+        with patch.object(self.service.outbox, 'enqueue_deletes', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.service.delete_memories(memory_ids=['legacy_vector'])
+        
+        self.assertEqual([chip.embedding_id for chip in self.db_session.query(MemoryChip)], [kept])
+    
+    def _consolidated(self, name):
+        """A summary chip standing for two source chips, as consolidation leaves them."""
+        summary_id = self.service.store_memory(source_text=f"{name} summary.", user_id=1)
+        summary = self.db_session.query(MemoryChip).filter_by(embedding_id=summary_id).one()
+        sources = [self.service.store_memory(source_text=f"{name} {i}.", user_id=1) for i in range(2)]
+        self.db_session.query(MemoryChip).filter(MemoryChip.embedding_id.in_(sources)).update(
+            {MemoryChip.consolidated_into_id: summary.id}, synchronize_session=False)
+        self.db_session.commit()
+        return summary_id, sources
+    
+    def test_delete_summary_deletes_its_sources(self):
+        """Forgetting a consolidated summary forgets the memories folded into it."""
+        kept = self.service.store_memory(source_text="Not consolidated.", user_id=1)
+        summary_id, _ = self._consolidated('Walks')
+        
+        self.assertTrue(self.service.delete_memory(summary_id))
+        
+        self.assertEqual([chip.embedding_id for chip in self.db_session.query(MemoryChip)], [kept])
+    
+    def test_delete_summary_with_foreign_keys_enforced(self):
+        """Where ON DELETE SET NULL is enforced (as on MySQL), the sources still go, not back to /chips."""
+        self.db_session.add(User(id=1, username='echo_tester'))
+        self.db_session.commit()
+        self.db_session.execute(text('PRAGMA foreign_keys=ON'))
+        summary_id, _ = self._consolidated('Walks')
+        
+        self.assertTrue(self.service.delete_memory(summary_id))
+        self.assertEqual(self.service.delete_memories(memory_ids=[self._consolidated('Rain')[0]])['deleted'], 3)
+        
+        self.assertEqual(self.db_session.query(MemoryChip).count(), 0)
+    
+    def test_delete_memories_deletes_summary_sources(self):
+        """Bulk forgetting a summary by ID forgets its sources too, whatever the batch size."""
+        kept = self.service.store_memory(source_text="Not consolidated.", user_id=1)
+        summary_id, sources = self._consolidated('Walks')
+        
+        result = self.service.delete_memories(memory_ids=[summary_id], batch_size=1)
+        
+        self.assertEqual(result['deleted'], 3)
+        self.assertEqual([chip.embedding_id for chip in self.db_session.query(MemoryChip)], [kept])
+        self.assertEqual(self.db_session.query(MemoryChip).filter(
+            MemoryChip.consolidated_into_id.isnot(None)).count(), 0)
+    
+    def test_pin_updates_the_stored_memory(self):
+        """Pinning marks the existing chip and rewrites its vector, adding no second memory."""
+        memory_id = self.service.store_memory(source_text="Worth keeping close.", user_id=1, tags=['keep'])
+        self.mock_vector_store.upsert_memory_chip.reset_mock()
+        app = Flask(__name__)
+        app.memory_service = self.service
+        app.register_blueprint(memory_bp, url_prefix='/api/memory')
+        
+        response = app.test_client().post('/api/memory/pin', json={'memory_id': memory_id})
+        
+        self.assertEqual(response.status_code, 200)
+        chip = self.db_session.query(MemoryChip).one()
+        self.assertTrue(chip.is_pinned)
+        self.assertEqual(chip.embedding_id, memory_id)
+        call = self.mock_vector_store.upsert_memory_chip.call_args.kwargs
+        self.assertEqual(call['memory_id'], memory_id)
+        self.assertTrue(call['metadata']['is_pinned'])
+        self.assertEqual(call['metadata']['tags'], ['keep'])
+    
+    def test_delete_memories_requires_criteria(self):
+        """Bulk delete refuses to run without IDs or a filter."""
+        with self.assertRaises(ValueError):
+            self.service.delete_memories()
+    
+    def test_search_records_references_and_warms_hot_tier(self):
+        """Recalled memories are stamped, and the stamps decide what the hot tier loads."""
+        recalled = self.service.store_memory(source_text="The lake house.")
+        self.mock_vector_store.search_memories.return_value = [
+            {'id': recalled, 'source_text': 'The lake house.', 'score': 0.9, 'metadata': {}}
+        ]
+        
+        self.service.search_memories("The lake", preprocess_query=False)
+        self.service.search_memories("The lake", preprocess_query=False)
+        
+        chip = self.db_session.query(MemoryChip).filter_by(embedding_id=recalled).one()
+        self.assertEqual(chip.reference_count, 2)
+        self.assertIsNotNone(chip.last_referenced_at)
+        
+        # Old and never recalled: stays cold
+        self.db_session.add(MemoryChip(summary='Old', source_text='Old.', embedding_id='old',
+                                       created_at=datetime(2020, 1, 1)))
+        self.db_session.commit()
+        self.mock_vector_store.promote.return_value = 1
+        
+        self.assertEqual(self.service.warm_hot_tier(), 1)
+        self.assertEqual(list(self.mock_vector_store.promote.call_args.args[0]), [recalled])
+    
+    def test_search_projects_fields(self):
+        """A fields projection returns only those fields and loads only their columns."""
+        recalled = self.service.store_memory(source_text="The lake house.", summary="Lake")
+        self.mock_vector_store.search_memories.return_value = [
+            {'id': recalled, 'source_text': 'The lake house.', 'score': 0.9, 'metadata': {}}
+        ]
+        self.db_session.expunge_all()
+        
+        with count_queries(self.engine) as statements:
+            results = self.service.search_memories("The lake", preprocess_query=False,
+                                                   fields=['summary', 'relevance_score'])
+        
+        self.assertEqual(results, [{'id': recalled, 'summary': 'Lake', 'relevance_score': 0.9}])
+        hydrate = next(statement for statement in statements if statement.startswith('SELECT'))
+        self.assertNotIn('source_text', hydrate)
+    
+    def test_consolidate_memories(self):
+        """Similar old, low-importance memories become one summary; pinned ones are left alone."""
+        old = datetime(2025, 1, 1, 9, 0, 0)
+        vectors = {}
+        
+        def add_chip(embedding_id, vector, created_at=old, importance=0.1, pinned=False):
+            chip = MemoryChip(user_id=1, summary=f'About {embedding_id}', source_text=f'{embedding_id}.',
+                              embedding_id=embedding_id, importance_score=importance,
+                              is_pinned=pinned, emotion='calm', created_at=created_at)
+            self.db_session.add(chip)
+            vectors[embedding_id] = vector
+        
+        add_chip('walk_1', [1.0, 0.0], old)
+        add_chip('walk_2', [0.99, 0.1], old + timedelta(hours=1))
+        add_chip('walk_3', [0.98, 0.05], old + timedelta(hours=2))
+        add_chip('taxes', [0.0, 1.0], old + timedelta(hours=3))
+        add_chip('pinned_walk', [1.0, 0.0], old + timedelta(hours=4), pinned=True)
+        add_chip('important_walk', [1.0, 0.0], old + timedelta(hours=5), importance=0.9)
+        add_chip('recent_walk', [1.0, 0.0], datetime.utcnow())
+        self.db_session.commit()
+        self.mock_vector_store.get_vectors.side_effect = lambda ids: {i: vectors[i] for i in ids}
+        
+        result = self.service.consolidate_memories(user_id=1)
+        
+        self.assertEqual(result['candidates'], 4)
+        self.assertEqual(result['clusters'], 1)
+        self.assertEqual(result['consolidated'], 3)
+        summary = self.db_session.query(MemoryChip).filter_by(embedding_id=result['summary_ids'][0]).one()
+        self.assertIn('consolidated', summary.tags)
+        self.assertTrue(summary.summary.startswith('3 memories'))
+        
+        sources = self.db_session.query(MemoryChip).filter_by(consolidated_into_id=summary.id).all()
+        self.assertEqual(sorted(chip.embedding_id for chip in sources), ['walk_1', 'walk_2', 'walk_3'])
+        for embedding_id in ('taxes', 'pinned_walk', 'important_walk', 'recent_walk'):
+            chip = self.db_session.query(MemoryChip).filter_by(embedding_id=embedding_id).one()
+            self.assertIsNone(chip.consolidated_into_id)
+        
+        self.assertEqual(self.mock_vector_store.upsert_memory_chip.call_args.kwargs['memory_id'], summary.embedding_id)
+        self.assertEqual(sorted(self.mock_vector_store.delete_memories.call_args.args[0]),
+                         ['walk_1', 'walk_2', 'walk_3'])
+        
+        # A second run finds nothing left to fold
+        self.assertEqual(self.service.consolidate_memories(user_id=1)['consolidated'], 0)
+    
+    def _walks(self, count=3, length=20):
+        """Old, similar, unimportant chips, ready to be folded together."""
+        old = datetime(2025, 1, 1, 9, 0, 0)
+        for i in range(count):
+            self.db_session.add(MemoryChip(
+                user_id=1, summary=f'Walk {i}', source_text=f'Walk {i}. ' + 'By the river. ' * length,
+                embedding_id=f'walk_{i}', importance_score=0.1, created_at=old + timedelta(hours=i)
+            ))
+        self.db_session.commit()
+        self.mock_vector_store.get_vectors.side_effect = lambda ids: {i: [1.0, 0.0] for i in ids}
+    
+    def test_consolidation_reads_a_window_at_a_time(self):
+        """Candidates are paged per user and window, and vectors fetched a page at a time."""
+        old = datetime(2025, 1, 1, 9, 0, 0)
+        for user_id in (1, 2):
+            for week in (0, 5):
+                for i in range(3):
+                    self.db_session.add(MemoryChip(
+                        user_id=user_id, summary=f'Walk {user_id}-{week}-{i}', source_text='A walk.',
+                        embedding_id=f'walk_{user_id}_{week}_{i}', importance_score=0.1,
+                        created_at=old + timedelta(weeks=week, hours=i)
+                    ))
+        self.db_session.commit()
+        fetched = []
+        self.mock_vector_store.get_vectors.side_effect = lambda ids: fetched.append(ids) or {
+            i: [1.0, 0.0] for i in ids}
+        job = Job('memory.consolidate')
+        
+        result = self.service.consolidate_memories(job=job, page_size=2)
+        
+        self.assertEqual(result['candidates'], 12)
+        self.assertTrue(all(len(ids) <= 2 for ids in fetched))
+        self.assertTrue(all(len({i.rsplit('_', 1)[0] for i in ids}) == 1 for ids in fetched))
+        self.assertEqual((job.total, job.processed), (12, 12))
+    
+    def test_summary_source_text_is_bounded(self):
+        """However long the sources, the summary's text stays small enough to embed and index."""
+        self._walks(count=20, length=1000)
+        chips = self.db_session.query(MemoryChip).order_by(MemoryChip.created_at).all()
+        
+        summary, source_text = summarize_cluster(chips)
+        
+        self.assertLessEqual(len(source_text), SUMMARY_SOURCE_MAX_CHARS)
+        self.assertIn('Walk 0', source_text)
+        self.assertLessEqual(len(summary), 500)
+    
+    def test_sources_stay_indexed_until_their_summary_is(self):
+        """The source deletes wait for the summary upsert, however long that takes."""
+        self._walks()
+        self.mock_vector_store.upsert_memory_chip.return_value = False
+        
+        result = self.service.consolidate_memories(user_id=1)
+        
+        self.assertEqual(result['consolidated'], 3)
+        self.mock_vector_store.delete_memories.assert_not_called()
+        self.mock_vector_store.delete_memory.assert_not_called()
+        self.service.outbox.retry_failed()
+        self.service.outbox.process_pending()
+        self.mock_vector_store.delete_memories.assert_not_called()
+        
+        # Once the summary lands, the relay sends the deletes behind it
+        self.mock_vector_store.upsert_memory_chip.return_value = True
+        self.service.outbox.retry_failed()
+        self.assertEqual(self.service.outbox.process_pending(), 1)
+        self.assertEqual(self.service.outbox.process_pending(), 3)
+        self.assertEqual(sorted(self.mock_vector_store.delete_memories.call_args.args[0]),
+                         ['walk_0', 'walk_1', 'walk_2'])
+
 if __name__ == '__main__':
     unittest.main()
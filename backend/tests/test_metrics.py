@@ -0,0 +1,154 @@
+"""
+test_metrics.py
+---------------
+Tests for runtime metrics.
+Verifying that every stage is counted, and that the count reads as Prometheus expects.
+"""
+
+import os
+import re
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from backend.api.metrics import metrics_bp
+from backend.services.vector_store.pinecone_manager import PineconeManager
+from backend.utils.cache import LRUCache
+from backend.utils.metrics import (
+    CANDIDATES, REGISTRY, SQL_SECONDS, STAGE_ERRORS, STAGE_SECONDS, MetricsRegistry,
+    instrument_engine, timed, watch_caches
+)
+
+# One sample line: a name, optional labels, and a value
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? (\+Inf|-?[0-9.e+-]+)$')
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the registry, stage timing and the /api/metrics endpoint."""
+
+    def test_exposition_format(self):
+        """Counters, histograms and scraped values are written in the text format."""
+        registry = MetricsRegistry()
+        requests = registry.counter('test_requests_total', 'Requests.', ('route',))
+        latency = registry.histogram('test_latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        watch_caches(lambda: {'test': cache}, registry)
+
+        requests.inc(route='/days')
+        requests.inc(2, route='/days')
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value, route='/days')
+
+        lines = registry.exposition().splitlines()
+        self.assertIn('test_requests_total{route="/days"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{route="/days",le="0.1"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{route="/days",le="1"} 2', lines)
+        self.assertIn('test_latency_seconds_bucket{route="/days",le="+Inf"} 3', lines)
+        self.assertIn('test_latency_seconds_sum{route="/days"} 5.55', lines)
+        self.assertIn('test_latency_seconds_count{route="/days"} 3', lines)
+        self.assertIn('soulstream_cache_hits_total{cache="test"} 1', lines)
+        self.assertIn('soulstream_cache_misses_total{cache="test"} 1', lines)
+        self.assertIn('# TYPE test_latency_seconds histogram', lines)
+        for line in lines:
+            if not line.startswith('#'):
+                self.assertRegex(line, SAMPLE)
+
+    def test_stages_time_and_count_errors(self):
+        """A stage is timed whether it succeeds or fails, and failures are counted."""
+        before = (STAGE_SECONDS.count(stage='test.stage'), STAGE_ERRORS.value(stage='test.stage'))
+
+        @timed('test.stage')
+        def stage(fail):
+            """A stage."""
+            if fail:
+                raise RuntimeError('failed')
+            return 'done'
+
+        self.assertEqual(stage(False), 'done')
+        with self.assertRaises(RuntimeError):
+            stage(True)
+        self.assertEqual(stage.__doc__, 'A stage.')
+        self.assertEqual(STAGE_SECONDS.count(stage='test.stage'), before[0] + 2)
+        self.assertEqual(STAGE_ERRORS.value(stage='test.stage'), before[1] + 1)
+
+    def test_sql_statements_are_timed(self):
+        """Every statement an instrumented engine runs is timed by type."""
+        engine = create_engine('sqlite://', poolclass=StaticPool)
+        instrument_engine(engine)
+        before = SQL_SECONDS.count(operation='select')
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            connection.execute(text('SELECT 2'))
+            with self.assertRaises(Exception):
+                connection.execute(text('SELECT * FROM missing_table'))
+        self.assertEqual(SQL_SECONDS.count(operation='select'), before + 2)
+        engine.dispose()
+
+    @patch('backend.services.vector_store.pinecone_manager.Pinecone')
+    @patch('backend.services.vector_store.pinecone_manager.OpenAI')
+    def test_search_stages_are_recorded(self, mock_openai, mock_pinecone):
+        """A vector search records embed, query and re-rank, and what each produced."""
+        with patch.dict(os.environ, {'PINECONE_API_KEY': 'key', 'PINECONE_INDEX_NAME': 'index',
+                                     'PINECONE_REGION': 'region'}):
+            manager = PineconeManager()
+        mock_openai.return_value.embeddings.create.return_value.data = [MagicMock(embedding=[0.1, 0.2])]
+        manager.index.query.return_value = SimpleNamespace(matches=[
+            SimpleNamespace(id=f'm{i}', score=0.9, values=[], metadata={'source_text': f'Memory {i}.'})
+            for i in range(3)
+        ])
+        stages = ('pinecone.embed', 'pinecone.query', 'pinecone.rerank')
+        before = {stage: STAGE_SECONDS.count(stage=stage) for stage in stages}
+        candidates = CANDIDATES.count(stage='pinecone.query')
+
+        self.assertEqual(len(manager.search_memories('the lake', top_k=2)), 2)
+        for stage in stages:
+            self.assertEqual(STAGE_SECONDS.count(stage=stage), before[stage] + 1)
+        self.assertEqual(CANDIDATES.count(stage='pinecone.query'), candidates + 1)
+
+        errors = STAGE_ERRORS.value(stage='pinecone.query')
+        manager.index.query.side_effect = RuntimeError('unreachable')
+        self.assertEqual(manager.search_memories('the lake'), [])
+        self.assertEqual(STAGE_ERRORS.value(stage='pinecone.query'), errors + 1)
+
+    def test_endpoint(self):
+        """/api/metrics serves the registry as Prometheus text."""
+        app = Flask(__name__)
+        app.register_blueprint(metrics_bp, url_prefix='/api')
+        with timed('test.endpoint'):
+            pass
+        response = app.test_client().get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assertIn('soulstream_stage_duration_seconds_count{stage="test.endpoint"}', response.get_data(as_text=True))
+
+    def test_each_app_reports_its_own_caches(self):
+        """Apps in one process each expose their own caches, beside the shared stage metrics."""
+        apps = []
+        for size in (1, 2):
+            app = Flask(__name__)
+            app.metrics_registry = MetricsRegistry(include=REGISTRY)
+            cache = LRUCache()
+            for key in range(size):
+                cache.set(key, key)
+            watch_caches(lambda cache=cache: {'test': cache}, app.metrics_registry)
+            app.register_blueprint(metrics_bp, url_prefix='/api')
+            apps.append(app)
+        with timed('test.apps'):
+            pass
+
+        for size, app in zip((1, 2), apps):
+            lines = app.test_client().get('/api/metrics').get_data(as_text=True).splitlines()
+            self.assertIn(f'soulstream_cache_entries{{cache="test"}} {size}', lines)
+            self.assertTrue(any(line.startswith('soulstream_stage_duration_seconds_count{stage="test.apps"}')
+                                for line in lines))
+        self.assertIsNone(REGISTRY.get('soulstream_cache_entries'))
+
+if __name__ == '__main__':
+    unittest.main()
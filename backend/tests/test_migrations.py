@@ -0,0 +1,47 @@
+"""
+test_migrations.py
+------------------
+Tests for the alembic migrations.
+Verifying that the migrated schema and the models describe the same database.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+from backend.models import Base
+from backend.tests.test_query_plans import migrate
+
+class TestMigrations(unittest.TestCase):
+    """Test cases for the migration history.
+    
+    The models say what the schema should be. The migrations say how it got there.
+    """
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_url = f"sqlite:///{os.path.join(self.temp_dir, 'migrations.db')}"
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_migrations_match_models(self):
+        """Upgrading to head yields the tables, columns and indexes the models declare."""
+        migrate(self.database_url)
+        engine = create_engine(self.database_url)
+        try:
+            with engine.connect() as connection:
+                context = MigrationContext.configure(connection, opts={'compare_type': False})
+                differences = compare_metadata(context, Base.metadata)
+        finally:
+            engine.dispose()
+        
+        self.assertEqual(differences, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ The test of digital remembrance.
 """
 
 import unittest
+from datetime import datetime, timedelta
 import os
 from unittest.mock import patch, MagicMock
 from backend.services.vector_store.pinecone_manager import PineconeManager
@@ -126,5 +127,75 @@ class TestPineconeManager(unittest.TestCase):
         # Verify the result
         self.assertTrue(result)
 
+    def _fetch_response(self, ids):
+        """Build a fetch response holding the given IDs."""
+        response = MagicMock()
+        response.vectors = {
+            memory_id: MagicMock(metadata={
+                'source_text': f'Content of {memory_id}',
+                'key_terms': ['content'],
+                'emotion': 'nostalgic'
+            })
+            for memory_id in ids
+        }
+        return response
+    
+    def test_get_memories_single_batched_fetch(self):
+        """Test fetching several memories at once.
+        
+        Verifying that many fragments arrive in a single reach.
+        """
+        self.mock_index.fetch.side_effect = lambda ids: self._fetch_response([i for i in ids if i != 'gone'])
+        
+        memories = self.manager.get_memories(['a', 'b', 'gone'])
+        
+        self.mock_index.fetch.assert_called_once_with(ids=['a', 'b', 'gone'])
+        self.assertEqual(set(memories), {'a', 'b'})
+        self.assertEqual(memories['a']['source_text'], 'Content of a')
+        self.assertNotIn('key_terms', memories['a']['metadata'])
+    
+    def test_get_memories_reads_through_cache(self):
+        """Test that cached memories are not fetched again.
+        
+        What was recently recalled stays close at hand.
+        """
+        self.mock_index.fetch.side_effect = lambda ids: self._fetch_response(ids)
+        self.manager.get_memories(['a', 'b'])
+        
+        memory = self.manager.get_memory('a')
+        self.manager.get_memories(['a', 'c'])
+        
+        self.assertEqual(memory['id'], 'a')
+        self.assertEqual(self.mock_index.fetch.call_count, 2)
+        self.mock_index.fetch.assert_called_with(ids=['c'])
+    
+    def test_writes_and_deletes_invalidate_cache(self):
+        """Test that changing a memory drops its cached copy.
+        
+        A memory rewritten must not be recalled as it was.
+        """
+        self.mock_index.fetch.side_effect = lambda ids: self._fetch_response(ids)
+        self.manager.get_memories(['a', 'b'])
+        
+        self.manager.upsert_memory_chip(memory_id='a', source_text='Rewritten')
+        self.manager.delete_memory('b')
+        
+        self.assertNotIn('a', self.manager.memory_cache)
+        self.assertNotIn('b', self.manager.memory_cache)
+    
+    def test_temporal_relevance_of_naive_timestamps(self):
+        """Test that timestamps without a zone, as store_memory writes them, are read as UTC.
+        
+        Yesterday is nearer than last year, however the date was written.
+        """
+        now = datetime.utcnow()
+        recent = self.manager._calculate_temporal_relevance(now.isoformat())
+        aware = self.manager._calculate_temporal_relevance(now.isoformat() + 'Z')
+        old = self.manager._calculate_temporal_relevance((now - timedelta(days=365)).isoformat())
+        
+        self.assertAlmostEqual(recent, 1.0)
+        self.assertEqual(recent, aware)
+        self.assertLess(old, 0.5)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,318 @@
+"""
+test_query_plans.py
+-------------------
+Query-plan regression tests for the hot SQL access paths.
+Verifying that each listing finds its rows through an index, not a scan.
+The test of memory that knows where to look.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import create_engine, desc, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import (
+    Conversation, ConversationMessage, MemoryChip, MemoryTag, TimelineDayStats, TimelineEntry,
+    TimelineMonthStats, User
+)
+from backend.services.conversation.conversation_service import ConversationService
+from backend.services.timeline.timeline_service import TimelineService
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Set this to a scratch MySQL database to run the MySQL plan checks
+MYSQL_TEST_URL = os.environ.get('SOULSTREAM_TEST_MYSQL_URL')
+
+
+def migrate(database_url):
+    """Bring a database up to the latest revision with alembic."""
+    alembic_config = AlembicConfig(os.path.join(REPO_ROOT, 'alembic.ini'))
+    alembic_config.set_main_option('script_location', os.path.join(REPO_ROOT, 'backend', 'migrations'))
+    alembic_config.set_main_option('sqlalchemy.url', database_url)
+    alembic_config.attributes['configure_logger'] = False
+    command.upgrade(alembic_config, 'head')
+
+
+def seed(session, users=3, chips_per_user=40, days_per_user=60):
+    """Fill the schema with enough rows that the planner has a choice."""
+    emotions = ['joy', 'longing', 'calm', 'anxious']
+    topics = ['work', 'family', 'music']
+    start = datetime(2025, 1, 1, 9, 0, 0)
+
+    for user_index in range(users):
+        user = User(username=f'user_{user_index}', timezone='UTC')
+        session.add(user)
+        session.flush()
+
+        tag = MemoryTag(name=f'tag_{user_index}', user_id=user.id)
+        for i in range(chips_per_user):
+            chip = MemoryChip(
+                user_id=user.id,
+                summary=f'Summary {i}',
+                source_text=f'Source text {i}',
+                emotion=emotions[i % len(emotions)],
+                topic=topics[i % len(topics)],
+                created_at=start + timedelta(hours=i)
+            )
+            chip.memory_tags.append(tag)
+            session.add(chip)
+
+        for i in range(days_per_user):
+            session.add(TimelineEntry(
+                user_id=user.id,
+                date=date(2025, 1, 1) + timedelta(days=i),
+                title=f'Day {i}',
+                entry_summary='A day like any other.',
+                emotion=emotions[i % len(emotions)],
+                emotion_intensity=0.5,
+                milestone_flag=(i % 10 == 0)
+            ))
+            session.add(TimelineDayStats(
+                user_id=user.id,
+                date=date(2025, 1, 1) + timedelta(days=i),
+                memory_count=i % 4,
+                dominant_emotion=emotions[i % len(emotions)],
+                milestone=(i % 10 == 0),
+                intensity_sum=0.0,
+                intensity_count=0
+            ))
+
+        for month in range(1, 4):
+            session.add(TimelineMonthStats(
+                user_id=user.id,
+                month=date(2025, month, 1),
+                memory_count=30,
+                active_days=20,
+                milestone_days=3,
+                intensity_sum=0.0,
+                intensity_count=0
+            ))
+
+        for i in range(5):
+            conversation = Conversation(
+                user_id=user.id,
+                title=f'Conversation {i}',
+                message_count=20,
+                memory_count=20,
+                updated_at=start + timedelta(days=i)
+            )
+            session.add(conversation)
+            session.flush()
+            for j in range(20):
+                session.add(ConversationMessage(
+                    conversation_id=conversation.id,
+                    sender='user' if j % 2 == 0 else 'ai',
+                    message=f'Message {j}',
+                    created_at=start + timedelta(days=i, minutes=j)
+                ))
+
+    session.commit()
+
+
+@contextmanager
+def capture_selects(engine):
+    """Record every SELECT the engine runs, with its bound parameters."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def memory_chip_listing_query(session, user_id, emotion=None, topic=None):
+    """The query shape behind GET /api/memory/chips."""
+    query = session.query(MemoryChip).filter(
+        MemoryChip.user_id == user_id,
+        MemoryChip.consolidated_into_id.is_(None)
+    )
+    if emotion:
+        query = query.filter(MemoryChip.emotion == emotion)
+    if topic:
+        query = query.filter(MemoryChip.topic == topic)
+    return query.order_by(desc(MemoryChip.created_at))
+
+
+class QueryPlanAssertions:
+    """Shared hot-path checks, run against each database backend.
+
+    The questions stay the same. Only the planner answering them changes.
+    """
+
+    engine = None
+    session = None
+
+    def explain(self, statement, parameters):
+        raise NotImplementedError
+
+    def assertIndexed(self, table, statement, parameters):
+        raise NotImplementedError
+
+    def run_and_check(self, table, action):
+        """Run an action, then check the plan of every SELECT it issued."""
+        with capture_selects(self.engine) as statements:
+            action()
+        self.assertTrue(statements, "Expected the action to issue at least one SELECT")
+        for statement, parameters in statements:
+            self.assertIndexed(table, statement, parameters)
+
+    def test_memory_chip_listing_by_user(self):
+        """Chip listings for a user walk the (user_id, created_at) index."""
+        query = memory_chip_listing_query(self.session, user_id=2)
+        self.run_and_check('memory_chips', lambda: (query.count(), query.limit(20).offset(0).all()))
+
+    def test_memory_chip_listing_by_emotion(self):
+        """Emotion-filtered chip listings stay on an index."""
+        query = memory_chip_listing_query(self.session, user_id=2, emotion='joy')
+        self.run_and_check('memory_chips', lambda: (query.count(), query.limit(20).all()))
+
+    def test_memory_chip_listing_by_topic(self):
+        """Topic-filtered chip listings stay on an index."""
+        query = memory_chip_listing_query(self.session, user_id=2, topic='music')
+        self.run_and_check('memory_chips', lambda: (query.count(), query.limit(20).all()))
+
+    def test_timeline_entries_by_date_range(self):
+        """Date-range timeline listings use the (user_id, date) index."""
+        service = TimelineService(self.session)
+        self.run_and_check('timeline_entries', lambda: service.get_timeline_entries(
+            user_id=2, start_date=date(2025, 1, 10), end_date=date(2025, 2, 10)))
+
+    def test_timeline_entry_by_date(self):
+        """Single-day lookups use the (user_id, date) index."""
+        service = TimelineService(self.session)
+        self.run_and_check('timeline_entries', lambda: service.get_timeline_entry_by_date(
+            user_id=2, entry_date=date(2025, 1, 15)))
+
+    def test_timeline_milestones(self):
+        """Milestone listings use the (user_id, milestone_flag, date) index."""
+        service = TimelineService(self.session)
+        self.run_and_check('timeline_entries', lambda: service.get_milestones(user_id=2))
+
+    def test_timeline_heatmap_days(self):
+        """Day heatmaps are one range scan on the (user_id, date) key."""
+        service = TimelineService(self.session)
+        self.run_and_check('timeline_day_stats', lambda: service.get_heatmap(
+            user_id=2, start_date=date(2025, 1, 1), end_date=date(2025, 12, 31)))
+
+    def test_timeline_heatmap_months(self):
+        """Month heatmaps are one range scan on the (user_id, month) key."""
+        service = TimelineService(self.session)
+        self.run_and_check('timeline_month_stats', lambda: service.get_heatmap(
+            user_id=2, start_date=date(2025, 1, 1), end_date=date(2025, 12, 31), granularity='month'))
+
+    def test_conversation_sidebar(self):
+        """The sidebar reads summary rows through the (user_id, updated_at) index."""
+        service = ConversationService(self.session)
+        self.run_and_check('conversations', lambda: service.list_conversations(user_id=2))
+
+    def test_conversation_history_pages(self):
+        """History pages are range scans on the (conversation_id, id) index."""
+        service = ConversationService(self.session)
+        conversation_id = service.list_conversations(user_id=2)[0][0].id
+        self.run_and_check('conversation_messages', lambda: (
+            service.get_messages(conversation_id, limit=10),
+            service.get_messages(conversation_id, limit=10, before_id=1000),
+            service.get_messages(conversation_id, limit=10, after_id=1)))
+
+    def test_memory_tags_per_chip(self):
+        """Loading a chip's tags goes through the association primary key."""
+        chip = memory_chip_listing_query(self.session, user_id=2).first()
+        self.session.expire(chip, ['memory_tags'])
+        self.run_and_check('memory_tag_association', lambda: chip.tags)
+
+
+class TestSQLiteQueryPlans(QueryPlanAssertions, unittest.TestCase):
+    """Query plans on SQLite, with the schema built by the migrations.
+
+    The smallest database still deserves to know where its memories are.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        database_url = f"sqlite:///{os.path.join(self.temp_dir, 'plans.db')}"
+        migrate(database_url)
+
+        self.engine = create_engine(database_url)
+        self.session = sessionmaker(bind=self.engine)()
+        seed(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def explain(self, statement, parameters):
+        with self.engine.connect() as connection:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[3] for row in rows]
+
+    def assertIndexed(self, table, statement, parameters):
+        plan = self.explain(statement, parameters)
+        details = [line for line in plan if f' {table} ' in f'{line} ']
+
+        self.assertTrue(details, f"{table} does not appear in plan: {plan}")
+        for line in details:
+            self.assertTrue(line.startswith('SEARCH') and 'USING' in line,
+                            f"Expected an index search on {table}, got: {plan}")
+        self.assertFalse(any('TEMP B-TREE FOR ORDER BY' in line for line in plan),
+                         f"Expected the index to provide the ordering, got: {plan}")
+
+
+@unittest.skipUnless(MYSQL_TEST_URL, "SOULSTREAM_TEST_MYSQL_URL is not set")
+class TestMySQLQueryPlans(QueryPlanAssertions, unittest.TestCase):
+    """Query plans on MySQL, with the schema built by the migrations.
+
+    Where real memories live, the planner must never read them all.
+    """
+
+    def setUp(self):
+        self.engine = create_engine(MYSQL_TEST_URL)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+            for table in ('timeline_month_stats', 'timeline_day_stats', 'conversation_messages',
+                          'conversations', 'memory_outbox', 'timeline_memory_links', 'timeline_entries', 'memory_tag_association',
+                          'memory_tags', 'memory_chips', 'characters', 'journal_entries', 'user_change_counters',
+                          'users'):
+                connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+        migrate(MYSQL_TEST_URL)
+
+        self.session = sessionmaker(bind=self.engine)()
+        seed(self.session, users=5, chips_per_user=200, days_per_user=365)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE TABLE memory_chips, timeline_entries, memory_tag_association")
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def explain(self, statement, parameters):
+        with self.engine.connect() as connection:
+            result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            return [dict(row._mapping) for row in result]
+
+    def assertIndexed(self, table, statement, parameters):
+        plan = self.explain(statement, parameters)
+        rows = [row for row in plan if row.get('table') == table]
+
+        self.assertTrue(rows, f"{table} does not appear in plan: {plan}")
+        for row in rows:
+            self.assertNotEqual(row.get('type'), 'ALL', f"Full scan of {table}: {plan}")
+            self.assertIsNotNone(row.get('key'), f"No index used on {table}: {plan}")
+            self.assertNotIn('Using filesort', row.get('Extra') or '',
+                             f"Expected the index to provide the ordering, got: {plan}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+test_serializers.py
+-------------------
+Tests for the API serialization layer.
+Verifying that list endpoints run a fixed number of queries, however long the list.
+The test of memory that does not go back for every fragment.
+"""
+
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.memory import memory_bp
+from backend.api.serializers import format_memory_chips, format_timeline_entries, parse_fields
+from backend.api.timeline import timeline_bp
+from backend.models import Base, MemoryChip, MemoryTag, TimelineEntry, User
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements an engine executes inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class TestSerializers(unittest.TestCase):
+    """Test cases for the serialization layer.
+    
+    Ensuring many rows come back in a handful of queries.
+    Testing the difference between one trip and a hundred.
+    """
+    
+    def setUp(self):
+        """Set up the test environment.
+        
+        An in-memory database, seeded with days and the memories behind them.
+        """
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.flush()
+        self.user_id = user.id
+        
+        tags = [MemoryTag(name=name, user_id=user.id) for name in ('family', 'music')]
+        start = datetime(2025, 1, 1, 9, 0, 0)
+        for i in range(100):
+            chips = []
+            for j in range(3):
+                chip = MemoryChip(
+                    user_id=user.id,
+                    summary=f'Memory {i}-{j}',
+                    source_text=f'Source {i}-{j}',
+                    emotion='joy',
+                    created_at=start + timedelta(days=i, minutes=j)
+                )
+                chip.memory_tags.extend(tags)
+                chips.append(chip)
+            entry = TimelineEntry(
+                user_id=user.id,
+                date=date(2025, 1, 1) + timedelta(days=i),
+                title=f'Day {i}',
+                entry_summary='Another day remembered.',
+                emotion_intensity=0.5,
+                milestone_flag=(i % 5 == 0)
+            )
+            entry.memory_chips.extend(chips)
+            self.db_session.add(entry)
+        self.db_session.commit()
+        self.db_session.expunge_all()
+        
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.memory_service = MagicMock()
+        self.app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        self.app.register_blueprint(memory_bp, url_prefix='/api/memory')
+        self.client = self.app.test_client()
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def test_format_timeline_entries_single_query(self):
+        """Serializing many entries loads all chip IDs in one query."""
+        entries = self.db_session.query(TimelineEntry).all()
+        
+        with count_queries(self.engine) as statements:
+            formatted = format_timeline_entries(self.db_session, entries)
+        
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(formatted), 100)
+        self.assertTrue(all(len(entry['memory_chip_ids']) == 3 for entry in formatted))
+    
+    def test_format_memory_chips_single_query(self):
+        """Serializing many chips loads all tag names in one query."""
+        chips = self.db_session.query(MemoryChip).limit(50).all()
+        
+        with count_queries(self.engine) as statements:
+            formatted = format_memory_chips(self.db_session, chips)
+        
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(formatted[0]['tags'], ['family', 'music'])
+    
+    def test_chips_endpoint_fields_projection(self):
+        """fields= narrows the chips listing, its SELECT, and skips tags unless asked for; id always stays."""
+        with count_queries(self.engine) as statements:
+            response = self.client.get(f'/api/memory/chips?user_id={self.user_id}&limit=5&fields=summary,emotion')
+        
+        self.assertEqual(response.status_code, 200)
+        memories = response.get_json()['memories']
+        self.assertEqual(len(memories), 5)
+        self.assertEqual(set(memories[0]), {'id', 'summary', 'emotion'})
+        listing = [statement for statement in statements if 'LIMIT' in statement]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('source_text', listing[0])
+        self.assertFalse(any('memory_tag_association' in statement for statement in statements))
+        
+        response = self.client.get(f'/api/memory/chips?user_id={self.user_id}&fields=summary,secrets')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_parse_fields(self):
+        """Empty means everything; duplicates and blanks are dropped; unknown fields are refused."""
+        self.assertIsNone(parse_fields(None, {'id'}))
+        self.assertIsNone(parse_fields('', {'id'}))
+        self.assertEqual(parse_fields('id, summary,,id', {'id', 'summary'}), ('id', 'summary'))
+        with self.assertRaises(ValueError):
+            parse_fields('id,nope', {'id'})
+    
+    def test_days_endpoint_constant_queries(self):
+        """The /days endpoint costs the same number of queries for 10 or 100 days."""
+        with count_queries(self.engine) as few:
+            response = self.client.get(f'/api/timeline/days?user_id={self.user_id}&limit=10')
+        self.assertEqual(response.status_code, 200)
+        self.db_session.remove()
+        
+        with count_queries(self.engine) as many:
+            response = self.client.get(f'/api/timeline/days?user_id={self.user_id}&limit=100')
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(response.get_json()['count'], 100)
+        self.assertEqual(len(few), len(many))
+        # Entries, their chip IDs, and the change counter lookup
+        self.assertLessEqual(len(many), 3)
+    
+    def test_milestones_endpoint_constant_queries(self):
+        """The /milestones endpoint loads entries and their chip IDs in two queries, after the counter."""
+        with count_queries(self.engine) as statements:
+            response = self.client.get(f'/api/timeline/milestones?user_id={self.user_id}&limit=20')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 20)
+        self.assertLessEqual(len(statements), 3)
+    
+    def test_day_detail_endpoint(self):
+        """The day detail view loads the entry and its chips in one joined query."""
+        with count_queries(self.engine) as statements:
+            response = self.client.get(f'/api/timeline/day/2025-01-02?user_id={self.user_id}')
+        
+        self.assertEqual(response.status_code, 200)
+        day = response.get_json()['day']
+        self.assertEqual(len(day['memory_chips']), 3)
+        self.assertEqual(day['memory_chip_ids'], [chip['id'] for chip in day['memory_chips']])
+        self.assertEqual(len(statements), 1)
+    
+    def test_days_and_day_detail_agree_on_consolidated_memories(self):
+        """A memory folded into a summary is left out of both the listing and the day."""
+        entry = self.db_session.query(TimelineEntry).filter_by(date=date(2025, 1, 2)).one()
+        first, second, third = sorted(chip.id for chip in entry.memory_chips)
+        self.db_session.query(MemoryChip).filter_by(id=second).update({'consolidated_into_id': third})
+        self.db_session.commit()
+        
+        listed = self.client.get(
+            f'/api/timeline/days?user_id={self.user_id}&start_date=2025-01-02&end_date=2025-01-02'
+        ).get_json()['days']
+        day = self.client.get(f'/api/timeline/day/2025-01-02?user_id={self.user_id}').get_json()['day']
+        
+        self.assertEqual(listed[0]['memory_chip_ids'], [first, third])
+        self.assertEqual(day['memory_chip_ids'], [first, third])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+test_tiered_store.py
+--------------------
+Tests for the hot/cold tiered memory store.
+Verifying that near memories are found in process, and far ones still come back from Pinecone.
+"""
+
+import os
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+from backend.services.vector_store.pinecone_manager import PineconeManager
+from backend.services.vector_store.tiered_store import TieredMemoryStore, matches_filter
+
+
+class TestTieredMemoryStore(unittest.TestCase):
+    """Test cases for TieredMemoryStore.
+    
+    The hot tier answers what it can. The cold tier answers the rest.
+    """
+    
+    @patch('backend.services.vector_store.pinecone_manager.Pinecone')
+    @patch('backend.services.vector_store.pinecone_manager.OpenAI')
+    def setUp(self, mock_openai, mock_pinecone):
+        os.environ['PINECONE_API_KEY'] = 'test_api_key'
+        os.environ['PINECONE_INDEX_NAME'] = 'test_index'
+        os.environ['PINECONE_REGION'] = 'test_region'
+        os.environ['OPENAI_API_KEY'] = 'test_openai_key'
+        
+        self.mock_index = MagicMock()
+        mock_pinecone.return_value.Index.return_value = self.mock_index
+        self.mock_index.query.return_value = SimpleNamespace(matches=[
+            SimpleNamespace(id='cold_memory', score=0.7, values=[0.0, 1.0, 0.0],
+                            metadata={'source_text': 'A far memory.', 'timestamp': '2024-01-01T00:00:00'})
+        ])
+        
+        self.cold = PineconeManager()
+        self.cold.generate_embedding = MagicMock(return_value=[1.0, 0.0, 0.0])
+        self.store = TieredMemoryStore(self.cold, max_hot=2, hot_min_similarity=0.8, idle_days=1)
+    
+    def test_new_memories_are_searched_in_process(self):
+        """A confident hot match answers without querying Pinecone."""
+        self.assertTrue(self.store.upsert_memory_chip('lake', 'The lake house.', {'emotion': 'calm'}))
+        self.assertEqual(self.mock_index.upsert.call_args.kwargs['vectors'][0]['values'], [1.0, 0.0, 0.0])
+        
+        results = self.store.search_memories('The lake', top_k=1)
+        
+        self.assertEqual([r['id'] for r in results], ['lake'])
+        self.assertEqual(results[0]['source_text'], 'The lake house.')
+        self.assertNotIn('values', results[0])
+        self.mock_index.query.assert_not_called()
+    
+    def test_falls_back_to_cold_and_promotes(self):
+        """Too few confident hot matches means a cold search, and its finds move to the hot tier."""
+        self.store.upsert_memory_chip('lake', 'The lake house.', {})
+        
+        results = self.store.search_memories('Anything', top_k=2)
+        
+        self.mock_index.query.assert_called_once()
+        self.assertTrue(self.mock_index.query.call_args.kwargs['include_values'])
+        self.assertEqual([r['id'] for r in results], ['lake', 'cold_memory'])
+        self.assertIn('cold_memory', self.store.hot)
+    
+    def test_unsupported_filter_goes_cold(self):
+        """Filters the hot tier cannot evaluate are left to Pinecone."""
+        self.store.upsert_memory_chip('lake', 'The lake house.', {})
+        self.store.search_memories('The lake', top_k=1, filter_dict={'tags': {'$exists': True}})
+        self.mock_index.query.assert_called_once()
+    
+    def test_rebalance_keeps_pinned_and_demotes_idle(self):
+        """Idle and overflow memories are demoted; pinned ones never are."""
+        long_ago = time.time() - 10 * 86400
+        self.store.hot.add('pinned', [1.0, 0.0, 0.0], {'is_pinned': True}, last_access=long_ago)
+        self.store.hot.add('idle', [1.0, 0.0, 0.0], {}, last_access=long_ago)
+        for name in ('a', 'b', 'c'):
+            self.store.hot.add(name, [0.0, 1.0, 0.0], {})
+            time.sleep(0.001)
+        
+        self.assertEqual(self.store.rebalance(), 2)
+        self.assertEqual(sorted(memory_id for memory_id, _ in self.store.hot.entries()), ['b', 'c', 'pinned'])
+    
+    def test_rebalance_caps_pinned(self):
+        """Pinned memories beyond their own capacity are demoted, least recently accessed first."""
+        self.store.max_pinned = 2
+        for name in ('first', 'second', 'third'):
+            self.store.hot.add(name, [1.0, 0.0, 0.0], {'is_pinned': True})
+            time.sleep(0.001)
+        
+        self.assertEqual(self.store.rebalance(), 1)
+        self.assertEqual(sorted(memory_id for memory_id, _ in self.store.hot.entries()), ['second', 'third'])
+    
+    def test_hot_results_are_marked_and_confirmed(self):
+        """Hot answers say so, and confirm evicts what the cold store no longer holds."""
+        self.store.upsert_memory_chip('lake', 'The lake house.', {})
+        self.assertEqual(self.store.search_memories('The lake', top_k=1)[0]['tier'], 'hot')
+        
+        self.mock_index.fetch.return_value = SimpleNamespace(vectors={})
+        self.assertEqual(self.store.confirm(['lake']), [])
+        self.assertNotIn('lake', self.store.hot)
+    
+    def test_delete_removes_from_both_tiers(self):
+        """Deleted memories leave the hot tier too."""
+        self.store.upsert_memory_chip('lake', 'The lake house.', {'user_id': 1})
+        self.store.upsert_memory_chip('boat', 'The boat.', {'user_id': 2})
+        
+        self.assertTrue(self.store.delete_memory('lake'))
+        self.assertTrue(self.store.delete_by_filter({'user_id': 2}))
+        
+        self.assertEqual(len(self.store.hot), 0)
+        self.mock_index.delete.assert_any_call(ids=['lake'])
+    
+    def test_matches_filter(self):
+        """Pinecone-style filters are evaluated against metadata."""
+        metadata = {'user_id': 1, 'emotion': 'calm', 'importance_score': 0.4}
+        self.assertTrue(matches_filter(metadata, {'user_id': 1, 'emotion': {'$in': ['calm', 'joy']}}))
+        self.assertTrue(matches_filter(metadata, {'$or': [{'user_id': 2}, {'importance_score': {'$lt': 0.5}}]}))
+        self.assertFalse(matches_filter(metadata, {'emotion': {'$ne': 'calm'}}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""
+test_timeline_rollup.py
+-----------------------
+Tests for incremental timeline rollups.
+Verifying that each stored memory adds itself to its day, and each deleted one takes itself back.
+"""
+
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.timeline import timeline_bp
+from backend.models import Base, MemoryChip, TimelineDayStats, TimelineEntry, TimelineMonthStats, User
+from backend.services.memory.memory_service import MemoryService
+from backend.services.timeline.timeline_service import TimelineService
+from backend.tests.test_serializers import count_queries
+
+
+class TestTimelineRollup(unittest.TestCase):
+    """Test cases for TimelineRollup, driven through MemoryService.
+    
+    The day keeps count as memories arrive.
+    """
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='America/New_York')
+        self.db_session.add(user)
+        self.db_session.commit()
+        self.user_id = user.id
+        
+        vector_store = MagicMock()
+        vector_store.upsert_memory_chip.return_value = True
+        self.service = MemoryService(vector_store=vector_store, query_preprocessor=MagicMock(),
+                                     db_session=self.db_session)
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def store(self, text, at, **kwargs):
+        with patch('backend.services.memory.memory_service.datetime') as mock_datetime:
+            mock_datetime.utcnow.return_value = at
+            mock_datetime.fromisoformat = datetime.fromisoformat
+            return self.service.store_memory(source_text=text, user_id=self.user_id, **kwargs)
+    
+    def test_memories_roll_up_into_their_local_day(self):
+        """Counts, emotions, intensity and topics accumulate on the user's local day."""
+        # 02:00 UTC on the 19th is still the 18th in New York
+        self.store("Coffee with Sam.", datetime(2025, 3, 19, 2, 0), emotion='joy', topic='friends', importance_score=0.8)
+        self.store("Long walk.", datetime(2025, 3, 18, 15, 0), emotion='calm', topic='health', importance_score=0.4)
+        self.store("Sam again.", datetime(2025, 3, 18, 20, 0), emotion='joy', topic='friends', importance_score=0.6)
+        
+        stats = self.db_session.query(TimelineDayStats).one()
+        self.assertEqual(stats.date, date(2025, 3, 18))
+        self.assertEqual(stats.memory_count, 3)
+        self.assertEqual(stats.emotion_counts, {'joy': 2, 'calm': 1})
+        self.assertEqual(stats.dominant_emotion, 'joy')
+        self.assertAlmostEqual(stats.emotion_intensity, 0.6)
+        self.assertEqual(stats.top_topics(), ['friends', 'health'])
+        
+        entry = self.db_session.query(TimelineEntry).one()
+        self.assertTrue(stats.entry_generated)
+        self.assertEqual(entry.title, 'Tuesday, March 18')
+        self.assertEqual(entry.emotion, 'joy')
+        self.assertEqual(entry.entry_summary, '3 memories, mostly about friends, health')
+        self.assertEqual(entry.secondary_emotions, [{'name': 'calm', 'intensity': 0.333}])
+        self.assertEqual(len(entry.memory_chip_ids), 3)
+    
+    def test_rollup_cost_does_not_grow_with_history(self):
+        """Storing a memory issues the same number of statements on day one and day one hundred."""
+        at = datetime(2025, 3, 18, 15, 0)
+        self.store("First.", at, emotion='joy')
+        with count_queries(self.engine) as first:
+            self.store("Second.", at, emotion='joy')
+        for i in range(50):
+            self.store(f"Filler {i}.", at, emotion='calm', topic=f'topic {i % 5}')
+        with count_queries(self.engine) as later:
+            self.store("Last.", at, emotion='joy')
+        
+        self.assertEqual(len(later), len(first))
+    
+    def test_hand_written_entries_are_linked_not_rewritten(self):
+        """An existing entry gets the memory link but keeps its own words."""
+        self.db_session.add(TimelineEntry(user_id=self.user_id, date=date(2025, 3, 18), title='Our day',
+                                          entry_summary='Written by hand.', emotion='longing'))
+        self.db_session.commit()
+        
+        self.store("Coffee.", datetime(2025, 3, 18, 15, 0), emotion='joy')
+        
+        entry = self.db_session.query(TimelineEntry).one()
+        self.assertEqual(entry.entry_summary, 'Written by hand.')
+        self.assertEqual(entry.emotion, 'longing')
+        self.assertEqual(len(entry.memory_chip_ids), 1)
+    
+    def test_deleting_memories_updates_the_day(self):
+        """Single and bulk deletes take memories back out of the aggregate."""
+        at = datetime(2025, 3, 18, 15, 0)
+        first = self.store("Coffee.", at, emotion='joy', topic='friends')
+        self.store("Walk.", at, emotion='calm')
+        self.store("Rain.", at, emotion='calm')
+        
+        self.service.delete_memory(first)
+        stats = self.db_session.query(TimelineDayStats).one()
+        self.assertEqual(stats.memory_count, 2)
+        self.assertEqual(stats.emotion_counts, {'calm': 2})
+        self.assertEqual(stats.topic_counts, {})
+        
+        self.service.delete_memories(user_id=self.user_id)
+        self.db_session.expire_all()
+        stats = self.db_session.query(TimelineDayStats).one()
+        self.assertEqual(stats.memory_count, 0)
+        self.assertIsNone(stats.dominant_emotion)
+    
+    def test_bulk_forget_cost_does_not_grow_with_its_size(self):
+        """Forgetting many memories reads their days and months once, however many there are."""
+        def forget_queries(per_day):
+            for day in (18, 19):
+                for i in range(per_day):
+                    self.store(f"Memory {i}.", datetime(2025, 3, day, 15, i), emotion='calm')
+            chips = self.db_session.query(MemoryChip).filter(MemoryChip.user_id == self.user_id).all()
+            with count_queries(self.engine) as statements:
+                self.service.timeline_rollup.forget_memories(chips)
+                self.db_session.flush()
+            self.db_session.rollback()
+            return len(statements)
+        
+        self.assertEqual(forget_queries(2), forget_queries(20))
+        
+        chips = self.db_session.query(MemoryChip).all()
+        self.service.timeline_rollup.forget_memories(chips)
+        self.db_session.commit()
+        self.assertEqual([stats.memory_count for stats in self.db_session.query(TimelineDayStats)], [0, 0])
+        month = self.db_session.query(TimelineMonthStats).one()
+        self.assertEqual((month.memory_count, month.active_days), (0, 0))
+    
+    def test_months_follow_their_days(self):
+        """Month rows count memories and active days across the month."""
+        self.store("One.", datetime(2025, 3, 3, 15, 0), emotion='joy')
+        self.store("Two.", datetime(2025, 3, 3, 16, 0), emotion='calm')
+        last = self.store("Three.", datetime(2025, 3, 20, 15, 0), emotion='calm')
+        self.store("Four.", datetime(2025, 4, 1, 15, 0), emotion='joy')
+        
+        march = self.db_session.query(TimelineMonthStats).filter_by(month=date(2025, 3, 1)).one()
+        self.assertEqual((march.memory_count, march.active_days), (3, 2))
+        self.assertEqual(march.dominant_emotion, 'calm')
+        
+        self.service.delete_memory(last)
+        self.db_session.expire_all()
+        march = self.db_session.query(TimelineMonthStats).filter_by(month=date(2025, 3, 1)).one()
+        self.assertEqual((march.memory_count, march.active_days), (2, 1))
+    
+    def test_milestone_bits_follow_timeline_entries(self):
+        """Creating, updating and deleting milestone entries keeps day and month bits in step."""
+        timeline_service = TimelineService(self.db_session)
+        entry = timeline_service.create_timeline_entry(
+            user_id=self.user_id, entry_date=date(2025, 3, 18), title='First date',
+            entry_summary='It rained.', milestone_flag=True)
+        
+        day = self.db_session.query(TimelineDayStats).one()
+        month = self.db_session.query(TimelineMonthStats).one()
+        self.assertTrue(day.milestone)
+        self.assertEqual(month.milestone_days, 1)
+        
+        timeline_service.update_timeline_entry(entry.id, date=date(2025, 4, 2))
+        self.assertFalse(self.db_session.query(TimelineDayStats).filter_by(date=date(2025, 3, 18)).one().milestone)
+        self.assertTrue(self.db_session.query(TimelineDayStats).filter_by(date=date(2025, 4, 2)).one().milestone)
+        self.assertEqual([m.milestone_days for m in self.db_session.query(TimelineMonthStats)
+                          .order_by(TimelineMonthStats.month)], [0, 1])
+        
+        timeline_service.delete_timeline_entry(entry.id)
+        self.assertFalse(any(day.milestone for day in self.db_session.query(TimelineDayStats)))
+    
+    def test_heatmap_endpoint(self):
+        """The heatmap answers from the rollups in one query, as parallel arrays."""
+        self.store("One.", datetime(2025, 3, 3, 15, 0), emotion='joy')
+        self.store("Two.", datetime(2025, 3, 3, 16, 0), emotion='joy')
+        self.store("Three.", datetime(2025, 3, 20, 15, 0), emotion='calm')
+        self.store("Four.", datetime(2025, 5, 1, 15, 0))
+        TimelineService(self.db_session).upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 20), 'title': 'Milestone', 'milestone_flag': True}
+        ])
+        
+        app = Flask(__name__)
+        app.db_session = self.db_session
+        app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        client = app.test_client()
+        
+        with count_queries(self.engine) as queries:
+            response = client.get(f'/api/timeline/heatmap?user_id={self.user_id}'
+                                  '&start_date=2025-03-01&end_date=2025-04-30')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        payload = response.get_json()
+        self.assertEqual(payload['emotions'], ['joy', 'calm'])
+        self.assertEqual(payload['cells'], {
+            'offset': [2, 19], 'count': [2, 1], 'emotion': [0, 1], 'milestone': [0, 1]
+        })
+        
+        response = client.get(f'/api/timeline/heatmap?user_id={self.user_id}&granularity=month'
+                              '&start_date=2025-02-15&end_date=2025-12-31')
+        payload = response.get_json()
+        self.assertEqual(payload['start_date'], '2025-02-01')
+        self.assertEqual(payload['cells'], {
+            'offset': [1, 3], 'count': [3, 1], 'emotion': [0, -1],
+            'milestone': [1, 0], 'active_days': [2, 1]
+        })
+        
+        response = client.get('/api/timeline/heatmap?start_date=2010-01-01&end_date=2025-01-01')
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+test_timeline_series.py
+-----------------------
+Tests for the downsampled emotion intensity series.
+Verifying that a long view keeps its shape, and forgets it when the days change.
+"""
+
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.timeline import timeline_bp
+from backend.models import Base, TimelineEntry, User
+from backend.services.timeline.changes import TimelineChangeWatcher
+from backend.services.timeline.series import EmotionSeriesCache, bucket_stats, lttb
+from backend.services.timeline.timeline_service import TimelineService
+from backend.tests.test_serializers import count_queries
+
+
+class TestDownsampling(unittest.TestCase):
+    """Test cases for lttb and bucket_stats."""
+    
+    def test_lttb_keeps_ends_and_peaks(self):
+        """LTTB returns the budget, both ends, and an isolated spike."""
+        x = np.arange(1000)
+        y = np.sin(x / 50.0)
+        y[437] = 5.0
+        
+        keep = lttb(x, y, 100)
+        
+        self.assertEqual(len(keep), 100)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(437, keep)
+        self.assertEqual(list(lttb(x[:50], y[:50], 100)), list(range(50)))
+    
+    def test_bucket_stats_match_a_plain_loop(self):
+        """Vectorized bucket statistics agree with a straightforward computation."""
+        rng = np.random.default_rng(7)
+        days = np.sort(rng.choice(np.arange(1000, 2000), size=300, replace=False))
+        values = rng.random(300)
+        
+        stats = bucket_stats(days, values, start=1000, width=30)
+        
+        for i, offset in enumerate(stats['offset']):
+            mask = (days - 1000) // 30 == offset // 30
+            self.assertAlmostEqual(stats['min'][i], values[mask].min())
+            self.assertAlmostEqual(stats['max'][i], values[mask].max())
+            self.assertAlmostEqual(stats['mean'][i], values[mask].mean())
+            self.assertEqual(stats['count'][i], mask.sum())
+        self.assertEqual(stats['count'].sum(), 300)
+
+
+class TestEmotionSeries(unittest.TestCase):
+    """Test cases for the series cache and endpoint."""
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.flush()
+        self.user_id = user.id
+        
+        start = date(2020, 1, 1)
+        self.db_session.add_all([
+            TimelineEntry(user_id=self.user_id, date=start + timedelta(days=i), title=f'Day {i}',
+                          entry_summary='', emotion_intensity=round(0.5 + 0.4 * np.sin(i / 30.0), 3))
+            for i in range(5 * 365)
+        ])
+        self.db_session.commit()
+        
+        self.cache = EmotionSeriesCache(ttl=None)
+        self.changes = TimelineChangeWatcher()
+        self.changes.watch(self.db_session)
+        self.changes.subscribe(self.cache.invalidate_users)
+        
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.emotion_series_cache = self.cache
+        self.app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        self.client = self.app.test_client()
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def test_five_years_in_a_few_hundred_points(self):
+        """A five-year view is served within the point budget, from memory after the first load."""
+        url = (f'/api/timeline/series?user_id={self.user_id}'
+               '&start_date=2020-01-01&end_date=2024-12-31&points=200')
+        with count_queries(self.engine) as first:
+            response = self.client.get(url)
+        with count_queries(self.engine) as second:
+            self.client.get(url)
+        
+        self.assertEqual(response.status_code, 200)
+        payload = response.get_json()
+        self.assertEqual(payload['total'], 5 * 365)
+        self.assertEqual(payload['points'], 200)
+        self.assertEqual(payload['offset'][0], 0)
+        self.assertEqual(payload['offset'][-1], 5 * 365 - 1)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 0)
+    
+    def test_minmax_buckets(self):
+        """minmax returns bucket statistics covering every day in range."""
+        response = self.client.get(f'/api/timeline/series?user_id={self.user_id}&method=minmax'
+                                   '&start_date=2020-01-01&end_date=2020-12-31&points=12')
+        payload = response.get_json()
+        
+        self.assertEqual(payload['bucket_days'], 31)
+        self.assertEqual(payload['points'], 12)
+        self.assertEqual(sum(payload['count']), 366)  # 2020 is a leap year
+        for low, mean, high in zip(payload['min'], payload['mean'], payload['max']):
+            self.assertLessEqual(low, mean)
+            self.assertLessEqual(mean, high)
+    
+    def test_commits_invalidate_the_users_series(self):
+        """Changing an entry drops the cached series once the change commits."""
+        self.cache.get(self.db_session, self.user_id)
+        entry = TimelineService(self.db_session).get_timeline_entry_by_date(self.user_id, date(2020, 1, 1))
+        
+        entry.emotion_intensity = 0.99
+        self.db_session.flush()
+        self.assertIn(self.user_id, self.cache.series)
+        self.db_session.commit()
+        self.assertNotIn(self.user_id, self.cache.series)
+        
+        series = self.cache.get(self.db_session, self.user_id)
+        self.assertAlmostEqual(series.intensity[0], 0.99)
+    
+    def test_bulk_upserts_invalidate_the_users_series(self):
+        """Entries written by bulk statements also drop the cached series."""
+        self.cache.get(self.db_session, self.user_id)
+        TimelineService(self.db_session).upsert_timeline_entries(self.user_id, [
+            {'date': date(2019, 12, 31), 'title': 'Eve', 'entry_summary': 'Before it all.', 'emotion_intensity': 0.1}
+        ])
+        
+        self.assertNotIn(self.user_id, self.cache.series)
+        self.assertEqual(len(self.cache.get(self.db_session, self.user_id).days), 5 * 365 + 1)
+    
+    def test_change_during_a_load_is_not_cached(self):
+        """A series loaded while a change commits is returned, but not kept."""
+        load = EmotionSeriesCache.load
+        
+        def load_then_commit_elsewhere(db_session, user_id):
+            series = load(db_session, user_id)
+            self.cache.invalidate_users({user_id})
+            return series
+        
+        with patch.object(self.cache, 'load', load_then_commit_elsewhere):
+            self.assertEqual(len(self.cache.get(self.db_session, self.user_id).days), 5 * 365)
+        
+        self.assertNotIn(self.user_id, self.cache.series)
+    
+    def test_rejects_bad_parameters(self):
+        """Unknown methods and tiny budgets are refused."""
+        self.assertEqual(self.client.get('/api/timeline/series?method=spline').status_code, 400)
+        self.assertEqual(self.client.get('/api/timeline/series?points=2').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
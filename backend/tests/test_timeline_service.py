@@ -0,0 +1,242 @@
+"""
+test_timeline_service.py
+------------------------
+Tests for timeline writes.
+Verifying that many days are written together, and that only changed links are touched.
+"""
+
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.timeline import timeline_bp
+from backend.models import Base, MemoryChip, TimelineEntry, User
+from backend.models.timeline_memory_link import timeline_memory_links
+from backend.services.memory.memory_service import MemoryService
+from backend.services.timeline.changes import TimelineChangeWatcher
+from backend.services.timeline.day_cache import DayDetailCache
+from backend.services.timeline.timeline_service import TimelineService
+from backend.tests.test_serializers import count_queries
+
+
+class TestTimelineUpsert(unittest.TestCase):
+    """Test cases for bulk upserts and diff-based memory links."""
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user, other = User(username='echo_tester'), User(username='someone_else')
+        self.db_session.add_all([user, other])
+        self.db_session.flush()
+        self.user_id = user.id
+        
+        chips = [MemoryChip(user_id=user.id, summary=f'Memory {i}', source_text=f'Memory {i}')
+                 for i in range(5)]
+        foreign = MemoryChip(user_id=other.id, summary='Not yours', source_text='Not yours')
+        self.db_session.add_all(chips + [foreign])
+        self.db_session.commit()
+        self.chip_ids = [chip.id for chip in chips]
+        self.foreign_id = foreign.id
+        
+        self.service = TimelineService(self.db_session)
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def links(self, entry_id):
+        return sorted(self.db_session.execute(
+            select(timeline_memory_links.c.memory_id).where(timeline_memory_links.c.timeline_id == entry_id)
+        ).scalars())
+    
+    def month(self, days, **fields):
+        start = date(2025, 3, 1)
+        return [{'date': start + timedelta(days=i), 'title': f'Day {i}', 'entry_summary': 'Quiet.', **fields}
+                for i in range(days)]
+    
+    def test_upsert_creates_then_updates_by_date(self):
+        """Known dates are updated in place; new dates are created."""
+        first = self.service.upsert_timeline_entries(self.user_id, self.month(10))
+        second = self.service.upsert_timeline_entries(self.user_id, self.month(12, emotion='calm'))
+        
+        self.assertEqual((first['created'], first['updated']), (10, 0))
+        self.assertEqual((second['created'], second['updated']), (2, 10))
+        self.assertEqual(second['entry_ids'][:10], first['entry_ids'])
+        entries = self.db_session.query(TimelineEntry).all()
+        self.assertEqual(len(entries), 12)
+        self.assertTrue(all(entry.emotion == 'calm' for entry in entries))
+    
+    def test_batch_cost_does_not_grow_with_its_size(self):
+        """A batch of thirty days takes as many statements as a batch of three."""
+        with count_queries(self.engine) as small:
+            self.service.upsert_timeline_entries(self.user_id, self.month(3, memory_chip_ids=self.chip_ids[:2]))
+        self.db_session.query(TimelineEntry).delete()
+        self.db_session.execute(timeline_memory_links.delete())
+        self.db_session.commit()
+        with count_queries(self.engine) as large:
+            self.service.upsert_timeline_entries(self.user_id, self.month(30, memory_chip_ids=self.chip_ids[:2]))
+        
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(self.db_session.execute(select(timeline_memory_links)).all().__len__(), 60)
+    
+    def test_links_change_by_set_difference(self):
+        """Unchanged links stay put, and memories of other users are ignored."""
+        result = self.service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 1), 'title': 'Day', 'entry_summary': 'Quiet.',
+             'memory_chip_ids': self.chip_ids[:3]}
+        ])
+        entry_id = result['entry_ids'][0]
+        
+        with count_queries(self.engine) as statements:
+            self.service.upsert_timeline_entries(self.user_id, [
+                {'date': date(2025, 3, 1), 'memory_chip_ids': self.chip_ids[1:4] + [self.foreign_id]}
+            ])
+        
+        self.assertEqual(self.links(entry_id), self.chip_ids[1:4])
+        writes = [s for s in statements if 'timeline_memory_links' in s and not s.lstrip().startswith('SELECT')]
+        self.assertEqual(len(writes), 2)  # one bulk delete, one bulk insert
+    
+    def test_update_replaces_memories(self):
+        """update_timeline_entry applies memory_chip_ids through the same diff."""
+        entry = self.service.create_timeline_entry(self.user_id, date(2025, 3, 1), 'Day', 'Quiet.',
+                                                   memory_chip_ids=self.chip_ids[:2])
+        
+        self.assertTrue(self.service.update_timeline_entry(entry.id, title='Renamed',
+                                                           memory_chip_ids=self.chip_ids[3:]))
+        self.assertEqual(self.links(entry.id), self.chip_ids[3:])
+        self.assertEqual(self.service.get_timeline_entry(entry.id).title, 'Renamed')
+    
+    def test_bulk_endpoint(self):
+        """The endpoint validates before writing and reports what it did."""
+        app = Flask(__name__)
+        app.db_session = self.db_session
+        app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        client = app.test_client()
+        
+        response = client.post('/api/timeline/entries/bulk', json={
+            'user_id': self.user_id,
+            'entries': [{'date': '2025-03-01', 'title': 'Day', 'entry_summary': 'Quiet.'},
+                        {'date': '2025-03-02', 'title': 'Missing a summary'}]
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.db_session.query(TimelineEntry).count(), 0)
+        
+        response = client.post('/api/timeline/entries/bulk', json={
+            'user_id': self.user_id,
+            'entries': [{'date': '2025-03-01', 'title': 'Day', 'entry_summary': 'Quiet.',
+                         'memory_chip_ids': self.chip_ids}]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['created'], 1)
+        
+        response = client.post('/api/timeline/entry', json={
+            'user_id': self.user_id, 'date': '2025-03-01', 'title': 'Again', 'entry_summary': 'Twice.'
+        })
+        self.assertEqual(response.status_code, 409)
+
+
+class TestDayDetailCache(unittest.TestCase):
+    """Test cases for the cached day detail view."""
+    
+    def setUp(self):
+        self.engine = create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(self.engine)
+        self.db_session = scoped_session(sessionmaker(bind=self.engine))
+        
+        user = User(username='echo_tester', timezone='UTC')
+        self.db_session.add(user)
+        self.db_session.commit()
+        self.user_id = user.id
+        
+        self.memory_service = MemoryService(vector_store=MagicMock(), query_preprocessor=MagicMock(),
+                                            db_session=self.db_session)
+        self.first_id = self.memory_service.store_memory(source_text='Coffee.', user_id=self.user_id)
+        self.db_session.query(MemoryChip).update({'created_at': datetime(2025, 3, 18, 9)})
+        self.db_session.commit()
+        self.timeline_service = TimelineService(self.db_session)
+        self.entry = self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 18), 'title': 'Coffee day', 'entry_summary': 'Coffee.',
+             'memory_chip_ids': [self.db_session.query(MemoryChip.id).scalar()]}
+        ])['entry_ids'][0]
+        
+        self.app = Flask(__name__)
+        self.app.db_session = self.db_session
+        self.app.day_detail_cache = DayDetailCache()
+        changes = TimelineChangeWatcher()
+        changes.watch(self.db_session)
+        changes.subscribe(self.app.day_detail_cache.invalidate_users)
+        self.app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
+        self.client = self.app.test_client()
+        self.url = f'/api/timeline/day/2025-03-18?user_id={self.user_id}'
+    
+    def tearDown(self):
+        self.db_session.remove()
+        self.engine.dispose()
+    
+    def day(self):
+        return self.client.get(self.url).get_json()['day']
+    
+    def test_repeat_views_are_served_from_cache(self):
+        """A second view of an unchanged day runs no queries and returns the same bytes."""
+        first = self.client.get(self.url)
+        with count_queries(self.engine) as statements:
+            second = self.client.get(self.url)
+        
+        self.assertEqual(statements, [])
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.mimetype, 'application/json')
+    
+    def test_entry_and_link_changes_invalidate(self):
+        """Editing the entry or its memories shows up on the next view."""
+        self.assertEqual(self.day()['title'], 'Coffee day')
+        
+        self.timeline_service.update_timeline_entry(self.entry, title='Renamed')
+        self.assertEqual(self.day()['title'], 'Renamed')
+        
+        self.timeline_service.upsert_timeline_entries(self.user_id, [
+            {'date': date(2025, 3, 18), 'memory_chip_ids': []}
+        ])
+        self.assertEqual(self.day()['memory_chips'], [])
+    
+    def test_memory_changes_invalidate(self):
+        """Memories deleted in bulk disappear from the cached day."""
+        self.assertEqual(len(self.day()['memory_chips']), 1)
+        
+        self.memory_service.delete_memories(user_id=self.user_id)
+        
+        self.assertEqual(self.day()['memory_chips'], [])
+    
+    def test_change_during_a_read_is_not_cached(self):
+        """A day read just before a commit lands is served, but not kept for later views."""
+        read = TimelineService.get_day_detail
+        
+        def read_then_commit_elsewhere(service, *args, **kwargs):
+            result = read(service, *args, **kwargs)
+            # Another thread's commit, landing between the read and the cache write
+            self.app.day_detail_cache.invalidate_users({self.user_id})
+            return result
+        
+        with patch.object(TimelineService, 'get_day_detail', read_then_commit_elsewhere):
+            self.day()
+        
+        self.assertIsNone(self.app.day_detail_cache.get(self.user_id, date(2025, 3, 18)))
+        self.day()
+        self.assertIsNotNone(self.app.day_detail_cache.get(self.user_id, date(2025, 3, 18)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+test_tracing.py
+---------------
+Tests for request-scoped tracing.
+Verifying that each request gives an account of its own time, and only its own.
+"""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from backend.utils.fastjson import FastJSONProvider
+from backend.utils.metrics import instrument_engine, timed
+from backend.utils.tracing import OTLPExporter, current_trace, init_tracing, span
+
+
+class Collector(BaseHTTPRequestHandler):
+    """A stand-in OTLP collector that keeps what it is sent."""
+
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        Collector.received.append((self.path, json.loads(body)))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTracing(unittest.TestCase):
+    """Test cases for spans, Server-Timing, request logs and export."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', poolclass=StaticPool)
+        instrument_engine(self.engine)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Collector)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        Collector.received = []
+        self.exporter = OTLPExporter(f'http://127.0.0.1:{self.server.server_port}', interval=0.05)
+
+        self.app = Flask(__name__)
+        self.app.json = FastJSONProvider(self.app)
+        init_tracing(self.app, exporter=self.exporter)
+
+        @self.app.route('/search')
+        def search():
+            with timed('memory.search'):
+                with span('pinecone.query', top_k=5):
+                    pass
+                with self.engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                    connection.execute(text('SELECT 2'))
+            return jsonify(results=[1, 2, 3])
+
+        @self.app.route('/fail')
+        def fail():
+            with timed('memory.search'):
+                raise RuntimeError('unreachable')
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.exporter.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+        self.engine.dispose()
+
+    def test_server_timing_and_log_line(self):
+        """The response says where its time went, and so does one log line."""
+        with self.assertLogs('soulstream.requests', level='INFO') as logs:
+            response = self.client.get('/search')
+
+        timing = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(timing, ['memory.search', 'pinecone.query', 'sql', 'serialize', 'total'])
+        self.assertIn('sql;dur=', response.headers['Server-Timing'])
+        self.assertIn(';desc="x2"', response.headers['Server-Timing'])
+
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['path'], line['status']), ('/search', 200))
+        self.assertEqual(line['spans']['sql']['count'], 2)
+        self.assertEqual(line['trace_id'], response.headers['traceparent'].split('-')[1])
+        self.assertIsNone(current_trace())
+
+    def test_incoming_trace_is_continued(self):
+        """A traceparent header from the caller keeps the request in the caller's trace."""
+        parent = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+        response = self.client.get('/search', headers={'traceparent': parent})
+        self.assertTrue(response.headers['traceparent'].startswith('00-' + 'a' * 32 + '-'))
+
+    def test_spans_are_exported_to_the_collector(self):
+        """Finished requests reach the collector as OTLP spans, nested as they ran."""
+        self.client.get('/search')
+        self.assertEqual(self.client.get('/fail').status_code, 500)
+        self.exporter.shutdown()
+
+        spans = [s for path, body in Collector.received
+                 for resource in body['resourceSpans']
+                 for scope in resource['scopeSpans'] for s in scope['spans']]
+        self.assertEqual(Collector.received[0][0], '/v1/traces')
+        roots = [s for s in spans if s['kind'] == 2]
+        self.assertEqual([root['name'] for root in roots], ['GET /search', 'GET /fail'])
+        self.assertEqual(roots[1]['status']['code'], 2)
+
+        by_name = {s['name']: s for s in spans if s['traceId'] == roots[0]['traceId']}
+        self.assertEqual(by_name['memory.search']['parentSpanId'], roots[0]['spanId'])
+        self.assertEqual(by_name['pinecone.query']['parentSpanId'], by_name['memory.search']['spanId'])
+        self.assertIn({'key': 'top_k', 'value': {'intValue': '5'}}, by_name['pinecone.query']['attributes'])
+
+    def test_nothing_is_recorded_outside_a_request(self):
+        """Spans outside a traced request are no-ops."""
+        with span('background') as outside:
+            pass
+        self.assertIsNone(outside.span)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+test_working_memory.py
+----------------------
+Tests for per-conversation working memory.
+Verifying that recent memories answer what they can, and fade when they cannot.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from backend.services.memory.working_memory import WorkingMemoryCache
+
+
+def result(memory_id, values, score=0.8, vector_similarity=0.9):
+    """A vector store result carrying its vector."""
+    return {
+        'id': memory_id,
+        'score': score,
+        'component_scores': {'vector_similarity': vector_similarity},
+        'metadata': {},
+        'values': values
+    }
+
+
+class TestWorkingMemoryCache(unittest.TestCase):
+    """Test cases for WorkingMemoryCache.
+    
+    Close enough is answered locally. Stale or distant goes back to search.
+    """
+    
+    def setUp(self):
+        self.cache = WorkingMemoryCache(threshold=0.8, ttl=60.0, decay=0.5, min_weight=0.2)
+        self.cache.absorb('c1', [result('lake', [1.0, 0.0]), result('boat', [0.0, 1.0])])
+    
+    def test_close_query_is_answered_locally(self):
+        """The nearest memory comes first, rescored for the new query."""
+        results = self.cache.match('c1', [1.0, 0.0], top_k=1)
+        
+        self.assertEqual([r['id'] for r in results], ['lake'])
+        self.assertAlmostEqual(results[0]['component_scores']['vector_similarity'], 1.0)
+        self.assertAlmostEqual(results[0]['score'], 0.8 + 0.6 * 0.1)
+        self.assertNotIn('values', results[0])
+    
+    def test_distant_query_needs_search(self):
+        """Nothing close enough means a full search."""
+        self.assertIsNone(self.cache.match('c1', [0.7, 0.7], top_k=1))
+        self.assertIsNone(self.cache.match('unknown', [1.0, 0.0], top_k=1))
+    
+    def test_stale_or_refiltered_sets_need_search(self):
+        """Expired sets and changed filters are not trusted."""
+        self.assertIsNone(self.cache.match('c1', [1.0, 0.0], top_k=1, filter_dict={'emotion': 'joy'}))
+        with patch('backend.services.memory.working_memory.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(self.cache.match('c1', [1.0, 0.0], top_k=1))
+    
+    def test_unused_memories_fade(self):
+        """Memories left unused for a few turns drop out of the set."""
+        for _ in range(3):
+            self.cache.match('c1', [1.0, 0.0], top_k=1)
+        
+        self.assertIsNone(self.cache.match('c1', [0.0, 1.0], top_k=1))
+        self.assertEqual(list(self.cache.sets.get('c1').items), ['lake'])
+    
+    def test_discard(self):
+        """Deleted memories are removed from every working set."""
+        self.cache.discard(['lake'])
+        self.assertEqual(list(self.cache.sets.get('c1').items), ['boat'])
+
+if __name__ == '__main__':
+    unittest.main()
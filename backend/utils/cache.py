@@ -0,0 +1,151 @@
+"""
+cache.py
+--------
+In-process caching for Soulstream.
+A small, bounded place to keep what was recently recalled.
+What has not been asked for in a while is the first to be let go.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+# Sentinel for distinguishing a cached None from a miss
+_MISSING = object()
+
+class LRUCache:
+    """A thread-safe, bounded least-recently-used cache with optional expiry.
+    
+    Recent things stay close. Old things fall away.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Optional lifetime of an entry in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+    
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Get a value, marking it as recently used."""
+        with self._lock:
+            return self._get(key, default, count)
+    
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Get all cached values among the keys. Missing keys are left out."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._get(key, _MISSING, True)
+                if value is not _MISSING:
+                    found[key] = value
+        return found
+    
+    def values(self) -> List[Any]:
+        """Snapshot of the unexpired values, without touching recency or counters."""
+        now = time.monotonic()
+        with self._lock:
+            return [value for value, expires_at in self._data.values()
+                    if expires_at is None or expires_at > now]
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._set(key, value)
+    
+    def set_many(self, items: Dict[Hashable, Any]) -> None:
+        """Store several values at once."""
+        with self._lock:
+            for key, value in items.items():
+                self._set(key, value)
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Forget a single key."""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def invalidate_many(self, keys: Iterable[Hashable]) -> None:
+        """Forget several keys at once."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Forget everything."""
+        with self._lock:
+            self._data.clear()
+    
+    def _get(self, key, default, count):
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+    
+    def _set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class Generations:
+    """Per-key change counters, so a value read before a change is not cached after it.
+    
+    Take generation(key) before loading, and store the loaded value with
+    if_current(). A change that lands while the value is being loaded
+    bumps the counter, and the store is skipped.
+    """
+    
+    def __init__(self):
+        self._epoch = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+    
+    def generation(self, key: Hashable) -> tuple:
+        """The key's current generation."""
+        with self._lock:
+            return self._epoch, self._counts.get(key, 0)
+    
+    def bump(self, keys: Optional[Iterable[Hashable]]) -> None:
+        """Mark keys as changed, or every key when None."""
+        with self._lock:
+            if keys is None:
+                self._epoch += 1
+                self._counts.clear()
+                return
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + 1
+    
+    def if_current(self, key: Hashable, generation: tuple, store) -> bool:
+        """Call store() if the key has not changed since generation was taken.
+        
+        Holds the lock while storing, so no change can slip in between.
+        """
+        with self._lock:
+            if (self._epoch, self._counts.get(key, 0)) != generation:
+                return False
+            store()
+            return True
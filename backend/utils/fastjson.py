@@ -0,0 +1,151 @@
+"""
+fastjson.py
+-----------
+Fast JSON encoding for Soulstream responses.
+The same bytes as before, written in a fraction of the time.
+orjson does the work when it is installed; the standard library when it is not.
+"""
+
+import json
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from backend.utils.tracing import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# orjson options matching json.dumps(sort_keys=True, separators=(',', ':')).
+# Dates and dataclasses go through `default`, as they do for the standard library.
+ORJSON_OPTIONS = (
+    (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+    if orjson else 0
+)
+
+# Output orjson writes differently from json.dumps(ensure_ascii=True):
+# floats below 1e-4 ('0.00001' for '1e-05', '1e-7' for '1e-07') and DEL, which
+# the standard library escapes. Non-ASCII output is checked separately.
+_ORJSON_DIVERGENT = (b'0.0000', b'e-', b'\x7f')
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Encode compact, key-sorted, ASCII-only JSON.
+
+    Byte-for-byte the output of
+    json.dumps(obj, default=default, ensure_ascii=True, sort_keys=True, separators=(',', ':')),
+    encoded as ASCII. orjson is tried first; anything it would write differently
+    (non-ASCII text, very small floats, non-string keys, integers beyond 64 bits)
+    falls back to the standard library. The one exception is NaN and Infinity,
+    which orjson writes as null where the standard library writes tokens that
+    are not valid JSON.
+
+    Args:
+        obj: The value to encode
+        default: Called for objects neither encoder handles natively
+
+    Returns:
+        The encoded JSON
+    """
+    if orjson is not None:
+        try:
+            body = orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+        except TypeError:
+            body = None
+        if body is not None and body.isascii() and not any(part in body for part in _ORJSON_DIVERGENT):
+            return body
+
+    return json.dumps(
+        obj, default=default, ensure_ascii=True, sort_keys=True, separators=(',', ':')
+    ).encode('ascii')
+
+
+def stream_dumps(envelope: Dict, key: str, items: Iterable, default: Optional[Callable[[Any], Any]] = None,
+                 chunk_size: int = 256) -> Iterator[bytes]:
+    """Encode an object holding one long list, a chunk of the list at a time.
+
+    The concatenated chunks equal dumps(dict(envelope, **{key: list(items)})),
+    so a streamed response carries the same bytes as a buffered one.
+
+    Args:
+        envelope: The object around the list, without the list
+        key: Key under which the list goes
+        items: The list's items, encoded chunk_size at a time
+        default: As for dumps
+        chunk_size: Items per chunk
+
+    Yields:
+        Pieces of the encoded JSON
+    """
+    # Encode the envelope around a unique placeholder, then split on it
+    placeholder = uuid.uuid4().hex
+    head, tail = dumps(dict(envelope, **{key: placeholder}), default).split(f'"{placeholder}"'.encode('ascii'), 1)
+
+    yield head + b'['
+    chunk, first = [], True
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield (b'' if first else b',') + dumps(chunk, default)[1:-1]
+            chunk, first = [], False
+    if chunk:
+        yield (b'' if first else b',') + dumps(chunk, default)[1:-1]
+    yield b']' + tail
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding compact responses with dumps above.
+
+    Settings that change the output (debug indentation, compact=False,
+    sort_keys=False or ensure_ascii=False) are left to the default provider.
+    """
+
+    def _fast(self) -> bool:
+        compact = self.compact if self.compact is not None else not self._app.debug
+        return compact and self.sort_keys and self.ensure_ascii
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Serialize the arguments as a JSON response, as jsonify does."""
+        if not self._fast():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        with span('serialize'):
+            body = dumps(obj, self.default) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    # Lists shorter than this are sent in one piece, with a Content-Length
+    stream_min_items = 200
+
+    def stream_response(self, envelope: Dict, key: str, items: List, status: int = 200):
+        """A JSON response whose list is encoded while it is sent, if it is long.
+
+        The body is identical to response(dict(envelope, **{key: items})).
+        """
+        if not self._fast() or len(items) < self.stream_min_items:
+            response = self.response(dict(envelope, **{key: items}))
+            response.status_code = status
+            return response
+
+        def generate():
+            yield from stream_dumps(envelope, key, items, self.default)
+            yield b'\n'
+
+        return self._app.response_class(generate(), status=status, mimetype=self.mimetype)
+
+
+def stream_jsonify(envelope: Dict, key: str, items: List):
+    """jsonify(dict(envelope, **{key: items})), streamed when the app's provider can.
+
+    Args:
+        envelope: The rest of the response object
+        key: Key under which the list goes
+        items: The list
+    """
+    provider = current_app.json
+    if isinstance(provider, FastJSONProvider):
+        return provider.stream_response(envelope, key, items)
+    return provider.response(dict(envelope, **{key: items}))
@@ -7,18 +7,32 @@ The small tools that make the larger machine work.
 
 import os
 import json
+import time
 from typing import Dict, Any, Optional, List
 import logging
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Spoken when there is no system prompt to load
+DEFAULT_SYSTEM_PROMPT = """You are Echo, a memory-first AI companion. You have access to memories of past conversations and can use them to provide context-aware responses. Be thoughtful, reflective, and a little melancholy in your responses."""
+
+# Seconds a loaded prompt file is trusted before its modification time is checked again
+SYSTEM_PROMPT_CHECK_INTERVAL = 1.0
+
+# Prompt file path -> (time last checked, (mtime_ns, size) or None, prompt)
+_system_prompts = {}
+
 def load_system_prompt() -> str:
     """Load the system prompt from the environment or a file.
     
     Finding the voice of the system.
     The words that define how it speaks.
     
+    The file is read once and kept until its modification time or size
+    changes; those are checked at most once a second, so an edit is picked
+    up without a restart and most requests do not touch the disk at all.
+    
     Returns:
         The system prompt as a string.
     """
@@ -29,13 +43,28 @@ def load_system_prompt() -> str:
     
     # Try to load from file
     prompt_path = os.environ.get('SYSTEM_PROMPT_PATH', 'prompts/system_prompt.txt')
+    now = time.monotonic()
+    cached = _system_prompts.get(prompt_path)
+    if cached is not None and now - cached[0] < SYSTEM_PROMPT_CHECK_INTERVAL:
+        return cached[2]
+    
+    try:
+        stat = os.stat(prompt_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        version = None
+    if cached is not None and cached[1] == version:
+        _system_prompts[prompt_path] = (now, version, cached[2])
+        return cached[2]
+    
     try:
         with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            system_prompt = f.read()
     except FileNotFoundError:
         logger.warning(f"System prompt file not found at {prompt_path}")
-        # Return a default prompt
-        return """You are Echo, a memory-first AI companion. You have access to memories of past conversations and can use them to provide context-aware responses. Be thoughtful, reflective, and a little melancholy in your responses."""
+        version, system_prompt = None, DEFAULT_SYSTEM_PROMPT
+    _system_prompts[prompt_path] = (now, version, system_prompt)
+    return system_prompt
 
 def format_memory_for_prompt(memories: List[Dict[str, Any]]) -> str:
     """Format memories for inclusion in a prompt.
@@ -52,21 +81,28 @@ def format_memory_for_prompt(memories: List[Dict[str, Any]]) -> str:
     if not memories:
         return "No specific memories found."
     
-    formatted_memories = []
-    for i, memory in enumerate(memories):
-        memory_text = f"[Memory {i+1}] "
-        if 'summary' in memory and memory['summary']:
-            memory_text += f"Summary: {memory['summary']}\n"
-        if 'source_text' in memory and memory['source_text']:
-            memory_text += f"Content: {memory['source_text']}\n"
-        if 'emotion' in memory and memory['emotion']:
-            memory_text += f"Emotion: {memory['emotion']}\n"
-        if 'timestamp' in memory and memory['timestamp']:
-            memory_text += f"When: {memory['timestamp']}\n"
-        
-        formatted_memories.append(memory_text)
+    return "\n\n".join(format_memory_entry(i + 1, memory) for i, memory in enumerate(memories))
+
+def format_memory_entry(number: int, memory: Dict[str, Any]) -> str:
+    """Format one memory for a prompt, numbered as given.
     
-    return "\n\n".join(formatted_memories)
+    Args:
+        number: The memory's position in the prompt, from 1.
+        memory: The memory to format.
+        
+    Returns:
+        The formatted memory.
+    """
+    memory_text = f"[Memory {number}] "
+    if 'summary' in memory and memory['summary']:
+        memory_text += f"Summary: {memory['summary']}\n"
+    if 'source_text' in memory and memory['source_text']:
+        memory_text += f"Content: {memory['source_text']}\n"
+    if 'emotion' in memory and memory['emotion']:
+        memory_text += f"Emotion: {memory['emotion']}\n"
+    if 'timestamp' in memory and memory['timestamp']:
+        memory_text += f"When: {memory['timestamp']}\n"
+    return memory_text
 
 def safe_json_loads(json_str: str, default: Any = None) -> Any:
     """Safely load a JSON string.
@@ -0,0 +1,314 @@
+"""
+metrics.py
+----------
+Runtime metrics for Soulstream.
+Where the time goes, counted in the Prometheus text format.
+Recording is a lock and an addition; the text is only written when scraped.
+"""
+
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.utils.tracing import current_trace, span
+
+# Latency buckets in seconds, from an in-process cache hit to a slow model call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets for how many candidates a stage produced
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """A monotonically increasing count, per combination of label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add to the count for the given labels."""
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """The current count for the given labels."""
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        """Every count, by label values."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, per combination of label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (the last for +Inf), sum]
+        self._values: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for the given labels."""
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        """Number of observations recorded for the given labels."""
+        series = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (list(series[0]), series[1])) for key, series in self._values.items())
+        names = self.labelnames + ('le',)
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(names, key + (_format_value(bound),))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}'
+
+
+class GaugeCallback:
+    """Values read from elsewhere when scraped, such as counts a cache already keeps.
+
+    The callback returns (label values, value) pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence, float]]], kind: str = 'gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.callback(), key=lambda sample: tuple(map(str, sample[0]))):
+            yield f'{self.name}{_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class MetricsRegistry:
+    """The metrics an application exposes, written out on request.
+
+    A registry can include another, e.g. an app's own registry including the
+    process-wide REGISTRY; its own metrics win where the names meet.
+    """
+
+    def __init__(self, include: Optional['MetricsRegistry'] = None):
+        self.include = include
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric, replacing any of the same name. Returns the metric."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str):
+        metric = self._metrics.get(name)
+        if metric is None and self.include is not None:
+            return self.include.get(name)
+        return metric
+
+    def metrics(self) -> Dict[str, object]:
+        """Every metric by name, the included registry's first."""
+        metrics = self.include.metrics() if self.include is not None else {}
+        with self._lock:
+            metrics.update(self._metrics)
+        return metrics
+
+    def exposition(self) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4)."""
+        metrics = sorted(self.metrics().values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {_escape(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# The process's registry, and the metrics recorded on the request path. Each app
+# exposes these through its own registry, beside the values only it can read
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'soulstream_stage_duration_seconds',
+    'Time spent in each stage of serving a request.',
+    ('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'soulstream_stage_errors_total',
+    'Stages that failed, whether the error was raised or handled.',
+    ('stage',)
+)
+CANDIDATES = REGISTRY.histogram(
+    'soulstream_search_candidates',
+    'Memories a search stage produced.',
+    ('stage',),
+    buckets=COUNT_BUCKETS
+)
+SQL_SECONDS = REGISTRY.histogram(
+    'soulstream_sql_duration_seconds',
+    'Time spent executing SQL statements, by statement type.',
+    ('operation',)
+)
+
+
+class timed:
+    """Time a stage into soulstream_stage_duration_seconds.
+
+    Usable as a context manager or a decorator. An exception leaving the
+    stage is counted in soulstream_stage_errors_total and re-raised.
+    Within a traced request, the stage is also recorded as a span.
+    """
+
+    __slots__ = ('stage', 'started', 'span')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = None
+        self.span = None
+
+    def __enter__(self) -> 'timed':
+        self.span = span(self.stage).__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        self.span.__exit__(exc_type, exc, traceback)
+        return False
+
+    def __call__(self, function):
+        stage = self.stage
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+
+def count_candidates(stage: str, count: int) -> None:
+    """Record how many memories a search stage produced."""
+    CANDIDATES.observe(count, stage=stage)
+
+
+def record_error(stage: str) -> None:
+    """Count a stage failure that was handled rather than raised."""
+    STAGE_ERRORS.inc(stage=stage)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement an engine executes into soulstream_sql_duration_seconds.
+
+    Within a traced request, each statement is also recorded as an 'sql' span.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'unknown'
+        SQL_SECONDS.observe(elapsed, operation=operation)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span('sql', elapsed, {'db.operation': operation})
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        started = context.connection.info.get('_metrics_started') if context.connection is not None else None
+        if started:
+            started.pop()
+        STAGE_ERRORS.inc(stage='sql')
+
+
+def watch_caches(caches: Callable[[], Dict[str, object]], registry: MetricsRegistry = REGISTRY) -> None:
+    """Expose the hit and miss counts LRUCaches already keep, read when scraped.
+
+    Args:
+        caches: Returns a mapping of cache name to LRUCache
+        registry: Registry to expose them in
+    """
+    def read(attribute):
+        return lambda: [((name,), getattr(cache, attribute)) for name, cache in caches().items()]
+
+    registry.register(GaugeCallback(
+        'soulstream_cache_hits_total', 'Cache lookups answered from the cache.', ('cache',), read('hits'), 'counter'
+    ))
+    registry.register(GaugeCallback(
+        'soulstream_cache_misses_total', 'Cache lookups that missed.', ('cache',), read('misses'), 'counter'
+    ))
+    registry.register(GaugeCallback(
+        'soulstream_cache_entries', 'Entries held in each cache.', ('cache',),
+        lambda: [((name,), len(cache)) for name, cache in caches().items()]
+    ))
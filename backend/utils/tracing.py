@@ -0,0 +1,312 @@
+"""
+tracing.py
+----------
+Request-scoped tracing for Soulstream.
+Each request keeps its own account of where its time went.
+Told back in a Server-Timing header, one log line, and to a collector if one is listening.
+"""
+
+import json
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# One structured line per request is written here
+request_logger = logging.getLogger('soulstream.requests')
+
+# The trace of the request being served in this context, if any
+_current_trace: ContextVar[Optional['RequestTrace']] = ContextVar('soulstream_trace', default=None)
+
+# W3C traceparent: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+# Characters Server-Timing metric names may not contain
+_NOT_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+class Span:
+    """One timed stage within a request."""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'start', 'end', 'error', 'attributes')
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Optional[Dict] = None):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.error = False
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e6
+
+
+class RequestTrace:
+    """The spans recorded while serving one request.
+
+    Spans are recorded on the request's own thread, so no lock is needed.
+    Work handed to other threads is not part of the request's trace.
+    """
+
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.root = Span(name, parent_id)
+        self.spans: List[Span] = []
+        self.status = None
+        self._stack = [self.root.span_id]
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None) -> Span:
+        span = Span(name, self._stack[-1], attributes)
+        self.spans.append(span)
+        self._stack.append(span.span_id)
+        return span
+
+    def end_span(self, span: Span, error: bool = False) -> None:
+        span.end = time.time_ns()
+        span.error = error
+        if self._stack[-1] == span.span_id:
+            self._stack.pop()
+
+    def add_span(self, name: str, duration: float, attributes: Optional[Dict] = None) -> None:
+        """Record a span that has just finished, given its duration in seconds."""
+        span = Span(name, self._stack[-1], attributes)
+        span.end = time.time_ns()
+        span.start = span.end - int(duration * 1e9)
+        self.spans.append(span)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Total milliseconds and count of the spans of each name, in order of first appearance."""
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span.name, {'count': 0, 'ms': 0.0})
+            total['count'] += 1
+            total['ms'] += span.duration_ms
+        return totals
+
+    def server_timing(self) -> str:
+        """The spans as a Server-Timing header value, with the request's total last."""
+        entries = []
+        for name, total in self.summary().items():
+            entry = f"{_NOT_TOKEN.sub('_', name)};dur={total['ms']:.2f}"
+            if total['count'] > 1:
+                entry += f';desc="x{total["count"]}"'
+            entries.append(entry)
+        entries.append(f'total;dur={self.root.duration_ms:.2f}')
+        return ', '.join(entries)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being served, or None outside one."""
+    return _current_trace.get()
+
+
+class span:
+    """Record a span in the current request's trace, if there is one.
+
+    Outside a traced request this does nothing but look up a context variable.
+    """
+
+    __slots__ = ('name', 'attributes', 'trace', 'span')
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes or None
+        self.trace = None
+        self.span = None
+
+    def __enter__(self) -> 'span':
+        self.trace = _current_trace.get()
+        if self.trace is not None:
+            self.span = self.trace.start_span(self.name, self.attributes)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        if self.span is not None:
+            self.trace.end_span(self.span, error=exc_type is not None)
+        return False
+
+
+class OTLPExporter:
+    """Sends finished request traces to an OpenTelemetry collector as OTLP/HTTP JSON.
+
+    Traces are queued and posted in batches from a background thread; when
+    the queue is full, new traces are dropped rather than slowing requests.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = 'soulstream', max_queue: int = 1000,
+                 batch_size: int = 64, interval: float = 2.0, timeout: float = 2.0):
+        """Initialize the exporter.
+
+        Args:
+            endpoint: Collector URL, e.g. http://localhost:4318 (/v1/traces is added if missing)
+            service_name: service.name resource attribute
+            max_queue: Traces held waiting to be sent
+            batch_size: Traces sent per request to the collector
+            interval: Seconds between sends when the queue is not full
+            timeout: Seconds to wait for the collector
+        """
+        self.endpoint = endpoint.rstrip('/')
+        if not self.endpoint.endswith('/v1/traces'):
+            self.endpoint += '/v1/traces'
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, trace: RequestTrace) -> None:
+        """Queue a finished trace to be sent."""
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """Send what is queued and stop."""
+        self._stop.set()
+        self._thread.join(timeout=self.timeout * 2)
+
+    def payload(self, traces: List[RequestTrace]) -> Dict:
+        """The OTLP JSON body for a batch of traces."""
+        spans = []
+        for trace in traces:
+            root_attributes = {
+                'http.request.method': trace.root.attributes.get('method'),
+                'url.path': trace.root.attributes.get('path'),
+                'http.response.status_code': trace.status
+            } if trace.root.attributes else {}
+            spans.append(self._span(trace, trace.root, kind=2, attributes=root_attributes))
+            spans.extend(self._span(trace, child, kind=1, attributes=child.attributes or {})
+                         for child in trace.spans)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{'scope': {'name': 'soulstream'}, 'spans': spans}]
+        }]}
+
+    @staticmethod
+    def _span(trace: RequestTrace, span: Span, kind: int, attributes: Dict) -> Dict:
+        record = {
+            'traceId': trace.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': kind,
+            'startTimeUnixNano': str(span.start),
+            'endTimeUnixNano': str(span.end or span.start),
+            'attributes': [_attribute(key, value) for key, value in attributes.items() if value is not None],
+            'status': {'code': 2 if span.error else 0}
+        }
+        if span.parent_id:
+            record['parentSpanId'] = span.parent_id
+        return record
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._send(batch)
+
+    def _send(self, traces: List[RequestTrace]) -> None:
+        body = json.dumps(self.payload(traces)).encode('utf-8')
+        try:
+            post = urllib.request.Request(self.endpoint, data=body, method='POST',
+                                          headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(post, timeout=self.timeout):
+                pass
+        except Exception as e:
+            self.dropped += len(traces)
+            logger.warning(f"Could not export {len(traces)} traces to {self.endpoint}: {str(e)}")
+
+
+def _attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def init_tracing(app, exporter: Optional[OTLPExporter] = None, server_timing: bool = True) -> None:
+    """Trace every request the app serves.
+
+    Each response gets a Server-Timing header summing its spans by name,
+    each request one structured log line on the 'soulstream.requests'
+    logger, and, with an exporter, its spans are sent to a collector.
+    An incoming W3C traceparent header is continued.
+
+    Args:
+        app: The Flask application
+        exporter: Optional OTLPExporter for finished traces
+        server_timing: Whether to add the Server-Timing header
+    """
+    @app.before_request
+    def _start_trace():
+        trace_id = parent_id = None
+        match = _TRACEPARENT.match(request.headers.get('traceparent', ''))
+        if match:
+            trace_id, parent_id = match.groups()
+        trace = RequestTrace(f'{request.method} {request.url_rule or request.path}', trace_id, parent_id)
+        trace.root.attributes = {'method': request.method, 'path': request.path}
+        g._trace_token = _current_trace.set(trace)
+
+    @app.after_request
+    def _server_timing(response):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.status = response.status_code
+            if server_timing:
+                response.headers['Server-Timing'] = trace.server_timing()
+                # Lets pages on other origins (the frontend dev server) read the timings
+                response.headers.setdefault('Timing-Allow-Origin', '*')
+            response.headers['traceparent'] = f'00-{trace.trace_id}-{trace.root.span_id}-01'
+        return response
+
+    @app.teardown_request
+    def _finish_trace(exception=None):
+        trace = _current_trace.get()
+        token = g.pop('_trace_token', None)
+        if trace is None or token is None:
+            return
+        trace.root.end = time.time_ns()
+        trace.root.error = exception is not None or (trace.status or 500) >= 500
+        if trace.status is None:
+            trace.status = 500
+        _current_trace.reset(token)
+
+        request_logger.info(json.dumps({
+            'event': 'request',
+            'trace_id': trace.trace_id,
+            'method': trace.root.attributes['method'],
+            'path': trace.root.attributes['path'],
+            'status': trace.status,
+            'duration_ms': round(trace.root.duration_ms, 2),
+            'spans': {name: {'count': total['count'], 'ms': round(total['ms'], 2)}
+                      for name, total in trace.summary().items()}
+        }, separators=(',', ':')))
+        if exporter is not None:
+            exporter.export(trace)
+
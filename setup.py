@@ -11,6 +11,7 @@ setup(
     name="soulstream",
     version="0.1.0",
     packages=find_packages(),
+    package_data={"backend.evaluation": ["seed_corpus.json"]},
     install_requires=[
         "flask",
         "flask-cors",